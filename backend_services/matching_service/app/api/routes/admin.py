@@ -0,0 +1,74 @@
+"""Admin endpoints for tuning the Matching Service at runtime"""
+
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.config import settings
+from app.models.schemas import AlgorithmConfig, AlgorithmConfigVersion
+from app.services.algorithm_registry import (
+    AlgorithmVersion,
+    ConfigVersionConflict,
+    algorithm_registry,
+)
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Reject the request unless it carries the configured admin token
+    """
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Admin API is disabled: ADMIN_API_TOKEN is not configured",
+        )
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), settings.ADMIN_API_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin token",
+        )
+
+
+def _to_response(current: AlgorithmVersion) -> AlgorithmConfigVersion:
+    return AlgorithmConfigVersion(
+        version=current.version,
+        config=current.config,
+        updated_at=current.updated_at,
+    )
+
+
+@router.get("/config", response_model=AlgorithmConfigVersion)
+async def get_versioned_config():
+    """
+    Get the matching algorithm configuration and its version
+    """
+    return _to_response(algorithm_registry.current)
+
+
+@router.put(
+    "/config",
+    response_model=AlgorithmConfigVersion,
+    dependencies=[Depends(require_admin_token)],
+)
+async def update_config(
+    config: AlgorithmConfig,
+    expected_version: Optional[int] = None,
+):
+    """
+    Swap in a new matching algorithm configuration without a redeploy
+    Requires the X-Admin-Token header. Pass ``expected_version`` to reject the update if the config changed
+    since it was read.
+    """
+    try:
+        return _to_response(
+            algorithm_registry.update(config, expected_version=expected_version)
+        )
+
+    except ConfigVersionConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,6 +1,7 @@
 """API endpoints for Matching Service"""
 
-from typing import List, Optional
+import asyncio
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.models.schemas import (
@@ -8,28 +9,127 @@ from app.models.schemas import (
     MatchResponse,
     DriverMatch,
     AlgorithmConfig,
+    BatchAssignment,
+    DriverAvailability,
     HealthResponse,
 )
-from app.services.matching_algorithm import MatchingAlgorithm
+from app.services.batch_assignment import BatchAssignmentEngine, BatchCollector
+from app.services.algorithm_registry import algorithm_registry
+from app.services.batch_scoring import DriverColumns
 from app.services.driver_service import DriverService
+from app.services.fleet_state import fleet_state
+from app.services.location_stream import get_location_consumer
 from app.core.config import settings
 
 router = APIRouter(prefix="/matching", tags=["Matching"])
 
 
+_assignment_engine: Optional[BatchAssignmentEngine] = None
+
+
+def get_assignment_engine() -> BatchAssignmentEngine:
+    """
+    Get the batch assignment engine for the current algorithm version
+    """
+    global _assignment_engine
+    algorithm = algorithm_registry.algorithm
+    if _assignment_engine is None or _assignment_engine.algorithm is not algorithm:
+        _assignment_engine = BatchAssignmentEngine(
+            algorithm,
+            candidates_per_order=settings.BATCH_CANDIDATES_PER_ORDER,
+            max_batch_orders=settings.BATCH_MAX_ORDERS,
+            latency_budget_ms=settings.BATCH_LATENCY_BUDGET_MS,
+        )
+    return _assignment_engine
+
+
+def _fleet_candidates(request: MatchRequest) -> Optional[List[DriverAvailability]]:
+    """
+    Get nearby drivers from the in-memory fleet, or None if it is not fresh
+    """
+    if get_location_consumer() is None or not fleet_state.is_fresh():
+        return None
+
+    return fleet_state.nearby(
+        request.pickup_latitude,
+        request.pickup_longitude,
+        settings.MAX_MATCH_DISTANCE_KM,
+        vehicle_type=request.vehicle_type,
+    )
+
+
+async def _load_available_drivers(
+    requests: List[MatchRequest],
+) -> List[DriverAvailability]:
+    """
+    Load the union of each order's nearest candidates
+    Requested vehicle types are enforced again per order when the batch is assigned.
+    """
+    if get_location_consumer() is not None and fleet_state.is_fresh():
+        per_order = [_fleet_candidates(request) for request in requests]
+    else:
+        per_order = await asyncio.gather(
+            *(
+                DriverService.get_available_drivers(
+                    vehicle_type=request.vehicle_type,
+                    is_online=True,
+                    is_available=True,
+                    is_verified=True,
+                    limit=settings.BATCH_CANDIDATES_PER_ORDER,
+                    latitude=request.pickup_latitude,
+                    longitude=request.pickup_longitude,
+                    radius_km=settings.MAX_MATCH_DISTANCE_KM,
+                )
+                for request in requests
+            )
+        )
+
+    drivers: Dict[str, DriverAvailability] = {}
+    for candidates in per_order:
+        for driver in candidates:
+            drivers.setdefault(driver.driver_id, driver)
+    return list(drivers.values())
+
+
+_batch_collector: Optional[BatchCollector] = None
+
+
+def get_batch_collector() -> BatchCollector:
+    """
+    Get the shared collector that windows single-order assignments
+    """
+    global _batch_collector
+    if _batch_collector is None:
+        _batch_collector = BatchCollector(
+            get_assignment_engine(),
+            load_drivers=_load_available_drivers,
+            window_seconds=settings.BATCH_WINDOW_SECONDS,
+        )
+    else:
+        # Pick up config swaps; the next flush scores with the new version
+        _batch_collector.engine = get_assignment_engine()
+    return _batch_collector
+
+
 @router.post("/find-drivers", response_model=List[DriverMatch])
 async def find_drivers(request: MatchRequest):
     """
     Find available drivers and calculate match scores
     """
     try:
-        # Get available drivers
-        drivers = await DriverService.get_available_drivers(
-            vehicle_type=request.vehicle_type,
-            is_online=True,
-            is_available=True,
-            is_verified=True,
-        )
+        # Get available drivers, from memory while the location stream is fresh
+        drivers = _fleet_candidates(request)
+        if drivers is None:
+            drivers = await DriverService.get_available_drivers(
+                vehicle_type=request.vehicle_type,
+                is_online=True,
+                is_available=True,
+                is_verified=True,
+                limit=settings.MAX_CANDIDATE_DRIVERS,
+                latitude=request.pickup_latitude,
+                longitude=request.pickup_longitude,
+                radius_km=settings.MAX_MATCH_DISTANCE_KM,
+            )
 
         if not drivers:
             raise HTTPException(
@@ -37,36 +137,19 @@ async def find_drivers(request: MatchRequest):
                 detail="No available drivers found",
             )
 
-        # Get recent match history for fairness
-        recent_matches = await DriverService.get_recent_matches(
-            limit=10,
-            hours_ago=24,
-        )
-
-        # Initialize algorithm with config
-        algorithm = MatchingAlgorithm(
-            AlgorithmConfig(
-                eta_weight=settings.ETA_WEIGHT,
-                rating_weight=settings.RATING_WEIGHT,
-                reliability_weight=settings.RELIABILITY_WEIGHT,
-                fairness_boost=settings.FAIRNESS_BOOST,
-                vehicle_weight=settings.VEHICLE_WEIGHT,
-                max_match_distance_km=settings.MAX_MATCH_DISTANCE_KM,
-                max_eta_minutes=settings.MAX_ETA_MINUTES,
-                fairness_boost_threshold=settings.FAIRNESS_BOOST_THRESHOLD,
-            )
-        )
-
-        # Find best matches
-        matches = algorithm.find_best_matches(
+        # Find best matches with the current config version; fairness
+        # comes from the in-memory tracker rather than a match history query
+        matches = algorithm_registry.algorithm.find_best_matches(
             request=request,
             available_drivers=drivers,
-            recent_matches=recent_matches,
+            recent_matches=[],
             max_matches=5,
         )
 
         return matches
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -74,6 +157,45 @@ async def find_drivers(request: MatchRequest):
         )
 
 
+@router.post("/batch-assign", response_model=List[BatchAssignment])
+async def batch_assign(requests: List[MatchRequest]):
+    """
+    Assign drivers to a batch of orders so each driver gets at most one order
+    """
+    try:
+        drivers = await _load_available_drivers(requests)
+
+        return get_assignment_engine().assign(
+            requests,
+            DriverColumns.from_drivers(drivers),
+            [],
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to assign drivers: {str(e)}",
+        )
+
+
+@router.post("/assign", response_model=BatchAssignment)
+async def assign_driver(
+    request: MatchRequest,
+    collector: BatchCollector = Depends(get_batch_collector),
+):
+    """
+    Queue an order for the next batch window and return its assignment
+    """
+    try:
+        return await collector.submit(request)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to assign driver: {str(e)}",
+        )
+
+
 @router.post("/select-driver", response_model=MatchResponse)
 async def select_driver(
     order_id: str,
@@ -99,11 +221,12 @@ async def select_driver(
             status="PENDING",
         )
 
-        # Update driver availability
+        # Update driver availability, in memory too so matching stops offering them
         await DriverService.update_driver_availability(
             driver_id=driver_id,
             is_available=False,
         )
+        fleet_state.set_availability(driver_id, False)
 
         return MatchResponse(
             order_id=order_id,
@@ -149,6 +272,7 @@ async def driver_response(
                 driver_id=driver_id,
                 is_available=True,
             )
+            fleet_state.set_availability(driver_id, True)
 
         return {"message": "Driver response recorded"}
 
@@ -159,18 +283,27 @@ async def driver_response(
         )
 
 
+@router.get("/fleet/status")
+async def fleet_status():
+    """
+    Get in-memory fleet state and location stream metrics
+    """
+    consumer = get_location_consumer()
+
+    return {
+        "stream_enabled": consumer is not None,
+        "fresh": consumer is not None and fleet_state.is_fresh(),
+        "drivers": len(fleet_state),
+        "pending_drivers": fleet_state.pending_count,
+        "lag_seconds": fleet_state.lag_seconds(),
+        "max_staleness_seconds": fleet_state.max_staleness_seconds,
+        "metrics": consumer.metrics.to_dict() if consumer is not None else None,
+    }
+
+
 @router.get("/config", response_model=AlgorithmConfig)
 async def get_config():
     """
     Get current matching algorithm configuration
     """
-    return AlgorithmConfig(
-        eta_weight=settings.ETA_WEIGHT,
-        rating_weight=settings.RATING_WEIGHT,
-        reliability_weight=settings.RELIABILITY_WEIGHT,
-        fairness_boost=settings.FAIRNESS_BOOST,
-        vehicle_weight=settings.VEHICLE_WEIGHT,
-        max_match_distance_km=settings.MAX_MATCH_DISTANCE_KM,
-        max_eta_minutes=settings.MAX_ETA_MINUTES,
-        fairness_boost_threshold=settings.FAIRNESS_BOOST_THRESHOLD,
-    )
+    return algorithm_registry.current.config
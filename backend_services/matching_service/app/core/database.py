@@ -0,0 +1,63 @@
+"""Database connection pool management"""
+
+from typing import Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.logging import logger
+
+_pool: Optional[asyncpg.Pool] = None
+
+
+def _asyncpg_dsn(url: str) -> str:
+    # asyncpg does not understand SQLAlchemy driver suffixes
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def init_pool() -> asyncpg.Pool:
+    """
+    Create the shared connection pool
+    asyncpg keeps an LRU cache of prepared statements per connection, so
+    queries with stable SQL text are parsed and planned once per connection.
+    """
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            dsn=_asyncpg_dsn(settings.DATABASE_URL),
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            command_timeout=settings.DB_COMMAND_TIMEOUT_SECONDS,
+        )
+        logger.info(
+            f"Database pool ready ({settings.DB_POOL_MIN_SIZE}-{settings.DB_POOL_MAX_SIZE} connections)"
+        )
+    return _pool
+
+
+async def get_pool() -> asyncpg.Pool:
+    """
+    Get the shared connection pool, creating it on first use
+    """
+    if _pool is None:
+        return await init_pool()
+    return _pool
+
+
+def set_pool(pool) -> None:
+    """
+    Replace the shared pool (used by tests and alternative backends)
+    """
+    global _pool
+    _pool = pool
+
+
+async def close_pool() -> None:
+    """
+    Close the shared connection pool
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -72,6 +72,18 @@ class AlgorithmConfig(BaseModel):
     fairness_boost_threshold: float = 0.3
 
 
+class AlgorithmConfigVersion(BaseModel):
+    version: int
+    config: AlgorithmConfig
+    updated_at: datetime
+
+
+class BatchAssignment(BaseModel):
+    order_id: str
+    match: Optional[DriverMatch] = None
+    strategy: str
+
+
 class HealthResponse(BaseModel):
     status: str
     service: str
@@ -0,0 +1,140 @@
+"""Long-lived matching algorithm with versioned, hot-swappable config"""
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.models.schemas import AlgorithmConfig
+from app.services.batch_scoring import BatchMatchingAlgorithm
+from app.services.fairness_tracker import FairnessTracker, fairness_tracker
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class ConfigVersionConflict(Exception):
+    """Raised when a config update was based on a superseded version"""
+
+
+@dataclass(frozen=True)
+class AlgorithmVersion:
+    """An algorithm instance together with the config version it was built from"""
+
+    version: int
+    algorithm: BatchMatchingAlgorithm
+    updated_at: datetime
+
+    @property
+    def config(self) -> AlgorithmConfig:
+        return self.algorithm.config
+
+
+def algorithm_config_from_settings() -> AlgorithmConfig:
+    """
+    Build the startup algorithm config from settings
+    """
+    return AlgorithmConfig(
+        eta_weight=settings.ETA_WEIGHT,
+        rating_weight=settings.RATING_WEIGHT,
+        reliability_weight=settings.RELIABILITY_WEIGHT,
+        fairness_boost=settings.FAIRNESS_BOOST,
+        vehicle_weight=settings.VEHICLE_WEIGHT,
+        max_match_distance_km=settings.MAX_MATCH_DISTANCE_KM,
+        max_eta_minutes=settings.MAX_ETA_MINUTES,
+        fairness_boost_threshold=settings.FAIRNESS_BOOST_THRESHOLD,
+    )
+
+
+def validate_config(config: AlgorithmConfig) -> None:
+    """
+    Reject configs that would produce scores outside 0-1
+    """
+    weights = [
+        config.eta_weight,
+        config.rating_weight,
+        config.reliability_weight,
+        config.fairness_boost,
+        config.vehicle_weight,
+    ]
+    if any(weight < 0 for weight in weights):
+        raise ValueError("Weights must be non-negative")
+    if sum(weights) > 1.0 + 1e-9:
+        raise ValueError(f"Weights must sum to at most 1.0, got {sum(weights):.4f}")
+    if config.max_eta_minutes <= 0:
+        raise ValueError("max_eta_minutes must be positive")
+    if config.max_match_distance_km <= 0:
+        raise ValueError("max_match_distance_km must be positive")
+    if not 0 < config.fairness_boost_threshold <= 1:
+        raise ValueError("fairness_boost_threshold must be in (0, 1]")
+
+
+class AlgorithmRegistry:
+    """
+    Holds the current matching algorithm and swaps it atomically on config change
+    Readers take ``current`` with a single attribute read and never lock;
+    the AlgorithmVersion they get is immutable, so a request scores every
+    driver against one consistent config even if an update lands mid-request.
+    Writers serialize on a lock and build the replacement before publishing it.
+    """
+
+    def __init__(
+        self,
+        config: AlgorithmConfig,
+        fairness_tracker: Optional[FairnessTracker] = None,
+    ):
+        validate_config(config)
+        self.fairness_tracker = fairness_tracker
+        self._write_lock = threading.Lock()
+        self._current = AlgorithmVersion(
+            version=1,
+            algorithm=self._build(config),
+            updated_at=datetime.utcnow(),
+        )
+
+    @property
+    def current(self) -> AlgorithmVersion:
+        return self._current
+
+    @property
+    def algorithm(self) -> BatchMatchingAlgorithm:
+        return self._current.algorithm
+
+    def update(
+        self,
+        config: AlgorithmConfig,
+        expected_version: Optional[int] = None,
+    ) -> AlgorithmVersion:
+        """
+        Publish a new config and return its version
+        With ``expected_version`` the update is rejected if another update
+        has been published since that version was read.
+        """
+        validate_config(config)
+
+        with self._write_lock:
+            current = self._current
+            if expected_version is not None and expected_version != current.version:
+                raise ConfigVersionConflict(
+                    f"Config is at version {current.version}, not {expected_version}"
+                )
+
+            replacement = AlgorithmVersion(
+                version=current.version + 1,
+                algorithm=self._build(config),
+                updated_at=datetime.utcnow(),
+            )
+            self._current = replacement
+
+        logger.info(f"Matching config updated to version {replacement.version}")
+        return replacement
+
+    def _build(self, config: AlgorithmConfig) -> BatchMatchingAlgorithm:
+        # The tracker is shared across versions; only the config is swapped
+        return BatchMatchingAlgorithm(
+            config.model_copy(), fairness_tracker=self.fairness_tracker
+        )
+
+
+algorithm_registry = AlgorithmRegistry(
+    algorithm_config_from_settings(), fairness_tracker=fairness_tracker
+)
@@ -0,0 +1,288 @@
+"""Global batch assignment of drivers to simultaneous orders"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from app.models.schemas import (
+    BatchAssignment,
+    DriverAvailability,
+    DriverMatch,
+    MatchRequest,
+    MatchStatus,
+)
+from app.services.batch_scoring import BatchMatchingAlgorithm, BatchScores, DriverColumns
+from app.core.logging import logger
+
+# Cost used for order/driver pairs that are not allowed to match
+INFEASIBLE_COST = 1e6
+
+STRATEGY_OPTIMAL = "optimal"
+STRATEGY_GREEDY = "greedy"
+
+
+class BatchAssignmentEngine:
+    """
+    Assigns a batch of orders to drivers so each driver gets at most one order
+    Cost is ``1 - match_score`` from the weighted matching score, restricted
+    to each order's best ``candidates_per_order`` in-range drivers. The
+    min-cost assignment is solved with the Hungarian method. Batches over
+    ``max_batch_orders`` go straight to a greedy best-edge-first assignment,
+    as do batches whose scoring overruns the latency budget; the budget is
+    checked while the edges are built, so the Hungarian solve only starts
+    when there is time left for it.
+    """
+
+    def __init__(
+        self,
+        algorithm: BatchMatchingAlgorithm,
+        candidates_per_order: int = 20,
+        max_batch_orders: int = 200,
+        latency_budget_ms: float = 200.0,
+    ):
+        self.algorithm = algorithm
+        self.candidates_per_order = candidates_per_order
+        self.max_batch_orders = max_batch_orders
+        self.latency_budget_ms = latency_budget_ms
+
+    def assign(
+        self,
+        requests: List[MatchRequest],
+        columns: DriverColumns,
+        recent_matches: List[str],
+    ) -> List[BatchAssignment]:
+        """
+        Assign drivers to a batch of orders
+        Returns one BatchAssignment per request, in request order.
+        """
+        if not requests:
+            return []
+
+        deadline = time.perf_counter() + self.latency_budget_ms / 1000
+        if len(requests) > self.max_batch_orders:
+            strategy = STRATEGY_GREEDY
+            logger.info(
+                f"Batch of {len(requests)} orders exceeds {self.max_batch_orders}, "
+                "using greedy assignment"
+            )
+        else:
+            strategy = STRATEGY_OPTIMAL
+
+        edges, on_time = self._candidate_edges(
+            requests,
+            columns,
+            recent_matches,
+            deadline if strategy == STRATEGY_OPTIMAL else None,
+        )
+        if strategy == STRATEGY_OPTIMAL and not on_time:
+            strategy = STRATEGY_GREEDY
+            logger.info(
+                f"Batch scoring overran the {self.latency_budget_ms:.0f}ms "
+                "budget, using greedy assignment"
+            )
+
+        if strategy == STRATEGY_OPTIMAL:
+            pairs = self._solve_optimal(len(requests), edges)
+        else:
+            pairs = self._solve_greedy(edges)
+
+        results = []
+        for order_index, request in enumerate(requests):
+            pair = pairs.get(order_index)
+            match = None
+            if pair is not None:
+                row, scores = pair
+                match = self._build_match(request, columns, row, scores)
+            results.append(
+                BatchAssignment(order_id=request.order_id, match=match, strategy=strategy)
+            )
+
+        return results
+
+    def _candidate_edges(
+        self,
+        requests: List[MatchRequest],
+        columns: DriverColumns,
+        recent_matches: List[str],
+        deadline: Optional[float] = None,
+    ) -> Tuple[List[Tuple[int, np.ndarray, BatchScores]], bool]:
+        """
+        Score every order and keep its best in-range drivers as sparse edges
+        Also returns whether scoring finished before ``deadline`` (a
+        ``time.perf_counter`` value); the clock is checked after each order.
+        """
+        if len(columns) == 0:
+            return [], True
+
+        # Fairness does not depend on the order, so compute it once
+        fairness = self.algorithm.fairness_column(columns, recent_matches)
+
+        edges = []
+        on_time = True
+        for order_index, request in enumerate(requests):
+            scores = self.algorithm.score_batch(
+                request, columns, recent_matches, fairness_boost=fairness
+            )
+            if request.vehicle_type is not None:
+                # A requested vehicle type is a hard requirement, as in
+                # /find-drivers; the match score only weights it
+                scores.in_range &= scores.vehicle_match > 0
+            rows = self.algorithm.top_k(scores, self.candidates_per_order)
+            if rows.size:
+                edges.append((order_index, rows, scores))
+            if on_time and deadline is not None and time.perf_counter() > deadline:
+                on_time = False
+
+        return edges, on_time
+
+    def _solve_optimal(
+        self,
+        order_count: int,
+        edges: List[Tuple[int, np.ndarray, BatchScores]],
+    ) -> Dict[int, Tuple[int, BatchScores]]:
+        if not edges:
+            return {}
+
+        driver_rows = np.unique(np.concatenate([rows for _, rows, _ in edges]))
+        column_of = {row: column for column, row in enumerate(driver_rows.tolist())}
+
+        cost = np.full((order_count, driver_rows.size), INFEASIBLE_COST)
+        scores_by_order = {}
+        for order_index, rows, scores in edges:
+            columns = [column_of[row] for row in rows.tolist()]
+            cost[order_index, columns] = 1.0 - scores.match_score[rows]
+            scores_by_order[order_index] = scores
+
+        order_indices, driver_columns = linear_sum_assignment(cost)
+
+        pairs = {}
+        for order_index, column in zip(order_indices.tolist(), driver_columns.tolist()):
+            if cost[order_index, column] >= INFEASIBLE_COST:
+                continue
+            pairs[order_index] = (int(driver_rows[column]), scores_by_order[order_index])
+
+        return pairs
+
+    def _solve_greedy(
+        self,
+        edges: List[Tuple[int, np.ndarray, BatchScores]],
+    ) -> Dict[int, Tuple[int, BatchScores]]:
+        ranked = sorted(
+            (
+                (float(scores.match_score[row]), order_index, row, scores)
+                for order_index, rows, scores in edges
+                for row in rows.tolist()
+            ),
+            key=lambda edge: edge[0],
+            reverse=True,
+        )
+
+        pairs = {}
+        taken = set()
+        for _, order_index, row, scores in ranked:
+            if order_index in pairs or row in taken:
+                continue
+            pairs[order_index] = (row, scores)
+            taken.add(row)
+
+        return pairs
+
+    def _build_match(
+        self,
+        request: MatchRequest,
+        columns: DriverColumns,
+        row: int,
+        scores: BatchScores,
+    ) -> DriverMatch:
+        return DriverMatch(
+            order_id=request.order_id,
+            driver_id=columns.driver_ids[row],
+            match_score=float(scores.match_score[row]),
+            eta_score=float(scores.eta_score[row]),
+            rating_score=float(scores.rating_score[row]),
+            reliability_score=float(scores.reliability_score[row]),
+            fairness_boost=float(scores.fairness_boost[row]),
+            vehicle_match=float(scores.vehicle_match[row]),
+            estimated_arrival_minutes=int(scores.eta_minutes[row]),
+            status=MatchStatus.PENDING,
+        )
+
+
+class BatchCollector:
+    """
+    Collects single order submissions over a short window and assigns them together
+    The first submission opens a window; the batch is flushed when the window
+    closes or ``max_batch_orders`` orders are waiting, whichever comes first.
+    ``load_recent_matches`` is only needed when the algorithm has no fairness
+    tracker attached.
+    """
+
+    def __init__(
+        self,
+        engine: BatchAssignmentEngine,
+        load_drivers: Callable[
+            [List[MatchRequest]], Awaitable[List[DriverAvailability]]
+        ],
+        load_recent_matches: Optional[Callable[[], Awaitable[List[str]]]] = None,
+        window_seconds: float = 1.5,
+    ):
+        self.engine = engine
+        self.load_drivers = load_drivers
+        self.load_recent_matches = load_recent_matches
+        self.window_seconds = window_seconds
+        self._pending: List[Tuple[MatchRequest, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, request: MatchRequest) -> BatchAssignment:
+        """
+        Queue an order for the current window and wait for its assignment
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+
+        if len(self._pending) >= self.engine.max_batch_orders:
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+        return await future
+
+    async def flush(self) -> None:
+        """
+        Assign every pending order now
+        """
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        requests = [request for request, _ in batch]
+        try:
+            drivers = await self.load_drivers(requests)
+            recent_matches = (
+                await self.load_recent_matches() if self.load_recent_matches else []
+            )
+            assignments = self.engine.assign(
+                requests,
+                DriverColumns.from_drivers(drivers),
+                recent_matches,
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), assignment in zip(batch, assignments):
+            if not future.done():
+                future.set_result(assignment)
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        self._flush_task = None
+        await self.flush()
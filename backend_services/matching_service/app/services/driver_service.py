@@ -1,12 +1,131 @@
-"""Driver service stub (to be implemented with database access)"""
+"""Driver data access backed by PostgreSQL/PostGIS"""
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from app.core.database import get_pool
 from app.models.schemas import DriverAvailability
+from app.services.fairness_tracker import fairness_tracker
+
+_DRIVER_COLUMNS = """
+    driver_id::text AS driver_id,
+    is_online,
+    is_available,
+    current_latitude,
+    current_longitude,
+    last_location_update,
+    vehicle_type,
+    is_verified,
+    rating,
+    total_trips
+"""
+
+# Pickup point as a geography, with $1 = latitude and $2 = longitude
+_PICKUP = "ST_SetSRID(ST_MakePoint($2, $1), 4326)::geography"
+
+# Cache of generated SQL keyed by filter shape. Status flags are inlined as
+# literals so the planner can use the partial (is_online, is_available) index
+# even for generic plans, and each shape keeps identical SQL text so asyncpg's
+# per-connection prepared statement cache hits on every call.
+_available_drivers_sql: Dict[Tuple[bool, bool, bool, bool, bool], str] = {}
+
+
+def _sql_bool(value: bool) -> str:
+    return "TRUE" if value else "FALSE"
+
+
+def available_drivers_sql(
+    is_online: bool,
+    is_available: bool,
+    is_verified: bool,
+    near_point: bool,
+    by_vehicle_type: bool,
+) -> str:
+    """
+    Get the available-drivers query for a filter shape
+    With ``near_point`` the radius filter and KNN ordering run in PostGIS
+    against the GIST index on ``location``, so only the nearest ``limit``
+    drivers leave the database.
+    """
+    key = (is_online, is_available, is_verified, near_point, by_vehicle_type)
+    sql = _available_drivers_sql.get(key)
+    if sql is not None:
+        return sql
+
+    conditions = [
+        f"is_online = {_sql_bool(is_online)}",
+        f"is_available = {_sql_bool(is_available)}",
+        f"is_verified = {_sql_bool(is_verified)}",
+        "last_location_update IS NOT NULL",
+    ]
+
+    if near_point:
+        # $1 latitude, $2 longitude, $3 radius (m), $4 limit, [$5 vehicle type]
+        conditions.append(f"ST_DWithin(location, {_PICKUP}, $3)")
+        order_by = f"ORDER BY location <-> {_PICKUP}"
+        limit = "LIMIT $4"
+        vehicle_param = "$5"
+    else:
+        # $1 limit, [$2 vehicle type]
+        conditions.append("location IS NOT NULL")
+        order_by = ""
+        limit = "LIMIT $1"
+        vehicle_param = "$2"
+
+    if by_vehicle_type:
+        conditions.append(f"vehicle_type = {vehicle_param}")
+
+    sql = (
+        f"SELECT {_DRIVER_COLUMNS} FROM driver_availability "
+        f"WHERE {' AND '.join(conditions)} {order_by} {limit}"
+    )
+    _available_drivers_sql[key] = sql
+    return sql
+
+
+RECENT_MATCHES_SQL = """
+    SELECT driver_id::text AS driver_id
+    FROM driver_matches
+    WHERE created_at >= NOW() - make_interval(hours => $1)
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+RECENT_MATCH_EVENTS_SQL = """
+    SELECT driver_id::text AS driver_id,
+           EXTRACT(EPOCH FROM created_at)::float8 AS matched_at
+    FROM driver_matches
+    WHERE created_at >= NOW() - make_interval(secs => $1)
+    ORDER BY created_at
+"""
+
+RECORD_MATCH_SQL = """
+    INSERT INTO driver_matches (
+        order_id, driver_id, match_score, eta_score, rating_score,
+        reliability_score, fairness_boost, vehicle_match,
+        estimated_arrival_minutes, status
+    )
+    VALUES ($1::uuid, $2::uuid, $3, $4, $5, $6, $7, $8, $9, $10)
+"""
+
+UPDATE_AVAILABILITY_SQL = """
+    UPDATE driver_availability
+    SET is_available = $2, updated_at = CURRENT_TIMESTAMP
+    WHERE driver_id = $1::uuid
+"""
+
+UPDATE_MATCH_RESPONSE_SQL = """
+    UPDATE driver_matches
+    SET status = $3,
+        driver_response_time_seconds = $4,
+        order_cancellation_reason = $5,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE order_id = $1::uuid AND driver_id = $2::uuid
+"""
 
 
 class DriverService:
     """Service for accessing driver data"""
-    
+
     @staticmethod
     async def get_available_drivers(
         vehicle_type: Optional[str] = None,
@@ -14,23 +133,55 @@ class DriverService:
         is_available: bool = True,
         is_verified: bool = True,
         limit: int = 100,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_km: Optional[float] = None,
     ) -> List[DriverAvailability]:
         """
         Get available drivers for matching
-        TODO: Implement with actual database queries
+        When a point and radius are given, returns the ``limit`` nearest
+        drivers within the radius, nearest first.
         """
-        # Stub implementation - replace with actual database queries
-        return []
-    
+        near_point = latitude is not None and longitude is not None
+        if near_point and radius_km is None:
+            raise ValueError("radius_km is required when searching near a point")
+
+        sql = available_drivers_sql(
+            is_online, is_available, is_verified, near_point, vehicle_type is not None
+        )
+
+        if near_point:
+            args = [latitude, longitude, radius_km * 1000.0, limit]
+        else:
+            args = [limit]
+        if vehicle_type is not None:
+            args.append(vehicle_type)
+
+        pool = await get_pool()
+        rows = await pool.fetch(sql, *args)
+
+        return [DriverAvailability(**dict(row)) for row in rows]
+
     @staticmethod
     async def get_recent_matches(limit: int = 10, hours_ago: int = 24) -> List[str]:
         """
-        Get recent driver matches for fairness algorithm
-        TODO: Implement with actual database queries
+        Get recent driver matches for fairness algorithm, most recent first
         """
-        # Stub implementation - replace with actual database queries
-        return []
-    
+        pool = await get_pool()
+        rows = await pool.fetch(RECENT_MATCHES_SQL, hours_ago, limit)
+
+        return [row["driver_id"] for row in rows]
+
+    @staticmethod
+    async def get_recent_match_events(hours_ago: float = 24) -> List[Tuple[str, float]]:
+        """
+        Get (driver_id, epoch seconds) for every match in the window, oldest first
+        """
+        pool = await get_pool()
+        rows = await pool.fetch(RECENT_MATCH_EVENTS_SQL, hours_ago * 3600.0)
+
+        return [(row["driver_id"], row["matched_at"]) for row in rows]
+
     @staticmethod
     async def record_driver_match(
         order_id: str,
@@ -46,10 +197,23 @@ class DriverService:
     ) -> None:
         """
         Record driver match in database
-        TODO: Implement with actual database queries
         """
-        pass
-    
+        pool = await get_pool()
+        await pool.execute(
+            RECORD_MATCH_SQL,
+            order_id,
+            driver_id,
+            match_score,
+            eta_score,
+            rating_score,
+            reliability_score,
+            fairness_boost,
+            vehicle_match,
+            estimated_arrival_minutes,
+            status,
+        )
+        fairness_tracker.record(driver_id)
+
     @staticmethod
     async def update_driver_availability(
         driver_id: str,
@@ -57,21 +221,28 @@ class DriverService:
     ) -> None:
         """
         Update driver availability status
-        TODO: Implement with actual database queries
         """
-        pass
-    
+        pool = await get_pool()
+        await pool.execute(UPDATE_AVAILABILITY_SQL, driver_id, is_available)
+
     @staticmethod
     async def update_match_response(
         order_id: str,
         driver_id: str,
         accepted: bool,
         response_time_seconds: int,
-        cancellation_reason: Optional[str] = None,
         status: str,
+        cancellation_reason: Optional[str] = None,
     ) -> None:
         """
         Update match response status
-        TODO: Implement with actual database queries
         """
-        pass
+        pool = await get_pool()
+        await pool.execute(
+            UPDATE_MATCH_RESPONSE_SQL,
+            order_id,
+            driver_id,
+            status,
+            response_time_seconds,
+            cancellation_reason,
+        )
@@ -0,0 +1,170 @@
+"""Time-decayed per-driver assignment counts for fairness scoring"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class FairnessTracker:
+    """
+    Exponentially decayed assignment counter per driver
+    Each assignment adds 1 to the driver's count, which then halves every
+    ``half_life_seconds``. Drivers with no assignment in the last
+    ``window_seconds`` are expired and count as never matched. Entries are
+    kept in last-assignment order, so expiry pops from the front in
+    amortized O(1) and lookups are a single dict access.
+    """
+
+    def __init__(self, half_life_seconds: float = 3600.0, window_seconds: float = 86400.0):
+        if half_life_seconds <= 0:
+            raise ValueError("half_life_seconds must be positive")
+        if window_seconds <= 0:
+            raise ValueError("window_seconds must be positive")
+
+        self.half_life_seconds = half_life_seconds
+        self.window_seconds = window_seconds
+        self._decay_rate = math.log(2) / half_life_seconds
+        # driver_id -> [count at last assignment, last assignment timestamp]
+        self._counts: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def record(self, driver_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record an assignment for a driver
+        Timestamps older than the driver's latest assignment are folded in
+        already decayed, so history can be replayed in any order. A new
+        driver older than the newest entry is stored decayed to that entry's
+        time, which keeps the entries oldest-first for expire(), or dropped
+        if it is already outside the window.
+        """
+        now = time.time() if timestamp is None else timestamp
+        entry = self._counts.get(driver_id)
+
+        if entry is None:
+            newest = next(reversed(self._counts.values()))[1] if self._counts else now
+            if now >= newest:
+                self._counts[driver_id] = [1.0, now]
+            elif newest - now <= self.window_seconds:
+                self._counts[driver_id] = [math.exp(-self._decay_rate * (newest - now)), newest]
+        elif now >= entry[1]:
+            entry[0] = entry[0] * math.exp(-self._decay_rate * (now - entry[1])) + 1.0
+            entry[1] = now
+            self._counts.move_to_end(driver_id)
+        else:
+            entry[0] += math.exp(-self._decay_rate * (entry[1] - now))
+
+        self.expire(now)
+
+    def record_many(self, events: Iterable[Tuple[str, float]]) -> None:
+        """
+        Replay (driver_id, timestamp) assignment events
+        """
+        for driver_id, timestamp in events:
+            self.record(driver_id, timestamp)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Drop drivers whose last assignment fell out of the window
+        """
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        expired = 0
+        while self._counts:
+            driver_id, entry = next(iter(self._counts.items()))
+            if entry[1] >= cutoff:
+                break
+            del self._counts[driver_id]
+            expired += 1
+        return expired
+
+    def count(self, driver_id: str, now: Optional[float] = None) -> float:
+        """
+        Get a driver's decayed assignment count
+        """
+        entry = self._counts.get(driver_id)
+        if entry is None:
+            return 0.0
+
+        now = time.time() if now is None else now
+        age = max(now - entry[1], 0.0)
+        if age > self.window_seconds:
+            return 0.0
+        return entry[0] * math.exp(-self._decay_rate * age)
+
+    def boost(self, driver_id: str, threshold: float, now: Optional[float] = None) -> float:
+        """
+        Get a driver's fairness boost
+        """
+        return boost_from_count(self.count(driver_id, now), threshold)
+
+    def count_column(self, driver_ids: Sequence[str], now: Optional[float] = None) -> np.ndarray:
+        """
+        Get decayed counts for many drivers as one column
+        """
+        now = time.time() if now is None else now
+        counts = np.zeros(len(driver_ids), dtype=np.float64)
+        last = np.full(len(driver_ids), -np.inf)
+
+        lookup = self._counts.get
+        for row, driver_id in enumerate(driver_ids):
+            entry = lookup(driver_id)
+            if entry is not None:
+                counts[row], last[row] = entry
+
+        return self._decay(counts, last, now)
+
+    def boost_column(
+        self,
+        driver_ids: Sequence[str],
+        threshold: float,
+        now: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Get fairness boosts for many drivers as one column
+        """
+        return boost_from_count(self.count_column(driver_ids, now), threshold)
+
+    def export(self, now: Optional[float] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Export every tracked driver and its decayed count
+        """
+        now = time.time() if now is None else now
+        driver_ids = list(self._counts)
+        entries = np.array(list(self._counts.values()), dtype=np.float64).reshape(-1, 2)
+
+        return driver_ids, self._decay(entries[:, 0], entries[:, 1], now)
+
+    def clear(self) -> None:
+        """
+        Forget every tracked assignment
+        """
+        self._counts.clear()
+
+    def _decay(self, counts: np.ndarray, last: np.ndarray, now: float) -> np.ndarray:
+        age = np.maximum(now - last, 0.0)
+        live = age <= self.window_seconds
+        decayed = np.zeros_like(counts)
+        decayed[live] = counts[live] * np.exp(-self._decay_rate * age[live])
+        return decayed
+
+
+def boost_from_count(count, threshold: float):
+    """
+    Map a decayed assignment count onto a 0-1 fairness boost
+    A driver with no recent assignments gets 1.0, one fresh assignment gets
+    ``threshold`` (which must be positive), and further assignments push the
+    boost towards 0. Works on floats and NumPy columns alike.
+    """
+    return 1.0 / (1.0 + count * (1.0 / threshold - 1.0))
+
+
+fairness_tracker = FairnessTracker(
+    half_life_seconds=settings.FAIRNESS_HALF_LIFE_MINUTES * 60,
+    window_seconds=settings.FAIRNESS_WINDOW_HOURS * 3600,
+)
@@ -0,0 +1,234 @@
+"""In-memory fleet positions kept current by the driver location stream"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.schemas import DriverAvailability
+from app.core.config import settings
+from app.services.spatial_index import DriverSpatialIndex
+
+
+@dataclass
+class LocationUpdate:
+    """Latest known position and status for one driver"""
+
+    driver_id: str
+    latitude: float
+    longitude: float
+    is_online: bool
+    is_available: bool
+    event_time: float
+
+    @classmethod
+    def from_record(cls, record: Dict) -> "LocationUpdate":
+        """
+        Build an update from a decoded DriverLocationUpdated record
+        """
+        return cls(
+            driver_id=record["driver_id"],
+            latitude=record["latitude"],
+            longitude=record["longitude"],
+            is_online=record["is_online"],
+            is_available=record["is_available"],
+            event_time=record["event_timestamp"] / 1000.0,
+        )
+
+
+class FleetState:
+    """
+    Driver records indexed by position, updated in place from location events
+    Driver attributes (vehicle, rating, verification) are seeded from the
+    database; positions and online/available flags then come from the
+    stream. A driver whose latest position is older than
+    ``max_staleness_seconds`` is not offered for matching, and the state as
+    a whole is only ``is_fresh`` while the stream keeps syncing within that
+    bound, so callers can fall back to the database when it is not.
+    """
+
+    def __init__(self, max_staleness_seconds: float = 30.0, cell_size_km: float = 1.0):
+        self.max_staleness_seconds = max_staleness_seconds
+        self.index = DriverSpatialIndex(cell_size_km=cell_size_km)
+        self._position_time: Dict[str, float] = {}
+        # When availability was last set by a match, not by the stream
+        self._availability_time: Dict[str, float] = {}
+        # Positions for drivers whose attributes have not been loaded yet
+        self._pending: Dict[str, LocationUpdate] = {}
+        self._seeded = False
+        self._synced_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def pending_driver_ids(self) -> List[str]:
+        """
+        Get drivers seen on the stream whose attributes are still unknown
+        """
+        return list(self._pending)
+
+    def load_drivers(self, drivers: Iterable[DriverAvailability]) -> int:
+        """
+        Load driver attributes, keeping any newer position seen on the stream
+        """
+        loaded = 0
+        for driver in drivers:
+            driver_id = driver.driver_id
+            loaded_time = driver.last_location_update.timestamp()
+
+            current = self.index.get(driver_id)
+            if current is not None and self._position_time[driver_id] > loaded_time:
+                driver.current_latitude = current.current_latitude
+                driver.current_longitude = current.current_longitude
+                driver.last_location_update = current.last_location_update
+                driver.is_online = current.is_online
+                driver.is_available = current.is_available
+                loaded_time = self._position_time[driver_id]
+
+            self.index.insert(driver)
+            self._position_time[driver_id] = loaded_time
+            loaded += 1
+
+            pending = self._pending.pop(driver_id, None)
+            if pending is not None:
+                self._apply_one(pending)
+
+        self._seeded = True
+        return loaded
+
+    def apply(self, updates: Iterable[LocationUpdate]) -> Tuple[int, int]:
+        """
+        Apply location updates
+        Returns (applied, stale) where stale updates were older than the
+        position already held for that driver.
+        """
+        applied = 0
+        stale = 0
+        for update in updates:
+            if self._apply_one(update):
+                applied += 1
+            else:
+                stale += 1
+        return applied, stale
+
+    def set_availability(
+        self, driver_id: str, is_available: bool, now: Optional[float] = None
+    ) -> bool:
+        """
+        Mark a driver available or not as soon as a match changes it
+        Location events sent before ``now`` keep their position but do not
+        undo the change. Returns False for drivers not in the index.
+        """
+        driver = self.index.get(driver_id)
+        if driver is None:
+            return False
+
+        driver.is_available = is_available
+        self._availability_time[driver_id] = time.time() if now is None else now
+        return True
+
+    def mark_synced(self, now: Optional[float] = None) -> None:
+        """
+        Record that the stream has been consumed up to now
+        """
+        self._synced_at = time.time() if now is None else now
+
+    def lag_seconds(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds since the stream was last fully consumed
+        """
+        if self._synced_at is None:
+            return None
+        return (time.time() if now is None else now) - self._synced_at
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """
+        Whether positions are within the staleness bound and can replace the database
+        """
+        lag = self.lag_seconds(now)
+        return self._seeded and lag is not None and lag <= self.max_staleness_seconds
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        vehicle_type: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> List[DriverAvailability]:
+        """
+        Get matchable drivers with a fresh position in cells around a point
+        """
+        cutoff = (time.time() if now is None else now) - self.max_staleness_seconds
+        position_time = self._position_time
+
+        return [
+            driver
+            for driver in self.index.nearby(latitude, longitude, radius_km)
+            if driver.is_online
+            and driver.is_available
+            and driver.is_verified
+            and (vehicle_type is None or driver.vehicle_type == vehicle_type)
+            and position_time[driver.driver_id] >= cutoff
+        ]
+
+    def evict_stale_pending(self, now: Optional[float] = None) -> int:
+        """
+        Drop buffered positions for unknown drivers that have gone stale
+        """
+        cutoff = (time.time() if now is None else now) - self.max_staleness_seconds
+        stale = [
+            driver_id
+            for driver_id, update in self._pending.items()
+            if update.event_time < cutoff
+        ]
+        for driver_id in stale:
+            del self._pending[driver_id]
+        return len(stale)
+
+    def clear(self) -> None:
+        """
+        Forget all drivers and sync state
+        """
+        self.index.clear()
+        self._position_time.clear()
+        self._availability_time.clear()
+        self._pending.clear()
+        self._seeded = False
+        self._synced_at = None
+
+    def _apply_one(self, update: LocationUpdate) -> bool:
+        driver_id = update.driver_id
+
+        if driver_id not in self.index:
+            pending = self._pending.get(driver_id)
+            if pending is not None and pending.event_time >= update.event_time:
+                return False
+            self._pending[driver_id] = update
+            return True
+
+        if self._position_time[driver_id] >= update.event_time:
+            return False
+
+        self.index.move(
+            driver_id,
+            update.latitude,
+            update.longitude,
+            timestamp=datetime.fromtimestamp(update.event_time),
+        )
+        driver = self.index.get(driver_id)
+        driver.is_online = update.is_online
+        if update.event_time >= self._availability_time.get(driver_id, update.event_time):
+            driver.is_available = update.is_available
+        self._position_time[driver_id] = update.event_time
+        return True
+
+
+fleet_state = FleetState(
+    max_staleness_seconds=settings.FLEET_MAX_STALENESS_SECONDS,
+    cell_size_km=settings.FLEET_CELL_SIZE_KM,
+)
@@ -0,0 +1,356 @@
+"""Consumer for the identity.driver.location.updated topic"""
+
+import asyncio
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.services.avro_codec import AvroRecordCodec, load_schema
+from app.services.fleet_state import FleetState, LocationUpdate, fleet_state
+from app.core.config import settings
+from app.core.logging import logger
+
+LOCATION_TOPIC = "identity.driver.location.updated"
+
+
+def coalesce(records: Iterable[Dict]) -> List[LocationUpdate]:
+    """
+    Keep only the newest update per driver
+    """
+    latest: Dict[str, LocationUpdate] = {}
+    for record in records:
+        update = LocationUpdate.from_record(record)
+        current = latest.get(update.driver_id)
+        if current is None or update.event_time >= current.event_time:
+            latest[update.driver_id] = update
+    return list(latest.values())
+
+
+@dataclass
+class StreamMetrics:
+    """Counters describing consumer throughput and backpressure"""
+
+    messages_received: int = 0
+    decode_errors: int = 0
+    updates_coalesced: int = 0
+    updates_applied: int = 0
+    updates_stale: int = 0
+    batches_processed: int = 0
+    last_batch_size: int = 0
+    last_apply_ms: float = 0.0
+    queue_depth: int = 0
+    queue_capacity: int = 0
+    backpressure_waits: int = 0
+    backpressure_seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class InProcessBroker:
+    """
+    Topic fan-out over asyncio queues for tests and local runs without Kafka
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List["InProcessSource"]] = defaultdict(list)
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """
+        Deliver a message to every subscriber of a topic
+        """
+        for source in self._subscribers[topic]:
+            source._queue.put_nowait(payload)
+
+    def subscribe(self, topic: str) -> "InProcessSource":
+        """
+        Get a source that receives messages published after this call
+        """
+        source = InProcessSource()
+        self._subscribers[topic].append(source)
+        return source
+
+
+class InProcessSource:
+    """Message source fed by an InProcessBroker"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.delivered = 0
+        self.committed = 0
+
+    async def getmany(self, max_records: int, timeout_seconds: float) -> List[bytes]:
+        """
+        Wait up to ``timeout_seconds`` for messages and return at most ``max_records``
+        """
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout_seconds)
+        except asyncio.TimeoutError:
+            return []
+
+        batch = [first]
+        while len(batch) < max_records and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        self.delivered += len(batch)
+        return batch
+
+    async def commit(self) -> None:
+        self.committed = self.delivered
+
+    async def close(self) -> None:
+        pass
+
+
+class KafkaSource:
+    """
+    Message source backed by kafka-python
+    kafka-python is blocking and its consumer is not thread-safe, so every
+    call runs on one dedicated worker thread.
+    """
+
+    def __init__(self, topic: str, bootstrap_servers: str, group_id: str):
+        from kafka import KafkaConsumer
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka")
+        self._consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers.split(","),
+            group_id=group_id,
+            enable_auto_commit=False,
+            auto_offset_reset="latest",
+        )
+
+    async def getmany(self, max_records: int, timeout_seconds: float) -> List[bytes]:
+        records = await self._run(
+            self._consumer.poll,
+            timeout_ms=int(timeout_seconds * 1000),
+            max_records=max_records,
+        )
+        return [
+            record.value for partition in records.values() for record in partition
+        ]
+
+    async def commit(self) -> None:
+        await self._run(self._consumer.commit)
+
+    async def close(self) -> None:
+        await self._run(self._consumer.close)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+
+class LocationStreamConsumer:
+    """
+    Applies driver location events to the in-memory fleet state
+    A fetch loop polls the source and hands raw batches to an apply loop
+    through a bounded queue. When applying falls behind, the queue fills
+    and the fetch loop blocks (backpressure) instead of buffering without
+    limit; the apply loop then drains everything queued at once, so many
+    updates for the same driver collapse into one. Offsets are committed
+    after each apply. A crash can lose at most the batches in flight, which
+    the next update for each driver supersedes anyway.
+    """
+
+    def __init__(
+        self,
+        source,
+        codec: AvroRecordCodec,
+        fleet_state: FleetState,
+        max_batch_size: int = 500,
+        poll_timeout_seconds: float = 0.1,
+        max_queued_batches: int = 8,
+    ):
+        self.source = source
+        self.codec = codec
+        self.fleet_state = fleet_state
+        self.max_batch_size = max_batch_size
+        self.poll_timeout_seconds = poll_timeout_seconds
+        self.metrics = StreamMetrics(queue_capacity=max_queued_batches)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_batches)
+        self._tasks: List[asyncio.Task] = []
+        # When a poll last came back short, i.e. the source was drained
+        self._drained_at: Optional[float] = None
+        self._applying = False
+
+    def process_batch(self, payloads: Sequence[bytes]) -> int:
+        """
+        Decode, coalesce and apply one batch of raw messages
+        """
+        started = time.perf_counter()
+        records, errors = self.codec.decode_batch(payloads)
+        updates = coalesce(records)
+        applied, stale = self.fleet_state.apply(updates)
+
+        metrics = self.metrics
+        metrics.messages_received += len(payloads)
+        metrics.decode_errors += errors
+        metrics.updates_coalesced += len(records) - len(updates)
+        metrics.updates_applied += applied
+        metrics.updates_stale += stale
+        metrics.batches_processed += 1
+        metrics.last_batch_size = len(payloads)
+        metrics.last_apply_ms = (time.perf_counter() - started) * 1000
+
+        if errors:
+            logger.warning(f"Dropped {errors} undecodable location events")
+        return applied
+
+    async def start(self) -> None:
+        """
+        Start the fetch and apply loops in the background
+        """
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._fetch_loop()),
+                asyncio.create_task(self._apply_loop()),
+            ]
+
+    async def stop(self) -> None:
+        """
+        Stop both loops and close the source
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.source.close()
+
+    async def _fetch_loop(self) -> None:
+        while True:
+            try:
+                payloads = await self.source.getmany(
+                    self.max_batch_size, self.poll_timeout_seconds
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Location stream poll failed: {e}")
+                await asyncio.sleep(self.poll_timeout_seconds)
+                continue
+
+            if len(payloads) < self.max_batch_size:
+                self._drained_at = time.time()
+
+            if not payloads:
+                # Caught up: nothing fetched and nothing waiting to apply
+                if self._queue.empty() and not self._applying:
+                    self.fleet_state.mark_synced(self._drained_at)
+                continue
+
+            if self._queue.full():
+                self.metrics.backpressure_waits += 1
+                waited = time.perf_counter()
+                await self._queue.put(payloads)
+                self.metrics.backpressure_seconds += time.perf_counter() - waited
+            else:
+                self._queue.put_nowait(payloads)
+            self.metrics.queue_depth = self._queue.qsize()
+
+    async def _apply_loop(self) -> None:
+        while True:
+            payloads = await self._queue.get()
+            while not self._queue.empty():
+                payloads.extend(self._queue.get_nowait())
+            self.metrics.queue_depth = 0
+
+            self._applying = True
+            try:
+                self.process_batch(payloads)
+                await self.source.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Location stream apply failed: {e}")
+            finally:
+                self._applying = False
+
+            # Everything fetched up to the last drained poll is now applied
+            if self._queue.empty() and self._drained_at is not None:
+                self.fleet_state.mark_synced(self._drained_at)
+
+
+async def refresh_fleet_attributes(
+    fleet_state: FleetState,
+    load_drivers,
+    interval_seconds: float,
+) -> None:
+    """
+    Periodically reload driver attributes so newly online drivers become matchable
+    """
+    while True:
+        try:
+            fleet_state.load_drivers(await load_drivers())
+            fleet_state.evict_stale_pending()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Fleet attribute refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+_consumer: Optional[LocationStreamConsumer] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_location_consumer() -> Optional[LocationStreamConsumer]:
+    """
+    Get the running location consumer, if the stream is enabled
+    """
+    return _consumer
+
+
+async def start_location_stream(load_drivers, source=None) -> LocationStreamConsumer:
+    """
+    Seed the fleet state and start consuming location events
+    ``source`` defaults to a Kafka consumer on the configured topic.
+    """
+    global _consumer, _refresh_task
+    if _consumer is not None:
+        return _consumer
+
+    if source is None:
+        source = KafkaSource(
+            settings.LOCATION_TOPIC,
+            settings.KAFKA_BROKERS,
+            settings.LOCATION_CONSUMER_GROUP,
+        )
+
+    codec = AvroRecordCodec(
+        load_schema(settings.LOCATION_SCHEMA_PATH),
+        confluent_framing=settings.LOCATION_CONFLUENT_FRAMING,
+    )
+    _consumer = LocationStreamConsumer(
+        source,
+        codec,
+        fleet_state,
+        max_batch_size=settings.LOCATION_BATCH_SIZE,
+        poll_timeout_seconds=settings.LOCATION_POLL_TIMEOUT_SECONDS,
+        max_queued_batches=settings.LOCATION_MAX_QUEUED_BATCHES,
+    )
+
+    fleet_state.load_drivers(await load_drivers())
+    await _consumer.start()
+    _refresh_task = asyncio.create_task(
+        refresh_fleet_attributes(fleet_state, load_drivers, settings.FLEET_REFRESH_SECONDS)
+    )
+    logger.info(f"Consuming {settings.LOCATION_TOPIC} into fleet state ({len(fleet_state)} drivers)")
+    return _consumer
+
+
+async def stop_location_stream() -> None:
+    """
+    Stop consuming location events
+    """
+    global _consumer, _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
+    if _consumer is not None:
+        await _consumer.stop()
+        _consumer = None
@@ -11,6 +11,8 @@ from app.models.schemas import (
     AlgorithmConfig,
     MatchStatus,
 )
+from app.services.fairness_tracker import FairnessTracker
+from app.services.spatial_index import DriverSpatialIndex
 from app.core.logging import logger
 
 
@@ -25,8 +27,26 @@ class MatchingAlgorithm:
                0.10 * vehicle_match
     """
 
-    def __init__(self, config: AlgorithmConfig):
+    def __init__(
+        self,
+        config: AlgorithmConfig,
+        fairness_tracker: Optional[FairnessTracker] = None,
+    ):
         self.config = config
+        self.fairness_tracker = fairness_tracker
+
+        # Derived once per instance; config changes build a new instance
+        # through AlgorithmRegistry instead of mutating this one
+        self.weights: Tuple[float, float, float, float, float] = (
+            config.eta_weight,
+            config.rating_weight,
+            config.reliability_weight,
+            config.fairness_boost,
+            config.vehicle_weight,
+        )
+        self.inv_max_eta_minutes = (
+            1.0 / config.max_eta_minutes if config.max_eta_minutes > 0 else 0.0
+        )
 
     def calculate_distance(
         self,
@@ -76,7 +96,7 @@ class MatchingAlgorithm:
         if eta_minutes >= self.config.max_eta_minutes:
             return 0.0
 
-        score = 1.0 - (eta_minutes / self.config.max_eta_minutes)
+        score = 1.0 - eta_minutes * self.inv_max_eta_minutes
         return max(0.0, min(1.0, score))
 
     def normalize_rating(self, rating: float) -> float:
@@ -110,8 +130,15 @@ class MatchingAlgorithm:
     ) -> float:
         """
         Calculate fairness boost to prevent always matching same drivers
-        Boost is applied if driver hasn't been matched recently
+        Boost is applied if driver hasn't been matched recently. With a
+        fairness tracker attached, its decayed assignment count is used
+        instead of ``recent_matches``.
         """
+        if self.fairness_tracker is not None:
+            return self.fairness_tracker.boost(
+                driver_id, self.config.fairness_boost_threshold
+            )
+
         if driver_id not in recent_matches:
             return 1.0
 
@@ -148,17 +175,19 @@ class MatchingAlgorithm:
         driver: DriverAvailability,
         request: MatchRequest,
         recent_matches: List[str],
+        distance_km: Optional[float] = None,
     ) -> DriverMatch:
         """
         Calculate overall match score for a driver
         """
-        # Calculate distance
-        distance_km = self.calculate_distance(
-            driver.current_latitude,
-            driver.current_longitude,
-            request.pickup_latitude,
-            request.pickup_longitude,
-        )
+        # Calculate distance unless the caller already has it
+        if distance_km is None:
+            distance_km = self.calculate_distance(
+                driver.current_latitude,
+                driver.current_longitude,
+                request.pickup_latitude,
+                request.pickup_longitude,
+            )
 
         # Check distance constraint
         if distance_km > self.config.max_match_distance_km:
@@ -179,12 +208,13 @@ class MatchingAlgorithm:
         )
 
         # Calculate weighted match score
+        eta_w, rating_w, reliability_w, fairness_w, vehicle_w = self.weights
         match_score = (
-            self.config.eta_weight * eta_score
-            + self.config.rating_weight * rating_score
-            + self.config.reliability_weight * reliability_score
-            + self.config.fairness_boost * fairness_boost
-            + self.config.vehicle_weight * vehicle_match
+            eta_w * eta_score
+            + rating_w * rating_score
+            + reliability_w * reliability_score
+            + fairness_w * fairness_boost
+            + vehicle_w * vehicle_match
         )
 
         return DriverMatch(
@@ -214,17 +244,62 @@ class MatchingAlgorithm:
             return []
 
         valid_matches = []
+        filtered = 0
 
         for driver in available_drivers:
-            try:
-                match = self.calculate_match_score(driver, request, recent_matches)
-                valid_matches.append(match)
-            except ValueError as e:
-                logger.warning(f"Driver {driver.driver_id} filtered: {e}")
+            distance_km = self.calculate_distance(
+                driver.current_latitude,
+                driver.current_longitude,
+                request.pickup_latitude,
+                request.pickup_longitude,
+            )
+
+            # Filter out-of-range drivers here rather than raising per driver
+            if distance_km > self.config.max_match_distance_km:
+                filtered += 1
                 continue
 
+            valid_matches.append(
+                self.calculate_match_score(
+                    driver, request, recent_matches, distance_km=distance_km
+                )
+            )
+
+        if filtered:
+            logger.debug(
+                f"{filtered} drivers beyond {self.config.max_match_distance_km}km "
+                f"filtered for order {request.order_id}"
+            )
+
         # Sort by match score (descending)
         valid_matches.sort(key=lambda m: m.match_score, reverse=True)
 
         # Return top matches
         return valid_matches[:max_matches]
+
+    def find_nearby_matches(
+        self,
+        request: MatchRequest,
+        spatial_index: DriverSpatialIndex,
+        recent_matches: List[str],
+        max_matches: int = 5,
+        min_candidates: Optional[int] = None,
+    ) -> List[DriverMatch]:
+        """
+        Find best matches scoring only drivers in grid cells near the pickup
+        With ``min_candidates`` set, ring expansion stops once that many
+        drivers are found instead of covering the full match radius.
+        """
+        candidates = spatial_index.nearby(
+            request.pickup_latitude,
+            request.pickup_longitude,
+            self.config.max_match_distance_km,
+            min_candidates=min_candidates,
+        )
+
+        return self.find_best_matches(
+            request=request,
+            available_drivers=candidates,
+            recent_matches=recent_matches,
+            max_matches=max_matches,
+        )
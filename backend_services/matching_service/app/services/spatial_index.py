@@ -0,0 +1,192 @@
+"""In-process spatial grid index for driver candidate lookup"""
+
+import math
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.models.schemas import DriverAvailability
+
+KM_PER_DEGREE_LAT = 111.32
+
+Cell = Tuple[int, int]
+
+
+class DriverSpatialIndex:
+    """
+    Uniform lat/lon grid over driver positions
+    Drivers are bucketed into square cells of roughly ``cell_size_km``.
+    Lookups walk rings of cells outward from the pickup cell, so matching
+    only scores drivers in nearby cells instead of the whole fleet.
+    """
+
+    def __init__(self, cell_size_km: float = 1.0):
+        if cell_size_km <= 0:
+            raise ValueError("cell_size_km must be positive")
+
+        self.cell_size_km = cell_size_km
+        self._cell_deg = cell_size_km / KM_PER_DEGREE_LAT
+        self._drivers: Dict[str, DriverAvailability] = {}
+        self._driver_cells: Dict[str, Cell] = {}
+        self._cells: Dict[Cell, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._drivers)
+
+    def __contains__(self, driver_id: str) -> bool:
+        return driver_id in self._drivers
+
+    def cell_for(self, latitude: float, longitude: float) -> Cell:
+        """
+        Get the grid cell containing a coordinate
+        """
+        return (
+            math.floor(latitude / self._cell_deg),
+            math.floor(longitude / self._cell_deg),
+        )
+
+    def get(self, driver_id: str) -> Optional[DriverAvailability]:
+        """
+        Get the indexed record for a driver
+        """
+        return self._drivers.get(driver_id)
+
+    def insert(self, driver: DriverAvailability) -> None:
+        """
+        Insert a driver, replacing any existing record with the same id
+        """
+        if driver.driver_id in self._drivers:
+            self.remove(driver.driver_id)
+
+        cell = self.cell_for(driver.current_latitude, driver.current_longitude)
+        self._drivers[driver.driver_id] = driver
+        self._driver_cells[driver.driver_id] = cell
+        self._cells.setdefault(cell, set()).add(driver.driver_id)
+
+    def move(
+        self,
+        driver_id: str,
+        latitude: float,
+        longitude: float,
+        timestamp=None,
+    ) -> bool:
+        """
+        Update a driver's position, re-bucketing only when the cell changes
+        Returns False if the driver is not indexed
+        """
+        driver = self._drivers.get(driver_id)
+        if driver is None:
+            return False
+
+        driver.current_latitude = latitude
+        driver.current_longitude = longitude
+        if timestamp is not None:
+            driver.last_location_update = timestamp
+
+        old_cell = self._driver_cells[driver_id]
+        new_cell = self.cell_for(latitude, longitude)
+        if new_cell != old_cell:
+            self._discard_from_cell(old_cell, driver_id)
+            self._cells.setdefault(new_cell, set()).add(driver_id)
+            self._driver_cells[driver_id] = new_cell
+
+        return True
+
+    def remove(self, driver_id: str) -> bool:
+        """
+        Remove a driver from the index
+        Returns False if the driver is not indexed
+        """
+        if driver_id not in self._drivers:
+            return False
+
+        del self._drivers[driver_id]
+        self._discard_from_cell(self._driver_cells.pop(driver_id), driver_id)
+        return True
+
+    def clear(self) -> None:
+        self._drivers.clear()
+        self._driver_cells.clear()
+        self._cells.clear()
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        min_candidates: Optional[int] = None,
+    ) -> List[DriverAvailability]:
+        """
+        Get drivers in cells around a point
+        Rings are expanded until they cover ``radius_km`` or, when
+        ``min_candidates`` is set, until at least that many drivers have
+        been collected (the last ring is always finished). Cells are coarser
+        than the radius, so callers still apply the exact distance check.
+        """
+        return [
+            self._drivers[driver_id]
+            for cell in self._iter_cells(latitude, longitude, radius_km, min_candidates)
+            for driver_id in self._cells.get(cell, ())
+        ]
+
+    def _iter_cells(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        min_candidates: Optional[int],
+    ) -> Iterator[Cell]:
+        center_row, center_col = self.cell_for(latitude, longitude)
+        max_ring = max(0, math.ceil(radius_km / self.cell_size_km))
+        lon_stretch = self._lon_stretch(latitude, radius_km)
+
+        # When the search box is larger than the occupied grid it is cheaper
+        # to scan occupied cells than to probe every empty one
+        box_cells = (2 * max_ring + 1) * (2 * math.ceil(max_ring * lon_stretch) + 1)
+        if min_candidates is None and box_cells > len(self._cells):
+            max_col = math.ceil(max_ring * lon_stretch)
+            for row, col in list(self._cells):
+                if abs(row - center_row) <= max_ring and abs(col - center_col) <= max_col:
+                    yield (row, col)
+            return
+
+        found = 0
+        for ring in range(max_ring + 1):
+            for cell in self._ring(center_row, center_col, ring, lon_stretch):
+                found += len(self._cells.get(cell, ()))
+                yield cell
+
+            if min_candidates is not None and found >= min_candidates:
+                return
+
+    def _ring(
+        self,
+        center_row: int,
+        center_col: int,
+        ring: int,
+        lon_stretch: float,
+    ) -> Iterator[Cell]:
+        """
+        Cells at Chebyshev distance ``ring`` from the center, widened in
+        longitude to compensate for meridian convergence
+        """
+        col_span = math.ceil(ring * lon_stretch)
+        inner_rows = ring - 1
+        inner_cols = math.ceil((ring - 1) * lon_stretch) if ring > 0 else -1
+
+        for d_row in range(-ring, ring + 1):
+            for d_col in range(-col_span, col_span + 1):
+                if abs(d_row) <= inner_rows and abs(d_col) <= inner_cols:
+                    continue
+                yield (center_row + d_row, center_col + d_col)
+
+    def _lon_stretch(self, latitude: float, radius_km: float) -> float:
+        # Use the latitude closest to the pole within the search band
+        edge_lat = min(89.0, abs(latitude) + radius_km / KM_PER_DEGREE_LAT)
+        return 1.0 / math.cos(math.radians(edge_lat))
+
+    def _discard_from_cell(self, cell: Cell, driver_id: str) -> None:
+        members = self._cells.get(cell)
+        if members is None:
+            return
+        members.discard(driver_id)
+        if not members:
+            del self._cells[cell]
@@ -0,0 +1,89 @@
+"""
+Benchmark scalar vs vectorized driver scoring
+
+Usage (from the matching_service directory):
+    python -m benchmarks.bench_batch_scoring [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.models.schemas import AlgorithmConfig, DriverAvailability, MatchRequest
+from app.services.batch_scoring import BatchMatchingAlgorithm, DriverColumns
+from app.services.matching_algorithm import MatchingAlgorithm
+
+VEHICLE_TYPES = ["SEDAN", "SUV", "MOTO", "VAN"]
+
+
+def make_fleet(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        DriverAvailability(
+            driver_id=f"driver-{i}",
+            is_online=True,
+            is_available=True,
+            current_latitude=40.7128 + rng.uniform(-0.4, 0.4),
+            current_longitude=-74.0060 + rng.uniform(-0.4, 0.4),
+            last_location_update=now,
+            vehicle_type=rng.choice(VEHICLE_TYPES),
+            is_verified=True,
+            rating=round(rng.uniform(3.0, 5.0), 2),
+            total_trips=rng.randint(0, 500),
+        )
+        for i in range(size)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = AlgorithmConfig(max_match_distance_km=30.0)
+    scalar = MatchingAlgorithm(config)
+    batch = BatchMatchingAlgorithm(config)
+    request = MatchRequest(
+        order_id="bench-order",
+        pickup_latitude=40.7128,
+        pickup_longitude=-74.0060,
+        destination_latitude=40.7589,
+        destination_longitude=-73.9851,
+        vehicle_type="SEDAN",
+    )
+
+    print(f"{'drivers':>10} {'scalar ms':>12} {'batch ms':>12} {'columns ms':>12} {'speedup':>9}")
+    for size in args.sizes:
+        drivers = make_fleet(size)
+        recent = [f"driver-{i}" for i in range(0, size, max(1, size // 10))]
+        columns = DriverColumns.from_drivers(drivers)
+
+        scalar_s = best_of(
+            lambda: scalar.find_best_matches(request, drivers, recent, 5), args.repeat
+        )
+        batch_s = best_of(
+            lambda: batch.find_best_matches_columnar(request, columns, recent, 5),
+            args.repeat,
+        )
+        build_s = best_of(lambda: DriverColumns.from_drivers(drivers), args.repeat)
+
+        print(
+            f"{size:>10} {scalar_s * 1000:>12.2f} {batch_s * 1000:>12.2f} "
+            f"{build_s * 1000:>12.2f} {scalar_s / batch_s:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
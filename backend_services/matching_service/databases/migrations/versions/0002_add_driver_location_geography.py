@@ -0,0 +1,60 @@
+"""Add geography column and KNN indexes to driver_availability
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    # Derived from the lat/lon columns so existing writers keep working
+    op.execute("""
+        ALTER TABLE driver_availability
+        ADD COLUMN location GEOGRAPHY(POINT, 4326)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN current_latitude IS NULL OR current_longitude IS NULL THEN NULL
+                ELSE ST_SetSRID(
+                    ST_MakePoint(current_longitude::float8, current_latitude::float8),
+                    4326
+                )::geography
+            END
+        ) STORED
+    """)
+
+    # GIST index serves both ST_DWithin radius filters and <-> KNN ordering
+    op.execute(
+        "CREATE INDEX idx_driver_availability_geog "
+        "ON driver_availability USING GIST(location)"
+    )
+    op.execute(
+        "CREATE INDEX idx_driver_availability_matchable "
+        "ON driver_availability USING GIST(location) "
+        "WHERE is_online = TRUE AND is_available = TRUE AND is_verified = TRUE"
+    )
+    op.execute(
+        "CREATE INDEX idx_driver_availability_online_available "
+        "ON driver_availability(is_online, is_available) "
+        "WHERE is_online = TRUE AND is_available = TRUE"
+    )
+    op.create_index(
+        "idx_driver_matches_created_at", "driver_matches", ["created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("idx_driver_matches_created_at", table_name="driver_matches")
+    op.execute("DROP INDEX IF EXISTS idx_driver_availability_online_available")
+    op.execute("DROP INDEX IF EXISTS idx_driver_availability_matchable")
+    op.execute("DROP INDEX IF EXISTS idx_driver_availability_geog")
+    op.execute("ALTER TABLE driver_availability DROP COLUMN location")
@@ -5,8 +5,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 
-from app.api.routes import matching, health
+from app.api.routes import admin, matching, health
 from app.core.config import settings
+from app.core.database import close_pool
+from app.services.algorithm_registry import algorithm_registry
+from app.services.driver_service import DriverService
+from app.services.fairness_tracker import fairness_tracker
+from app.services.location_stream import start_location_stream, stop_location_stream
 
 logger = logging.getLogger(__name__)
 
@@ -30,17 +35,42 @@ app.add_middleware(
 # Include routers
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(matching.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+
+
+async def load_fleet_drivers():
+    return await DriverService.get_available_drivers(limit=settings.FLEET_SEED_LIMIT)
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Matching Service")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
+    logger.info(f"Matching config version {algorithm_registry.current.version}")
+
+    # Warm the fairness tracker from match history so a restart does not
+    # reset every driver to "never matched"
+    try:
+        events = await DriverService.get_recent_match_events(
+            hours_ago=settings.FAIRNESS_WINDOW_HOURS
+        )
+        fairness_tracker.record_many(events)
+        logger.info(f"Fairness tracker loaded {len(events)} recent matches")
+    except Exception as e:
+        logger.warning(f"Fairness tracker starting empty: {e}")
+
+    if settings.LOCATION_STREAM_ENABLED:
+        try:
+            await start_location_stream(load_fleet_drivers)
+        except Exception as e:
+            logger.error(f"Location stream not started, matching reads the database: {e}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down Matching Service")
+    await stop_location_stream()
+    await close_pool()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,44 @@
 """Test configuration for pytest"""
 
+from datetime import datetime
+
 import pytest
 from app.core.config import settings
+from app.core import database
+from app.services.fairness_tracker import fairness_tracker
+
+
+class FakePool:
+    """In-memory stand-in for the asyncpg pool that records queries"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+
+    async def fetch(self, sql, *args):
+        self.calls.append((sql, args))
+        return list(self.rows)
+
+    async def execute(self, sql, *args):
+        self.calls.append((sql, args))
+        return "OK"
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_pool():
+    pool = FakePool()
+    database.set_pool(pool)
+    yield pool
+    database.set_pool(None)
+
+
+@pytest.fixture(autouse=True)
+def reset_fairness_tracker():
+    yield
+    fairness_tracker.clear()
 
 
 @pytest.fixture
@@ -12,6 +49,35 @@ def test_client():
     return TestClient(app)
 
 
+@pytest.fixture
+def admin_headers(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "test-admin-token")
+    return {"X-Admin-Token": "test-admin-token"}
+
+
+@pytest.fixture
+def make_driver():
+    """Build an online, available driver at a position"""
+
+    def make(driver_id, latitude, longitude, rating=4.5, vehicle_type="SEDAN"):
+        from app.models.schemas import DriverAvailability
+
+        return DriverAvailability(
+            driver_id=driver_id,
+            is_online=True,
+            is_available=True,
+            current_latitude=latitude,
+            current_longitude=longitude,
+            last_location_update=datetime.now(),
+            vehicle_type=vehicle_type,
+            is_verified=True,
+            rating=rating,
+            total_trips=100,
+        )
+
+    return make
+
+
 @pytest.fixture
 def algorithm_config():
     from app.models.schemas import AlgorithmConfig
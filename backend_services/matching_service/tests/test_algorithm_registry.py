@@ -0,0 +1,178 @@
+"""Test suite for the versioned algorithm registry"""
+
+import threading
+
+import pytest
+from app.core.config import settings
+from app.models.schemas import AlgorithmConfig
+from app.services.algorithm_registry import (
+    AlgorithmRegistry,
+    ConfigVersionConflict,
+    algorithm_registry,
+)
+
+
+@pytest.fixture
+def registry():
+    return AlgorithmRegistry(AlgorithmConfig())
+
+
+@pytest.fixture
+def restore_global_registry(monkeypatch):
+    monkeypatch.setattr(algorithm_registry, "_current", algorithm_registry.current)
+
+
+class TestAlgorithmRegistry:
+    """Test atomic config swaps"""
+
+    def test_cached_weights(self, registry):
+        """Test weights and the ETA reciprocal are precomputed"""
+        algorithm = registry.algorithm
+
+        assert algorithm.weights == (0.35, 0.25, 0.15, 0.15, 0.10)
+        assert algorithm.inv_max_eta_minutes == pytest.approx(1 / 30)
+
+    def test_update_publishes_new_version(self, registry):
+        """Test an update builds a new algorithm and bumps the version"""
+        before = registry.current
+        config = AlgorithmConfig(eta_weight=0.45, vehicle_weight=0.0, max_eta_minutes=20)
+
+        after = registry.update(config)
+
+        assert after.version == before.version + 1
+        assert registry.current is after
+        assert after.algorithm is not before.algorithm
+        assert after.algorithm.weights[0] == 0.45
+        assert after.algorithm.inv_max_eta_minutes == pytest.approx(1 / 20)
+        # Readers holding the old version keep a consistent config
+        assert before.algorithm.weights[0] == 0.35
+
+    def test_caller_config_is_copied(self, registry):
+        """Test mutating the submitted config does not leak into the live one"""
+        config = AlgorithmConfig(eta_weight=0.30, vehicle_weight=0.15)
+        registry.update(config)
+
+        config.eta_weight = 0.9
+
+        assert registry.current.config.eta_weight == 0.30
+
+    def test_stale_expected_version_rejected(self, registry):
+        """Test compare-and-swap rejects updates based on an old version"""
+        registry.update(AlgorithmConfig(), expected_version=1)
+
+        with pytest.raises(ConfigVersionConflict):
+            registry.update(AlgorithmConfig(), expected_version=1)
+        assert registry.current.version == 2
+
+    @pytest.mark.parametrize(
+        "config",
+        [
+            AlgorithmConfig(eta_weight=-0.1),
+            AlgorithmConfig(eta_weight=0.9),
+            AlgorithmConfig(max_eta_minutes=0),
+            AlgorithmConfig(fairness_boost_threshold=1.5),
+        ],
+    )
+    def test_invalid_config_rejected(self, registry, config):
+        """Test invalid configs never become current"""
+        with pytest.raises(ValueError):
+            registry.update(config)
+        assert registry.current.version == 1
+
+    def test_concurrent_updates_get_distinct_versions(self, registry):
+        """Test concurrent writers serialize on the version counter"""
+        versions = []
+
+        def writer():
+            versions.append(registry.update(AlgorithmConfig()).version)
+
+        threads = [threading.Thread(target=writer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(versions) == list(range(2, 10))
+        assert registry.current.version == 9
+
+
+class TestAdminConfigEndpoints:
+    """Test the admin config endpoints"""
+
+    def test_update_config_hot_reloads(
+        self, test_client, admin_headers, restore_global_registry
+    ):
+        """Test a config update is served without a restart"""
+        current = test_client.get("/api/v1/admin/config").json()
+        config = dict(current["config"], eta_weight=0.40, vehicle_weight=0.05)
+
+        response = test_client.put(
+            "/api/v1/admin/config",
+            params={"expected_version": current["version"]},
+            json=config,
+            headers=admin_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["version"] == current["version"] + 1
+        assert test_client.get("/api/v1/matching/config").json()["eta_weight"] == 0.40
+
+    def test_update_config_conflict(
+        self, test_client, admin_headers, restore_global_registry
+    ):
+        """Test a stale expected version returns 409"""
+        current = test_client.get("/api/v1/admin/config").json()
+
+        response = test_client.put(
+            "/api/v1/admin/config",
+            params={"expected_version": current["version"] - 1},
+            json=current["config"],
+            headers=admin_headers,
+        )
+
+        assert response.status_code == 409
+
+    def test_update_config_invalid(
+        self, test_client, admin_headers, restore_global_registry
+    ):
+        """Test an invalid config returns 400"""
+        current = test_client.get("/api/v1/admin/config").json()
+        config = dict(current["config"], max_eta_minutes=0)
+
+        response = test_client.put(
+            "/api/v1/admin/config", json=config, headers=admin_headers
+        )
+
+        assert response.status_code == 400
+
+    def test_update_config_requires_admin_token(
+        self, test_client, admin_headers, restore_global_registry
+    ):
+        """Test config updates without the admin token are refused"""
+        current = test_client.get("/api/v1/admin/config").json()
+
+        missing = test_client.put("/api/v1/admin/config", json=current["config"])
+        wrong = test_client.put(
+            "/api/v1/admin/config",
+            json=current["config"],
+            headers={"X-Admin-Token": "wrong"},
+        )
+
+        assert missing.status_code == 401
+        assert wrong.status_code == 401
+        assert test_client.get("/api/v1/admin/config").json() == current
+
+    def test_update_config_disabled_without_token(
+        self, test_client, monkeypatch, restore_global_registry
+    ):
+        """Test config updates are refused while no admin token is configured"""
+        monkeypatch.setattr(settings, "ADMIN_API_TOKEN", None)
+        current = test_client.get("/api/v1/admin/config").json()
+
+        response = test_client.put(
+            "/api/v1/admin/config",
+            json=current["config"],
+            headers={"X-Admin-Token": ""},
+        )
+
+        assert response.status_code == 503
@@ -45,3 +45,23 @@ def test_get_config(test_client):
     assert "rating_weight" in data
     assert data["eta_weight"] == 0.35
     assert data["rating_weight"] == 0.25
+
+
+def test_batch_assign_no_drivers(test_client):
+    """Test batch assignment when no drivers available"""
+    requests = [
+        MatchRequest(
+            order_id=f"test-order-{i}",
+            pickup_latitude=40.7128,
+            pickup_longitude=-74.0060,
+            destination_latitude=40.7589,
+            destination_longitude=-73.9851,
+        ).model_dump()
+        for i in range(2)
+    ]
+
+    response = test_client.post("/api/v1/matching/batch-assign", json=requests)
+    assert response.status_code == 200
+    data = response.json()
+    assert [a["order_id"] for a in data] == ["test-order-0", "test-order-1"]
+    assert all(a["match"] is None for a in data)
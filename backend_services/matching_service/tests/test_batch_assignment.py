@@ -0,0 +1,255 @@
+"""Test suite for global batch assignment"""
+
+import asyncio
+import random
+import time
+
+import pytest
+from app.services.batch_assignment import (
+    BatchAssignmentEngine,
+    BatchCollector,
+    STRATEGY_GREEDY,
+    STRATEGY_OPTIMAL,
+)
+from app.services.batch_scoring import BatchMatchingAlgorithm, DriverColumns
+from app.models.schemas import AlgorithmConfig, MatchRequest
+
+
+def make_request(order_id, latitude, longitude, vehicle_type=None):
+    return MatchRequest(
+        order_id=order_id,
+        pickup_latitude=latitude,
+        pickup_longitude=longitude,
+        destination_latitude=latitude + 0.05,
+        destination_longitude=longitude + 0.05,
+        vehicle_type=vehicle_type,
+    )
+
+
+@pytest.fixture
+def algorithm():
+    return BatchMatchingAlgorithm(AlgorithmConfig(max_match_distance_km=10.0))
+
+
+class TestBatchAssignmentEngine:
+    """Test min-cost assignment and greedy fallback"""
+
+    def test_each_driver_assigned_once(self, algorithm, make_driver):
+        """Test no driver is assigned to two orders"""
+        rng = random.Random(5)
+        drivers = [
+            make_driver(f"driver-{i}", 40.7 + rng.uniform(-0.05, 0.05), -74.0 + rng.uniform(-0.05, 0.05))
+            for i in range(30)
+        ]
+        requests = [
+            make_request(f"order-{i}", 40.7 + rng.uniform(-0.05, 0.05), -74.0 + rng.uniform(-0.05, 0.05))
+            for i in range(20)
+        ]
+
+        engine = BatchAssignmentEngine(algorithm)
+        results = engine.assign(requests, DriverColumns.from_drivers(drivers), [])
+
+        assert [r.order_id for r in results] == [r.order_id for r in requests]
+        assigned = [r.match.driver_id for r in results if r.match]
+        assert len(assigned) == 20
+        assert len(set(assigned)) == len(assigned)
+        assert all(r.strategy == STRATEGY_OPTIMAL for r in results)
+
+    def test_optimal_beats_greedy_on_contention(self, algorithm, make_driver):
+        """Test the optimal solve avoids the greedy trap on a shared driver"""
+        # order-1 sits on driver-a, but only driver-a is in range of order-0
+        drivers = [
+            make_driver("driver-a", 40.7000, -74.0000),
+            make_driver("driver-b", 40.7400, -74.0000),
+        ]
+        requests = [
+            make_request("order-0", 40.6700, -74.0000),
+            make_request("order-1", 40.7000, -74.0000),
+        ]
+        algorithm.config.max_match_distance_km = 5.0
+        columns = DriverColumns.from_drivers(drivers)
+
+        optimal = BatchAssignmentEngine(algorithm).assign(requests, columns, [])
+        greedy = BatchAssignmentEngine(algorithm, max_batch_orders=1).assign(
+            requests, columns, []
+        )
+
+        assert {r.order_id: r.match.driver_id for r in optimal} == {
+            "order-0": "driver-a",
+            "order-1": "driver-b",
+        }
+        assert all(r.strategy == STRATEGY_GREEDY for r in greedy)
+        assert greedy[0].match is None
+        assert greedy[1].match.driver_id == "driver-a"
+
+    def test_more_orders_than_drivers(self, algorithm, make_driver):
+        """Test surplus orders are left unassigned"""
+        drivers = [make_driver("driver-0", 40.7, -74.0)]
+        requests = [make_request(f"order-{i}", 40.7, -74.0) for i in range(3)]
+
+        results = BatchAssignmentEngine(algorithm).assign(
+            requests, DriverColumns.from_drivers(drivers), []
+        )
+
+        assert sum(1 for r in results if r.match) == 1
+
+    def test_out_of_range_orders_unassigned(self, algorithm, make_driver):
+        """Test orders with no driver in range get no match"""
+        drivers = [make_driver("driver-0", 40.7, -74.0)]
+        requests = [make_request("order-far", 41.9, -87.6)]
+
+        results = BatchAssignmentEngine(algorithm).assign(
+            requests, DriverColumns.from_drivers(drivers), []
+        )
+
+        assert results[0].match is None
+
+    def test_requested_vehicle_type_is_required(self, algorithm, make_driver):
+        """Test orders are only assigned drivers with the requested vehicle type"""
+        drivers = [
+            make_driver("driver-sedan", 40.7, -74.0, rating=5.0),
+            make_driver("driver-van", 40.75, -74.05, rating=3.0, vehicle_type="VAN"),
+        ]
+        requests = [
+            make_request("order-van", 40.7, -74.0, vehicle_type="VAN"),
+            make_request("order-moto", 40.7, -74.0, vehicle_type="MOTO"),
+        ]
+
+        for latency_budget_ms in (200.0, -1):
+            results = BatchAssignmentEngine(algorithm, latency_budget_ms=latency_budget_ms).assign(
+                requests, DriverColumns.from_drivers(drivers), []
+            )
+
+            assert results[0].match.driver_id == "driver-van"
+            assert results[1].match is None
+
+    def test_latency_budget_falls_back_to_greedy(self, algorithm, make_driver):
+        """Test exceeding the latency budget switches to greedy"""
+        drivers = [make_driver("driver-0", 40.7, -74.0)]
+        requests = [make_request("order-0", 40.7, -74.0)]
+
+        results = BatchAssignmentEngine(algorithm, latency_budget_ms=-1).assign(
+            requests, DriverColumns.from_drivers(drivers), []
+        )
+
+        assert results[0].strategy == STRATEGY_GREEDY
+        assert results[0].match.driver_id == "driver-0"
+
+    def test_slow_scoring_skips_optimal_solve(self, algorithm, make_driver, monkeypatch):
+        """Test overrunning the budget while building edges falls back before the solve"""
+        drivers = [make_driver(f"driver-{i}", 40.7, -74.0 + i * 0.001) for i in range(3)]
+        requests = [make_request(f"order-{i}", 40.7, -74.0) for i in range(3)]
+        score_batch = algorithm.score_batch
+
+        def slow_score_batch(*args, **kwargs):
+            time.sleep(0.02)
+            return score_batch(*args, **kwargs)
+
+        engine = BatchAssignmentEngine(algorithm, latency_budget_ms=10.0)
+        monkeypatch.setattr(algorithm, "score_batch", slow_score_batch)
+        monkeypatch.setattr(engine, "_solve_optimal", pytest.fail)
+
+        results = engine.assign(requests, DriverColumns.from_drivers(drivers), [])
+
+        assert all(r.strategy == STRATEGY_GREEDY for r in results)
+        assert len({r.match.driver_id for r in results}) == 3
+
+    def test_oversized_batch_skips_optimal_solve(self, algorithm, make_driver, monkeypatch):
+        """Test batches over max_batch_orders go to greedy without a deadline"""
+        drivers = [make_driver(f"driver-{i}", 40.7, -74.0 + i * 0.001) for i in range(3)]
+        requests = [make_request(f"order-{i}", 40.7, -74.0) for i in range(3)]
+        engine = BatchAssignmentEngine(algorithm, max_batch_orders=2, latency_budget_ms=-1)
+        monkeypatch.setattr(engine, "_solve_optimal", pytest.fail)
+
+        results = engine.assign(requests, DriverColumns.from_drivers(drivers), [])
+
+        assert all(r.strategy == STRATEGY_GREEDY for r in results)
+        assert all(r.match is not None for r in results)
+
+    def test_empty_inputs(self, algorithm):
+        """Test empty batches and fleets"""
+        engine = BatchAssignmentEngine(algorithm)
+
+        assert engine.assign([], DriverColumns.from_drivers([]), []) == []
+        results = engine.assign(
+            [make_request("order-0", 40.7, -74.0)], DriverColumns.from_drivers([]), []
+        )
+        assert results[0].match is None
+
+
+class TestBatchCollector:
+    """Test windowed collection of single orders"""
+
+    def test_orders_in_window_share_a_batch(self, algorithm, make_driver):
+        """Test concurrent submissions are assigned together"""
+        drivers = [make_driver("driver-0", 40.7, -74.0), make_driver("driver-1", 40.7, -74.0)]
+        calls = []
+
+        async def load_drivers(requests):
+            calls.append(1)
+            return drivers
+
+        async def load_recent():
+            return []
+
+        async def run():
+            collector = BatchCollector(
+                BatchAssignmentEngine(algorithm),
+                load_drivers=load_drivers,
+                load_recent_matches=load_recent,
+                window_seconds=0.01,
+            )
+            return await asyncio.gather(
+                collector.submit(make_request("order-0", 40.7, -74.0)),
+                collector.submit(make_request("order-1", 40.7, -74.0)),
+            )
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert {r.match.driver_id for r in results} == {"driver-0", "driver-1"}
+
+    def test_full_batch_flushes_immediately(self, algorithm, make_driver):
+        """Test reaching max batch size flushes without waiting for the window"""
+
+        async def load_drivers(requests):
+            return [make_driver("driver-0", 40.7, -74.0)]
+
+        async def load_recent():
+            return []
+
+        async def run():
+            collector = BatchCollector(
+                BatchAssignmentEngine(algorithm, max_batch_orders=1),
+                load_drivers=load_drivers,
+                load_recent_matches=load_recent,
+                window_seconds=60,
+            )
+            return await asyncio.wait_for(
+                collector.submit(make_request("order-0", 40.7, -74.0)), timeout=1
+            )
+
+        result = asyncio.run(run())
+
+        assert result.match.driver_id == "driver-0"
+
+    def test_loader_error_propagates(self, algorithm):
+        """Test driver loading errors reach every waiting submitter"""
+
+        async def load_drivers(requests):
+            raise RuntimeError("database unavailable")
+
+        async def load_recent():
+            return []
+
+        async def run():
+            collector = BatchCollector(
+                BatchAssignmentEngine(algorithm),
+                load_drivers=load_drivers,
+                load_recent_matches=load_recent,
+                window_seconds=0.01,
+            )
+            await collector.submit(make_request("order-0", 40.7, -74.0))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(run())
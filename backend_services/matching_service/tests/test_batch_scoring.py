@@ -0,0 +1,141 @@
+"""Test suite for vectorized batch scoring"""
+
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+from app.services.batch_scoring import BatchMatchingAlgorithm, DriverColumns
+from app.services.matching_algorithm import MatchingAlgorithm
+from app.models.schemas import AlgorithmConfig, DriverAvailability, MatchRequest
+
+
+@pytest.fixture
+def fleet():
+    rng = random.Random(3)
+    return [
+        DriverAvailability(
+            driver_id=f"driver-{i}",
+            is_online=True,
+            is_available=True,
+            current_latitude=40.7128 + rng.uniform(-0.3, 0.3),
+            current_longitude=-74.0060 + rng.uniform(-0.3, 0.3),
+            last_location_update=datetime.now(),
+            vehicle_type=rng.choice(["SEDAN", "SUV", "MOTO"]),
+            is_verified=True,
+            rating=round(rng.uniform(3.0, 5.0), 3),
+            total_trips=rng.randint(0, 300),
+        )
+        for i in range(400)
+    ]
+
+
+@pytest.fixture
+def config():
+    return AlgorithmConfig(max_match_distance_km=20.0)
+
+
+def make_request(vehicle_type=None):
+    return MatchRequest(
+        order_id="order-1",
+        pickup_latitude=40.7128,
+        pickup_longitude=-74.0060,
+        destination_latitude=40.7589,
+        destination_longitude=-73.9851,
+        vehicle_type=vehicle_type,
+    )
+
+
+class TestBatchMatchingAlgorithm:
+    """Test the batch path agrees with the scalar path"""
+
+    @pytest.mark.parametrize("vehicle_type", [None, "SEDAN", "TRUCK"])
+    def test_scores_match_scalar(self, config, fleet, vehicle_type):
+        """Test every sub-score matches calculate_match_score"""
+        scalar = MatchingAlgorithm(config)
+        batch = BatchMatchingAlgorithm(config)
+        request = make_request(vehicle_type)
+        recent = ["driver-5", "driver-9", "driver-5", "driver-200"]
+
+        scores = batch.score_batch(request, DriverColumns.from_drivers(fleet), recent)
+
+        for row, driver in enumerate(fleet):
+            distance = scalar.calculate_distance(
+                driver.current_latitude,
+                driver.current_longitude,
+                request.pickup_latitude,
+                request.pickup_longitude,
+            )
+            assert scores.in_range[row] == (distance <= config.max_match_distance_km)
+            if not scores.in_range[row]:
+                continue
+
+            expected = scalar.calculate_match_score(driver, request, recent)
+            assert scores.match_score[row] == pytest.approx(expected.match_score)
+            assert scores.eta_score[row] == pytest.approx(expected.eta_score)
+            assert scores.fairness_boost[row] == pytest.approx(expected.fairness_boost)
+            assert scores.vehicle_match[row] == expected.vehicle_match
+            assert scores.eta_minutes[row] == expected.estimated_arrival_minutes
+
+    def test_top_matches_match_scalar(self, config, fleet):
+        """Test the returned top-k matches the scalar ranking"""
+        request = make_request("SUV")
+
+        expected = MatchingAlgorithm(config).find_best_matches(request, fleet, [], 10)
+        matches = BatchMatchingAlgorithm(config).find_best_matches(request, fleet, [], 10)
+
+        assert len(matches) == 10
+        assert [m.match_score for m in matches] == pytest.approx(
+            [m.match_score for m in expected]
+        )
+        assert matches[0].order_id == request.order_id
+
+    def test_top_k_ties_keep_input_order(self, config):
+        """Test equal scores are returned in input order"""
+        batch = BatchMatchingAlgorithm(config)
+        now = datetime.now()
+        drivers = [
+            DriverAvailability(
+                driver_id=f"driver-{i}",
+                is_online=True,
+                is_available=True,
+                current_latitude=40.7128,
+                current_longitude=-74.0060,
+                last_location_update=now,
+                vehicle_type="SEDAN",
+                is_verified=True,
+                rating=4.0,
+                total_trips=50,
+            )
+            for i in range(4)
+        ]
+
+        matches = batch.find_best_matches(make_request(), drivers, [], 3)
+
+        assert [m.driver_id for m in matches] == ["driver-0", "driver-1", "driver-2"]
+
+    def test_no_drivers_in_range(self, config, fleet):
+        """Test no matches when every driver is too far"""
+        request = make_request()
+        request.pickup_latitude = 0.0
+
+        assert BatchMatchingAlgorithm(config).find_best_matches(request, fleet, [], 5) == []
+
+    def test_empty_fleet(self, config):
+        """Test empty inputs"""
+        batch = BatchMatchingAlgorithm(config)
+
+        assert batch.find_best_matches(make_request(), [], [], 5) == []
+        columns = DriverColumns.from_drivers([])
+        assert len(columns) == 0
+        assert batch.find_best_matches_columnar(make_request(), columns, [], 5) == []
+
+    def test_precomputed_fairness_column(self, config, fleet):
+        """Test a caller-supplied fairness column is used as-is"""
+        batch = BatchMatchingAlgorithm(config)
+        columns = DriverColumns.from_drivers(fleet)
+        fairness = np.zeros(len(columns))
+
+        scores = batch.score_batch(make_request(), columns, [], fairness_boost=fairness)
+
+        assert not scores.fairness_boost.any()
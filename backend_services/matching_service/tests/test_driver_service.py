@@ -0,0 +1,154 @@
+"""Test suite for the database-backed driver service"""
+
+import asyncio
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from app.core import database
+from app.services.driver_service import DriverService, available_drivers_sql
+
+
+def driver_row(driver_id="driver-1"):
+    return {
+        "driver_id": driver_id,
+        "is_online": True,
+        "is_available": True,
+        "current_latitude": Decimal("40.71280000"),
+        "current_longitude": Decimal("-74.00600000"),
+        "last_location_update": datetime.now(),
+        "vehicle_type": "SEDAN",
+        "is_verified": True,
+        "rating": Decimal("4.80"),
+        "total_trips": 120,
+    }
+
+
+class TestAvailableDriversSql:
+    """Test generated KNN queries"""
+
+    def test_knn_query_pushes_radius_and_order_into_sql(self):
+        """Test the radius filter and KNN ordering run in PostGIS"""
+        sql = available_drivers_sql(True, True, True, True, False)
+
+        assert "ST_DWithin(location" in sql
+        assert "ORDER BY location <->" in sql
+        assert "LIMIT $4" in sql
+        # Literal flags let the planner use the partial availability index
+        assert "is_online = TRUE" in sql
+        assert "is_available = TRUE" in sql
+
+    def test_vehicle_type_parameter(self):
+        """Test the vehicle type filter binds after the fixed parameters"""
+        assert "vehicle_type = $5" in available_drivers_sql(True, True, True, True, True)
+        assert "vehicle_type = $2" in available_drivers_sql(True, True, True, False, True)
+
+    def test_query_text_is_cached(self):
+        """Test each filter shape reuses identical SQL text"""
+        first = available_drivers_sql(True, True, False, True, True)
+        second = available_drivers_sql(True, True, False, True, True)
+
+        assert first is second
+
+
+class TestDriverService:
+    """Test DriverService against the in-memory pool"""
+
+    def test_get_available_drivers_near_point(self, fake_pool):
+        """Test a nearest-driver query binds point, radius and limit"""
+        fake_pool.rows = [driver_row("driver-1"), driver_row("driver-2")]
+
+        drivers = asyncio.run(
+            DriverService.get_available_drivers(
+                vehicle_type="SEDAN",
+                limit=25,
+                latitude=40.7128,
+                longitude=-74.0060,
+                radius_km=5.0,
+            )
+        )
+
+        sql, args = fake_pool.calls[-1]
+        assert "ORDER BY location <->" in sql
+        assert args == (40.7128, -74.0060, 5000.0, 25, "SEDAN")
+        assert [d.driver_id for d in drivers] == ["driver-1", "driver-2"]
+        assert drivers[0].rating == 4.8
+        assert drivers[0].current_latitude == pytest.approx(40.7128)
+
+    def test_get_available_drivers_requires_radius(self):
+        """Test searching near a point without a radius is rejected"""
+        with pytest.raises(ValueError):
+            asyncio.run(
+                DriverService.get_available_drivers(latitude=40.7, longitude=-74.0)
+            )
+
+    def test_get_recent_matches(self, fake_pool):
+        """Test recent matches are returned as driver ids"""
+        fake_pool.rows = [{"driver_id": "driver-2"}, {"driver_id": "driver-1"}]
+
+        recent = asyncio.run(DriverService.get_recent_matches(limit=10, hours_ago=24))
+
+        assert recent == ["driver-2", "driver-1"]
+        assert fake_pool.calls[-1][1] == (24, 10)
+
+    def test_update_match_response(self, fake_pool):
+        """Test match responses are written with their status"""
+        asyncio.run(
+            DriverService.update_match_response(
+                order_id="order-1",
+                driver_id="driver-1",
+                accepted=False,
+                response_time_seconds=12,
+                status="DECLINED",
+                cancellation_reason="too far",
+            )
+        )
+
+        sql, args = fake_pool.calls[-1]
+        assert sql.strip().startswith("UPDATE driver_matches")
+        assert args == ("order-1", "driver-1", "DECLINED", 12, "too far")
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="TEST_DATABASE_URL not set (needs PostGIS with migrations applied)",
+)
+def test_knn_against_postgis():
+    """Test nearest-first ordering against a real PostGIS database"""
+    import asyncpg
+
+    async def run():
+        pool = await asyncpg.create_pool(os.environ["TEST_DATABASE_URL"])
+        database.set_pool(pool)
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    "DELETE FROM driver_availability WHERE vehicle_type = 'KNN_TEST'"
+                )
+                for offset in (0.02, 0.01, 0.5):
+                    await conn.execute(
+                        """
+                        INSERT INTO driver_availability (
+                            driver_id, is_online, is_available, current_latitude,
+                            current_longitude, last_location_update, vehicle_type,
+                            is_verified, rating, total_trips
+                        )
+                        VALUES (gen_random_uuid(), TRUE, TRUE, $1, -74.0,
+                                CURRENT_TIMESTAMP, 'KNN_TEST', TRUE, 4.5, 10)
+                        """,
+                        40.7 + offset,
+                    )
+            return await DriverService.get_available_drivers(
+                vehicle_type="KNN_TEST",
+                limit=5,
+                latitude=40.7,
+                longitude=-74.0,
+                radius_km=10.0,
+            )
+        finally:
+            await pool.close()
+
+    drivers = asyncio.run(run())
+
+    assert [round(d.current_latitude, 2) for d in drivers] == [40.71, 40.72]
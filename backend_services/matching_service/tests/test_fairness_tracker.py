@@ -0,0 +1,137 @@
+"""Test suite for the time-decayed fairness tracker"""
+
+import asyncio
+
+import pytest
+from app.models.schemas import AlgorithmConfig
+from app.services.batch_scoring import BatchMatchingAlgorithm, DriverColumns
+from app.services.driver_service import DriverService
+from app.services.fairness_tracker import (
+    FairnessTracker,
+    boost_from_count,
+    fairness_tracker,
+)
+from app.services.matching_algorithm import MatchingAlgorithm
+
+HOUR = 3600.0
+
+
+@pytest.fixture
+def tracker():
+    return FairnessTracker(half_life_seconds=HOUR, window_seconds=24 * HOUR)
+
+
+class TestFairnessTracker:
+    """Test decayed counts and sliding-window expiry"""
+
+    def test_counts_decay_by_half_life(self, tracker):
+        """Test a count halves every half-life"""
+        tracker.record("driver-1", timestamp=0.0)
+        tracker.record("driver-1", timestamp=0.0)
+
+        assert tracker.count("driver-1", now=0.0) == pytest.approx(2.0)
+        assert tracker.count("driver-1", now=HOUR) == pytest.approx(1.0)
+        assert tracker.count("driver-2", now=HOUR) == 0.0
+
+    def test_out_of_order_events(self, tracker):
+        """Test replaying history newest-first gives the same count"""
+        tracker.record_many([("driver-1", 2 * HOUR), ("driver-1", HOUR)])
+        in_order = FairnessTracker(half_life_seconds=HOUR, window_seconds=24 * HOUR)
+        in_order.record_many([("driver-1", HOUR), ("driver-1", 2 * HOUR)])
+
+        assert tracker.count("driver-1", now=3 * HOUR) == pytest.approx(
+            in_order.count("driver-1", now=3 * HOUR)
+        )
+
+    def test_window_expiry(self, tracker):
+        """Test drivers outside the window are dropped"""
+        tracker.record("driver-old", timestamp=0.0)
+        tracker.record("driver-new", timestamp=20 * HOUR)
+
+        assert tracker.count("driver-old", now=25 * HOUR) == 0.0
+        tracker.record("driver-new", timestamp=25 * HOUR)
+        assert len(tracker) == 1
+
+    def test_late_new_driver_keeps_expiry_order(self, tracker):
+        """Test a new driver recorded with an older timestamp does not outlive the window"""
+        tracker.record("driver-a", timestamp=10 * HOUR)
+        tracker.record("driver-b", timestamp=30 * HOUR)
+        tracker.record("driver-late", timestamp=20 * HOUR)
+        tracker.record("driver-stale", timestamp=5 * HOUR)
+
+        assert tracker.count("driver-late", now=31 * HOUR) == pytest.approx(0.5 ** 11)
+        assert tracker.count("driver-stale", now=31 * HOUR) == 0.0
+        assert tracker.expire(now=34.5 * HOUR) == 1
+        assert len(tracker) == 2
+        assert tracker.expire(now=54.5 * HOUR) == 2
+        assert len(tracker) == 0
+
+    def test_boost_mapping(self):
+        """Test boost is 1.0 unmatched, threshold after one match, then lower"""
+        assert boost_from_count(0.0, 0.3) == 1.0
+        assert boost_from_count(1.0, 0.3) == pytest.approx(0.3)
+        assert boost_from_count(2.0, 0.3) < 0.3
+
+    def test_columns_match_scalar_lookups(self, tracker):
+        """Test the vectorized export agrees with per-driver lookups"""
+        for i in range(50):
+            tracker.record(f"driver-{i % 7}", timestamp=i * 60.0)
+        driver_ids = [f"driver-{i}" for i in range(10)]
+        now = 3 * HOUR
+
+        column = tracker.boost_column(driver_ids, 0.3, now=now)
+        expected = [tracker.boost(d, 0.3, now=now) for d in driver_ids]
+        exported_ids, counts = tracker.export(now=now)
+
+        assert column == pytest.approx(expected)
+        assert dict(zip(exported_ids, counts)) == pytest.approx(
+            {d: tracker.count(d, now=now) for d in exported_ids}
+        )
+
+    def test_empty_export(self, tracker):
+        """Test exporting an empty tracker"""
+        driver_ids, counts = tracker.export()
+
+        assert driver_ids == []
+        assert counts.shape == (0,)
+
+
+class TestFairnessScoring:
+    """Test the algorithms read fairness from an attached tracker"""
+
+    def test_scalar_and_batch_paths_agree(self, tracker, make_driver):
+        """Test both scoring paths use the tracker"""
+        tracker.record("driver-1")
+        config = AlgorithmConfig()
+        scalar = MatchingAlgorithm(config, fairness_tracker=tracker)
+        batch = BatchMatchingAlgorithm(config, fairness_tracker=tracker)
+        columns = DriverColumns.from_drivers(
+            [make_driver("driver-1", 40.7, -74.0), make_driver("driver-2", 40.7, -74.0)]
+        )
+
+        column = batch.fairness_column(columns, [])
+
+        assert column[1] == 1.0
+        assert column[0] == pytest.approx(0.3, abs=1e-3)
+        assert scalar.calculate_fairness_boost("driver-1", []) == pytest.approx(
+            column[0], abs=1e-3
+        )
+
+    def test_record_driver_match_updates_tracker(self, fake_pool):
+        """Test recording a match counts against the driver"""
+        asyncio.run(
+            DriverService.record_driver_match(
+                order_id="order-1",
+                driver_id="driver-1",
+                match_score=0.9,
+                eta_score=0.9,
+                rating_score=0.9,
+                reliability_score=0.9,
+                fairness_boost=1.0,
+                vehicle_match=1.0,
+                estimated_arrival_minutes=3,
+                status="PENDING",
+            )
+        )
+
+        assert fairness_tracker.count("driver-1") == pytest.approx(1.0, abs=1e-3)
@@ -0,0 +1,321 @@
+"""Test suite for driver location stream ingestion"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from app.core.config import settings
+from app.models.schemas import MatchRequest
+from app.services.avro_codec import AvroRecordCodec, load_schema
+from app.services.fleet_state import FleetState, LocationUpdate, fleet_state
+from app.services.location_stream import (
+    InProcessBroker,
+    LocationStreamConsumer,
+    coalesce,
+    start_location_stream,
+    stop_location_stream,
+)
+
+TOPIC = settings.LOCATION_TOPIC
+
+
+@pytest.fixture
+def codec():
+    return AvroRecordCodec(load_schema(settings.LOCATION_SCHEMA_PATH))
+
+
+def location_event(driver_id, latitude, longitude, event_time, is_available=True):
+    millis = int(event_time * 1000)
+    return {
+        "event_id": f"{driver_id}-{millis}",
+        "event_timestamp": millis,
+        "driver_id": driver_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "accuracy": 5.0,
+        "heading": 90.0,
+        "speed": 30.0,
+        "is_online": True,
+        "is_available": is_available,
+        "last_seen": millis,
+    }
+
+
+@pytest.fixture
+def seeded_driver(make_driver):
+    def seed(driver_id, latitude, longitude, seen_at):
+        driver = make_driver(driver_id, latitude, longitude)
+        driver.last_location_update = datetime.fromtimestamp(seen_at)
+        return driver
+
+    return seed
+
+
+class TestAvroCodec:
+    """Test decoding the driver-location-updated schema"""
+
+    def test_round_trip(self, codec):
+        """Test encoded events decode to the same record"""
+        event = location_event("driver-1", 40.7128, -74.006, 1700000000.5)
+
+        assert codec.decode(codec.encode(event)) == event
+
+    def test_confluent_framing(self):
+        """Test the schema registry header is skipped"""
+        framed = AvroRecordCodec(
+            load_schema(settings.LOCATION_SCHEMA_PATH), confluent_framing=True
+        )
+        event = location_event("driver-1", 40.7, -74.0, 1700000000.0)
+
+        payload = framed.encode(event)
+
+        assert payload[:5] == bytes(5)
+        assert framed.decode(payload) == event
+
+    def test_batch_counts_bad_messages(self, codec):
+        """Test truncated messages are counted, not raised"""
+        good = codec.encode(location_event("driver-1", 40.7, -74.0, 1700000000.0))
+
+        records, errors = codec.decode_batch([good, good[:-3], b"\x02x"])
+
+        assert len(records) == 1
+        assert errors == 2
+
+
+class TestFleetState:
+    """Test applying location updates to the fleet"""
+
+    def test_coalesce_keeps_newest(self, codec):
+        """Test many updates for one driver collapse to the newest"""
+        records = [
+            location_event("driver-1", 40.70, -74.0, 10.0),
+            location_event("driver-1", 40.72, -74.0, 12.0),
+            location_event("driver-1", 40.71, -74.0, 11.0),
+            location_event("driver-2", 40.80, -74.0, 10.0),
+        ]
+
+        updates = {u.driver_id: u for u in coalesce(records)}
+
+        assert len(updates) == 2
+        assert updates["driver-1"].latitude == 40.72
+
+    def test_out_of_order_updates_ignored(self, seeded_driver):
+        """Test an older event never overwrites a newer position"""
+        state = FleetState(max_staleness_seconds=30)
+        state.load_drivers([seeded_driver("driver-1", 40.70, -74.0, 100.0)])
+
+        applied, stale = state.apply(
+            [
+                LocationUpdate("driver-1", 40.75, -74.0, True, True, 110.0),
+                LocationUpdate("driver-1", 40.60, -74.0, True, True, 105.0),
+            ]
+        )
+
+        assert (applied, stale) == (1, 1)
+        assert state.index.get("driver-1").current_latitude == 40.75
+
+    def test_unknown_driver_buffered_until_loaded(self, seeded_driver):
+        """Test positions for drivers without attributes wait for the seed"""
+        state = FleetState(max_staleness_seconds=30)
+        state.apply([LocationUpdate("driver-1", 40.75, -74.0, True, True, 110.0)])
+
+        assert state.pending_count == 1
+        state.load_drivers([seeded_driver("driver-1", 40.70, -74.0, 100.0)])
+
+        assert state.pending_count == 0
+        assert state.index.get("driver-1").current_latitude == 40.75
+
+    def test_stale_positions_not_matchable(self, seeded_driver):
+        """Test drivers beyond the staleness bound are excluded"""
+        state = FleetState(max_staleness_seconds=30)
+        state.load_drivers(
+            [
+                seeded_driver("driver-fresh", 40.70, -74.0, 100.0),
+                seeded_driver("driver-stale", 40.70, -74.0, 50.0),
+            ]
+        )
+
+        nearby = state.nearby(40.70, -74.0, 5.0, now=110.0)
+
+        assert [d.driver_id for d in nearby] == ["driver-fresh"]
+
+    def test_unavailable_drivers_not_matchable(self, seeded_driver):
+        """Test availability from the stream is respected"""
+        state = FleetState(max_staleness_seconds=30)
+        state.load_drivers([seeded_driver("driver-1", 40.70, -74.0, 100.0)])
+        state.apply([LocationUpdate("driver-1", 40.70, -74.0, True, False, 105.0)])
+
+        assert state.nearby(40.70, -74.0, 5.0, now=110.0) == []
+
+    def test_selected_driver_stays_unavailable(self, seeded_driver):
+        """Test availability set by a match survives location events sent before it"""
+        state = FleetState(max_staleness_seconds=30)
+        state.load_drivers([seeded_driver("driver-1", 40.70, -74.0, 100.0)])
+
+        assert state.set_availability("driver-1", False, now=106.0)
+        assert not state.set_availability("driver-unknown", False, now=106.0)
+        state.apply([LocationUpdate("driver-1", 40.71, -74.0, True, True, 105.0)])
+        assert state.nearby(40.70, -74.0, 5.0, now=110.0) == []
+        assert state.index.get("driver-1").current_latitude == 40.71
+
+        state.apply([LocationUpdate("driver-1", 40.71, -74.0, True, True, 107.0)])
+        assert [d.driver_id for d in state.nearby(40.70, -74.0, 5.0, now=110.0)] == ["driver-1"]
+
+    def test_freshness_requires_recent_sync(self):
+        """Test the fleet is only fresh while the stream keeps up"""
+        state = FleetState(max_staleness_seconds=30)
+        state.load_drivers([])
+
+        assert not state.is_fresh(now=100.0)
+        state.mark_synced(100.0)
+        assert state.is_fresh(now=120.0)
+        assert not state.is_fresh(now=140.0)
+
+
+class TestLocationStreamConsumer:
+    """Test the consumer against the in-process broker"""
+
+    def test_events_reach_fleet_state(self, codec, seeded_driver):
+        """Test published events are decoded, coalesced and applied"""
+        now = time.time()
+
+        async def run():
+            broker = InProcessBroker()
+            state = FleetState(max_staleness_seconds=30)
+            state.load_drivers([seeded_driver("driver-1", 40.70, -74.0, now - 5)])
+            consumer = LocationStreamConsumer(
+                broker.subscribe(TOPIC), codec, state, poll_timeout_seconds=0.01
+            )
+            await consumer.start()
+
+            for step in range(20):
+                broker.publish(
+                    TOPIC,
+                    codec.encode(location_event("driver-1", 40.70 + step / 1000, -74.0, now + step)),
+                )
+            broker.publish(TOPIC, b"\x00garbage")
+            await asyncio.sleep(0.1)
+            await consumer.stop()
+            return state, consumer
+
+        state, consumer = asyncio.run(run())
+
+        assert state.index.get("driver-1").current_latitude == pytest.approx(40.719)
+        assert consumer.metrics.messages_received == 21
+        assert consumer.metrics.decode_errors == 1
+        assert consumer.metrics.updates_applied + consumer.metrics.updates_coalesced == 20
+        assert consumer.source.committed == 21
+        assert state.is_fresh()
+
+    def test_backpressure_blocks_fetching(self, codec):
+        """Test a full queue blocks the fetch loop and is counted"""
+
+        async def run():
+            broker = InProcessBroker()
+            consumer = LocationStreamConsumer(
+                broker.subscribe(TOPIC),
+                codec,
+                FleetState(),
+                max_batch_size=1,
+                poll_timeout_seconds=0.01,
+                max_queued_batches=1,
+            )
+            for step in range(5):
+                broker.publish(TOPIC, codec.encode(location_event("driver-1", 40.7, -74.0, step)))
+
+            # Only the fetch loop runs, so nothing drains the queue
+            fetch = asyncio.create_task(consumer._fetch_loop())
+            await asyncio.sleep(0.05)
+            fetch.cancel()
+            await asyncio.gather(fetch, return_exceptions=True)
+            return consumer
+
+        consumer = asyncio.run(run())
+
+        assert consumer.metrics.backpressure_waits == 1
+        assert consumer.metrics.queue_depth == 1
+
+    def test_find_drivers_reads_fleet_state(self, codec, test_client, fake_pool, seeded_driver):
+        """Test matching uses in-memory positions while the stream is fresh"""
+        now = time.time()
+        broker = InProcessBroker()
+        source = broker.subscribe(TOPIC)
+
+        async def load_drivers():
+            return [seeded_driver("driver-1", 40.70, -74.0, now - 5)]
+
+        async def start():
+            await start_location_stream(load_drivers, source=source)
+            broker.publish(TOPIC, codec.encode(location_event("driver-1", 40.7128, -74.006, now)))
+            await asyncio.sleep(0.3)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(start())
+            request = MatchRequest(
+                order_id="order-1",
+                pickup_latitude=40.7128,
+                pickup_longitude=-74.0060,
+                destination_latitude=40.7589,
+                destination_longitude=-73.9851,
+            )
+            response = test_client.post("/api/v1/matching/find-drivers", json=request.model_dump())
+            status = test_client.get("/api/v1/matching/fleet/status").json()
+        finally:
+            loop.run_until_complete(stop_location_stream())
+            loop.close()
+            fleet_state.clear()
+
+        assert response.status_code == 200
+        assert [m["driver_id"] for m in response.json()] == ["driver-1"]
+        assert not any("driver_availability" in sql for sql, _ in fake_pool.calls)
+        assert status["fresh"] is True
+        assert status["metrics"]["updates_applied"] == 1
+
+    def test_selected_driver_not_offered_again(self, codec, test_client, fake_pool, seeded_driver):
+        """Test selecting a driver removes them from in-memory matching right away"""
+        now = time.time()
+        broker = InProcessBroker()
+        source = broker.subscribe(TOPIC)
+
+        async def load_drivers():
+            return [seeded_driver("driver-1", 40.70, -74.0, now - 5)]
+
+        async def start():
+            await start_location_stream(load_drivers, source=source)
+            broker.publish(TOPIC, codec.encode(location_event("driver-1", 40.7128, -74.006, now)))
+            await asyncio.sleep(0.3)
+
+        request = MatchRequest(
+            order_id="order-1",
+            pickup_latitude=40.7128,
+            pickup_longitude=-74.0060,
+            destination_latitude=40.7589,
+            destination_longitude=-73.9851,
+        )
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(start())
+            before = test_client.post("/api/v1/matching/find-drivers", json=request.model_dump())
+            selected = test_client.post(
+                "/api/v1/matching/select-driver",
+                params={
+                    "order_id": "order-1",
+                    "driver_id": "driver-1",
+                    "match_score": 0.9,
+                    "estimated_arrival_minutes": 3,
+                },
+            )
+            after = test_client.post("/api/v1/matching/find-drivers", json=request.model_dump())
+            batch = test_client.post("/api/v1/matching/batch-assign", json=[request.model_dump()])
+        finally:
+            loop.run_until_complete(stop_location_stream())
+            loop.close()
+            fleet_state.clear()
+
+        assert [m["driver_id"] for m in before.json()] == ["driver-1"]
+        assert selected.status_code == 200
+        assert after.status_code == 404
+        assert batch.json()[0]["match"] is None
+        assert not any(sql.lstrip().startswith("SELECT") for sql, _ in fake_pool.calls)
@@ -0,0 +1,170 @@
+"""Test suite for the driver spatial index"""
+
+import random
+from datetime import datetime
+
+import pytest
+from app.services.spatial_index import DriverSpatialIndex
+from app.services.matching_algorithm import MatchingAlgorithm
+from app.models.schemas import DriverAvailability, MatchRequest, AlgorithmConfig
+
+
+def make_driver(driver_id, latitude, longitude, vehicle_type="SEDAN"):
+    return DriverAvailability(
+        driver_id=driver_id,
+        is_online=True,
+        is_available=True,
+        current_latitude=latitude,
+        current_longitude=longitude,
+        last_location_update=datetime.now(),
+        vehicle_type=vehicle_type,
+        is_verified=True,
+        rating=4.5,
+        total_trips=150,
+    )
+
+
+@pytest.fixture
+def index():
+    return DriverSpatialIndex(cell_size_km=1.0)
+
+
+@pytest.fixture
+def sample_request():
+    return MatchRequest(
+        order_id="order-1",
+        pickup_latitude=40.7128,
+        pickup_longitude=-74.0060,
+        destination_latitude=40.7589,
+        destination_longitude=-73.9851,
+    )
+
+
+class TestDriverSpatialIndex:
+    """Test spatial index maintenance and lookup"""
+
+    def test_insert_and_nearby(self, index):
+        """Test inserted drivers are found near their position"""
+        index.insert(make_driver("driver-1", 40.7128, -74.0060))
+        index.insert(make_driver("driver-2", 41.8781, -87.6298))  # Chicago
+
+        nearby = index.nearby(40.7130, -74.0050, radius_km=5.0)
+
+        assert [d.driver_id for d in nearby] == ["driver-1"]
+        assert len(index) == 2
+
+    def test_move_rebuckets_driver(self, index):
+        """Test moving a driver updates the cell it is found in"""
+        index.insert(make_driver("driver-1", 40.7128, -74.0060))
+
+        assert index.move("driver-1", 41.8781, -87.6298)
+
+        assert index.nearby(40.7128, -74.0060, radius_km=5.0) == []
+        moved = index.nearby(41.8781, -87.6298, radius_km=5.0)
+        assert [d.driver_id for d in moved] == ["driver-1"]
+        assert moved[0].current_latitude == 41.8781
+
+    def test_move_unknown_driver(self, index):
+        """Test moving a driver that is not indexed"""
+        assert not index.move("missing", 40.0, -74.0)
+
+    def test_remove(self, index):
+        """Test removed drivers are no longer returned"""
+        index.insert(make_driver("driver-1", 40.7128, -74.0060))
+
+        assert index.remove("driver-1")
+        assert not index.remove("driver-1")
+        assert "driver-1" not in index
+        assert index.nearby(40.7128, -74.0060, radius_km=5.0) == []
+
+    def test_reinsert_replaces_record(self, index):
+        """Test inserting an existing driver id replaces its record"""
+        index.insert(make_driver("driver-1", 40.7128, -74.0060))
+        index.insert(make_driver("driver-1", 41.8781, -87.6298))
+
+        assert len(index) == 1
+        assert index.nearby(40.7128, -74.0060, radius_km=5.0) == []
+
+    def test_nearby_covers_radius(self, index):
+        """Test every driver within the radius is returned"""
+        rng = random.Random(7)
+        algorithm = MatchingAlgorithm(AlgorithmConfig())
+        center = (59.3293, 18.0686)  # High latitude stresses longitude cells
+
+        for i in range(2000):
+            index.insert(
+                make_driver(
+                    f"driver-{i}",
+                    center[0] + rng.uniform(-0.3, 0.3),
+                    center[1] + rng.uniform(-0.6, 0.6),
+                )
+            )
+
+        radius_km = 12.0
+        found = {d.driver_id for d in index.nearby(*center, radius_km=radius_km)}
+        expected = {
+            driver_id
+            for driver_id in (f"driver-{i}" for i in range(2000))
+            if algorithm.calculate_distance(
+                *center,
+                index.get(driver_id).current_latitude,
+                index.get(driver_id).current_longitude,
+            )
+            <= radius_km
+        }
+
+        assert expected
+        assert expected <= found
+
+    def test_nearby_min_candidates_stops_early(self, index):
+        """Test ring expansion stops once enough candidates are found"""
+        for i in range(10):
+            index.insert(make_driver(f"near-{i}", 40.7128, -74.0060))
+        index.insert(make_driver("far", 40.9, -74.0060))
+
+        nearby = index.nearby(40.7128, -74.0060, radius_km=50.0, min_candidates=5)
+
+        assert len(nearby) == 10
+        assert "far" not in {d.driver_id for d in nearby}
+
+    def test_invalid_cell_size(self):
+        """Test cell size must be positive"""
+        with pytest.raises(ValueError):
+            DriverSpatialIndex(cell_size_km=0)
+
+
+class TestFindNearbyMatches:
+    """Test matching through the spatial index"""
+
+    def test_matches_full_scan(self, index, sample_request):
+        """Test indexed matching returns the same drivers as a full scan"""
+        rng = random.Random(11)
+        algorithm = MatchingAlgorithm(AlgorithmConfig(max_match_distance_km=5.0))
+        drivers = [
+            make_driver(
+                f"driver-{i}",
+                40.7128 + rng.uniform(-0.2, 0.2),
+                -74.0060 + rng.uniform(-0.2, 0.2),
+            )
+            for i in range(500)
+        ]
+        for driver in drivers:
+            index.insert(driver)
+
+        expected = algorithm.find_best_matches(sample_request, drivers, [], 5)
+        matches = algorithm.find_nearby_matches(sample_request, index, [], 5)
+
+        # ETA is bucketed to whole minutes, so compare scores rather than ids
+        assert [m.match_score for m in matches] == [m.match_score for m in expected]
+
+    def test_out_of_range_drivers_filtered(self, sample_request):
+        """Test drivers beyond the max distance are dropped without errors"""
+        algorithm = MatchingAlgorithm(AlgorithmConfig(max_match_distance_km=5.0))
+
+        matches = algorithm.find_best_matches(
+            sample_request,
+            [make_driver("far", 41.8781, -87.6298)],
+            [],
+        )
+
+        assert matches == []
@@ -4,13 +4,57 @@ Implements intelligent matching algorithms for premium driver assignment
 """
 
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Optional
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import math
 
+from pricing_table import PremiumPricingTable
 
-@dataclass
+
+# Special requirements that premium requests enforce as vehicle features
+PREMIUM_VEHICLE_FEATURES = ("child_seat", "pet_friendly", "wheelchair_accessible")
+
+# Vehicle types that can serve each service type
+SERVICE_VEHICLE_COMPATIBILITY = {
+    "RIDE": ["SEDAN", "SUV", "LUXURY_SEDAN", "LUXURY_SUV"],
+    "MOTO": ["MOTO"],
+    "FOOD": ["MOTO", "SCOOTER", "CAR"],
+    "GROCERY": ["SCOOTER", "CAR", "VAN"],
+    "GOODS": ["SCOOTER", "CAR", "VAN", "TRUCK_VAN"],
+    "TRUCK_VAN": ["TRUCK_VAN"]
+}
+
+# Weights of eta, rating, reliability, fairness and vehicle match (from specs103.md)
+MATCH_SCORE_WEIGHTS = (0.35, 0.25, 0.15, 0.15, 0.10)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Driver coaching rules: (profile field, "<" or ">", threshold, recommendations)
+DRIVER_RECOMMENDATION_RULES = (
+    ("avg_rating_30d", "<", 4.0, (
+        "Improve your average rating by providing excellent service",
+        "Be punctual and professional to increase tips"
+    )),
+    ("completion_rate_30d", "<", 0.95, (
+        "Focus on completing all accepted rides",
+        "Communicate clearly if you need to cancel"
+    )),
+    ("acceptance_rate_30d", "<", 0.90, (
+        "Accept more ride requests to improve your rate",
+    )),
+    ("eta_accuracy_30d", "<", 0.85, (
+        "Update your location regularly for accurate ETAs",
+        "Plan your routes more efficiently"
+    )),
+    ("cancellation_rate_30d", ">", 0.05, (
+        "Reduce cancellations by maintaining your schedule",
+        "Give advance notice for cancellations"
+    ))
+)
+
+
+@dataclass(slots=True)
 class DriverProfile:
     """Driver quality profile for matching."""
     driver_id: str
@@ -22,7 +66,15 @@ class DriverProfile:
     acceptance_rate_30d: float
     eta_accuracy_30d: float
     fairness_boost: float = 0.0
-    last_updated: datetime
+    cancellation_rate_30d: float = 0.0
+    is_available: bool = True
+    service_types: List[str] = field(default_factory=list)
+    specialties: List[str] = field(default_factory=list)
+    vehicle_features: List[str] = field(default_factory=list)
+    vehicle_type: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    last_updated: datetime = field(default_factory=datetime.now)
 
 
 @dataclass
@@ -34,7 +86,7 @@ class MatchingRequest:
     service_type: str
     scheduled_at: Optional[datetime] = None
     user_tier: Optional[str] = None
-    user_preferences: Dict[str, any] = None
+    user_preferences: Dict[str, Any] = None
     premium_required: bool = False
 
 
@@ -74,6 +126,24 @@ class PremiumDriverMatcher:
             "GOLD": {"multiplier": 2.0, "min_rating": 4.5},
             "PLATINUM": {"multiplier": 2.5, "min_rating": 4.8}
         }
+        self.pricing_table = PremiumPricingTable(self.premium_tiers)
+        # EligibilityIndex whose tier bitsets follow premium_tiers, if one is attached
+        self.eligibility_index = None
+    
+    def update_premium_tiers(self, premium_tiers: Dict[str, Dict[str, float]]) -> None:
+        """
+        Replace the premium tier config and rebuild what is derived from it.
+        
+        Rebuilds the pricing table and re-thresholds the tier bitsets of the
+        attached eligibility index.
+        
+        Args:
+            premium_tiers: Tier config with "multiplier" and "min_rating" per tier
+        """
+        self.premium_tiers = premium_tiers
+        self.pricing_table.rebuild(premium_tiers)
+        if self.eligibility_index is not None:
+            self.eligibility_index.set_premium_tiers(premium_tiers)
     
     def calculate_distance(
         self,
@@ -91,30 +161,25 @@ class PremiumDriverMatcher:
             
         Returns:
             Distance in kilometers
+            
+        Raises:
+            ValueError: If a coordinate is out of range
         """
+        for lat, lon in ((lat1, lon1), (lat2, lon2)):
+            if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+                raise ValueError(f"Invalid coordinates: ({lat}, {lon})")
+        
         # Convert to radians
         lat1_rad = math.radians(lat1)
         lat2_rad = math.radians(lat2)
-        lon1_rad = math.radians(lon1)
-        lon2_rad = math.radians(lon2)
         
         # Haversine formula
         dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        
-        a = math.sin(dlat / 2) ** 2
-        c = math.cos(lat1_rad) * math.cos(lat2_rad)
-        c2 = math.cos(lat2_rad) * math.cos(lat1_rad)
+        dlon = math.radians(lon2 - lon1)
         
-        # Earth's radius in kilometers
-        r = 6371  # km
+        a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
         
-        # Calculate distance
-        distance = r * math.acos(
-            c * c2 + math.sin(lat1_rad) * math.sin(lat2_rad)
-        )
-        
-        return distance
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
     
     def calculate_eta(
         self,
@@ -122,7 +187,7 @@ class PremiumDriverMatcher:
         driver_lon: float,
         pickup_lat: float,
         pickup_lon: float,
-        distance_km: float
+        distance_km: float,
         average_speed_kmh: float = 30.0
     ) -> int:
         """
@@ -237,16 +302,7 @@ class PremiumDriverMatcher:
         score = 0.0
         
         # Check service type compatibility
-        service_compatibility = {
-            "RIDE": ["SEDAN", "SUV", "LUXURY_SEDAN", "LUXURY_SUV"],
-            "MOTO": ["MOTO"],
-            "FOOD": ["MOTO", "SCOOTER", "CAR"],
-            "GROCERY": ["SCOOTER", "CAR", "VAN"],
-            "GOODS": ["SCOOTER", "CAR", "VAN", "TRUCK_VAN"],
-            "TRUCK_VAN": ["TRUCK_VAN"]
-        }
-        
-        if driver_vehicle_type in service_compatibility.get(request_service_type, []):
+        if driver_vehicle_type in SERVICE_VEHICLE_COMPATIBILITY.get(request_service_type, []):
             score += 0.3
         
         # Check special requirements
@@ -291,7 +347,7 @@ class PremiumDriverMatcher:
     def calculate_match_score(
         self,
         request: MatchingRequest,
-        driver_profile: DriverProfile
+        driver_profile: DriverProfile,
         distance_km: float,
         eta_minutes: int
     ) -> MatchingScore:
@@ -316,27 +372,20 @@ class PremiumDriverMatcher:
         )
         vehicle_match = self.calculate_vehicle_match_score(
             request.service_type,
-            driver_profile.avg_rating_30d,  # Use rating as proxy for vehicle type
-            request.service_type,  # Actual vehicle type would come from driver profile
-            request.special_requirements,
-            driver_profile.specialties if hasattr(driver_profile, 'specialties') else []
+            driver_profile.vehicle_type,
+            (request.user_preferences or {}).get("special_requirements", []),
+            driver_profile.specialties
         )
         fairness_boost = self.calculate_fairness_boost(driver_profile, recent_assignments=0)
         
         # Calculate weighted total score
-        # Weights (from specs103.md):
-        # score = 0.35 * eta_score +
-        #         0.25 * rating_score +
-        #         0.15 * reliability_score +
-        #         0.15 * fairness_boost +
-        #         0.10 * vehicle_match
-        
+        eta_weight, rating_weight, reliability_weight, fairness_weight, vehicle_weight = MATCH_SCORE_WEIGHTS
         total_score = (
-            0.35 * eta_score +
-            0.25 * rating_score +
-            0.15 * reliability_score +
-            0.15 * fairness_boost +
-            0.10 * vehicle_match
+            eta_weight * eta_score +
+            rating_weight * rating_score +
+            reliability_weight * reliability_score +
+            fairness_weight * fairness_boost +
+            vehicle_weight * vehicle_match
         )
         
         return MatchingScore(
@@ -368,23 +417,31 @@ class PremiumDriverMatcher:
             Ranked list of drivers by match score
         """
         scores = []
+        pickup_lat, pickup_lon = request.pickup_location
         
         for driver in available_drivers:
-            # Calculate distance
-            distance = self.calculate_distance(
-                driver.avg_rating_lifetime,  # Use rating as proxy for location
-                driver.avg_rating_lifetime,  # Use rating as proxy for location
-                request.pickup_location[0],
-                request.pickup_location[1]
-            )
-            
-            # Calculate ETA
-            eta = self.calculate_eta(
-                driver.avg_rating_lifetime,
-                driver.avg_rating_lifetime,
-                distance_km=distance,
-                average_speed_kmh=30.0
-            )
+            if driver.latitude is None or driver.longitude is None:
+                # Unknown location scores like a driver beyond the maximum ETA
+                distance = math.inf
+                eta = math.inf
+            else:
+                # Calculate distance
+                distance = self.calculate_distance(
+                    driver.latitude,
+                    driver.longitude,
+                    pickup_lat,
+                    pickup_lon
+                )
+                
+                # Calculate ETA
+                eta = self.calculate_eta(
+                    driver.latitude,
+                    driver.longitude,
+                    pickup_lat,
+                    pickup_lon,
+                    distance_km=distance,
+                    average_speed_kmh=30.0
+                )
             
             # Calculate match score
             score = self.calculate_match_score(
@@ -402,6 +459,41 @@ class PremiumDriverMatcher:
         # Return top N drivers
         return scores[:max_drivers]
     
+    def get_eligibility_requirements(self, request: MatchingRequest) -> Dict[str, Any]:
+        """
+        Get the requirements a driver must meet to be eligible for a request.
+        
+        Args:
+            request: Matching request
+            
+        Returns:
+            Dictionary with min_rating (None without a premium tier),
+            specialties, service_type and vehicle_features
+        """
+        preferences = request.user_preferences or {}
+        tier_requirements = self.premium_tiers.get(request.user_tier, {})
+        
+        min_rating = None
+        specialties = []
+        if tier_requirements:
+            min_rating = tier_requirements.get("min_rating", 4.0)
+            specialties = list(preferences.get("specialties", []))
+        
+        vehicle_features = []
+        if request.premium_required:
+            special_requirements = preferences.get("special_requirements", [])
+            vehicle_features = [
+                feature for feature in PREMIUM_VEHICLE_FEATURES
+                if feature in special_requirements
+            ]
+        
+        return {
+            "min_rating": min_rating,
+            "specialties": specialties,
+            "service_type": request.service_type or None,
+            "vehicle_features": vehicle_features
+        }
+    
     def filter_eligible_drivers(
         self,
         drivers: List[DriverProfile],
@@ -417,30 +509,21 @@ class PremiumDriverMatcher:
         Returns:
             List of eligible drivers
         """
+        requirements = self.get_eligibility_requirements(request)
+        min_rating = requirements["min_rating"]
+        required_specialties = set(requirements["specialties"])
+        service_type = requirements["service_type"]
+        required_features = requirements["vehicle_features"]
+        
         eligible_drivers = []
         
         for driver in drivers:
-            # Check if driver is premium
-            is_premium = driver.avg_rating_lifetime >= 4.5
-            
             # Check premium tier requirements
-            tier_requirements = self.premium_tiers.get(request.user_tier, {})
-            
-            if tier_requirements:
-                min_rating = tier_requirements.get("min_rating", 4.0)
-                
+            if min_rating is not None:
                 if driver.avg_rating_30d < min_rating:
                     continue  # Driver doesn't meet minimum rating
-            
-                # Check if driver offers required service types
-                if hasattr(driver, 'specialties'):
-                    driver_specialties = driver.specialties
-                else:
-                    driver_specialties = []
                 
-                # Check if driver offers required specialties
-                required_specialties = request.user_preferences.get("specialties", [])
-                if not set(required_specialties).issubset(driver_specialties):
+                if not required_specialties.issubset(driver.specialties):
                     continue  # Driver doesn't offer required specialties
             
             # Check availability
@@ -448,27 +531,12 @@ class PremiumDriverMatcher:
                 continue  # Driver not available
             
             # Check service type compatibility
-            if request.service_type:
-                service_types = hasattr(driver, 'service_types') and driver.service_types
-                if request.service_type not in service_types:
-                    continue  # Driver doesn't offer this service type
+            if service_type and service_type not in driver.service_types:
+                continue  # Driver doesn't offer this service type
             
-            # Check special requirements
-            if request.premium_required:
-                # Check for child seat
-                if "child_seat" in request.special_requirements:
-                    if not hasattr(driver, 'vehicle_features') or "child_seat" not in driver.vehicle_features:
-                        continue
-                
-                # Check for pet-friendly
-                if "pet_friendly" in request.special_requirements:
-                    if not hasattr(driver, 'vehicle_features') or "pet_friendly" not in driver.vehicle_features:
-                        continue
-                
-                # Check for wheelchair accessible
-                if "wheelchair_accessible" in request.special_requirements:
-                    if not hasattr(driver, 'vehicle_features') or "wheelchair_accessible" not in driver.vehicle_features:
-                        continue
+            # Check special requirements (child seat, pet-friendly, wheelchair accessible)
+            if any(feature not in driver.vehicle_features for feature in required_features):
+                continue
             
             eligible_drivers.append(driver)
         
@@ -491,81 +559,74 @@ class PremiumDriverMatcher:
         Returns:
             Pricing breakdown
         """
-        tier_config = self.premium_tiers.get(driver_tier, {"multiplier": 1.0})
-        multiplier = tier_config["multiplier"]
-        
-        # Apply premium fee
-        premium_fee = base_fare * 0.2  # 20% premium fee
-        
-        # Apply time-based multipliers
-        current_hour = datetime.now().hour
-        is_night = current_hour >= 22 or current_hour < 6
-        is_weekend = datetime.now().weekday() >= 5  # Saturday or Sunday
-        
-        if is_night:
-            multiplier *= 1.1  # Night premium
-        elif is_weekend:
-            multiplier *= 1.05  # Weekend premium
-        
-        total_fare = base_fare * multiplier + premium_fee
-        
-        # Calculate savings
-        standard_fare = base_fare * 1.0
-        savings = standard_fare - total_fare
+        # Tier multiplier with the night (x1.1) or weekend (x1.05) premium, plus a 20% fee
+        return self.pricing_table.price(base_fare, driver_tier)
+    
+    def apply_premium_pricing_batch(
+        self,
+        base_fares: List[float],
+        driver_tiers: List[str],
+        service_types: List[str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate premium pricing for many fares at once.
         
-        return {
-            "base_fare": base_fare,
-            "premium_fee": premium_fee,
-            "multiplier": multiplier,
-            "total_fare": total_fare,
-            "savings": savings,
-            "savings_percentage": (savings / standard_fare) * 100 if standard_fare > 0 else 0
-        }
+        Args:
+            base_fares: Standard base fares
+            driver_tiers: Premium tier of each fare
+            service_types: Service type of each fare
+            
+        Returns:
+            Pricing breakdown with one array per field
+        """
+        return self.pricing_table.price_batch(base_fares, driver_tiers)
     
     def get_driver_recommendations(
         self,
         driver_profile: DriverProfile,
-        request: MatchingRequest
+        request: Optional[MatchingRequest] = None
     ) -> List[str]:
         """
         Get recommendations for improving driver quality.
         
         Args:
             driver_profile: Driver's quality profile
-            request: Matching request
+            request: Matching request (unused; recommendations depend only on the profile)
             
         Returns:
             List of recommendations
         """
         recommendations = []
-        
-        # Rating-based recommendations
-        if driver_profile.avg_rating_30d < 4.0:
-            recommendations.append("Improve your average rating by providing excellent service")
-            recommendations.append("Be punctual and professional to increase tips")
-        
-        # Completion rate recommendations
-        if driver_profile.completion_rate_30d < 0.95:
-            recommendations.append("Focus on completing all accepted rides")
-            recommendations.append("Communicate clearly if you need to cancel")
-        
-        # Acceptance rate recommendations
-        if driver_profile.acceptance_rate_30d < 0.90:
-            recommendations.append("Accept more ride requests to improve your rate")
-        
-        # ETA accuracy recommendations
-        if driver_profile.eta_accuracy_30d < 0.85:
-            recommendations.append("Update your location regularly for accurate ETAs")
-            recommendations.append("Plan your routes more efficiently")
-        
-        # Reliability recommendations
-        if driver_profile.cancellation_rate_30d > 0.05:
-            recommendations.append("Reduce cancellations by maintaining your schedule")
-            recommendations.append("Give advance notice for cancellations")
+        for field_name, comparison, threshold, messages in DRIVER_RECOMMENDATION_RULES:
+            value = getattr(driver_profile, field_name)
+            if (value < threshold) if comparison == "<" else (value > threshold):
+                recommendations.extend(messages)
         
         return recommendations
 
 
+def fairness_score_for_count(recent_count: int) -> float:
+    """
+    Calculate the fairness score for one driver's recent assignment count.
+    
+    Args:
+        recent_count: Number of recent assignments
+            
+    Returns:
+        Fairness score (0 or a penalty down to -0.5)
+    """
+    if recent_count <= 5:
+        return 0.0
+    elif recent_count <= 10:
+        return -0.1  # Slight penalty for too many assignments
+    elif recent_count <= 15:
+        return -0.2
+    elif recent_count <= 20:
+        return -0.3
+    else:
+        return -0.5
+
+
 def calculate_fairness_score(
     driver_profiles: List[DriverProfile],
     recent_assignments: Dict[str, int]
@@ -577,8 +638,8 @@ def calculate_fairness_score(
         driver_profiles: List of driver profiles
         recent_assignments: Dictionary of driver_id -> recent assignment count
             
-        Returns:
-            Dictionary of driver_id -> fairness score
+    Returns:
+        Dictionary of driver_id -> fairness score
     """
     fairness_scores = {}
     
@@ -586,21 +647,7 @@ def calculate_fairness_score(
         # Get recent assignment count
         recent_count = recent_assignments.get(driver.driver_id, 0)
         
-        # Calculate fairness boost
-        if recent_count == 0:
-            boost = 0.0
-        elif recent_count <= 5:
-            boost = 0.0
-        elif recent_count <= 10:
-            boost = -0.1  # Slight penalty for too many assignments
-        elif recent_count <= 15:
-            boost = -0.2
-        elif recent_count <= 20:
-            boost = -0.3
-        else:
-            boost = -0.5
-        
-        fairness_scores[driver.driver_id] = boost
+        fairness_scores[driver.driver_id] = fairness_score_for_count(recent_count)
     
     return fairness_scores
 
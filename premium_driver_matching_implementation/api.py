@@ -3,22 +3,33 @@ Premium Driver Matching API
 FastAPI endpoints for premium driver matching service
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status, Query, Path
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import json
 import logging
+import os
 from contextlib import asynccontextmanager
+import numpy as np
 
 from algorithms import (
     PremiumDriverMatcher,
     DriverProfile,
     MatchingRequest,
-    MatchingScore,
-    calculate_fairness_score
+    MatchingScore
 )
+from fleet_store import FleetStore
+from eligibility_index import EligibilityIndex
+from batch_ranking import BatchDriverRanker
+from fleet_stats import FleetStatsAggregator
+from driver_index import DriverListIndex, InvalidCursor
+from fleet_persistence import FleetPersistence
+from driver_recommendations import FleetRecommender
+from bulk_upsert import DriverBatch, field_rules, parse_columnar, parse_ndjson, validate_batch
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +41,7 @@ logger = logging.getLogger(__name__)
 
 # Global matcher instance
 matcher = PremiumDriverMatcher()
+ranker = BatchDriverRanker()
 
 
 # Pydantic models for API requests/responses
@@ -48,6 +60,9 @@ class DriverProfileCreate(BaseModel):
     service_types: List[str] = Field(default_factory=list, description="Service types driver offers")
     specialties: List[str] = Field(default_factory=list, description="Driver specialties")
     vehicle_features: List[str] = Field(default_factory=list, description="Vehicle features")
+    vehicle_type: Optional[str] = Field(None, description="Vehicle type (SEDAN, SUV, MOTO, ...)")
+    latitude: Optional[float] = Field(None, ge=-90.0, le=90.0, description="Current latitude")
+    longitude: Optional[float] = Field(None, ge=-180.0, le=180.0, description="Current longitude")
 
 
 class DriverProfileUpdate(BaseModel):
@@ -64,6 +79,9 @@ class DriverProfileUpdate(BaseModel):
     service_types: Optional[List[str]] = None
     specialties: Optional[List[str]] = None
     vehicle_features: Optional[List[str]] = None
+    vehicle_type: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90.0, le=90.0)
+    longitude: Optional[float] = Field(None, ge=-180.0, le=180.0)
 
 
 class MatchingRequestCreate(BaseModel):
@@ -129,6 +147,9 @@ class DriverProfileResponse(BaseModel):
     service_types: List[str]
     specialties: List[str]
     vehicle_features: List[str]
+    vehicle_type: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     last_updated: datetime
 
 
@@ -147,6 +168,49 @@ class PricingRequest(BaseModel):
         return v
 
 
+class BatchPricingRequest(BaseModel):
+    """Request model for pricing many fares at once (one list entry per fare)."""
+    base_fares: List[float] = Field(..., min_length=1, description="Standard base fares")
+    driver_tiers: List[str] = Field(..., description="Driver premium tier of each fare")
+    service_types: List[str] = Field(..., description="Service type of each fare")
+    
+    @validator('base_fares')
+    def validate_base_fares(cls, v):
+        """Validate every base fare is positive."""
+        if any(fare <= 0 for fare in v):
+            raise ValueError("Base fares must be greater than 0")
+        return v
+    
+    @validator('driver_tiers')
+    def validate_driver_tiers(cls, v, values):
+        """Validate driver tiers and that there is one per fare."""
+        valid_tiers = {"BRONZE", "SILVER", "GOLD", "PLATINUM"}
+        invalid = sorted(set(v) - valid_tiers)
+        if invalid:
+            raise ValueError(f"Driver tiers must be one of {sorted(valid_tiers)}, got {invalid}")
+        if "base_fares" in values and len(v) != len(values["base_fares"]):
+            raise ValueError("driver_tiers must have one entry per base fare")
+        return v
+    
+    @validator('service_types')
+    def validate_service_types(cls, v, values):
+        """Validate there is one service type per fare."""
+        if "base_fares" in values and len(v) != len(values["base_fares"]):
+            raise ValueError("service_types must have one entry per base fare")
+        return v
+
+
+class BatchPricingResponse(BaseModel):
+    """Response model for batch premium pricing (one list entry per fare)."""
+    time_bucket: str
+    base_fare: List[float]
+    premium_fee: List[float]
+    multiplier: List[float]
+    total_fare: List[float]
+    savings: List[float]
+    savings_percentage: List[float]
+
+
 class PricingResponse(BaseModel):
     """Response model for premium pricing."""
     base_fare: float
@@ -163,6 +227,15 @@ class RecommendationsResponse(BaseModel):
     recommendations: List[str]
 
 
+class BulkUpsertResponse(BaseModel):
+    """Response model for bulk driver upserts."""
+    received: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[Dict[str, Any]]
+
+
 class HealthResponse(BaseModel):
     """Response model for health check."""
     status: str
@@ -172,7 +245,179 @@ class HealthResponse(BaseModel):
 
 
 # In-memory storage (in production, use database)
-driver_profiles_store: Dict[str, DriverProfile] = {}
+driver_profiles_store = FleetStore()
+eligibility_index = EligibilityIndex(driver_profiles_store, matcher.premium_tiers)
+matcher.eligibility_index = eligibility_index
+fleet_stats = FleetStatsAggregator(driver_profiles_store)
+driver_list_index = DriverListIndex(driver_profiles_store)
+recommender = FleetRecommender(driver_profiles_store)
+
+# Validation rules for bulk upserts, taken from the single-driver model
+DRIVER_FIELD_RULES = field_rules(DriverProfileCreate)
+
+# Bulk upserts touching more than this fraction of the fleet rebuild the indexes instead
+BULK_REBUILD_FRACTION = 0.125
+
+# Snapshots and change log; persistence is off unless a data directory is configured
+FLEET_DATA_DIR = os.environ.get("PREMIUM_FLEET_DATA_DIR")
+SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("PREMIUM_FLEET_SNAPSHOT_INTERVAL", "300"))
+# Set to 0 to skip the fsync after each change log entry: faster writes, but a
+# machine crash can lose recent acknowledged changes (see FleetPersistence)
+FLEET_FSYNC = os.environ.get("PREMIUM_FLEET_FSYNC", "1").lower() not in ("0", "false", "no")
+fleet_persistence: Optional[FleetPersistence] = None
+
+
+def store_driver_profile(profile: DriverProfile) -> None:
+    """Insert or replace a driver profile and update the indexes and statistics."""
+    row = driver_profiles_store.row_of(profile.driver_id)
+    before = None if row is None else fleet_stats.contribution(row)
+    row = driver_profiles_store.upsert(profile)
+    if fleet_persistence is not None:
+        fleet_persistence.record_upsert(profile)
+    eligibility_index.refresh_row(row)
+    driver_list_index.refresh(profile.driver_id)
+    recommender.invalidate(profile.driver_id)
+    fleet_stats.apply(profile.driver_id, before, fleet_stats.contribution(row))
+
+
+def update_driver_fields(driver_id: str, **changes) -> None:
+    """Update fields of a stored driver and update the indexes and statistics."""
+    before = fleet_stats.contribution(driver_profiles_store.row_of(driver_id))
+    row = driver_profiles_store.update(driver_id, **changes)
+    if fleet_persistence is not None:
+        fleet_persistence.record_update(driver_id, changes)
+    eligibility_index.refresh_row(row)
+    driver_list_index.refresh(driver_id)
+    recommender.invalidate(driver_id)
+    fleet_stats.apply(driver_id, before, fleet_stats.contribution(row))
+
+
+def remove_driver_profile(driver_id: str) -> None:
+    """Remove a stored driver and update the indexes and statistics."""
+    before = fleet_stats.contribution(driver_profiles_store.row_of(driver_id))
+    row, last = driver_profiles_store.delete(driver_id)
+    if fleet_persistence is not None:
+        fleet_persistence.record_delete(driver_id)
+    eligibility_index.remove_row(row, last)
+    driver_list_index.remove(driver_id)
+    recommender.invalidate(driver_id)
+    fleet_stats.apply(driver_id, before, None)
+
+
+def upsert_driver_batch(batch: DriverBatch, creates: np.ndarray) -> Tuple[int, int]:
+    """
+    Apply the valid rows of a validated bulk upsert in one pass.
+    
+    Updates of existing drivers are written a column at a time; new drivers
+    are inserted with the model defaults for fields they omit. The indexes
+    are refreshed per touched row, or rebuilt once if the batch touches a
+    large part of the fleet. With persistence on, the whole batch is logged
+    with one write before the store changes; if that write fails the store
+    is left untouched and the OSError propagates.
+    
+    Args:
+        batch: Batch validated by validate_batch
+        creates: Mask of rows that create a new driver
+        
+    Returns:
+        (created, updated) counts
+    """
+    store = driver_profiles_store
+    now = datetime.now()
+    driver_ids = batch.columns.get("driver_id", [])
+    valid = batch.valid_rows()
+    update_rows = valid[~creates[valid]]
+    create_rows = valid[creates[valid]]
+    
+    defaults = {name: rule.default for name, rule in DRIVER_FIELD_RULES.items() if not rule.required}
+    created_profiles = [
+        DriverProfile(driver_id=driver_ids[i], last_updated=now, **{**defaults, **batch.values(i)})
+        for i in create_rows
+    ]
+    if fleet_persistence is not None:
+        # Log the whole batch with one fsync before the store changes, so a
+        # failed write leaves both the store and the log as they were
+        fleet_persistence.record_many(
+            [
+                FleetPersistence.update_entry(driver_ids[i], {**batch.values(i), "last_updated": now})
+                for i in update_rows
+            ]
+            + [FleetPersistence.upsert_entry(profile) for profile in created_profiles]
+        )
+    
+    store_rows = np.array([store.row_of(driver_ids[i]) for i in update_rows], dtype=np.intp)
+    before = fleet_stats.contributions(store_rows)
+    for name, column in batch.columns.items():
+        if name == "driver_id" or name not in DRIVER_FIELD_RULES:
+            continue
+        values = [column[i] for i in update_rows]
+        present = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        if present.any():
+            store.assign(name, store_rows[present], [value for value in values if value is not None])
+    store.assign("last_updated", store_rows, [now] * len(store_rows))
+    
+    created_rows = [store.upsert(profile) for profile in created_profiles]
+    
+    touched = np.concatenate([store_rows, np.array(created_rows, dtype=np.intp)])
+    if len(touched) > len(store) * BULK_REBUILD_FRACTION:
+        eligibility_index.rebuild()
+        driver_list_index.rebuild()
+    else:
+        for row in touched:
+            eligibility_index.refresh_row(row)
+            driver_list_index.refresh(store.driver_ids[row])
+    for row in touched:
+        recommender.invalidate(store.driver_ids[row])
+    
+    after = fleet_stats.contributions(store_rows)
+    for i, old, new in zip(update_rows, before, after):
+        fleet_stats.apply(driver_ids[i], old, new)
+    for profile, row in zip(created_profiles, created_rows):
+        fleet_stats.apply(profile.driver_id, None, fleet_stats.contribution(row))
+    
+    return len(create_rows), len(update_rows)
+
+
+def reset_driver_store() -> None:
+    """Remove all drivers and reset the indexes and statistics."""
+    driver_profiles_store.clear()
+    if fleet_persistence is not None:
+        fleet_persistence.record_clear()
+    rebuild_driver_indexes()
+
+
+def rebuild_driver_indexes() -> None:
+    """Rebuild the indexes and statistics from the driver store."""
+    eligibility_index.rebuild()
+    fleet_stats.rebuild()
+    driver_list_index.rebuild()
+    recommender.clear()
+
+
+def load_driver_store(persistence: FleetPersistence) -> int:
+    """
+    Load the driver store from the latest snapshot and change log.
+    
+    Args:
+        persistence: Snapshot and change log location
+        
+    Returns:
+        Number of change log entries replayed on top of the snapshot
+    """
+    replayed = persistence.load(driver_profiles_store)
+    rebuild_driver_indexes()
+    return replayed
+
+
+async def snapshot_periodically(persistence: FleetPersistence, interval: float) -> None:
+    """Snapshot the driver store every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Runs on the event loop, so no request can change the store mid-snapshot
+            persistence.snapshot(driver_profiles_store)
+        except OSError as e:
+            logger.error(f"Driver store snapshot failed: {e}")
 
 
 # Lifespan context manager
@@ -181,13 +426,29 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     # Startup
     logger.info("Starting Premium Driver Matching API")
-    logger.info("Loading driver profiles...")
-    # Load driver profiles from database (in production)
-    logger.info(f"Loaded {len(driver_profiles_store)} driver profiles")
+    global fleet_persistence
+    snapshot_task = None
+    if FLEET_DATA_DIR:
+        logger.info("Loading driver profiles...")
+        persistence = FleetPersistence(FLEET_DATA_DIR, fsync=FLEET_FSYNC)
+        replayed = load_driver_store(persistence)
+        fleet_persistence = persistence
+        snapshot_task = asyncio.create_task(
+            snapshot_periodically(persistence, SNAPSHOT_INTERVAL_SECONDS)
+        )
+        logger.info(
+            f"Loaded {len(driver_profiles_store)} driver profiles "
+            f"({replayed} changes replayed since the last snapshot)"
+        )
     
     yield
     
     # Shutdown
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        fleet_persistence.snapshot(driver_profiles_store)
+        fleet_persistence.close()
+        fleet_persistence = None
     logger.info("Shutting down Premium Driver Matching API")
 
 
@@ -206,6 +467,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -222,11 +484,14 @@ def driver_profile_to_response(profile: DriverProfile) -> DriverProfileResponse:
         acceptance_rate_30d=profile.acceptance_rate_30d,
         eta_accuracy_30d=profile.eta_accuracy_30d,
         fairness_boost=profile.fairness_boost,
-        is_available=profile.is_available if hasattr(profile, 'is_available') else True,
-        service_types=profile.service_types if hasattr(profile, 'service_types') else [],
-        specialties=profile.specialties if hasattr(profile, 'specialties') else [],
-        vehicle_features=profile.vehicle_features if hasattr(profile, 'vehicle_features') else [],
-        last_updated=profile.last_updated if hasattr(profile, 'last_updated') else datetime.now()
+        is_available=profile.is_available,
+        service_types=profile.service_types,
+        specialties=profile.specialties,
+        vehicle_features=profile.vehicle_features,
+        vehicle_type=profile.vehicle_type,
+        latitude=profile.latitude,
+        longitude=profile.longitude,
+        last_updated=profile.last_updated
     )
 
 
@@ -286,23 +551,84 @@ async def create_driver_profile(profile: DriverProfileCreate):
         acceptance_rate_30d=profile.acceptance_rate_30d,
         eta_accuracy_30d=profile.eta_accuracy_30d,
         fairness_boost=profile.fairness_boost,
+        is_available=profile.is_available,
+        service_types=profile.service_types,
+        specialties=profile.specialties,
+        vehicle_features=profile.vehicle_features,
+        vehicle_type=profile.vehicle_type,
+        latitude=profile.latitude,
+        longitude=profile.longitude,
         last_updated=datetime.now()
     )
     
-    # Add additional attributes
-    driver_profile.is_available = profile.is_available
-    driver_profile.service_types = profile.service_types
-    driver_profile.specialties = profile.specialties
-    driver_profile.vehicle_features = profile.vehicle_features
-    
     # Store profile
-    driver_profiles_store[profile.driver_id] = driver_profile
+    try:
+        store_driver_profile(driver_profile)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
     
     logger.info(f"Created driver profile: {profile.driver_id}")
     
     return driver_profile_to_response(driver_profile)
 
 
+@app.post("/drivers/bulk", response_model=BulkUpsertResponse)
+async def bulk_upsert_drivers(request: Request):
+    """
+    Create or update many driver profiles in one request.
+    
+    The body is either NDJSON (Content-Type application/x-ndjson), one
+    profile object per line, or a columnar JSON object mapping each field
+    to a list with one value per driver. New drivers need every required
+    field; existing drivers only need the fields that change (null means
+    unchanged, as with PUT). Invalid rows are reported and skipped, and
+    the other rows are applied.
+    
+    Args:
+        request: HTTP request carrying the payload
+        
+    Returns:
+        Counts of created, updated and failed rows, with per-row errors
+    """
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            batch = parse_ndjson(body)
+        else:
+            batch = parse_columnar(json.loads(body))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bulk payload: {e}"
+        )
+    
+    creates = validate_batch(batch, DRIVER_FIELD_RULES, driver_profiles_store)
+    created, updated = upsert_driver_batch(batch, creates)
+    
+    driver_ids = batch.columns.get("driver_id", [])
+    errors = [
+        {
+            "row": row,
+            "driver_id": driver_ids[row] if row < len(driver_ids) and isinstance(driver_ids[row], str) else None,
+            "errors": batch.errors[row]
+        }
+        for row in sorted(batch.errors)
+    ]
+    
+    logger.info(f"Bulk upsert: {created} created, {updated} updated, {len(errors)} failed")
+    
+    return BulkUpsertResponse(
+        received=batch.size,
+        created=created,
+        updated=updated,
+        failed=len(errors),
+        errors=errors
+    )
+
+
 @app.get("/drivers/{driver_id}", response_model=DriverProfileResponse)
 async def get_driver_profile(driver_id: str = Path(..., description="Driver ID")):
     """
@@ -344,40 +670,19 @@ async def update_driver_profile(
             detail=f"Driver profile {driver_id} not found"
         )
     
-    # Get existing profile
-    existing_profile = driver_profiles_store[driver_id]
-    
-    # Update fields
-    if profile.avg_rating_30d is not None:
-        existing_profile.avg_rating_30d = profile.avg_rating_30d
-    if profile.avg_rating_90d is not None:
-        existing_profile.avg_rating_90d = profile.avg_rating_90d
-    if profile.avg_rating_lifetime is not None:
-        existing_profile.avg_rating_lifetime = profile.avg_rating_lifetime
-    if profile.total_rides is not None:
-        existing_profile.total_rides = profile.total_rides
-    if profile.completion_rate_30d is not None:
-        existing_profile.completion_rate_30d = profile.completion_rate_30d
-    if profile.acceptance_rate_30d is not None:
-        existing_profile.acceptance_rate_30d = profile.acceptance_rate_30d
-    if profile.eta_accuracy_30d is not None:
-        existing_profile.eta_accuracy_30d = profile.eta_accuracy_30d
-    if profile.fairness_boost is not None:
-        existing_profile.fairness_boost = profile.fairness_boost
-    if profile.is_available is not None:
-        existing_profile.is_available = profile.is_available
-    if profile.service_types is not None:
-        existing_profile.service_types = profile.service_types
-    if profile.specialties is not None:
-        existing_profile.specialties = profile.specialties
-    if profile.vehicle_features is not None:
-        existing_profile.vehicle_features = profile.vehicle_features
-    
-    existing_profile.last_updated = datetime.now()
+    # Update only the fields that were provided
+    changes = profile.model_dump(exclude_none=True) if profile else {}
+    try:
+        update_driver_fields(driver_id, last_updated=datetime.now(), **changes)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
     
     logger.info(f"Updated driver profile: {driver_id}")
     
-    return driver_profile_to_response(existing_profile)
+    return driver_profile_to_response(driver_profiles_store[driver_id])
 
 
 @app.delete("/drivers/{driver_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -394,48 +699,56 @@ async def delete_driver_profile(driver_id: str = Path(..., description="Driver I
             detail=f"Driver profile {driver_id} not found"
         )
     
-    del driver_profiles_store[driver_id]
+    remove_driver_profile(driver_id)
     
     logger.info(f"Deleted driver profile: {driver_id}")
 
 
 @app.get("/drivers", response_model=List[DriverProfileResponse])
 async def list_drivers(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     service_type: Optional[str] = Query(None, description="Filter by service type"),
     is_available: Optional[bool] = Query(None, description="Filter by availability"),
-    min_rating: Optional[float] = Query(None, ge=1.0, le=5.0, description="Minimum rating")
+    min_rating: Optional[float] = Query(None, ge=1.0, le=5.0, description="Minimum rating"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
 ):
     """
     List driver profiles with optional filters.
     
+    Drivers are ordered by driver ID, or by rating (highest first) when
+    min_rating is given. When more results exist, the X-Next-Cursor response
+    header holds a cursor for the next page; paging with cursors stays
+    consistent while drivers are being changed.
+    
     Args:
         skip: Number of records to skip
         limit: Maximum number of records to return
         service_type: Filter by service type
         is_available: Filter by availability
         min_rating: Minimum rating
+        cursor: Cursor for the next page
         
     Returns:
         List of driver profiles
     """
-    profiles = list(driver_profiles_store.values())
-    
-    # Apply filters
-    if service_type:
-        profiles = [p for p in profiles if service_type in (getattr(p, 'service_types', []))]
-    
-    if is_available is not None:
-        profiles = [p for p in profiles if getattr(p, 'is_available', True) == is_available]
-    
-    if min_rating:
-        profiles = [p for p in profiles if p.avg_rating_30d >= min_rating]
+    try:
+        driver_ids, next_cursor = driver_list_index.page(
+            limit,
+            cursor=cursor,
+            skip=skip,
+            service_type=service_type,
+            is_available=is_available,
+            min_rating=min_rating
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    # Apply pagination
-    profiles = profiles[skip:skip + limit]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return [driver_profile_to_response(p) for p in profiles]
+    return [driver_profile_to_response(driver_profiles_store[driver_id]) for driver_id in driver_ids]
 
 
 @app.post("/match", response_model=MatchingResponse)
@@ -465,14 +778,13 @@ async def match_drivers(request: MatchingRequestCreate):
     if request.special_requirements:
         matching_request.user_preferences["special_requirements"] = request.special_requirements
     
-    # Get all available drivers
-    available_drivers = list(driver_profiles_store.values())
-    
-    # Filter eligible drivers
-    eligible_drivers = matcher.filter_eligible_drivers(available_drivers, matching_request)
+    # Filter eligible drivers with the bitset index
+    eligible_rows = eligibility_index.eligible_rows_for_request(matcher, matching_request)
     
-    # Rank drivers
-    ranked_drivers = matcher.rank_drivers(matching_request, eligible_drivers, max_drivers=10)
+    # Rank drivers on column arrays, keeping only the top 10
+    ranked_drivers = ranker.rank_rows(
+        matching_request, driver_profiles_store, eligible_rows, max_drivers=10
+    )
     
     # Convert to response format
     matched_drivers = [matching_score_to_dict(score) for score in ranked_drivers]
@@ -482,7 +794,7 @@ async def match_drivers(request: MatchingRequestCreate):
     return MatchingResponse(
         order_id=request.order_id,
         matched_drivers=matched_drivers,
-        total_candidates=len(eligible_drivers),
+        total_candidates=len(eligible_rows),
         timestamp=datetime.now()
     )
 
@@ -507,6 +819,51 @@ async def calculate_pricing(pricing_request: PricingRequest):
     return PricingResponse(**pricing)
 
 
+@app.post("/pricing/batch", response_model=BatchPricingResponse)
+async def calculate_pricing_batch(pricing_request: BatchPricingRequest):
+    """
+    Calculate premium pricing for many fares at once.
+    
+    Every fare is priced in the same time bucket.
+    
+    Args:
+        pricing_request: Columns of fares to price
+        
+    Returns:
+        Pricing breakdown columns, in request order
+    """
+    time_bucket = matcher.pricing_table.current_bucket()
+    pricing = matcher.apply_premium_pricing_batch(
+        base_fares=pricing_request.base_fares,
+        driver_tiers=pricing_request.driver_tiers,
+        service_types=pricing_request.service_types
+    )
+    
+    return BatchPricingResponse(
+        time_bucket=time_bucket,
+        **{name: values.tolist() for name, values in pricing.items()}
+    )
+
+
+@app.get("/drivers/recommendations/export")
+async def export_driver_recommendations(
+    include_empty: bool = Query(False, description="Include drivers without recommendations")
+):
+    """
+    Export recommendations for the whole fleet as NDJSON.
+    
+    Args:
+        include_empty: Include drivers without recommendations
+        
+    Returns:
+        Streaming response with one {"driver_id", "recommendations"} object per line
+    """
+    return StreamingResponse(
+        recommender.export_ndjson(include_empty=include_empty),
+        media_type="application/x-ndjson"
+    )
+
+
 @app.get("/drivers/{driver_id}/recommendations", response_model=RecommendationsResponse)
 async def get_driver_recommendations(driver_id: str = Path(..., description="Driver ID")):
     """
@@ -524,18 +881,8 @@ async def get_driver_recommendations(driver_id: str = Path(..., description="Dri
             detail=f"Driver profile {driver_id} not found"
         )
     
-    driver_profile = driver_profiles_store[driver_id]
-    
-    # Create a dummy request for recommendations
-    request = MatchingRequest(
-        order_id="dummy_order",
-        pickup_location=(0.0, 0.0),
-        dropoff_location=(0.0, 0.0),
-        service_type="RIDE"
-    )
-    
-    # Get recommendations
-    recommendations = matcher.get_driver_recommendations(driver_profile, request)
+    # Cached until the profile changes
+    recommendations = recommender.recommendations_for(driver_id)
     
     return RecommendationsResponse(
         driver_id=driver_id,
@@ -551,14 +898,8 @@ async def calculate_fairness_scores():
     Returns:
         Dictionary of driver_id -> fairness score
     """
-    profiles = list(driver_profiles_store.values())
-    
-    # In production, get recent assignments from database
-    recent_assignments = {p.driver_id: 0 for p in profiles}
-    
-    fairness_scores = calculate_fairness_score(profiles, recent_assignments)
-    
-    return fairness_scores
+    # Scores are maintained per driver as profiles and assignment counts change
+    return fleet_stats.fairness_scores
 
 
 @app.get("/stats")
@@ -569,26 +910,24 @@ async def get_statistics():
     Returns:
         Statistics summary
     """
-    profiles = list(driver_profiles_store.values())
-    
-    if not profiles:
-        return {
-            "total_drivers": 0,
-            "available_drivers": 0,
-            "avg_rating": 0.0,
-            "avg_completion_rate": 0.0,
-            "avg_acceptance_rate": 0.0
-        }
-    
-    available_drivers = [p for p in profiles if getattr(p, 'is_available', True)]
+    return fleet_stats.stats()
+
+
+@app.get("/stats/changes")
+async def get_statistics_changes(
+    since: int = Query(0, ge=0, description="Last statistics version seen")
+):
+    """
+    Get statistics changes since a version, for dashboards that poll.
     
-    return {
-        "total_drivers": len(profiles),
-        "available_drivers": len(available_drivers),
-        "avg_rating": sum(p.avg_rating_30d for p in profiles) / len(profiles),
-        "avg_completion_rate": sum(p.completion_rate_30d for p in profiles) / len(profiles),
-        "avg_acceptance_rate": sum(p.acceptance_rate_30d for p in profiles) / len(profiles)
-    }
+    Args:
+        since: Last statistics version seen
+        
+    Returns:
+        Current statistics, the changes after ``since`` and whether they are
+        complete; when incomplete, resync from the returned statistics
+    """
+    return fleet_stats.changes_since(since)
 
 
 # Exception handlers
@@ -0,0 +1,91 @@
+"""
+Benchmark rank_drivers loop vs BatchDriverRanker
+
+Usage (from the premium_driver_matching_implementation directory):
+    python -m benchmarks.bench_batch_ranking [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from algorithms import DriverProfile, MatchingRequest, PremiumDriverMatcher
+from batch_ranking import BatchDriverRanker
+from fleet_store import FleetStore
+
+VEHICLE_TYPES = ["SEDAN", "SUV", "LUXURY_SEDAN", "MOTO", "VAN"]
+SPECIALTIES = ["airport_transfer", "city_tour", "corporate", "events"]
+
+
+def make_profiles(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        DriverProfile(
+            driver_id=f"driver-{i}",
+            avg_rating_30d=round(rng.uniform(3.0, 5.0), 2),
+            avg_rating_90d=round(rng.uniform(3.0, 5.0), 2),
+            avg_rating_lifetime=round(rng.uniform(3.0, 5.0), 2),
+            total_rides=rng.randint(0, 5000),
+            completion_rate_30d=round(rng.uniform(0.8, 1.0), 3),
+            acceptance_rate_30d=round(rng.uniform(0.7, 1.0), 3),
+            eta_accuracy_30d=round(rng.uniform(0.7, 1.0), 3),
+            specialties=rng.sample(SPECIALTIES, 2),
+            vehicle_type=rng.choice(VEHICLE_TYPES),
+            latitude=40.7128 + rng.uniform(-0.4, 0.4),
+            longitude=-74.0060 + rng.uniform(-0.4, 0.4),
+            last_updated=now
+        )
+        for i in range(size)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    matcher = PremiumDriverMatcher()
+    ranker = BatchDriverRanker()
+    request = MatchingRequest(
+        order_id="bench-order",
+        pickup_location=(40.7128, -74.0060),
+        dropoff_location=(40.7589, -73.9851),
+        service_type="RIDE",
+        user_preferences={"special_requirements": ["airport_transfer"]}
+    )
+
+    print(f"{'drivers':>10} {'loop ms':>12} {'batch ms':>12} {'speedup':>9}")
+    for size in args.sizes:
+        profiles = make_profiles(size)
+        store = FleetStore(capacity=size)
+        for profile in profiles:
+            store.upsert(profile)
+
+        loop_s = best_of(
+            lambda: matcher.rank_drivers(request, profiles, max_drivers=args.top), args.repeat
+        )
+        batch_s = best_of(
+            lambda: ranker.rank_rows(request, store, max_drivers=args.top), args.repeat
+        )
+
+        print(
+            f"{size:>10} {loop_s * 1000:>12.2f} {batch_s * 1000:>12.2f} "
+            f"{loop_s / batch_s:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
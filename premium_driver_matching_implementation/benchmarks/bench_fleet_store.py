@@ -0,0 +1,81 @@
+"""
+Benchmark memory per driver: dict of DriverProfile vs FleetStore
+
+Usage (from the premium_driver_matching_implementation directory):
+    python -m benchmarks.bench_fleet_store [--sizes 10000 200000]
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime
+
+from algorithms import DriverProfile
+from fleet_store import FleetStore
+
+SERVICE_TYPES = ["RIDE", "MOTO", "FOOD", "GROCERY", "GOODS", "TRUCK_VAN"]
+SPECIALTIES = ["airport_transfer", "city_tour", "corporate", "events", "long_distance"]
+VEHICLE_FEATURES = ["child_seat", "pet_friendly", "wheelchair_accessible", "wifi"]
+
+
+def make_profiles(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(size):
+        yield DriverProfile(
+            driver_id=f"driver-{i}",
+            avg_rating_30d=round(rng.uniform(3.0, 5.0), 2),
+            avg_rating_90d=round(rng.uniform(3.0, 5.0), 2),
+            avg_rating_lifetime=round(rng.uniform(3.0, 5.0), 2),
+            total_rides=rng.randint(0, 5000),
+            completion_rate_30d=round(rng.uniform(0.8, 1.0), 3),
+            acceptance_rate_30d=round(rng.uniform(0.7, 1.0), 3),
+            eta_accuracy_30d=round(rng.uniform(0.7, 1.0), 3),
+            is_available=rng.random() < 0.7,
+            service_types=rng.sample(SERVICE_TYPES, 2),
+            specialties=rng.sample(SPECIALTIES, 2),
+            vehicle_features=rng.sample(VEHICLE_FEATURES, 1),
+            last_updated=now
+        )
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return size
+
+
+def build_dict(size: int):
+    return {profile.driver_id: profile for profile in make_profiles(size)}
+
+
+def build_store(size: int):
+    store = FleetStore(capacity=size)
+    for profile in make_profiles(size):
+        store.upsert(profile)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 200000])
+    args = parser.parse_args()
+
+    print(f"{'drivers':>10} {'dict MB':>10} {'store MB':>10} {'dict B/drv':>11} {'store B/drv':>12} {'ratio':>7}")
+    for size in args.sizes:
+        dict_bytes = measure(lambda: build_dict(size))
+        store_bytes = measure(lambda: build_store(size))
+        print(
+            f"{size:>10} {dict_bytes / 1e6:>10.1f} {store_bytes / 1e6:>10.1f} "
+            f"{dict_bytes / size:>11.0f} {store_bytes / size:>12.0f} "
+            f"{dict_bytes / store_bytes:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
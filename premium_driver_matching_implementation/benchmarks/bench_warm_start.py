@@ -0,0 +1,74 @@
+"""
+Benchmark warm start from a snapshot and change log
+
+Usage (from the premium_driver_matching_implementation directory):
+    python -m benchmarks.bench_warm_start [--sizes 10000 200000] [--changes 1000]
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.bench_batch_ranking import make_profiles
+from eligibility_index import EligibilityIndex
+from driver_index import DriverListIndex
+from fleet_persistence import FleetPersistence
+from fleet_stats import FleetStatsAggregator
+from fleet_store import FleetStore
+from algorithms import PremiumDriverMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 200000])
+    parser.add_argument("--changes", type=int, default=1000)
+    args = parser.parse_args()
+
+    premium_tiers = PremiumDriverMatcher().premium_tiers
+
+    print(
+        f"{'drivers':>10} {'snapshot ms':>12} {'load ms':>10} {'replay ms':>10} "
+        f"{'indexes ms':>11} {'upserts ms':>11}"
+    )
+    for size in args.sizes:
+        profiles = make_profiles(size)
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            store = FleetStore(capacity=size)
+            for profile in profiles:
+                store.upsert(profile)
+            upsert_s = time.perf_counter() - start
+
+            persistence = FleetPersistence(directory)
+            start = time.perf_counter()
+            persistence.snapshot(store)
+            snapshot_s = time.perf_counter() - start
+
+            for profile in profiles[:args.changes]:
+                profile.avg_rating_30d = 4.9
+                persistence.record_upsert(profile)
+            persistence.close()
+
+            replica = FleetStore()
+            start = time.perf_counter()
+            FleetPersistence(directory)._load_snapshot(replica, persistence._latest_snapshot())
+            load_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            FleetPersistence(directory).load(replica)
+            replay_s = time.perf_counter() - start - load_s
+
+            start = time.perf_counter()
+            EligibilityIndex(replica, premium_tiers)
+            FleetStatsAggregator(replica)
+            DriverListIndex(replica)
+            indexes_s = time.perf_counter() - start
+
+        print(
+            f"{size:>10} {snapshot_s * 1000:>12.1f} {load_s * 1000:>10.1f} "
+            f"{replay_s * 1000:>10.1f} {indexes_s * 1000:>11.1f} {upsert_s * 1000:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Bulk Driver Upsert
+Parsing and column-at-a-time validation of many driver profile changes
+"""
+
+import json
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from fleet_store import COLUMN_DTYPES, BitVocabulary, FleetStore
+
+
+class BulkPayloadError(ValueError):
+    """Raised when a bulk payload cannot be parsed at all."""
+
+
+class FieldRule(NamedTuple):
+    """How one profile field is validated."""
+    kind: str  # "float", "int", "bool", "str" or "labels"
+    required: bool
+    default: Any
+    ge: Optional[float] = None
+    le: Optional[float] = None
+
+
+def field_rules(model: Type[BaseModel]) -> Dict[str, FieldRule]:
+    """
+    Derive validation rules from a pydantic profile model.
+
+    Args:
+        model: Model whose fields describe a full driver profile
+
+    Returns:
+        Rule per field name
+    """
+    kinds = {float: "float", int: "int", bool: "bool", str: "str"}
+    rules = {}
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        if get_origin(annotation) is Union:
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        kind = "labels" if get_origin(annotation) in (list, List) else kinds[annotation]
+        bounds = {
+            key: getattr(constraint, key)
+            for constraint in info.metadata
+            for key in ("ge", "le")
+            if hasattr(constraint, key)
+        }
+        rules[name] = FieldRule(
+            kind=kind,
+            required=info.is_required(),
+            default=None if info.is_required() else info.get_default(call_default_factory=True),
+            **bounds
+        )
+    return rules
+
+
+@dataclass
+class DriverBatch:
+    """
+    A bulk payload as columns.
+
+    ``columns`` holds one list per field name seen in the payload, with
+    None where a row does not set the field. As with PUT, a null value
+    means "leave unchanged", so optional fields cannot be cleared in bulk.
+    """
+    size: int
+    columns: Dict[str, List[Any]]
+    errors: Dict[int, List[Dict[str, str]]] = field(default_factory=dict)
+
+    def add_error(self, row: int, field_name: str, message: str) -> None:
+        """Record a validation error for a row."""
+        self.errors.setdefault(row, []).append({"field": field_name, "message": message})
+
+    def valid_rows(self) -> np.ndarray:
+        """Rows without errors, in payload order."""
+        valid = np.ones(self.size, dtype=bool)
+        valid[list(self.errors)] = False
+        return np.flatnonzero(valid)
+
+    def values(self, row: int) -> Dict[str, Any]:
+        """Fields set by one row (driver_id excluded)."""
+        return {
+            name: column[row]
+            for name, column in self.columns.items()
+            if name != "driver_id" and column[row] is not None
+        }
+
+
+def parse_ndjson(body: bytes) -> DriverBatch:
+    """
+    Parse newline-delimited JSON, one driver object per line.
+
+    Args:
+        body: Request body
+
+    Returns:
+        DriverBatch; lines that are not JSON objects become row errors
+    """
+    lines = [line for line in body.splitlines() if line.strip()]
+    objects: List[Dict[str, Any]] = []
+    batch = DriverBatch(size=len(lines), columns={})
+    for row, line in enumerate(lines):
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            obj = None
+            batch.add_error(row, "", f"Invalid JSON: {e}")
+        else:
+            if not isinstance(obj, dict):
+                batch.add_error(row, "", "Each line must be a JSON object")
+                obj = None
+        objects.append(obj or {})
+
+    names = {name for obj in objects for name in obj}
+    batch.columns = {name: [obj.get(name) for obj in objects] for name in names}
+    return batch
+
+
+def parse_columnar(payload: Any) -> DriverBatch:
+    """
+    Parse a columnar JSON object mapping each field to a list of values.
+
+    Args:
+        payload: Decoded JSON body
+
+    Returns:
+        DriverBatch
+
+    Raises:
+        BulkPayloadError: If the payload is not an object of equal-length lists
+    """
+    if not isinstance(payload, dict) or "driver_id" not in payload:
+        raise BulkPayloadError("Columnar payload must be an object with a driver_id column")
+    lengths = {len(values) if isinstance(values, list) else -1 for values in payload.values()}
+    if len(lengths) != 1 or -1 in lengths:
+        raise BulkPayloadError("Every column must be a list of the same length")
+    return DriverBatch(size=lengths.pop(), columns=dict(payload))
+
+
+def validate_batch(batch: DriverBatch, rules: Dict[str, FieldRule], store: FleetStore) -> np.ndarray:
+    """
+    Validate a batch one column at a time, recording row errors on it.
+
+    Range checks run as array comparisons over each numeric column; only
+    type checks look at values one by one. Values the store cannot hold
+    (integers past its column type, labels past a vocabulary's capacity)
+    are row errors too, so applying the valid rows cannot fail midway.
+
+    Args:
+        batch: Parsed batch
+        rules: Rules from field_rules
+        store: Store the batch will be applied to (to tell creates from updates)
+
+    Returns:
+        Boolean mask of rows that create a new driver
+    """
+    size = batch.size
+    for name in sorted(set(batch.columns) - set(rules)):
+        for row in np.flatnonzero([value is not None for value in batch.columns[name]]):
+            batch.add_error(int(row), name, "Unknown field")
+
+    driver_ids = batch.columns.get("driver_id", [None] * size)
+    seen = set()
+    for row, driver_id in enumerate(driver_ids):
+        if not isinstance(driver_id, str) or not driver_id:
+            batch.add_error(row, "driver_id", "driver_id must be a non-empty string")
+        elif driver_id in seen:
+            batch.add_error(row, "driver_id", "Duplicate driver_id in batch")
+        else:
+            seen.add(driver_id)
+    creates = np.fromiter(
+        (isinstance(driver_id, str) and driver_id not in store for driver_id in driver_ids),
+        dtype=bool,
+        count=size
+    )
+
+    for name, rule in rules.items():
+        if name == "driver_id":
+            continue
+        values = batch.columns.get(name)
+        present = (
+            np.zeros(size, dtype=bool) if values is None
+            else np.fromiter((value is not None for value in values), dtype=bool, count=size)
+        )
+        if rule.required:
+            for row in np.flatnonzero(creates & ~present):
+                batch.add_error(int(row), name, "Field required for a new driver")
+        if values is None or not present.any():
+            continue
+
+        typed = np.fromiter((_has_kind(value, rule.kind) for value in values), dtype=bool, count=size)
+        for row in np.flatnonzero(present & ~typed):
+            batch.add_error(int(row), name, f"Expected {rule.kind}")
+
+        if rule.kind in ("float", "int") and (rule.ge is not None or rule.le is not None):
+            checked = present & typed
+            numbers = np.array([value if ok else 0.0 for value, ok in zip(values, checked)], dtype=np.float64)
+            out_of_range = ~np.isfinite(numbers)
+            if rule.ge is not None:
+                out_of_range |= numbers < rule.ge
+            if rule.le is not None:
+                out_of_range |= numbers > rule.le
+            for row in np.flatnonzero(checked & out_of_range):
+                batch.add_error(int(row), name, _bounds_message(rule))
+
+        dtype = COLUMN_DTYPES.get(name)
+        if rule.kind == "int" and dtype is not None and np.issubdtype(dtype, np.integer):
+            limits = np.iinfo(dtype)
+            for row in np.flatnonzero(present & typed):
+                if not limits.min <= values[row] <= limits.max:
+                    batch.add_error(int(row), name, f"Must be between {limits.min} and {limits.max}")
+
+        vocabulary = store.vocabularies.get(name)
+        if vocabulary is not None and rule.kind in ("str", "labels"):
+            # Register labels in payload order; rows that would overflow the vocabulary fail
+            labels = set(vocabulary.labels)
+            for row in np.flatnonzero(present & typed):
+                row_labels = {values[row]} if rule.kind == "str" else set(values[row])
+                if len(labels | row_labels) > BitVocabulary.MAX_LABELS:
+                    batch.add_error(int(row), name, f"More than {BitVocabulary.MAX_LABELS} distinct labels")
+                elif int(row) not in batch.errors:
+                    labels |= row_labels
+    return creates
+
+
+def _bounds_message(rule: FieldRule) -> str:
+    if rule.le is None:
+        return f"Must be at least {rule.ge}"
+    if rule.ge is None:
+        return f"Must be at most {rule.le}"
+    return f"Must be between {rule.ge} and {rule.le}"
+
+
+def _has_kind(value: Any, kind: str) -> bool:
+    if value is None:
+        return True
+    if kind == "float":
+        return type(value) in (float, int)
+    if kind == "int":
+        return type(value) is int or (type(value) is float and value.is_integer())
+    if kind == "bool":
+        return type(value) is bool
+    if kind == "str":
+        return type(value) is str
+    return type(value) is list and all(type(label) is str for label in value)
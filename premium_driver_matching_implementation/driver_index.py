@@ -0,0 +1,266 @@
+"""
+Driver List Index
+Sorted secondary indexes and keyset cursors for listing drivers
+"""
+
+import base64
+import json
+import numpy as np
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from fleet_store import FleetStore
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or does not fit the query."""
+
+
+def encode_cursor(order: str, key) -> str:
+    """
+    Encode a keyset position as an opaque cursor.
+
+    Args:
+        order: Ordering the key belongs to ("id" or "rating")
+        key: Last key returned
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({"o": order, "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string
+        order: Ordering the current query uses
+
+    Returns:
+        The key the cursor points after
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or was made for another ordering
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        cursor_order, key = payload["o"], payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_order != order:
+        raise InvalidCursor("Cursor does not match the query filters")
+    if order == "rating":
+        if not (isinstance(key, list) and len(key) == 2
+                and isinstance(key[0], (int, float)) and isinstance(key[1], str)):
+            raise InvalidCursor("Malformed cursor")
+        return (float(key[0]), key[1])
+    if not isinstance(key, str):
+        raise InvalidCursor("Malformed cursor")
+    return key
+
+
+class DriverListIndex:
+    """
+    Sorted secondary indexes over driver ids.
+
+    Keeps all ids sorted, ids sorted per service type and per availability,
+    and (-rating, id) keys sorted for a descending-rating order. A page is
+    found by binary search to the cursor position and read forward, so
+    paging costs O(log N + limit) when the chosen index matches the
+    filters, plus any rows skipped by the remaining filters otherwise.
+
+    Cursors carry the last key returned rather than an offset, so walking
+    the fleet while drivers are added, updated or removed never repeats or
+    skips a driver whose sort key did not change during the walk.
+    Maintenance is a binary search and a list insert/delete per index
+    (a memmove of the id pointers) on each driver change.
+    """
+
+    def __init__(self, store: FleetStore):
+        """
+        Initialize the index from the store's current rows.
+
+        Args:
+            store: Store whose drivers are indexed
+        """
+        self.store = store
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Rebuild every index from the store."""
+        self._by_service: Dict[int, List[str]] = {}
+
+        store = self.store
+        # Read whole columns once, in driver id order
+        order = np.array(sorted(range(len(store)), key=store.driver_ids.__getitem__), dtype=np.intp)
+        ids = np.array(store.driver_ids, dtype=object)[order]
+        ratings = store.column("avg_rating_30d")[order].astype(np.float64)
+        service_masks = store.column("service_types")[order]
+        available = store.column("is_available")[order]
+
+        # Indexed values per driver, needed to find its old keys when it changes
+        self._ids: List[str] = ids.tolist()
+        self._ratings: Dict[str, float] = dict(zip(self._ids, ratings.tolist()))
+        self._service_masks: Dict[str, int] = dict(zip(self._ids, service_masks.tolist()))
+        self._availability: Dict[str, bool] = dict(zip(self._ids, available.tolist()))
+
+        self._by_availability: Dict[bool, List[str]] = {
+            True: ids[available].tolist(),
+            False: ids[~available].tolist()
+        }
+        for bit in range(len(store.vocabularies["service_types"])):
+            offers = (service_masks >> np.uint64(bit) & np.uint64(1)).astype(bool)
+            if offers.any():
+                self._by_service[bit] = ids[offers].tolist()
+        # A stable sort of id-ordered rows gives (-rating, id) order
+        by_rating = np.argsort(-ratings, kind="stable")
+        self._by_rating: List[Tuple[float, str]] = list(zip((-ratings[by_rating]).tolist(), ids[by_rating].tolist()))
+
+    def refresh(self, driver_id: str) -> None:
+        """
+        Re-index a driver after it was created or updated in the store.
+
+        Args:
+            driver_id: Driver identifier
+        """
+        entry = self._read(driver_id)
+        old = self._entry(driver_id)
+        if old == entry:
+            return
+        if old is None:
+            insort(self._ids, driver_id)
+        else:
+            self._unlink(driver_id, *old)
+        self._link(driver_id, *entry)
+        rating, service_mask, is_available = entry
+        self._ratings[driver_id] = rating
+        self._service_masks[driver_id] = service_mask
+        self._availability[driver_id] = is_available
+
+    def remove(self, driver_id: str) -> None:
+        """
+        Remove a driver from every index.
+
+        Args:
+            driver_id: Driver identifier
+        """
+        self._unlink(
+            driver_id,
+            self._ratings.pop(driver_id),
+            self._service_masks.pop(driver_id),
+            self._availability.pop(driver_id)
+        )
+        del self._ids[bisect_left(self._ids, driver_id)]
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        service_type: Optional[str] = None,
+        is_available: Optional[bool] = None,
+        min_rating: Optional[float] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Get one page of driver ids.
+
+        Pages are ordered by driver id, or by rating (highest first, then
+        id) when ``min_rating`` is given.
+
+        Args:
+            limit: Maximum number of ids to return
+            cursor: Cursor from the previous page
+            skip: Number of matching drivers to skip after the cursor
+            service_type: Only drivers offering this service type
+            is_available: Only drivers with this availability
+            min_rating: Only drivers rated at least this (30-day average)
+
+        Returns:
+            (driver_ids, next_cursor); next_cursor is None on the last page
+        """
+        service_bit = None
+        if service_type:
+            mask = self.store.vocabularies["service_types"].mask([service_type])
+            if mask is None:
+                return [], None
+            service_bit = mask.bit_length() - 1
+
+        if min_rating is not None:
+            order = "rating"
+            # Compare at the stored float32 precision
+            threshold = float(np.float32(min_rating))
+            keys = self._by_rating
+            start = bisect_right(keys, decode_cursor(cursor, order)) if cursor else 0
+            end = bisect_right(keys, (-threshold, "\U0010ffff"))
+        else:
+            order = "id"
+            # Walk the smallest index that already satisfies a filter
+            candidates = [self._ids]
+            if service_bit is not None:
+                candidates.append(self._by_service.get(service_bit, []))
+            if is_available is not None:
+                candidates.append(self._by_availability[is_available])
+            keys = min(candidates, key=len)
+            start = bisect_right(keys, decode_cursor(cursor, order)) if cursor else 0
+            end = len(keys)
+
+        availability = self._availability
+        service_masks = self._service_masks
+        page: List[str] = []
+        last_key = None
+        more = False
+        for position in range(start, end):
+            key = keys[position]
+            driver_id = key[1] if order == "rating" else key
+            if is_available is not None and availability[driver_id] != is_available:
+                continue
+            if service_bit is not None and not service_masks[driver_id] >> service_bit & 1:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if len(page) == limit:
+                more = True
+                break
+            page.append(driver_id)
+            last_key = key
+
+        next_cursor = encode_cursor(order, last_key) if more else None
+        return page, next_cursor
+
+    def _read(self, driver_id: str) -> Tuple[float, int, bool]:
+        store = self.store
+        row = store.row_of(driver_id)
+        return (
+            float(store.column("avg_rating_30d")[row]),
+            int(store.column("service_types")[row]),
+            bool(store.column("is_available")[row])
+        )
+
+    def _entry(self, driver_id: str) -> Optional[Tuple[float, int, bool]]:
+        if driver_id not in self._ratings:
+            return None
+        return self._ratings[driver_id], self._service_masks[driver_id], self._availability[driver_id]
+
+    def _link(self, driver_id: str, rating: float, service_mask: int, is_available: bool) -> None:
+        insort(self._by_rating, (-rating, driver_id))
+        insort(self._by_availability[is_available], driver_id)
+        for bit in self._bits(service_mask):
+            insort(self._by_service.setdefault(bit, []), driver_id)
+
+    def _unlink(self, driver_id: str, rating: float, service_mask: int, is_available: bool) -> None:
+        keys = self._by_rating
+        del keys[bisect_left(keys, (-rating, driver_id))]
+        ids = self._by_availability[is_available]
+        del ids[bisect_left(ids, driver_id)]
+        for bit in self._bits(service_mask):
+            ids = self._by_service[bit]
+            del ids[bisect_left(ids, driver_id)]
+
+    @staticmethod
+    def _bits(mask: int) -> List[int]:
+        return [bit for bit in range(mask.bit_length()) if mask >> bit & 1]
@@ -0,0 +1,169 @@
+"""
+Driver Recommendations
+Fleet-wide driver coaching recommendations evaluated as column masks
+"""
+
+import json
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from algorithms import DRIVER_RECOMMENDATION_RULES
+from fleet_store import FleetStore
+
+
+class FleetRecommender:
+    """
+    Evaluates DRIVER_RECOMMENDATION_RULES over FleetStore columns.
+
+    Each rule is one array comparison over a metric column, and the rules
+    a driver triggers are packed into a small bitmask (bit i for rule i).
+    Recommendations depend only on that bitmask, so the message list is
+    built once per distinct bitmask and shared.
+
+    Bitmasks are cached per driver until ``invalidate`` is called for it,
+    which the API does whenever a profile changes.
+    """
+
+    def __init__(self, store: FleetStore, rules=DRIVER_RECOMMENDATION_RULES):
+        """
+        Initialize the recommender.
+
+        Args:
+            store: Driver store
+            rules: (field, "<" or ">", threshold, messages) rules
+        """
+        self.store = store
+        self.rules = rules
+        self._cache: Dict[str, int] = {}
+        self._messages: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def rule_masks(self, rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Evaluate every rule for the drivers at some rows.
+
+        Args:
+            rows: Store rows (all rows if omitted)
+
+        Returns:
+            Bitmask of triggered rules per row
+        """
+        store = self.store
+        masks = np.zeros(len(store) if rows is None else len(rows), dtype=np.int64)
+        for bit, (field_name, comparison, threshold, _) in enumerate(self.rules):
+            column = store.column(field_name)
+            values = column if rows is None else column[rows]
+            # Compare at the stored float32 precision, as the materialized profile does
+            limit = np.float32(threshold)
+            triggered = values < limit if comparison == "<" else values > limit
+            masks |= triggered.astype(np.int64) << bit
+        return masks
+
+    def messages(self, mask: int) -> List[str]:
+        """
+        Get the recommendations for a bitmask of triggered rules.
+
+        Args:
+            mask: Bitmask from rule_masks
+
+        Returns:
+            Recommendations, in rule order (shared; do not mutate)
+        """
+        messages = self._messages.get(mask)
+        if messages is None:
+            messages = [
+                message
+                for bit, rule in enumerate(self.rules)
+                if mask >> bit & 1
+                for message in rule[3]
+            ]
+            self._messages[mask] = messages
+        return messages
+
+    def recommendations_for(self, driver_id: str) -> List[str]:
+        """
+        Get one driver's recommendations, from the cache if possible.
+
+        Args:
+            driver_id: Driver identifier
+
+        Returns:
+            Recommendations
+
+        Raises:
+            KeyError: If the driver is not stored
+        """
+        mask = self._cache.get(driver_id)
+        if mask is None:
+            row = self.store.row_of(driver_id)
+            if row is None:
+                raise KeyError(driver_id)
+            mask = int(self.rule_masks([row])[0])
+            self._cache[driver_id] = mask
+        return self.messages(mask)
+
+    def evaluate_fleet(self) -> Dict[str, int]:
+        """
+        Get every driver's rule bitmask, evaluating only uncached drivers.
+
+        Returns:
+            Bitmask per driver id
+        """
+        driver_ids = self.store.driver_ids
+        cache = self._cache
+        if len(cache) < len(driver_ids):
+            uncached = [row for row, driver_id in enumerate(driver_ids) if driver_id not in cache]
+            masks = self.rule_masks(uncached)
+            cache.update(zip([driver_ids[row] for row in uncached], masks.tolist()))
+        return {driver_id: cache[driver_id] for driver_id in driver_ids}
+
+    def export_ndjson(self, include_empty: bool = False, chunk_size: int = 10000) -> Iterator[str]:
+        """
+        Stream every driver's recommendations as NDJSON.
+
+        The fleet is evaluated when this is called, not as the iterator is
+        consumed, so the export is a consistent view of the fleet and can
+        be consumed from another thread while profiles keep changing.
+
+        Args:
+            include_empty: Also emit drivers with no recommendations
+            chunk_size: Drivers per yielded chunk
+
+        Returns:
+            Iterator over chunks of {"driver_id": ..., "recommendations": [...]} lines
+        """
+        masks = self.evaluate_fleet()
+        # Each distinct message list is encoded once
+        encoded = {
+            mask: json.dumps(self.messages(mask))
+            for mask in set(masks.values())
+            if include_empty or mask
+        }
+
+        def chunks() -> Iterator[str]:
+            lines = []
+            for driver_id, mask in masks.items():
+                if mask in encoded:
+                    lines.append(f'{{"driver_id": {json.dumps(driver_id)}, "recommendations": {encoded[mask]}}}\n')
+                    if len(lines) == chunk_size:
+                        yield "".join(lines)
+                        lines = []
+            if lines:
+                yield "".join(lines)
+
+        return chunks()
+
+    def invalidate(self, driver_id: str) -> None:
+        """
+        Forget a driver's cached result after its profile changed.
+
+        Args:
+            driver_id: Driver identifier
+        """
+        self._cache.pop(driver_id, None)
+
+    def clear(self) -> None:
+        """Forget every cached result."""
+        self._cache.clear()
@@ -0,0 +1,252 @@
+"""
+Eligibility Index
+Inverted bitsets over FleetStore rows for premium eligibility filtering
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+from algorithms import MatchingRequest, PremiumDriverMatcher
+from fleet_store import SET_FIELDS, FleetStore
+
+_ONE = np.uint64(1)
+
+
+def _words_for(rows: int) -> int:
+    return (rows + 63) // 64
+
+
+def _set_bit(bitset: np.ndarray, row: int) -> None:
+    bitset[row >> 6] |= _ONE << np.uint64(row & 63)
+
+
+def _clear_bit(bitset: np.ndarray, row: int) -> None:
+    bitset[row >> 6] &= ~(_ONE << np.uint64(row & 63))
+
+
+def _test_bit(bitset: np.ndarray, row: int) -> bool:
+    return bool(bitset[row >> 6] >> np.uint64(row & 63) & _ONE)
+
+
+class EligibilityIndex:
+    """
+    Inverted bitsets over the rows of a FleetStore.
+
+    One bitset (a packed uint64 array, one bit per row) is kept per
+    service type, specialty and vehicle feature, one for availability and
+    one per premium tier rating threshold. Tier thresholds are a handful
+    of fixed values, so each gets a precomputed bitset rather than a
+    sorted rating column: the check costs one AND instead of a binary
+    search. Eligibility for a request is then the AND of a few bitsets,
+    O(N / 64) word operations with no per-driver Python code.
+
+    The index must be told about every row written or removed in the
+    store (``refresh_row`` / ``remove_row``); each call is O(labels), not
+    O(N). ``FleetStore.clear`` resets the vocabularies, so call
+    ``rebuild`` after it.
+    """
+
+    def __init__(self, store: FleetStore, premium_tiers: Dict[str, Dict]):
+        """
+        Initialize the index and build it from the store's current rows.
+
+        Args:
+            store: Store whose rows are indexed
+            premium_tiers: Tier configuration with min_rating per tier
+        """
+        self.store = store
+        self.thresholds = sorted({tier["min_rating"] for tier in premium_tiers.values()})
+        self._words = 0
+        self._available = np.zeros(0, dtype=np.uint64)
+        self._tiers: Dict[float, np.ndarray] = {}
+        # Per set field, one bitset per vocabulary bit
+        self._labels: Dict[str, List[np.ndarray]] = {}
+        # Masks as last indexed, to know which label bits to clear on rewrite
+        self._indexed_masks: Dict[str, np.ndarray] = {}
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Rebuild every bitset from the store's columns."""
+        self._words = _words_for(self.store.capacity)
+        n = len(self.store)
+
+        self._available = self._pack(self.store.column("is_available"))
+        ratings = self.store.column("avg_rating_30d")
+        self._tiers = {
+            threshold: self._pack(ratings >= np.float32(threshold))
+            for threshold in self.thresholds
+        }
+        self._labels = {}
+        self._indexed_masks = {}
+        for name in SET_FIELDS:
+            masks = self.store.column(name)
+            self._labels[name] = [
+                self._pack((masks >> np.uint64(bit) & _ONE).astype(bool))
+                for bit in range(len(self.store.vocabularies[name]))
+            ]
+            indexed = np.zeros(self._words * 64, dtype=np.uint64)
+            indexed[:n] = masks
+            self._indexed_masks[name] = indexed
+
+    def set_premium_tiers(self, premium_tiers: Dict[str, Dict]) -> None:
+        """
+        Re-threshold the tier bitsets for a new tier configuration.
+
+        Args:
+            premium_tiers: Tier configuration with min_rating per tier
+        """
+        self.thresholds = sorted({tier["min_rating"] for tier in premium_tiers.values()})
+        ratings = self.store.column("avg_rating_30d")
+        self._tiers = {
+            threshold: self._pack(ratings >= np.float32(threshold))
+            for threshold in self.thresholds
+        }
+
+    def refresh_row(self, row: int) -> None:
+        """
+        Re-index one row after it was inserted or written in the store.
+
+        Args:
+            row: Store row
+        """
+        if row >= self._words * 64:
+            self._grow(self.store.capacity)
+
+        store = self.store
+        self._assign(self._available, row, bool(store.column("is_available")[row]))
+        rating = store.column("avg_rating_30d")[row]
+        for threshold, bitset in self._tiers.items():
+            self._assign(bitset, row, rating >= np.float32(threshold))
+
+        for name in SET_FIELDS:
+            bitsets = self._labels[name]
+            old = int(self._indexed_masks[name][row])
+            new = int(store.column(name)[row])
+            while len(bitsets) < len(store.vocabularies[name]):
+                bitsets.append(np.zeros(self._words, dtype=np.uint64))
+            changed = old ^ new
+            bit = 0
+            while changed:
+                if changed & 1:
+                    self._assign(bitsets[bit], row, bool(new >> bit & 1))
+                changed >>= 1
+                bit += 1
+            self._indexed_masks[name][row] = new
+
+    def remove_row(self, row: int, last: int) -> None:
+        """
+        Update the index after the store deleted a row.
+
+        Args:
+            row: Freed row, now holding what was in ``last``
+            last: Former last row, now empty
+        """
+        bitsets = [self._available, *self._tiers.values()]
+        for name in SET_FIELDS:
+            bitsets.extend(self._labels[name])
+            masks = self._indexed_masks[name]
+            masks[row] = masks[last]
+            masks[last] = 0
+
+        for bitset in bitsets:
+            if row != last:
+                self._assign(bitset, row, _test_bit(bitset, last))
+            _clear_bit(bitset, last)
+
+    def eligible_rows(
+        self,
+        min_rating: Optional[float] = None,
+        service_type: Optional[str] = None,
+        specialties: Iterable[str] = (),
+        vehicle_features: Iterable[str] = (),
+        available_only: bool = True
+    ) -> np.ndarray:
+        """
+        Get the rows of drivers meeting all requirements.
+
+        Args:
+            min_rating: Minimum 30-day rating; must be a tier threshold
+            service_type: Service type the driver must offer
+            specialties: Specialties the driver must all offer
+            vehicle_features: Vehicle features the driver must all have
+            available_only: Whether to require availability
+
+        Returns:
+            Sorted array of store rows
+        """
+        n = len(self.store)
+        if available_only:
+            result = self._available.copy()
+        else:
+            result = self._pack(np.ones(n, dtype=bool))
+
+        if min_rating is not None:
+            if min_rating not in self._tiers:
+                raise ValueError(f"No tier bitset for min_rating {min_rating}")
+            result &= self._tiers[min_rating]
+
+        required = {
+            "service_types": [service_type] if service_type else [],
+            "specialties": specialties,
+            "vehicle_features": vehicle_features,
+        }
+        for name, labels in required.items():
+            vocabulary = self.store.vocabularies[name]
+            for label in labels:
+                mask = vocabulary.mask([label])
+                if mask is None:
+                    return np.zeros(0, dtype=np.intp)
+                result &= self._labels[name][mask.bit_length() - 1]
+
+        bits = np.unpackbits(result.view(np.uint8), bitorder="little")[:n]
+        return np.flatnonzero(bits)
+
+    def eligible_rows_for_request(
+        self,
+        matcher: PremiumDriverMatcher,
+        request: MatchingRequest
+    ) -> np.ndarray:
+        """
+        Get the rows of drivers eligible for a matching request.
+
+        Equivalent to ``matcher.filter_eligible_drivers`` over the store.
+
+        Args:
+            matcher: Matcher whose eligibility rules apply
+            request: Matching request
+
+        Returns:
+            Sorted array of store rows
+        """
+        requirements = matcher.get_eligibility_requirements(request)
+        return self.eligible_rows(**requirements)
+
+    def _pack(self, flags: np.ndarray) -> np.ndarray:
+        # Little-endian words: byte k of word w holds rows 64w + 8k .. 64w + 8k + 7
+        bitset = np.zeros(self._words, dtype=np.uint64)
+        packed = np.packbits(flags, bitorder="little")
+        bitset.view(np.uint8)[:packed.size] = packed
+        return bitset
+
+    def _assign(self, bitset: np.ndarray, row: int, value: bool) -> None:
+        if value:
+            _set_bit(bitset, row)
+        else:
+            _clear_bit(bitset, row)
+
+    def _grow(self, capacity: int) -> None:
+        words = _words_for(capacity)
+
+        def grown(bitset: np.ndarray) -> np.ndarray:
+            result = np.zeros(words, dtype=np.uint64)
+            result[:bitset.size] = bitset
+            return result
+
+        self._available = grown(self._available)
+        self._tiers = {threshold: grown(bitset) for threshold, bitset in self._tiers.items()}
+        for name in SET_FIELDS:
+            self._labels[name] = [grown(bitset) for bitset in self._labels[name]]
+            masks = np.zeros(words * 64, dtype=np.uint64)
+            masks[:self._indexed_masks[name].size] = self._indexed_masks[name]
+            self._indexed_masks[name] = masks
+        self._words = words
@@ -0,0 +1,252 @@
+"""
+Fleet Statistics
+Running driver statistics maintained on every profile change
+"""
+
+import numpy as np
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from algorithms import fairness_score_for_count
+from fleet_store import FleetStore
+
+# Sums are kept as integers in millionths so adding and removing a driver cancel exactly
+SUM_SCALE = 1_000_000
+
+# Rating histogram buckets of width 0.5 from 1.0; 5.0 falls in the last one
+RATING_BUCKETS = [f"{1.0 + i * 0.5:.1f}-{1.5 + i * 0.5:.1f}" for i in range(8)]
+
+
+class DriverContribution(NamedTuple):
+    """What one driver adds to the fleet statistics."""
+    available: int
+    rating: int
+    completion_rate: int
+    acceptance_rate: int
+    rating_bucket: int
+
+
+class FleetStatsAggregator:
+    """
+    Running fleet statistics over a FleetStore.
+
+    Counts, sums and a rating histogram are updated from each driver's
+    contribution before and after a change, so ``stats()`` is O(1)
+    regardless of fleet size. Fairness scores are kept per driver and
+    only recomputed when that driver's recent assignment count changes.
+
+    Every change is also appended to a bounded change log, so pollers can
+    fetch only what changed since the version they last saw.
+    """
+
+    def __init__(self, store: FleetStore, max_changes: int = 10000):
+        """
+        Initialize the aggregator from the store's current rows.
+
+        Args:
+            store: Store whose drivers are aggregated
+            max_changes: Number of changes kept for ``changes_since``
+        """
+        self.store = store
+        self.max_changes = max_changes
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute every statistic from the store and reset the change log."""
+        self.version = 0
+        self._changes: deque = deque(maxlen=self.max_changes)
+
+        # Whole-column version of contribution(), so a warm start of a large fleet stays fast
+        store = self.store
+        ratings = store.column("avg_rating_30d").astype(np.float64)
+        self.total_drivers = len(store)
+        self.available_drivers = int(np.count_nonzero(store.column("is_available")))
+        self.rating_sum = int(self._scaled(ratings).sum())
+        self.completion_rate_sum = int(self._scaled(store.column("completion_rate_30d")).sum())
+        self.acceptance_rate_sum = int(self._scaled(store.column("acceptance_rate_30d")).sum())
+        self.rating_histogram: List[int] = np.bincount(
+            self._buckets(ratings), minlength=len(RATING_BUCKETS)
+        ).tolist()
+        self.recent_assignments: Dict[str, int] = dict.fromkeys(store.driver_ids, 0)
+        self.fairness_scores: Dict[str, float] = dict.fromkeys(
+            store.driver_ids, fairness_score_for_count(0)
+        )
+
+    def contribution(self, row: int) -> DriverContribution:
+        """
+        Get what the driver at a store row contributes to the statistics.
+
+        Args:
+            row: Store row
+
+        Returns:
+            DriverContribution
+        """
+        store = self.store
+        rating = float(store.column("avg_rating_30d")[row])
+        return DriverContribution(
+            available=int(store.column("is_available")[row]),
+            rating=round(rating * SUM_SCALE),
+            completion_rate=round(float(store.column("completion_rate_30d")[row]) * SUM_SCALE),
+            acceptance_rate=round(float(store.column("acceptance_rate_30d")[row]) * SUM_SCALE),
+            rating_bucket=min(max(int((rating - 1.0) / 0.5), 0), len(RATING_BUCKETS) - 1)
+        )
+
+    def contributions(self, rows: np.ndarray) -> List[DriverContribution]:
+        """
+        Get what the drivers at many store rows contribute, column at a time.
+
+        Args:
+            rows: Store rows
+
+        Returns:
+            DriverContribution per row, equal to ``contribution(row)``
+        """
+        store = self.store
+        ratings = store.column("avg_rating_30d")[rows].astype(np.float64)
+        return list(map(DriverContribution._make, zip(
+            store.column("is_available")[rows].astype(np.int64).tolist(),
+            self._scaled(ratings).tolist(),
+            self._scaled(store.column("completion_rate_30d")[rows]).tolist(),
+            self._scaled(store.column("acceptance_rate_30d")[rows]).tolist(),
+            self._buckets(ratings).tolist()
+        )))
+
+    def apply(
+        self,
+        driver_id: str,
+        before: Optional[DriverContribution],
+        after: Optional[DriverContribution]
+    ) -> int:
+        """
+        Apply one driver change.
+
+        Args:
+            driver_id: Driver identifier
+            before: Contribution before the change (None for a new driver)
+            after: Contribution after the change (None for a deleted driver)
+
+        Returns:
+            New statistics version
+        """
+        deltas: Dict[str, Any] = {}
+        if before is not None:
+            self._remove(before)
+        if after is not None:
+            self._add(after)
+
+        if before is None:
+            op = "create"
+            deltas["total_drivers"] = 1
+            self.set_recent_assignments(driver_id, 0)
+        elif after is None:
+            op = "delete"
+            deltas["total_drivers"] = -1
+            self.recent_assignments.pop(driver_id, None)
+            self.fairness_scores.pop(driver_id, None)
+        else:
+            op = "update"
+
+        available = (after.available if after else 0) - (before.available if before else 0)
+        if available:
+            deltas["available_drivers"] = available
+
+        old_bucket = None if before is None else before.rating_bucket
+        new_bucket = None if after is None else after.rating_bucket
+        if old_bucket != new_bucket:
+            histogram = {}
+            if old_bucket is not None:
+                histogram[RATING_BUCKETS[old_bucket]] = -1
+            if new_bucket is not None:
+                histogram[RATING_BUCKETS[new_bucket]] = 1
+            deltas["rating_histogram"] = histogram
+
+        self.version += 1
+        self._changes.append({
+            "version": self.version,
+            "op": op,
+            "driver_id": driver_id,
+            "deltas": deltas,
+            "fairness_score": self.fairness_scores.get(driver_id)
+        })
+        return self.version
+
+    def set_recent_assignments(self, driver_id: str, count: int) -> None:
+        """
+        Set a driver's recent assignment count and update its fairness score.
+
+        Args:
+            driver_id: Driver identifier
+            count: Number of recent assignments
+        """
+        self.recent_assignments[driver_id] = count
+        self.fairness_scores[driver_id] = fairness_score_for_count(count)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current statistics.
+
+        Returns:
+            Statistics summary
+        """
+        total = self.total_drivers
+        scale = total * SUM_SCALE
+        return {
+            "total_drivers": total,
+            "available_drivers": self.available_drivers,
+            "avg_rating": self.rating_sum / scale if total else 0.0,
+            "avg_completion_rate": self.completion_rate_sum / scale if total else 0.0,
+            "avg_acceptance_rate": self.acceptance_rate_sum / scale if total else 0.0,
+            "rating_histogram": dict(zip(RATING_BUCKETS, self.rating_histogram)),
+            "version": self.version
+        }
+
+    def changes_since(self, version: int) -> Dict[str, Any]:
+        """
+        Get the changes applied after a version.
+
+        Args:
+            version: Last version the caller has seen
+
+        Returns:
+            Current statistics, the changes after ``version`` and whether
+            they are complete (False if older changes were already dropped,
+            in which case the caller should resync from the statistics)
+        """
+        # Versions in the log are contiguous and end at self.version
+        oldest = self.version - len(self._changes) + 1
+        complete = oldest - 1 <= version <= self.version
+        start = max(version - oldest + 1, 0) if complete else 0
+        changes = list(islice(self._changes, start, None))
+        return {
+            "version": self.version,
+            "complete": complete,
+            "changes": changes,
+            "stats": self.stats()
+        }
+
+    @staticmethod
+    def _scaled(values: np.ndarray) -> np.ndarray:
+        # Rounds like contribution() does (half to even)
+        return np.rint(values.astype(np.float64) * SUM_SCALE).astype(np.int64)
+
+    @staticmethod
+    def _buckets(ratings: np.ndarray) -> np.ndarray:
+        return np.clip(((ratings - 1.0) / 0.5).astype(np.int64), 0, len(RATING_BUCKETS) - 1)
+
+    def _add(self, contribution: DriverContribution) -> None:
+        self.total_drivers += 1
+        self.available_drivers += contribution.available
+        self.rating_sum += contribution.rating
+        self.completion_rate_sum += contribution.completion_rate
+        self.acceptance_rate_sum += contribution.acceptance_rate
+        self.rating_histogram[contribution.rating_bucket] += 1
+
+    def _remove(self, contribution: DriverContribution) -> None:
+        self.total_drivers -= 1
+        self.available_drivers -= contribution.available
+        self.rating_sum -= contribution.rating
+        self.completion_rate_sum -= contribution.completion_rate
+        self.acceptance_rate_sum -= contribution.acceptance_rate
+        self.rating_histogram[contribution.rating_bucket] -= 1
@@ -0,0 +1,459 @@
+"""
+Columnar Driver Store
+Compact in-memory storage for premium driver profiles
+"""
+
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+
+from algorithms import DriverProfile
+
+
+# Ratings and rates only need ~7 significant digits, so float32 halves their footprint
+FLOAT_FIELDS = (
+    "avg_rating_30d",
+    "avg_rating_90d",
+    "avg_rating_lifetime",
+    "completion_rate_30d",
+    "acceptance_rate_30d",
+    "eta_accuracy_30d",
+    "fairness_boost",
+    "cancellation_rate_30d",
+)
+
+# Categorical set fields, stored as one uint64 bitmask per driver
+SET_FIELDS = ("service_types", "specialties", "vehicle_features")
+
+# Optional single-label fields, stored as a one-bit mask (0 when unset)
+LABEL_FIELDS = ("vehicle_type",)
+
+# Optional coordinates, NaN when unknown
+LOCATION_FIELDS = ("latitude", "longitude")
+
+COLUMN_DTYPES = {
+    **{name: np.float32 for name in FLOAT_FIELDS},
+    "total_rides": np.int32,
+    "is_available": np.bool_,
+    **{name: np.uint64 for name in SET_FIELDS + LABEL_FIELDS},
+    **{name: np.float64 for name in LOCATION_FIELDS},
+    # Seconds since the epoch
+    "last_updated": np.float64,
+}
+
+
+class BitVocabulary:
+    """Assigns each label of a categorical set field its own bit."""
+
+    __slots__ = ("_bits", "_labels")
+
+    MAX_LABELS = 64
+
+    def __init__(self):
+        """Initialize an empty vocabulary."""
+        self._bits: Dict[str, int] = {}
+        self._labels: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels in bit order."""
+        return list(self._labels)
+
+    def encode(self, labels: Iterable[str]) -> int:
+        """
+        Encode labels as a bitmask, registering any new ones.
+
+        Args:
+            labels: Labels to encode
+
+        Returns:
+            Bitmask with one bit set per label
+        """
+        mask = 0
+        for label in labels:
+            bit = self._bits.get(label)
+            if bit is None:
+                if len(self._labels) >= self.MAX_LABELS:
+                    raise ValueError(f"More than {self.MAX_LABELS} distinct labels")
+                bit = len(self._labels)
+                self._bits[label] = bit
+                self._labels.append(label)
+            mask |= 1 << bit
+        return mask
+
+    def mask(self, labels: Iterable[str]) -> Optional[int]:
+        """
+        Encode labels without registering new ones.
+
+        Args:
+            labels: Labels to encode
+
+        Returns:
+            Bitmask, or None if any label is unknown (no driver can have it)
+        """
+        mask = 0
+        for label in labels:
+            bit = self._bits.get(label)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+    def mask_any(self, labels: Iterable[str]) -> int:
+        """
+        Encode the known labels among ``labels``, ignoring unknown ones.
+
+        Args:
+            labels: Labels to encode
+
+        Returns:
+            Bitmask, 0 if none of the labels is known
+        """
+        mask = 0
+        for label in labels:
+            bit = self._bits.get(label)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        """
+        Decode a bitmask into labels.
+
+        Args:
+            mask: Bitmask produced by encode
+
+        Returns:
+            Labels in bit order
+        """
+        mask = int(mask)
+        return [label for bit, label in enumerate(self._labels) if mask >> bit & 1]
+
+
+class FleetStore:
+    """
+    Columnar store of driver profiles.
+
+    Each profile field lives in a typed NumPy column and set-valued fields
+    are bitmasks over a per-field vocabulary, so a driver costs a few dozen
+    bytes plus its id instead of a dataclass with three lists. Rows are
+    kept dense: a delete moves the last row into the freed slot, so
+    upsert and delete are O(1) and ``column()`` returns a zero-copy view
+    that scoring code can use directly. Row numbers are therefore only
+    stable until the next delete.
+    """
+
+    __slots__ = ("_ids", "_row_of", "_columns", "_capacity", "vocabularies")
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize an empty store.
+
+        Args:
+            capacity: Initial number of rows to allocate
+        """
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._capacity = max(1, capacity)
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(self._capacity, dtype=dtype)
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+        self.vocabularies: Dict[str, BitVocabulary] = {
+            name: BitVocabulary() for name in SET_FIELDS + LABEL_FIELDS
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, driver_id: str) -> bool:
+        return driver_id in self._row_of
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __getitem__(self, driver_id: str) -> DriverProfile:
+        return self.profile_at(self._row_of[driver_id])
+
+    def __delitem__(self, driver_id: str) -> None:
+        self.delete(driver_id)
+
+    @property
+    def capacity(self) -> int:
+        """Number of rows allocated."""
+        return self._capacity
+
+    @property
+    def driver_ids(self) -> List[str]:
+        """Driver ids in row order (not a copy; do not mutate)."""
+        return self._ids
+
+    def row_of(self, driver_id: str) -> Optional[int]:
+        """
+        Get the current row of a driver.
+
+        Args:
+            driver_id: Driver identifier
+
+        Returns:
+            Row number, or None if the driver is not stored
+        """
+        return self._row_of.get(driver_id)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a zero-copy view of one column over the stored rows.
+
+        Args:
+            name: Profile field name
+
+        Returns:
+            Array of length len(self), invalidated by the next upsert or delete
+        """
+        return self._columns[name][:len(self._ids)]
+
+    def get(self, driver_id: str) -> Optional[DriverProfile]:
+        """
+        Materialize one driver profile.
+
+        Args:
+            driver_id: Driver identifier
+
+        Returns:
+            DriverProfile, or None if the driver is not stored
+        """
+        row = self._row_of.get(driver_id)
+        return None if row is None else self.profile_at(row)
+
+    def profile_at(self, row: int) -> DriverProfile:
+        """
+        Materialize the driver profile stored at a row.
+
+        Args:
+            row: Row number
+
+        Returns:
+            DriverProfile
+        """
+        columns = self._columns
+        values = {
+            # str() gives the shortest decimal that round-trips through float32
+            name: float(str(columns[name][row]))
+            for name in FLOAT_FIELDS
+        }
+        for name in SET_FIELDS:
+            values[name] = self.vocabularies[name].decode(columns[name][row])
+        for name in LABEL_FIELDS:
+            labels = self.vocabularies[name].decode(columns[name][row])
+            values[name] = labels[0] if labels else None
+        for name in LOCATION_FIELDS:
+            value = columns[name][row]
+            values[name] = None if np.isnan(value) else float(value)
+        return DriverProfile(
+            driver_id=self._ids[row],
+            total_rides=int(columns["total_rides"][row]),
+            is_available=bool(columns["is_available"][row]),
+            last_updated=datetime.fromtimestamp(columns["last_updated"][row]),
+            **values
+        )
+
+    def profiles(self, rows: Optional[Iterable[int]] = None) -> List[DriverProfile]:
+        """
+        Materialize driver profiles.
+
+        Args:
+            rows: Rows to materialize (all rows if omitted)
+
+        Returns:
+            List of DriverProfile
+        """
+        if rows is None:
+            rows = range(len(self._ids))
+        return [self.profile_at(row) for row in rows]
+
+    def upsert(self, profile: DriverProfile) -> int:
+        """
+        Insert a driver profile or overwrite the stored one.
+
+        Args:
+            profile: Driver profile
+
+        Returns:
+            Row the profile was written to
+
+        Raises:
+            ValueError: If a value cannot be stored; the store is left unchanged
+        """
+        encoded = self._encode_values({name: getattr(profile, name) for name in COLUMN_DTYPES})
+        row = self._row_of.get(profile.driver_id)
+        if row is None:
+            row = len(self._ids)
+            if row == self._capacity:
+                self._grow()
+            self._ids.append(profile.driver_id)
+            self._row_of[profile.driver_id] = row
+
+        self._write(row, encoded)
+        return row
+
+    def update(self, driver_id: str, **values) -> int:
+        """
+        Overwrite selected fields of a stored driver.
+
+        Args:
+            driver_id: Driver identifier
+            **values: Profile field values to set
+
+        Returns:
+            Row of the driver
+
+        Raises:
+            ValueError: If a field is unknown or a value cannot be stored; the row is left unchanged
+        """
+        row = self._row_of[driver_id]
+        unknown = set(values) - set(COLUMN_DTYPES)
+        if unknown:
+            raise ValueError(f"Unknown driver profile fields: {sorted(unknown)}")
+        self._write(row, self._encode_values(values))
+        return row
+
+    def assign(self, name: str, rows: np.ndarray, values: List) -> None:
+        """
+        Write one field of many rows at once.
+
+        Args:
+            name: Profile field name
+            rows: Rows to write
+            values: One field value per row, as accepted by upsert
+        """
+        if name not in COLUMN_DTYPES:
+            raise ValueError(f"Unknown driver profile field: {name}")
+        column = self._columns[name]
+        if name in SET_FIELDS + LABEL_FIELDS + LOCATION_FIELDS or name == "last_updated":
+            values = [self._encode(name, value) for value in values]
+        self._check_range(name, column.dtype, values)
+        column[rows] = np.asarray(values, dtype=column.dtype)
+
+    def delete(self, driver_id: str) -> Tuple[int, int]:
+        """
+        Remove a driver, moving the last row into its slot.
+
+        Args:
+            driver_id: Driver identifier
+
+        Returns:
+            (row, last): the freed row and the row whose contents moved
+            into it (equal when the deleted driver was the last row)
+        """
+        row = self._row_of.pop(driver_id)
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._ids[row] = moved_id
+            self._row_of[moved_id] = row
+            for column in self._columns.values():
+                column[row] = column[last]
+        self._ids.pop()
+        return row, last
+
+    def load_columns(
+        self,
+        driver_ids: List[str],
+        columns: Dict[str, np.ndarray],
+        vocabulary_labels: Dict[str, List[str]]
+    ) -> None:
+        """
+        Replace the store's contents with whole columns, e.g. from a snapshot.
+
+        Args:
+            driver_ids: Driver ids in row order
+            columns: One array of len(driver_ids) per field in COLUMN_DTYPES
+            vocabulary_labels: Labels in bit order for each set and label field
+        """
+        size = len(driver_ids)
+        row_of = {driver_id: row for row, driver_id in enumerate(driver_ids)}
+        if len(row_of) != size:
+            raise ValueError("Duplicate driver ids")
+        missing = set(COLUMN_DTYPES) - set(columns)
+        if missing:
+            raise ValueError(f"Missing driver profile columns: {sorted(missing)}")
+
+        self._capacity = max(self._capacity, size)
+        for name, dtype in COLUMN_DTYPES.items():
+            if len(columns[name]) != size:
+                raise ValueError(f"Column {name} has {len(columns[name])} rows, expected {size}")
+            column = np.zeros(self._capacity, dtype=dtype)
+            column[:size] = columns[name]
+            self._columns[name] = column
+        for name in self.vocabularies:
+            vocabulary = BitVocabulary()
+            # Bits are assigned in order, so encoding the labels restores their bits
+            vocabulary.encode(vocabulary_labels.get(name, []))
+            self.vocabularies[name] = vocabulary
+        self._ids = list(driver_ids)
+        self._row_of = row_of
+
+    def clear(self) -> None:
+        """Remove all drivers and forget the vocabularies."""
+        self._ids.clear()
+        self._row_of.clear()
+        for name in self.vocabularies:
+            self.vocabularies[name] = BitVocabulary()
+
+    def nbytes(self) -> int:
+        """
+        Get the bytes allocated for columns.
+
+        Returns:
+            Total size of all column buffers, including spare capacity
+        """
+        return sum(column.nbytes for column in self._columns.values())
+
+    def _encode_values(self, values: Dict) -> Dict:
+        # Encode every field before any column is touched, so a value that
+        # does not fit fails the whole write instead of leaving part of a row
+        encoded = {}
+        for name, value in values.items():
+            dtype = self._columns[name].dtype
+            value = self._encode(name, value)
+            self._check_range(name, dtype, [value])
+            encoded[name] = dtype.type(value)
+        return encoded
+
+    def _check_range(self, name: str, dtype: np.dtype, values: List) -> None:
+        # NumPy 1.x wraps out-of-range ints on conversion instead of raising,
+        # so integer columns are checked against their limits explicitly
+        if not np.issubdtype(dtype, np.integer) or not len(values):
+            return
+        limits = np.iinfo(dtype)
+        values = np.asarray(values)
+        outside = (values < limits.min) | (values > limits.max)
+        if outside.any():
+            value = values[np.flatnonzero(outside)[0]]
+            raise ValueError(f"{name} value {value!r} does not fit in {dtype}")
+
+    def _write(self, row: int, encoded: Dict) -> None:
+        columns = self._columns
+        for name, value in encoded.items():
+            columns[name][row] = value
+
+    def _encode(self, name: str, value):
+        if name in SET_FIELDS:
+            return self.vocabularies[name].encode(value)
+        if name in LABEL_FIELDS:
+            return 0 if value is None else self.vocabularies[name].encode([value])
+        if name in LOCATION_FIELDS:
+            return np.nan if value is None else value
+        if name == "last_updated":
+            return value.timestamp()
+        return value
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[name] = grown
@@ -0,0 +1,188 @@
+"""
+Premium Pricing Table
+Precomputed premium multipliers by tier and time bucket
+"""
+
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Sequence
+
+# 20% premium fee on top of the multiplied fare
+PREMIUM_FEE_RATE = 0.2
+
+# Time buckets and their multipliers; night takes precedence over weekend
+TIME_BUCKETS = ("normal", "weekend", "night")
+TIME_BUCKET_MULTIPLIERS = {"normal": 1.0, "weekend": 1.05, "night": 1.1}
+NIGHT_START_HOUR = 22
+NIGHT_END_HOUR = 6
+
+
+def time_bucket(moment: datetime) -> str:
+    """
+    Get the pricing time bucket of a local time.
+
+    Args:
+        moment: Local time
+
+    Returns:
+        "night" (22:00-06:00), "weekend" (Saturday or Sunday) or "normal"
+    """
+    if moment.hour >= NIGHT_START_HOUR or moment.hour < NIGHT_END_HOUR:
+        return "night"
+    if moment.weekday() >= 5:
+        return "weekend"
+    return "normal"
+
+
+def next_bucket_boundary(moment: datetime) -> datetime:
+    """
+    Get the first time after ``moment`` at which the time bucket may change.
+
+    Buckets can only change at 06:00, 22:00 and midnight.
+
+    Args:
+        moment: Local time
+
+    Returns:
+        Next boundary
+    """
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    for hour in (NIGHT_END_HOUR, NIGHT_START_HOUR):
+        boundary = midnight + timedelta(hours=hour)
+        if boundary > moment:
+            return boundary
+    return midnight + timedelta(days=1)
+
+
+class PremiumPricingTable:
+    """
+    Premium multipliers precomputed for every tier and time bucket.
+
+    The current time bucket is cached until the clock crosses the next
+    bucket boundary, so pricing a fare is a table lookup and one clock
+    read instead of two ``datetime.now()`` calls and a walk of the tier
+    config. Call ``rebuild`` whenever the tier config changes.
+    """
+
+    def __init__(
+        self,
+        premium_tiers: Dict[str, Dict[str, float]],
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize the table.
+
+        Args:
+            premium_tiers: Tier config with a "multiplier" per tier
+            clock: Returns the current time in seconds since the epoch
+        """
+        self.clock = clock
+        self._bucket = 0
+        self._bucket_expires = float("-inf")
+        self.rebuild(premium_tiers)
+
+    def rebuild(self, premium_tiers: Dict[str, Dict[str, float]]) -> None:
+        """
+        Recompute the table from the tier config.
+
+        Args:
+            premium_tiers: Tier config with a "multiplier" per tier
+        """
+        self.tiers = list(premium_tiers)
+        self._tier_index = {tier: i for i, tier in enumerate(self.tiers)}
+        # The last row prices unknown tiers at the standard multiplier
+        tier_multipliers = [premium_tiers[tier]["multiplier"] for tier in self.tiers] + [1.0]
+        self.multipliers = np.array([
+            [multiplier * TIME_BUCKET_MULTIPLIERS[bucket] for bucket in TIME_BUCKETS]
+            for multiplier in tier_multipliers
+        ])
+
+    def current_bucket(self) -> str:
+        """
+        Get the time bucket for the current time.
+
+        Returns:
+            Time bucket name
+        """
+        return TIME_BUCKETS[self._bucket_index()]
+
+    def multiplier(self, driver_tier: str) -> float:
+        """
+        Get the current multiplier of a tier.
+
+        Args:
+            driver_tier: Premium tier (unknown tiers use 1.0)
+
+        Returns:
+            Tier multiplier including the time bucket premium
+        """
+        return float(self.multipliers[self._tier_index.get(driver_tier, -1), self._bucket_index()])
+
+    def price(self, base_fare: float, driver_tier: str) -> Dict[str, float]:
+        """
+        Price one fare.
+
+        Args:
+            base_fare: Standard base fare
+            driver_tier: Premium tier
+
+        Returns:
+            Pricing breakdown
+        """
+        multiplier = self.multiplier(driver_tier)
+        premium_fee = base_fare * PREMIUM_FEE_RATE
+        total_fare = base_fare * multiplier + premium_fee
+        savings = base_fare - total_fare
+        return {
+            "base_fare": base_fare,
+            "premium_fee": premium_fee,
+            "multiplier": multiplier,
+            "total_fare": total_fare,
+            "savings": savings,
+            "savings_percentage": (savings / base_fare) * 100 if base_fare > 0 else 0
+        }
+
+    def price_batch(self, base_fares: Sequence[float], driver_tiers: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Price many fares at once, all in the same time bucket.
+
+        Args:
+            base_fares: Standard base fares
+            driver_tiers: Premium tier of each fare
+
+        Returns:
+            Pricing breakdown with one array per field
+        """
+        base_fares = np.asarray(base_fares, dtype=np.float64)
+        if len(driver_tiers) != base_fares.size:
+            raise ValueError("base_fares and driver_tiers must have the same length")
+        bucket = self._bucket_index()
+        unknown = len(self.tiers)
+        rows = np.fromiter(
+            (self._tier_index.get(tier, unknown) for tier in driver_tiers),
+            dtype=np.intp,
+            count=base_fares.size
+        )
+        multiplier = self.multipliers[rows, bucket]
+        premium_fee = base_fares * PREMIUM_FEE_RATE
+        total_fare = base_fares * multiplier + premium_fee
+        savings = base_fares - total_fare
+        with np.errstate(divide="ignore", invalid="ignore"):
+            savings_percentage = np.where(base_fares > 0, savings / base_fares * 100, 0.0)
+        return {
+            "base_fare": base_fares,
+            "premium_fee": premium_fee,
+            "multiplier": multiplier,
+            "total_fare": total_fare,
+            "savings": savings,
+            "savings_percentage": savings_percentage
+        }
+
+    def _bucket_index(self) -> int:
+        now = self.clock()
+        if now >= self._bucket_expires:
+            moment = datetime.fromtimestamp(now)
+            self._bucket = TIME_BUCKETS.index(time_bucket(moment))
+            self._bucket_expires = next_bucket_boundary(moment).timestamp()
+        return self._bucket
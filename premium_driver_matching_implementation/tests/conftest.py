@@ -0,0 +1,15 @@
+"""
+Shared fixtures for Premium Driver Matching tests
+"""
+
+import pytest
+
+from api import reset_driver_store
+
+
+@pytest.fixture(autouse=True)
+def empty_driver_store():
+    """Start every test with an empty driver store."""
+    reset_driver_store()
+    yield
+    reset_driver_store()
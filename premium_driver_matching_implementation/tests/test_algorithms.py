@@ -12,6 +12,17 @@ from algorithms import (
     MatchingScore,
     calculate_fairness_score
 )
+from pricing_table import PremiumPricingTable
+
+# Friday noon, so premium pricing carries no night or weekend premium
+WEEKDAY_NOON = datetime(2024, 1, 5, 12, 0)
+
+
+def make_matcher():
+    """Create a matcher whose pricing table sees a fixed weekday daytime clock."""
+    matcher = PremiumDriverMatcher()
+    matcher.pricing_table = PremiumPricingTable(matcher.premium_tiers, clock=WEEKDAY_NOON.timestamp)
+    return matcher
 
 
 class TestPremiumDriverMatcher:
@@ -20,7 +31,7 @@ class TestPremiumDriverMatcher:
     @pytest.fixture
     def matcher(self):
         """Create a matcher instance."""
-        return PremiumDriverMatcher()
+        return make_matcher()
     
     @pytest.fixture
     def sample_drivers(self):
@@ -402,7 +413,7 @@ class TestEdgeCases:
     @pytest.fixture
     def matcher(self):
         """Create a matcher instance."""
-        return PremiumDriverMatcher()
+        return make_matcher()
     
     def test_empty_driver_list(self, matcher):
         """Test matching with empty driver list."""
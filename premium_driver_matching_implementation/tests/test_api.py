@@ -2,10 +2,15 @@
 Tests for Premium Driver Matching API
 """
 
+import json
+import os
 import pytest
+import api
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
-from api import app, driver_profiles_store
+from api import app, driver_profiles_store, matcher
+from fleet_persistence import FleetPersistence
+from fleet_store import FleetStore
 from algorithms import DriverProfile
 
 
@@ -120,6 +125,15 @@ class TestDriverProfileEndpoints:
         response = client.post("/drivers", json=sample_driver_profile)
         assert response.status_code == 422  # Validation error
     
+    def test_create_driver_unstorable_value(self, client, sample_driver_profile):
+        """Test a value past the store's column type is rejected without a partial row."""
+        sample_driver_profile["total_rides"] = 2**40
+        
+        response = client.post("/drivers", json=sample_driver_profile)
+        assert response.status_code == 422
+        assert client.get(f"/drivers/{sample_driver_profile['driver_id']}").status_code == 404
+        assert client.get("/stats").json()["total_drivers"] == 0
+    
     def test_get_driver_profile(self, client, sample_driver_profile):
         """Test getting a driver profile."""
         # Create driver
@@ -233,6 +247,39 @@ class TestDriverProfileEndpoints:
         ids2 = [d["driver_id"] for d in data2]
         assert len(set(ids1) & set(ids2)) == 0
     
+    def test_list_drivers_with_cursor(self, client, sample_driver_profile):
+        """Test walking all drivers with cursors."""
+        for i in range(7):
+            driver_data = sample_driver_profile.copy()
+            driver_data["driver_id"] = f"driver_{i:03d}"
+            client.post("/drivers", json=driver_data)
+        
+        seen = []
+        response = client.get("/drivers?limit=3")
+        while True:
+            assert response.status_code == 200
+            seen.extend(d["driver_id"] for d in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            response = client.get("/drivers", params={"limit": 3, "cursor": cursor})
+        
+        assert seen == [f"driver_{i:03d}" for i in range(7)]
+        
+        # Invalid cursor
+        response = client.get("/drivers", params={"cursor": "garbage"})
+        assert response.status_code == 400
+    
+    def test_next_cursor_exposed_to_browsers(self, client, sample_driver_profile):
+        """Test cross-origin callers may read the cursor header."""
+        for i in range(2):
+            client.post("/drivers", json={**sample_driver_profile, "driver_id": f"driver_{i:03d}"})
+        
+        response = client.get("/drivers?limit=1", headers={"Origin": "https://dashboard.example.com"})
+        
+        assert response.headers.get("X-Next-Cursor")
+        assert "x-next-cursor" in response.headers["Access-Control-Expose-Headers"].lower()
+    
     def test_list_drivers_with_filters(self, client, sample_driver_profile):
         """Test listing drivers with filters."""
         # Create drivers with different service types
@@ -274,6 +321,129 @@ class TestDriverProfileEndpoints:
             assert driver["avg_rating_30d"] >= 4.5
 
 
+class TestBulkUpsertEndpoint:
+    """Test suite for bulk driver upserts."""
+    
+    def test_ndjson_upsert(self, client, sample_driver_profile):
+        """Test NDJSON rows create and update drivers and report bad rows."""
+        client.post("/drivers", json=sample_driver_profile)
+        new_driver = {**sample_driver_profile, "driver_id": "driver_002", "is_available": False}
+        body = "\n".join([
+            json.dumps(new_driver),
+            json.dumps({"driver_id": "driver_001", "avg_rating_30d": 3.2, "specialties": ["events"]}),
+            json.dumps({"driver_id": "driver_003", "avg_rating_30d": 4.0})
+        ])
+        
+        response = client.post(
+            "/drivers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["received"], data["created"], data["updated"], data["failed"]) == (3, 1, 1, 1)
+        assert data["errors"][0]["row"] == 2
+        assert data["errors"][0]["driver_id"] == "driver_003"
+        
+        updated = client.get("/drivers/driver_001").json()
+        assert updated["avg_rating_30d"] == 3.2
+        assert updated["specialties"] == ["events"]
+        assert updated["total_rides"] == sample_driver_profile["total_rides"]
+        assert client.get("/drivers/driver_002").json()["is_available"] is False
+        
+        # Indexes and statistics follow the bulk changes
+        stats = client.get("/stats").json()
+        assert stats["total_drivers"] == 2
+        assert stats["available_drivers"] == 1
+        listed = client.get("/drivers", params={"min_rating": 4.5}).json()
+        assert [driver["driver_id"] for driver in listed] == ["driver_002"]
+    
+    def test_columnar_upsert(self, client, sample_driver_profile):
+        """Test a columnar payload updates many drivers at once."""
+        for i in range(20):
+            client.post("/drivers", json={**sample_driver_profile, "driver_id": f"driver_{i:03d}"})
+        
+        response = client.post("/drivers/bulk", json={
+            "driver_id": [f"driver_{i:03d}" for i in range(20)],
+            "avg_rating_30d": [1.0 + i * 0.2 for i in range(20)],
+            "is_available": [i % 2 == 0 for i in range(20)]
+        })
+        
+        assert response.status_code == 200
+        assert response.json()["updated"] == 20
+        assert client.get("/drivers/driver_010").json()["avg_rating_30d"] == pytest.approx(3.0)
+        assert client.get("/stats").json()["available_drivers"] == 10
+        
+        response = client.post("/drivers/bulk", json={"driver_id": ["a"], "total_rides": []})
+        assert response.status_code == 400
+    
+    def test_bulk_upsert_unstorable_value(self, client, sample_driver_profile):
+        """Test a row the store cannot hold is reported while the others apply."""
+        new_drivers = [
+            {**sample_driver_profile, "driver_id": "driver_002", "total_rides": 2**40},
+            {**sample_driver_profile, "driver_id": "driver_003"}
+        ]
+        body = "\n".join(json.dumps(driver) for driver in new_drivers)
+        
+        response = client.post(
+            "/drivers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["created"], data["failed"]) == (1, 1)
+        assert data["errors"][0]["driver_id"] == "driver_002"
+        assert driver_profiles_store.driver_ids == ["driver_003"]
+
+    
+    def test_bulk_upsert_logs_with_one_fsync(self, client, sample_driver_profile, tmp_path, monkeypatch):
+        """Test a persisted bulk upsert fsyncs its change log once, not once per row."""
+        synced = []
+        monkeypatch.setattr(api, "fleet_persistence", FleetPersistence(str(tmp_path)))
+        monkeypatch.setattr(os, "fsync", synced.append)
+        client.post("/drivers", json=sample_driver_profile)
+        synced.clear()
+        body = "\n".join(
+            [json.dumps({"driver_id": "driver_001", "total_rides": 7})]
+            + [json.dumps({**sample_driver_profile, "driver_id": f"driver_{i:03d}"}) for i in range(2, 52)]
+        )
+        
+        response = client.post(
+            "/drivers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        api.fleet_persistence.close()
+        
+        assert (response.json()["created"], response.json()["updated"]) == (50, 1)
+        assert len(synced) == 1
+        restored = FleetStore()
+        assert FleetPersistence(str(tmp_path)).load(restored) == 52
+        assert restored["driver_001"].total_rides == 7
+        assert len(restored) == 51
+    
+    def test_bulk_upsert_log_failure_leaves_store_unchanged(self, sample_driver_profile, tmp_path, monkeypatch):
+        """Test a bulk upsert whose change log write fails changes nothing."""
+        client = TestClient(app, raise_server_exceptions=False)
+        client.post("/drivers", json=sample_driver_profile)
+        monkeypatch.setattr(api, "fleet_persistence", FleetPersistence(str(tmp_path)))
+        
+        def fail(fd):
+            raise OSError("disk full")
+        
+        monkeypatch.setattr(os, "fsync", fail)
+        body = "\n".join([
+            json.dumps({"driver_id": "driver_001", "total_rides": 7}),
+            json.dumps({**sample_driver_profile, "driver_id": "driver_002"})
+        ])
+        
+        response = client.post(
+            "/drivers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        
+        assert response.status_code == 500
+        assert driver_profiles_store.driver_ids == ["driver_001"]
+        assert driver_profiles_store["driver_001"].total_rides == sample_driver_profile["total_rides"]
+        assert client.get("/stats").json()["total_drivers"] == 1
+
+
 class TestMatchingEndpoints:
     """Test suite for matching endpoints."""
     
@@ -327,6 +497,24 @@ class TestMatchingEndpoints:
         
         response = client.post("/match", json=sample_matching_request)
         assert response.status_code == 422
+    
+    def test_match_drivers_after_tier_change(self, client, sample_driver_profile, sample_matching_request):
+        """Test that matching follows a premium tier config change."""
+        client.post("/drivers", json=sample_driver_profile)
+        original_tiers = matcher.premium_tiers
+        
+        try:
+            matcher.update_premium_tiers({**original_tiers, "GOLD": {"multiplier": 2.0, "min_rating": 4.7}})
+            response = client.post("/match", json=sample_matching_request)
+            assert response.status_code == 200
+            assert response.json()["total_candidates"] == 1
+            
+            matcher.update_premium_tiers({**original_tiers, "GOLD": {"multiplier": 2.0, "min_rating": 4.9}})
+            response = client.post("/match", json=sample_matching_request)
+            assert response.status_code == 200
+            assert response.json()["total_candidates"] == 0
+        finally:
+            matcher.update_premium_tiers(original_tiers)
 
 
 class TestPricingEndpoints:
@@ -374,6 +562,48 @@ class TestPricingEndpoints:
             assert fares[i] < fares[i + 1]
 
 
+class TestBatchPricingEndpoint:
+    """Test suite for batch pricing endpoint."""
+    
+    def test_calculate_pricing_batch(self, client):
+        """Test batch pricing matches single pricing."""
+        request = {
+            "base_fares": [25.0, 10.0, 42.5],
+            "driver_tiers": ["GOLD", "BRONZE", "PLATINUM"],
+            "service_types": ["RIDE", "MOTO", "RIDE"]
+        }
+        
+        response = client.post("/pricing/batch", json=request)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["time_bucket"] in ("normal", "weekend", "night")
+        for i in range(3):
+            single = client.post("/pricing", json={
+                "base_fare": request["base_fares"][i],
+                "driver_tier": request["driver_tiers"][i],
+                "service_type": request["service_types"][i]
+            }).json()
+            assert data["total_fare"][i] == pytest.approx(single["total_fare"])
+            assert data["multiplier"][i] == pytest.approx(single["multiplier"])
+    
+    def test_calculate_pricing_batch_invalid(self, client):
+        """Test batch pricing validation."""
+        response = client.post("/pricing/batch", json={
+            "base_fares": [25.0, 10.0],
+            "driver_tiers": ["GOLD"],
+            "service_types": ["RIDE", "RIDE"]
+        })
+        assert response.status_code == 422
+        
+        response = client.post("/pricing/batch", json={
+            "base_fares": [25.0],
+            "driver_tiers": ["DIAMOND"],
+            "service_types": ["RIDE"]
+        })
+        assert response.status_code == 422
+
+
 class TestRecommendationsEndpoint:
     """Test suite for recommendations endpoint."""
     
@@ -402,6 +632,28 @@ class TestRecommendationsEndpoint:
         assert "not found" in response.json()["detail"]
 
 
+class TestRecommendationsExport:
+    """Test suite for the fleet recommendations export."""
+    
+    def test_export_recommendations(self, client, sample_driver_profile):
+        """Test the export streams NDJSON and follows profile changes."""
+        client.post("/drivers", json=sample_driver_profile)
+        client.post("/drivers", json={**sample_driver_profile, "driver_id": "driver_002", "avg_rating_30d": 3.5})
+        
+        response = client.get("/drivers/recommendations/export")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["driver_id"] for row in rows] == ["driver_002"]
+        assert rows[0]["recommendations"] == client.get("/drivers/driver_002/recommendations").json()["recommendations"]
+        
+        client.put("/drivers/driver_002", json={"avg_rating_30d": 4.9})
+        response = client.get("/drivers/recommendations/export", params={"include_empty": True})
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["recommendations"] for row in rows] == [[], []]
+
+
 class TestFairnessEndpoint:
     """Test suite for fairness endpoint."""
     
@@ -458,6 +710,23 @@ class TestStatisticsEndpoint:
         assert data["avg_rating"] == 0.0
         assert data["avg_completion_rate"] == 0.0
         assert data["avg_acceptance_rate"] == 0.0
+    
+    def test_get_statistics_changes(self, client, sample_driver_profile):
+        """Test polling statistics changes since a version."""
+        version = client.get("/stats").json()["version"]
+        
+        client.post("/drivers", json=sample_driver_profile)
+        client.put(f"/drivers/{sample_driver_profile['driver_id']}", json={"is_available": False})
+        
+        response = client.get("/stats/changes", params={"since": version})
+        
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["complete"] is True
+        assert [change["op"] for change in data["changes"]] == ["create", "update"]
+        assert data["changes"][1]["deltas"]["available_drivers"] == -1
+        assert data["stats"]["available_drivers"] == 0
 
 
 class TestErrorHandling:
@@ -474,6 +743,31 @@ class TestErrorHandling:
         assert response.status_code == 405
 
 
+class TestPersistence:
+    """Test suite for warm start from snapshots and the change log."""
+    
+    def test_restart_restores_drivers(self, tmp_path, monkeypatch, sample_driver_profile):
+        """Test drivers survive a restart when a data directory is configured."""
+        import api
+        monkeypatch.setattr(api, "FLEET_DATA_DIR", str(tmp_path))
+        
+        with TestClient(app) as client:
+            client.post("/drivers", json=sample_driver_profile)
+            client.put("/drivers/driver_001", json={"is_available": False})
+        
+        api.reset_driver_store()
+        
+        with TestClient(app) as client:
+            response = client.get("/drivers/driver_001")
+            assert response.status_code == 200
+            assert response.json()["is_available"] is False
+            assert client.get("/stats").json()["total_drivers"] == 1
+            client.delete("/drivers/driver_001")
+        
+        with TestClient(app) as client:
+            assert client.get("/drivers/driver_001").status_code == 404
+
+
 class TestIntegration:
     """Test suite for integration scenarios."""
     
@@ -0,0 +1,104 @@
+"""
+Tests for vectorized driver ranking
+"""
+
+import pytest
+import random
+from algorithms import PremiumDriverMatcher, DriverProfile, MatchingRequest
+from batch_ranking import BatchDriverRanker
+from fleet_store import FleetStore
+
+VEHICLE_TYPES = ["SEDAN", "SUV", "MOTO", "VAN", None]
+SPECIALTIES = ["airport_transfer", "city_tour", "corporate"]
+
+
+def make_fleet(size, seed=3):
+    """Create a store of random drivers around Manhattan."""
+    rng = random.Random(seed)
+    store = FleetStore()
+    for i in range(size):
+        located = rng.random() < 0.9
+        store.upsert(DriverProfile(
+            driver_id=f"driver_{i:04d}",
+            avg_rating_30d=round(rng.uniform(2.5, 5.0), 2),
+            avg_rating_90d=4.5,
+            avg_rating_lifetime=4.5,
+            total_rides=rng.randint(0, 3000),
+            completion_rate_30d=round(rng.uniform(0.7, 1.0), 3),
+            acceptance_rate_30d=round(rng.uniform(0.6, 1.0), 3),
+            eta_accuracy_30d=0.9,
+            fairness_boost=round(rng.uniform(0.0, 0.2), 2),
+            specialties=rng.sample(SPECIALTIES, rng.randint(0, 2)),
+            vehicle_type=rng.choice(VEHICLE_TYPES),
+            latitude=40.7128 + rng.uniform(-0.1, 0.1) if located else None,
+            longitude=-74.0060 + rng.uniform(-0.1, 0.1) if located else None
+        ))
+    return store
+
+
+def make_request(special_requirements=()):
+    """Create a matching request."""
+    return MatchingRequest(
+        order_id="order_1",
+        pickup_location=(40.7128, -74.0060),
+        dropoff_location=(40.7308, -73.9357),
+        service_type="RIDE",
+        user_preferences={"special_requirements": list(special_requirements)}
+    )
+
+
+class TestBatchDriverRanker:
+    """Test suite for BatchDriverRanker."""
+
+    @pytest.fixture
+    def matcher(self):
+        """Create a matcher instance."""
+        return PremiumDriverMatcher()
+
+    @pytest.mark.parametrize("special_requirements", [(), ("airport_transfer", "wifi")])
+    def test_matches_scalar_ranking(self, matcher, special_requirements):
+        """Test the vectorized ranking agrees with rank_drivers."""
+        store = make_fleet(400)
+        request = make_request(special_requirements)
+
+        expected = matcher.rank_drivers(request, store.profiles(), max_drivers=25)
+        ranked = BatchDriverRanker().rank_rows(request, store, max_drivers=25)
+
+        assert len(ranked) == 25
+        for actual, scalar in zip(ranked, expected):
+            assert actual.total_score == pytest.approx(scalar.total_score, abs=1e-6)
+            assert actual.eta_score == pytest.approx(scalar.eta_score)
+            assert actual.vehicle_match == pytest.approx(scalar.vehicle_match)
+
+        # Scores are sorted and every driver outside the top k scores no higher
+        scores = [score.total_score for score in ranked]
+        assert scores == sorted(scores, reverse=True)
+        all_scores = matcher.rank_drivers(request, store.profiles(), max_drivers=400)
+        assert all_scores[25].total_score <= scores[-1] + 1e-6
+
+    def test_uses_driver_location(self):
+        """Test a nearer driver gets a better ETA score."""
+        store = FleetStore()
+        for driver_id, latitude in (("far", 40.80), ("near", 40.7130), ("unknown", None)):
+            store.upsert(DriverProfile(
+                driver_id, 4.8, 4.8, 4.8, 100, 0.95, 0.9, 0.9,
+                latitude=latitude, longitude=None if latitude is None else -74.0060
+            ))
+
+        ranked = BatchDriverRanker().rank_rows(make_request(), store, max_drivers=3)
+
+        assert [score.driver_id for score in ranked] == ["near", "far", "unknown"]
+        assert ranked[2].eta_score == pytest.approx(0.7)
+
+    def test_candidate_rows(self):
+        """Test only the given rows are ranked."""
+        store = make_fleet(50)
+
+        ranked = BatchDriverRanker().rank_rows(make_request(), store, rows=[3, 7], max_drivers=10)
+
+        assert sorted(score.driver_id for score in ranked) == ["driver_0003", "driver_0007"]
+        assert BatchDriverRanker().rank_rows(make_request(), store, rows=[], max_drivers=10) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Tests for bulk upsert parsing and validation
+"""
+
+import json
+import pytest
+from algorithms import DriverProfile
+from api import DriverProfileCreate
+from bulk_upsert import BulkPayloadError, field_rules, parse_columnar, parse_ndjson, validate_batch
+from fleet_store import FleetStore
+
+RULES = field_rules(DriverProfileCreate)
+
+FULL_PROFILE = {
+    "avg_rating_30d": 4.8,
+    "avg_rating_90d": 4.7,
+    "avg_rating_lifetime": 4.75,
+    "total_rides": 1500,
+    "completion_rate_30d": 0.96,
+    "acceptance_rate_30d": 0.92,
+    "eta_accuracy_30d": 0.88
+}
+
+
+def make_store(*driver_ids):
+    """Create a store holding the given drivers."""
+    store = FleetStore()
+    for driver_id in driver_ids:
+        store.upsert(DriverProfile(driver_id=driver_id, **FULL_PROFILE))
+    return store
+
+
+def ndjson(*rows):
+    """Encode rows as an NDJSON body."""
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+class TestFieldRules:
+    """Test suite for rules derived from the pydantic model."""
+
+    def test_rules(self):
+        """Test kinds, bounds and defaults come from the model."""
+        assert RULES["avg_rating_30d"].kind == "float"
+        assert (RULES["avg_rating_30d"].ge, RULES["avg_rating_30d"].le) == (1.0, 5.0)
+        assert RULES["total_rides"].kind == "int" and RULES["total_rides"].le is None
+        assert RULES["specialties"].kind == "labels" and RULES["specialties"].default == []
+        assert RULES["latitude"].kind == "float" and not RULES["latitude"].required
+        assert RULES["is_available"].default is True
+
+
+class TestParsing:
+    """Test suite for NDJSON and columnar parsing."""
+
+    def test_ndjson(self):
+        """Test NDJSON rows become columns, with bad lines as row errors."""
+        body = ndjson({"driver_id": "a", "avg_rating_30d": 4.5}, {"driver_id": "b"}) + b"\n[1]\n{oops\n"
+
+        batch = parse_ndjson(body)
+
+        assert batch.size == 4
+        assert batch.columns["driver_id"] == ["a", "b", None, None]
+        assert batch.columns["avg_rating_30d"] == [4.5, None, None, None]
+        assert sorted(batch.errors) == [2, 3]
+
+    def test_columnar(self):
+        """Test columnar payloads need equal-length columns."""
+        batch = parse_columnar({"driver_id": ["a", "b"], "is_available": [False, None]})
+
+        assert batch.size == 2
+        assert batch.values(1) == {}
+
+        with pytest.raises(BulkPayloadError):
+            parse_columnar({"driver_id": ["a", "b"], "is_available": [False]})
+        with pytest.raises(BulkPayloadError):
+            parse_columnar({"is_available": [False]})
+
+
+class TestValidation:
+    """Test suite for column-at-a-time validation."""
+
+    def test_updates_need_only_changed_fields(self):
+        """Test existing drivers can be updated with a subset of fields."""
+        batch = parse_columnar({"driver_id": ["a", "b"], "avg_rating_30d": [4.1, 3.9]})
+
+        creates = validate_batch(batch, RULES, make_store("a", "b"))
+
+        assert batch.errors == {}
+        assert creates.tolist() == [False, False]
+
+    def test_new_drivers_need_required_fields(self):
+        """Test a new driver missing required fields is rejected."""
+        batch = parse_ndjson(ndjson({"driver_id": "new", **FULL_PROFILE}, {"driver_id": "partial", "avg_rating_30d": 4.0}))
+
+        creates = validate_batch(batch, RULES, make_store())
+
+        assert creates.tolist() == [True, True]
+        assert list(batch.errors) == [1]
+        assert {error["field"] for error in batch.errors[1]} == set(FULL_PROFILE) - {"avg_rating_30d"}
+
+    def test_row_errors(self):
+        """Test type, range, unknown-field and duplicate errors are reported per row."""
+        batch = parse_columnar({
+            "driver_id": ["a", "b", "c", "d", "a", 7],
+            "avg_rating_30d": [5.5, "4.0", 4.0, float("nan"), 4.0, 4.0],
+            "total_rides": [1, 2, 2.5, -1, 3, 4],
+            "specialties": [["events"], ["events", 1], None, None, None, None],
+            "is_available": [True, 1, None, None, None, None],
+            "colour": [None, None, "red", None, None, None]
+        })
+
+        validate_batch(batch, RULES, make_store("a", "b", "c", "d"))
+
+        fields = {row: sorted(error["field"] for error in errors) for row, errors in batch.errors.items()}
+        assert fields == {
+            0: ["avg_rating_30d"],
+            1: ["avg_rating_30d", "is_available", "specialties"],
+            2: ["colour", "total_rides"],
+            3: ["avg_rating_30d", "total_rides"],
+            4: ["driver_id"],
+            5: ["driver_id"]
+        }
+        assert batch.valid_rows().tolist() == []
+
+
+    def test_storage_limit_errors(self):
+        """Test values the store cannot hold are row errors rather than write failures."""
+        store = make_store("a", "b", "c", "d")
+        store.vocabularies["specialties"].encode([f"label_{i}" for i in range(63)])
+        batch = parse_columnar({
+            "driver_id": ["a", "b", "c", "d"],
+            "total_rides": [2**40, 10, 10, 10],
+            "specialties": [None, ["label_63"], ["label_64"], ["label_0"]]
+        })
+
+        validate_batch(batch, RULES, store)
+
+        fields = {row: sorted(error["field"] for error in errors) for row, errors in batch.errors.items()}
+        assert fields == {0: ["total_rides"], 2: ["specialties"]}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,159 @@
+"""
+Tests for driver list indexes and cursor pagination
+"""
+
+import pytest
+import random
+from algorithms import DriverProfile
+from driver_index import DriverListIndex, InvalidCursor, encode_cursor
+from fleet_store import FleetStore
+
+SERVICE_TYPES = ["RIDE", "MOTO", "FOOD"]
+
+
+def random_profile(rng, driver_id):
+    """Create a random driver profile."""
+    return DriverProfile(
+        driver_id=driver_id,
+        avg_rating_30d=round(rng.uniform(3.0, 5.0), 1),
+        avg_rating_90d=4.5,
+        avg_rating_lifetime=4.5,
+        total_rides=100,
+        completion_rate_30d=0.95,
+        acceptance_rate_30d=0.9,
+        eta_accuracy_30d=0.9,
+        is_available=rng.random() < 0.6,
+        service_types=rng.sample(SERVICE_TYPES, rng.randint(0, 2))
+    )
+
+
+def make_fleet(size, seed=9):
+    """Create an indexed store of random drivers."""
+    rng = random.Random(seed)
+    store = FleetStore()
+    index = DriverListIndex(store)
+    for i in range(size):
+        store.upsert(random_profile(rng, f"driver_{i:04d}"))
+        index.refresh(f"driver_{i:04d}")
+    return store, index
+
+
+def walk(index, limit, **filters):
+    """Collect every page of a query by following cursors."""
+    driver_ids, cursor = index.page(limit, **filters)
+    pages = [driver_ids]
+    while cursor:
+        driver_ids, cursor = index.page(limit, cursor=cursor, **filters)
+        pages.append(driver_ids)
+    return pages
+
+
+def expected_ids(store, service_type=None, is_available=None, min_rating=None):
+    """Filter and order drivers by brute force."""
+    profiles = [
+        p for p in store.profiles()
+        if (service_type is None or service_type in p.service_types)
+        and (is_available is None or p.is_available == is_available)
+        and (min_rating is None or p.avg_rating_30d >= min_rating)
+    ]
+    if min_rating is None:
+        return sorted(p.driver_id for p in profiles)
+    return [p.driver_id for p in sorted(profiles, key=lambda p: (-p.avg_rating_30d, p.driver_id))]
+
+
+class TestDriverListIndex:
+    """Test suite for DriverListIndex."""
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"service_type": "RIDE"},
+        {"is_available": False},
+        {"service_type": "FOOD", "is_available": True},
+        {"min_rating": 4.5},
+        {"min_rating": 4.0, "service_type": "MOTO", "is_available": True}
+    ])
+    def test_cursor_walk_matches_brute_force(self, filters):
+        """Test following cursors visits every matching driver once, in order."""
+        store, index = make_fleet(300)
+
+        pages = walk(index, 17, **filters)
+
+        assert all(len(page) == 17 for page in pages[:-1])
+        assert [driver_id for page in pages for driver_id in page] == expected_ids(store, **filters)
+
+    def test_skip(self):
+        """Test skip offsets within the matching drivers."""
+        store, index = make_fleet(50)
+
+        driver_ids, _ = index.page(5, skip=10, is_available=True)
+
+        assert driver_ids == expected_ids(store, is_available=True)[10:15]
+
+    def test_walk_is_stable_under_writes(self):
+        """Test drivers untouched during a walk are returned exactly once."""
+        rng = random.Random(4)
+        store, index = make_fleet(200)
+        untouched = set(store.driver_ids)
+        seen = []
+
+        driver_ids, cursor = index.page(10)
+        seen.extend(driver_ids)
+        while cursor:
+            # Concurrent writes between pages: deletes, inserts and rating changes
+            for _ in range(5):
+                action = rng.random()
+                if action < 0.3:
+                    victim = rng.choice(store.driver_ids)
+                    untouched.discard(victim)
+                    store.delete(victim)
+                    index.remove(victim)
+                elif action < 0.6:
+                    new_id = f"new_{rng.randint(0, 10 ** 6)}"
+                    store.upsert(random_profile(rng, new_id))
+                    index.refresh(new_id)
+                else:
+                    driver_id = rng.choice(store.driver_ids)
+                    store.update(driver_id, avg_rating_30d=4.9, is_available=False)
+                    index.refresh(driver_id)
+            driver_ids, cursor = index.page(10, cursor=cursor)
+            seen.extend(driver_ids)
+
+        assert len(seen) == len(set(seen))
+        assert untouched <= set(seen)
+
+    def test_rebuild_matches_incremental(self):
+        """Test rebuilding from the store gives the same pages as incremental upkeep."""
+        store, index = make_fleet(200)
+        for driver_id in store.driver_ids[::7]:
+            store.update(driver_id, avg_rating_30d=4.25, service_types=["MOTO"])
+            index.refresh(driver_id)
+        for driver_id in list(store.driver_ids[::11]):
+            store.delete(driver_id)
+            index.remove(driver_id)
+
+        rebuilt = DriverListIndex(store)
+
+        for filters in ({}, {"service_type": "MOTO"}, {"is_available": True}, {"min_rating": 4.0}):
+            assert walk(rebuilt, 13, **filters) == walk(index, 13, **filters)
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors and cursors from another ordering are rejected."""
+        _, index = make_fleet(30)
+        _, rating_cursor = index.page(5, min_rating=3.0)
+
+        with pytest.raises(InvalidCursor):
+            index.page(5, cursor="not-a-cursor")
+        with pytest.raises(InvalidCursor):
+            index.page(5, cursor=rating_cursor)
+        with pytest.raises(InvalidCursor):
+            index.page(5, cursor=encode_cursor("rating", 4.5), min_rating=3.0)
+
+    def test_unknown_service_type(self):
+        """Test filtering on a service type no driver offers."""
+        _, index = make_fleet(10)
+
+        assert index.page(10, service_type="TRUCK_VAN") == ([], None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
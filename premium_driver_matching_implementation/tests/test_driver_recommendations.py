@@ -0,0 +1,97 @@
+"""
+Tests for fleet-wide driver recommendations
+"""
+
+import json
+import pytest
+import random
+from algorithms import DriverProfile, PremiumDriverMatcher
+from driver_recommendations import FleetRecommender
+from fleet_store import FleetStore
+
+
+def make_fleet(size, seed=11):
+    """Create a store of drivers with metrics around the rule thresholds."""
+    rng = random.Random(seed)
+    store = FleetStore()
+    for i in range(size):
+        store.upsert(DriverProfile(
+            driver_id=f"driver_{i:04d}",
+            avg_rating_30d=rng.choice([3.5, 3.99, 4.0, 4.8]),
+            avg_rating_90d=4.5,
+            avg_rating_lifetime=4.5,
+            total_rides=100,
+            completion_rate_30d=rng.choice([0.9, 0.95, 0.99]),
+            acceptance_rate_30d=rng.choice([0.8, 0.9, 0.95]),
+            eta_accuracy_30d=rng.choice([0.8, 0.85, 0.9]),
+            cancellation_rate_30d=rng.choice([0.0, 0.05, 0.1])
+        ))
+    return store
+
+
+class TestFleetRecommender:
+    """Test suite for FleetRecommender."""
+
+    def test_matches_scalar_rules(self):
+        """Test the vectorized rules agree with get_driver_recommendations."""
+        store = make_fleet(300)
+        matcher = PremiumDriverMatcher()
+        recommender = FleetRecommender(store)
+
+        masks = recommender.evaluate_fleet()
+
+        for profile in store.profiles():
+            expected = matcher.get_driver_recommendations(profile)
+            assert recommender.messages(masks[profile.driver_id]) == expected
+            assert recommender.recommendations_for(profile.driver_id) == expected
+
+    def test_cache_until_invalidated(self):
+        """Test cached results are kept until the driver is invalidated."""
+        store = make_fleet(5)
+        recommender = FleetRecommender(store)
+        store.update("driver_0000", avg_rating_30d=4.8, completion_rate_30d=0.99,
+                     acceptance_rate_30d=0.95, eta_accuracy_30d=0.9, cancellation_rate_30d=0.0)
+        assert recommender.recommendations_for("driver_0000") == []
+        assert len(recommender) == 1
+
+        store.update("driver_0000", avg_rating_30d=3.0)
+        assert recommender.recommendations_for("driver_0000") == []
+
+        recommender.invalidate("driver_0000")
+        assert len(recommender.recommendations_for("driver_0000")) == 2
+
+        with pytest.raises(KeyError):
+            recommender.recommendations_for("missing")
+
+    def test_export_ndjson(self):
+        """Test the export lists each driver once, in chunks."""
+        store = make_fleet(250)
+        recommender = FleetRecommender(store)
+
+        chunks = list(recommender.export_ndjson(include_empty=True, chunk_size=100))
+        rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+        assert len(chunks) == 3
+        assert [row["driver_id"] for row in rows] == store.driver_ids
+        for row in rows:
+            assert row["recommendations"] == recommender.recommendations_for(row["driver_id"])
+
+        flagged = [json.loads(line) for chunk in recommender.export_ndjson() for line in chunk.splitlines()]
+        assert all(row["recommendations"] for row in flagged)
+        assert len(flagged) == sum(1 for row in rows if row["recommendations"])
+
+    def test_export_is_a_snapshot(self):
+        """Test changes after the export starts do not show up in it."""
+        store = make_fleet(10)
+        recommender = FleetRecommender(store)
+
+        export = recommender.export_ndjson(include_empty=True)
+        store.delete("driver_0003")
+        recommender.invalidate("driver_0003")
+
+        rows = [json.loads(line) for chunk in export for line in chunk.splitlines()]
+        assert len(rows) == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
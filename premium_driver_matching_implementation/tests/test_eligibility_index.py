@@ -0,0 +1,142 @@
+"""
+Tests for the bitset eligibility index
+"""
+
+import pytest
+import random
+from algorithms import PremiumDriverMatcher, DriverProfile, MatchingRequest
+from eligibility_index import EligibilityIndex
+from fleet_store import FleetStore
+
+SERVICE_TYPES = ["RIDE", "MOTO", "FOOD"]
+SPECIALTIES = ["airport_transfer", "city_tour", "corporate"]
+VEHICLE_FEATURES = ["child_seat", "pet_friendly", "wheelchair_accessible"]
+
+
+def random_profile(rng, driver_id):
+    """Create a random driver profile."""
+    return DriverProfile(
+        driver_id=driver_id,
+        avg_rating_30d=round(rng.uniform(3.5, 5.0), 2),
+        avg_rating_90d=4.5,
+        avg_rating_lifetime=4.5,
+        total_rides=100,
+        completion_rate_30d=0.95,
+        acceptance_rate_30d=0.9,
+        eta_accuracy_30d=0.9,
+        is_available=rng.random() < 0.8,
+        service_types=rng.sample(SERVICE_TYPES, rng.randint(0, 2)),
+        specialties=rng.sample(SPECIALTIES, rng.randint(0, 2)),
+        vehicle_features=rng.sample(VEHICLE_FEATURES, rng.randint(0, 2))
+    )
+
+
+def make_request(service_type="RIDE", user_tier=None, specialties=(), special_requirements=(),
+                 premium_required=False):
+    """Create a matching request."""
+    return MatchingRequest(
+        order_id="order_1",
+        pickup_location=(40.7128, -74.0060),
+        dropoff_location=(40.7308, -73.9357),
+        service_type=service_type,
+        user_tier=user_tier,
+        user_preferences={
+            "specialties": list(specialties),
+            "special_requirements": list(special_requirements)
+        },
+        premium_required=premium_required
+    )
+
+
+class TestEligibilityIndex:
+    """Test suite for EligibilityIndex."""
+
+    @pytest.fixture
+    def matcher(self):
+        """Create a matcher instance."""
+        return PremiumDriverMatcher()
+
+    def eligible_ids(self, index, matcher, request):
+        """Get the driver ids the index finds eligible."""
+        rows = index.eligible_rows_for_request(matcher, request)
+        return sorted(index.store.driver_ids[row] for row in rows)
+
+    def test_filters_by_requirements(self, matcher):
+        """Test each requirement narrows the eligible set."""
+        store = FleetStore()
+        index = EligibilityIndex(store, matcher.premium_tiers)
+        profiles = [
+            DriverProfile("d1", 4.9, 4.9, 4.9, 10, 0.9, 0.9, 0.9,
+                          service_types=["RIDE"], specialties=["airport_transfer"],
+                          vehicle_features=["child_seat"]),
+            DriverProfile("d2", 4.6, 4.6, 4.6, 10, 0.9, 0.9, 0.9,
+                          service_types=["RIDE"], vehicle_features=["pet_friendly"]),
+            DriverProfile("d3", 4.9, 4.9, 4.9, 10, 0.9, 0.9, 0.9,
+                          service_types=["FOOD"], is_available=False)
+        ]
+        for profile in profiles:
+            index.refresh_row(store.upsert(profile))
+
+        assert self.eligible_ids(index, matcher, make_request()) == ["d1", "d2"]
+        assert self.eligible_ids(index, matcher, make_request(user_tier="PLATINUM")) == ["d1"]
+        assert self.eligible_ids(
+            index, matcher, make_request(user_tier="GOLD", specialties=["airport_transfer"])
+        ) == ["d1"]
+        assert self.eligible_ids(
+            index, matcher, make_request(special_requirements=["pet_friendly"], premium_required=True)
+        ) == ["d2"]
+        assert self.eligible_ids(index, matcher, make_request(service_type="FOOD")) == []
+        assert self.eligible_ids(index, matcher, make_request(service_type="MOTO")) == []
+
+    def test_unknown_tier_threshold(self, matcher):
+        """Test a rating threshold without a bitset is rejected."""
+        index = EligibilityIndex(FleetStore(), matcher.premium_tiers)
+
+        with pytest.raises(ValueError):
+            index.eligible_rows(min_rating=4.2)
+
+    def test_matches_filter_under_churn(self, matcher):
+        """Test incremental maintenance agrees with filter_eligible_drivers."""
+        rng = random.Random(7)
+        store = FleetStore(capacity=8)
+        index = EligibilityIndex(store, matcher.premium_tiers)
+
+        for step in range(600):
+            action = rng.random()
+            if action < 0.5 or len(store) < 5:
+                driver_id = f"driver_{rng.randint(0, 150)}"
+                index.refresh_row(store.upsert(random_profile(rng, driver_id)))
+            elif action < 0.75:
+                driver_id = rng.choice(store.driver_ids)
+                row = store.update(
+                    driver_id,
+                    avg_rating_30d=round(rng.uniform(3.5, 5.0), 2),
+                    is_available=rng.random() < 0.8,
+                    vehicle_features=rng.sample(VEHICLE_FEATURES, rng.randint(0, 3))
+                )
+                index.refresh_row(row)
+            else:
+                row, last = store.delete(rng.choice(store.driver_ids))
+                index.remove_row(row, last)
+
+        requests = [
+            make_request(),
+            make_request(service_type="FOOD", user_tier="SILVER"),
+            make_request(user_tier="GOLD", specialties=["city_tour"]),
+            make_request(user_tier="PLATINUM", special_requirements=["child_seat"], premium_required=True),
+            make_request(service_type="MOTO", special_requirements=["pet_friendly", "wheelchair_accessible"],
+                         premium_required=True)
+        ]
+        profiles = store.profiles()
+        for request in requests:
+            expected = sorted(p.driver_id for p in matcher.filter_eligible_drivers(profiles, request))
+            assert self.eligible_ids(index, matcher, request) == expected
+
+        # A rebuilt index agrees with the incrementally maintained one
+        rebuilt = EligibilityIndex(store, matcher.premium_tiers)
+        for request in requests:
+            assert self.eligible_ids(rebuilt, matcher, request) == self.eligible_ids(index, matcher, request)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,210 @@
+"""
+Tests for driver store snapshots and the change log
+"""
+
+import os
+import pytest
+from datetime import datetime
+from algorithms import DriverProfile
+from fleet_persistence import FleetPersistence
+from fleet_store import FleetStore
+
+
+def make_profile(driver_id, **overrides):
+    """Create a driver profile with sensible defaults."""
+    values = dict(
+        driver_id=driver_id,
+        avg_rating_30d=4.8,
+        avg_rating_90d=4.7,
+        avg_rating_lifetime=4.75,
+        total_rides=1500,
+        completion_rate_30d=0.96,
+        acceptance_rate_30d=0.92,
+        eta_accuracy_30d=0.88,
+        service_types=["RIDE"],
+        vehicle_type="SEDAN",
+        latitude=40.7128,
+        longitude=-74.0060,
+        last_updated=datetime(2024, 1, 1, 12, 0, 0)
+    )
+    values.update(overrides)
+    return DriverProfile(**values)
+
+
+def make_store(size):
+    """Create a store of drivers with varied fields."""
+    store = FleetStore(capacity=4)
+    for i in range(size):
+        store.upsert(make_profile(
+            f"driver_{i:03d}",
+            avg_rating_30d=3.0 + (i % 20) / 10,
+            vehicle_type=None if i % 5 == 0 else ["SEDAN", "SUV"][i % 2],
+            specialties=["airport_transfer", "corporate"][:i % 3],
+            latitude=None if i % 7 == 0 else 40.7,
+            longitude=None if i % 7 == 0 else -74.0
+        ))
+    return store
+
+
+def profiles_of(store):
+    """Get all stored profiles keyed by driver id."""
+    return {profile.driver_id: profile for profile in store.profiles()}
+
+
+class TestFleetPersistence:
+    """Test suite for FleetPersistence."""
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """Test a snapshot restores every profile and vocabulary."""
+        store = make_store(50)
+        FleetPersistence(str(tmp_path)).snapshot(store)
+
+        restored = FleetStore()
+        replayed = FleetPersistence(str(tmp_path)).load(restored)
+
+        assert replayed == 0
+        assert profiles_of(restored) == profiles_of(store)
+        assert restored.vocabularies["specialties"].labels == store.vocabularies["specialties"].labels
+        # The restored store accepts new drivers and labels
+        restored.upsert(make_profile("new", specialties=["events"]))
+        assert restored["new"].specialties == ["events"]
+
+    def test_change_log_replays_after_snapshot(self, tmp_path):
+        """Test changes recorded after the snapshot are replayed on load."""
+        store = make_store(20)
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.snapshot(store)
+
+        changed = make_profile("driver_003", avg_rating_30d=4.1, specialties=["events"])
+        store.upsert(changed)
+        persistence.record_upsert(changed)
+        updated_at = datetime(2024, 2, 1, 9, 30)
+        store.update("driver_004", is_available=False, last_updated=updated_at)
+        persistence.record_update("driver_004", {"is_available": False, "last_updated": updated_at})
+        store.delete("driver_005")
+        persistence.record_delete("driver_005")
+        persistence.close()
+
+        restored = FleetStore()
+        replayed = FleetPersistence(str(tmp_path)).load(restored)
+
+        assert replayed == 3
+        assert profiles_of(restored) == profiles_of(store)
+
+    def test_snapshot_truncates_change_log(self, tmp_path):
+        """Test a snapshot absorbs the change log and replaces older snapshots."""
+        store = make_store(10)
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.snapshot(store)
+        store.delete("driver_001")
+        persistence.record_delete("driver_001")
+
+        persistence.snapshot(store)
+
+        assert os.path.getsize(persistence.log_path) == 0
+        assert len([name for name in os.listdir(tmp_path) if name.startswith("snapshot-")]) == 1
+        restored = FleetStore()
+        assert FleetPersistence(str(tmp_path)).load(restored) == 0
+        assert profiles_of(restored) == profiles_of(store)
+
+    def test_stale_log_entries_are_skipped(self, tmp_path):
+        """Test entries already in the snapshot are not replayed again."""
+        store = make_store(5)
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.record_delete("driver_000")
+        store.delete("driver_000")
+        log = open(persistence.log_path).read()
+        persistence.snapshot(store)
+        # As if the process died after writing the snapshot but before truncating the log
+        with open(persistence.log_path, "w") as log_file:
+            log_file.write(log)
+
+        restored = FleetStore()
+
+        assert FleetPersistence(str(tmp_path)).load(restored) == 0
+        assert len(restored) == 4
+
+    def test_change_log_is_fsynced_by_default(self, tmp_path, monkeypatch):
+        """Test each change log entry is fsynced unless fsync is turned off."""
+        synced = []
+        monkeypatch.setattr(os, "fsync", synced.append)
+
+        FleetPersistence(str(tmp_path / "durable")).record_delete("driver_a")
+        assert len(synced) == 1
+        FleetPersistence(str(tmp_path / "fast"), fsync=False).record_delete("driver_a")
+        assert len(synced) == 1
+
+    def test_record_many_fsyncs_once(self, tmp_path, monkeypatch):
+        """Test a batch of entries is written with a single fsync and replays in order."""
+        synced = []
+        monkeypatch.setattr(os, "fsync", synced.append)
+        persistence = FleetPersistence(str(tmp_path))
+        updated_at = datetime(2024, 1, 2, 8, 0, 0)
+
+        persistence.record_many(
+            [FleetPersistence.upsert_entry(make_profile(f"driver_{i}")) for i in range(50)]
+            + [FleetPersistence.update_entry("driver_7", {"total_rides": 9, "last_updated": updated_at})]
+        )
+        persistence.record_many([])
+        persistence.close()
+
+        assert len(synced) == 1
+        assert persistence.sequence == 51
+        restored = FleetStore()
+        assert FleetPersistence(str(tmp_path)).load(restored) == 51
+        assert restored["driver_7"] == make_profile("driver_7", total_rides=9, last_updated=updated_at)
+
+    def test_failed_batch_write_leaves_log_unchanged(self, tmp_path, monkeypatch):
+        """Test a batch whose write fails is cut from the log and does not use up sequence numbers."""
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.record_upsert(make_profile("driver_a"))
+        size = os.path.getsize(persistence.log_path)
+
+        def fail(fd):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "fsync", fail)
+        with pytest.raises(OSError):
+            persistence.record_many([FleetPersistence.upsert_entry(make_profile("driver_b"))])
+        monkeypatch.undo()
+
+        assert os.path.getsize(persistence.log_path) == size
+        assert persistence.sequence == 1
+        persistence.record_upsert(make_profile("driver_c"))
+        persistence.close()
+
+        restored = FleetStore()
+        assert FleetPersistence(str(tmp_path)).load(restored) == 2
+        assert sorted(restored.driver_ids) == ["driver_a", "driver_c"]
+
+    def test_torn_final_entry_is_ignored(self, tmp_path):
+        """Test a partially written last entry does not prevent loading."""
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.record_upsert(make_profile("driver_a"))
+        persistence.close()
+        with open(persistence.log_path, "a") as log_file:
+            log_file.write('{"op":"delete","driver_id":"dri')
+
+        restored = FleetStore()
+
+        assert FleetPersistence(str(tmp_path)).load(restored) == 1
+        assert restored["driver_a"] == make_profile("driver_a")
+
+    def test_sequence_continues_after_load(self, tmp_path):
+        """Test entries recorded after a restart follow the replayed ones."""
+        persistence = FleetPersistence(str(tmp_path))
+        persistence.record_upsert(make_profile("driver_a"))
+        persistence.close()
+
+        restarted = FleetPersistence(str(tmp_path))
+        restarted.load(FleetStore())
+        restarted.record_upsert(make_profile("driver_b"))
+        restarted.close()
+
+        restored = FleetStore()
+        assert FleetPersistence(str(tmp_path)).load(restored) == 2
+        assert sorted(restored.driver_ids) == ["driver_a", "driver_b"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
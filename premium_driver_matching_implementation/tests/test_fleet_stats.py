@@ -0,0 +1,131 @@
+"""
+Tests for incremental fleet statistics
+"""
+
+import pytest
+import random
+import numpy as np
+from algorithms import DriverProfile
+from fleet_stats import FleetStatsAggregator, RATING_BUCKETS
+from fleet_store import FleetStore
+
+
+def random_profile(rng, driver_id):
+    """Create a random driver profile."""
+    return DriverProfile(
+        driver_id=driver_id,
+        avg_rating_30d=round(rng.uniform(1.0, 5.0), 2),
+        avg_rating_90d=4.5,
+        avg_rating_lifetime=4.5,
+        total_rides=100,
+        completion_rate_30d=round(rng.uniform(0.5, 1.0), 3),
+        acceptance_rate_30d=round(rng.uniform(0.5, 1.0), 3),
+        eta_accuracy_30d=0.9,
+        is_available=rng.random() < 0.7
+    )
+
+
+def upsert(store, stats, profile):
+    """Store a profile and apply it to the statistics."""
+    row = store.row_of(profile.driver_id)
+    before = None if row is None else stats.contribution(row)
+    row = store.upsert(profile)
+    return stats.apply(profile.driver_id, before, stats.contribution(row))
+
+
+def delete(store, stats, driver_id):
+    """Delete a driver and apply it to the statistics."""
+    before = stats.contribution(store.row_of(driver_id))
+    store.delete(driver_id)
+    return stats.apply(driver_id, before, None)
+
+
+class TestFleetStatsAggregator:
+    """Test suite for FleetStatsAggregator."""
+
+    def test_empty(self):
+        """Test statistics of an empty fleet."""
+        stats = FleetStatsAggregator(FleetStore()).stats()
+
+        assert stats["total_drivers"] == 0
+        assert stats["avg_rating"] == 0.0
+        assert sum(stats["rating_histogram"].values()) == 0
+
+    def test_matches_full_recompute_under_churn(self):
+        """Test running statistics agree with a recomputation from the columns."""
+        rng = random.Random(11)
+        store = FleetStore(capacity=4)
+        stats = FleetStatsAggregator(store)
+
+        for _ in range(500):
+            if rng.random() < 0.7 or len(store) < 3:
+                upsert(store, stats, random_profile(rng, f"driver_{rng.randint(0, 80)}"))
+            else:
+                delete(store, stats, rng.choice(store.driver_ids))
+
+        current = stats.stats()
+        ratings = store.column("avg_rating_30d").astype(np.float64)
+        assert current["total_drivers"] == len(store)
+        assert current["available_drivers"] == int(store.column("is_available").sum())
+        assert current["avg_rating"] == pytest.approx(ratings.mean(), abs=1e-6)
+        assert current["avg_completion_rate"] == pytest.approx(
+            store.column("completion_rate_30d").astype(np.float64).mean(), abs=1e-6
+        )
+        assert sum(current["rating_histogram"].values()) == len(store)
+        assert set(stats.fairness_scores) == set(store.driver_ids)
+
+        # A rebuild from the store gives the same answer
+        assert FleetStatsAggregator(store).stats() == {**current, "version": 0}
+
+    def test_changes_since(self):
+        """Test pollers receive only the changes after their version."""
+        rng = random.Random(5)
+        store = FleetStore()
+        stats = FleetStatsAggregator(store, max_changes=3)
+
+        upsert(store, stats, random_profile(rng, "driver_a"))
+        version = upsert(store, stats, random_profile(rng, "driver_b"))
+        upsert(store, stats, DriverProfile("driver_a", 4.9, 4.9, 4.9, 1, 1.0, 1.0, 1.0, is_available=False))
+
+        result = stats.changes_since(version)
+        assert result["complete"] is True
+        assert [change["op"] for change in result["changes"]] == ["update"]
+
+        delete(store, stats, "driver_b")
+        delete(store, stats, "driver_a")
+
+        # Only the last three changes are kept
+        assert stats.changes_since(1)["complete"] is False
+        result = stats.changes_since(2)
+        assert result["complete"] is True
+        assert [change["version"] for change in result["changes"]] == [3, 4, 5]
+        assert result["changes"][-1]["deltas"]["total_drivers"] == -1
+        assert stats.changes_since(5)["changes"] == []
+        assert stats.changes_since(9)["complete"] is False
+
+    def test_rating_buckets(self):
+        """Test ratings land in the expected histogram bucket."""
+        store = FleetStore()
+        stats = FleetStatsAggregator(store)
+
+        for driver_id, rating in (("low", 1.0), ("mid", 4.2), ("top", 5.0)):
+            upsert(store, stats, DriverProfile(driver_id, rating, rating, rating, 1, 1.0, 1.0, 1.0))
+
+        histogram = stats.stats()["rating_histogram"]
+        assert histogram[RATING_BUCKETS[0]] == 1
+        assert histogram["4.0-4.5"] == 1
+        assert histogram["4.5-5.0"] == 1
+
+    def test_recent_assignments_update_fairness(self):
+        """Test fairness scores follow recent assignment counts."""
+        store = FleetStore()
+        stats = FleetStatsAggregator(store)
+        upsert(store, stats, random_profile(random.Random(1), "driver_a"))
+
+        stats.set_recent_assignments("driver_a", 25)
+
+        assert stats.fairness_scores == {"driver_a": -0.5}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
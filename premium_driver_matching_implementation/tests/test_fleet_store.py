@@ -0,0 +1,217 @@
+"""
+Tests for the columnar driver store
+"""
+
+import pytest
+import numpy as np
+from datetime import datetime
+from algorithms import DriverProfile
+from fleet_store import BitVocabulary, FleetStore
+
+
+def make_profile(driver_id, **overrides):
+    """Create a driver profile with sensible defaults."""
+    values = dict(
+        driver_id=driver_id,
+        avg_rating_30d=4.8,
+        avg_rating_90d=4.7,
+        avg_rating_lifetime=4.75,
+        total_rides=1500,
+        completion_rate_30d=0.96,
+        acceptance_rate_30d=0.92,
+        eta_accuracy_30d=0.88,
+        service_types=["RIDE", "FOOD"],
+        specialties=["airport_transfer"],
+        vehicle_features=["child_seat"],
+        vehicle_type="SEDAN",
+        latitude=40.7128,
+        longitude=-74.0060,
+        last_updated=datetime(2024, 1, 1, 12, 0, 0)
+    )
+    values.update(overrides)
+    return DriverProfile(**values)
+
+
+class TestBitVocabulary:
+    """Test suite for BitVocabulary."""
+
+    def test_encode_decode(self):
+        """Test labels round-trip through a bitmask."""
+        vocabulary = BitVocabulary()
+
+        mask = vocabulary.encode(["RIDE", "FOOD"])
+
+        assert mask == 0b11
+        assert vocabulary.decode(mask) == ["RIDE", "FOOD"]
+        assert vocabulary.encode(["FOOD"]) == 0b10
+
+    def test_mask_unknown_label(self):
+        """Test masking an unknown label does not register it."""
+        vocabulary = BitVocabulary()
+        vocabulary.encode(["RIDE"])
+
+        assert vocabulary.mask(["RIDE"]) == 0b1
+        assert vocabulary.mask(["MOTO"]) is None
+        assert len(vocabulary) == 1
+
+    def test_too_many_labels(self):
+        """Test a vocabulary is limited to 64 labels."""
+        vocabulary = BitVocabulary()
+        vocabulary.encode([f"label_{i}" for i in range(64)])
+
+        assert vocabulary.decode(vocabulary.mask(["label_63"])) == ["label_63"]
+        with pytest.raises(ValueError):
+            vocabulary.encode(["label_64"])
+
+
+class TestFleetStore:
+    """Test suite for FleetStore."""
+
+    def test_upsert_and_get(self):
+        """Test a stored profile materializes unchanged."""
+        store = FleetStore()
+        profile = make_profile("driver_001")
+
+        store.upsert(profile)
+
+        assert len(store) == 1
+        assert "driver_001" in store
+        assert store["driver_001"] == profile
+        assert store.get("missing") is None
+
+    def test_optional_fields_unset(self):
+        """Test unset location and vehicle type round-trip as None."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001", vehicle_type=None, latitude=None, longitude=None))
+
+        profile = store["driver_001"]
+        assert profile.vehicle_type is None
+        assert profile.latitude is None
+        assert np.isnan(store.column("latitude")[0])
+        assert store.column("vehicle_type")[0] == 0
+
+    def test_upsert_overwrites(self):
+        """Test upserting an existing driver reuses its row."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        row = store.upsert(make_profile("driver_001", avg_rating_30d=4.2, is_available=False))
+
+        assert row == 0
+        assert len(store) == 1
+        assert store["driver_001"].avg_rating_30d == 4.2
+        assert store["driver_001"].is_available is False
+
+    def test_update_fields(self):
+        """Test updating selected fields."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        store.update("driver_001", total_rides=1501, specialties=["city_tour"])
+
+        profile = store["driver_001"]
+        assert profile.total_rides == 1501
+        assert profile.specialties == ["city_tour"]
+        assert profile.service_types == ["RIDE", "FOOD"]
+
+    def test_update_unknown_field(self):
+        """Test updating an unknown field is rejected."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        with pytest.raises(ValueError):
+            store.update("driver_001", rating=4.0)
+        with pytest.raises(KeyError):
+            store.update("missing", total_rides=1)
+
+    def test_failed_upsert_leaves_store_unchanged(self):
+        """Test a value the columns cannot hold fails before a row is claimed."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        with pytest.raises(ValueError):
+            store.upsert(make_profile("driver_002", total_rides=2**40))
+        store.vocabularies["specialties"].encode([f"label_{i}" for i in range(63)])
+        with pytest.raises(ValueError):
+            store.upsert(make_profile("driver_003", specialties=["label_63", "label_64"]))
+
+        assert store.driver_ids == ["driver_001"]
+        assert "driver_002" not in store
+        assert store.column("total_rides").tolist() == [1500]
+
+    def test_failed_update_leaves_row_unchanged(self):
+        """Test an update with one unstorable value writes none of its fields."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        with pytest.raises(ValueError):
+            store.update("driver_001", avg_rating_30d=4.1, total_rides=2**40)
+
+        assert store["driver_001"] == make_profile("driver_001")
+
+    def test_int_limits_are_checked_explicitly(self):
+        """Test int columns reject values just outside their range instead of wrapping."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001", total_rides=2**31 - 1))
+        store.upsert(make_profile("driver_002", total_rides=-2**31))
+
+        with pytest.raises(ValueError):
+            store.upsert(make_profile("driver_003", total_rides=2**31))
+        with pytest.raises(ValueError):
+            store.update("driver_001", total_rides=-2**31 - 1)
+        with pytest.raises(ValueError):
+            store.assign("total_rides", np.array([0, 1]), [5, 2**31])
+
+        assert store.column("total_rides").tolist() == [2**31 - 1, -2**31]
+
+    def test_delete_moves_last_row(self):
+        """Test deleting keeps rows dense and the id index correct."""
+        store = FleetStore()
+        for i in range(3):
+            store.upsert(make_profile(f"driver_{i}", total_rides=i))
+
+        del store["driver_0"]
+
+        assert len(store) == 2
+        assert "driver_0" not in store
+        assert store.row_of("driver_2") == 0
+        assert store["driver_2"].total_rides == 2
+        assert list(store.column("total_rides")) == [2, 1]
+        with pytest.raises(KeyError):
+            store.delete("driver_0")
+
+    def test_column_views_are_zero_copy(self):
+        """Test columns are views over the store's buffers."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        ratings = store.column("avg_rating_30d")
+        store.update("driver_001", avg_rating_30d=3.5)
+
+        assert ratings.dtype == np.float32
+        assert ratings[0] == np.float32(3.5)
+
+    def test_grows_past_capacity(self):
+        """Test the store grows beyond its initial capacity."""
+        store = FleetStore(capacity=2)
+        for i in range(5):
+            store.upsert(make_profile(f"driver_{i}", total_rides=i))
+
+        assert len(store) == 5
+        assert list(store.column("total_rides")) == [0, 1, 2, 3, 4]
+        assert [p.driver_id for p in store.profiles()] == [f"driver_{i}" for i in range(5)]
+
+    def test_clear(self):
+        """Test clearing the store."""
+        store = FleetStore()
+        store.upsert(make_profile("driver_001"))
+
+        store.clear()
+
+        assert len(store) == 0
+        assert len(store.vocabularies["service_types"]) == 0
+        assert store.column("total_rides").size == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+"""
+Tests for the precomputed premium pricing table
+"""
+
+import pytest
+from datetime import datetime
+from algorithms import PremiumDriverMatcher
+from pricing_table import PremiumPricingTable, next_bucket_boundary, time_bucket
+
+# Friday 2024-01-05
+FRIDAY_NOON = datetime(2024, 1, 5, 12, 0)
+FRIDAY_NIGHT = datetime(2024, 1, 5, 23, 0)
+SATURDAY_NOON = datetime(2024, 1, 6, 12, 0)
+
+
+class FakeClock:
+    """Clock that returns a settable time."""
+
+    def __init__(self, moment):
+        self.moment = moment
+
+    def __call__(self):
+        return self.moment.timestamp()
+
+
+def make_table(moment):
+    """Create a table with the matcher's tier config and a fake clock."""
+    return PremiumPricingTable(PremiumDriverMatcher().premium_tiers, clock=FakeClock(moment))
+
+
+class TestTimeBuckets:
+    """Test suite for time bucket helpers."""
+
+    @pytest.mark.parametrize("moment, bucket", [
+        (FRIDAY_NOON, "normal"),
+        (datetime(2024, 1, 5, 5, 59), "night"),
+        (datetime(2024, 1, 5, 22, 0), "night"),
+        (SATURDAY_NOON, "weekend"),
+        (datetime(2024, 1, 6, 23, 0), "night")
+    ])
+    def test_time_bucket(self, moment, bucket):
+        """Test night takes precedence over weekend."""
+        assert time_bucket(moment) == bucket
+
+    @pytest.mark.parametrize("moment, boundary", [
+        (datetime(2024, 1, 5, 3, 0), datetime(2024, 1, 5, 6, 0)),
+        (FRIDAY_NOON, datetime(2024, 1, 5, 22, 0)),
+        (FRIDAY_NIGHT, datetime(2024, 1, 6, 0, 0)),
+        (datetime(2024, 1, 5, 22, 0), datetime(2024, 1, 6, 0, 0))
+    ])
+    def test_next_bucket_boundary(self, moment, boundary):
+        """Test boundaries fall at 06:00, 22:00 and midnight."""
+        assert next_bucket_boundary(moment) == boundary
+
+
+class TestPremiumPricingTable:
+    """Test suite for PremiumPricingTable."""
+
+    @pytest.mark.parametrize("moment, factor", [(FRIDAY_NOON, 1.0), (SATURDAY_NOON, 1.05), (FRIDAY_NIGHT, 1.1)])
+    def test_multipliers(self, moment, factor):
+        """Test tier multipliers include the time bucket premium."""
+        table = make_table(moment)
+
+        assert table.multiplier("GOLD") == 2.0 * factor
+        assert table.multiplier("UNKNOWN") == 1.0 * factor
+
+    def test_price(self):
+        """Test the pricing breakdown."""
+        pricing = make_table(FRIDAY_NOON).price(25.0, "GOLD")
+
+        assert pricing == {
+            "base_fare": 25.0,
+            "premium_fee": 5.0,
+            "multiplier": 2.0,
+            "total_fare": 55.0,
+            "savings": -30.0,
+            "savings_percentage": -120.0
+        }
+
+    def test_bucket_refreshes_at_boundary(self):
+        """Test the cached bucket changes once the clock crosses a boundary."""
+        table = make_table(datetime(2024, 1, 5, 21, 59))
+        assert table.current_bucket() == "normal"
+
+        table.clock.moment = datetime(2024, 1, 5, 22, 0)
+        assert table.current_bucket() == "night"
+
+        table.clock.moment = datetime(2024, 1, 6, 6, 0)
+        assert table.current_bucket() == "weekend"
+
+    def test_rebuild_on_config_change(self):
+        """Test updating the tier config reprices fares."""
+        matcher = PremiumDriverMatcher()
+        matcher.pricing_table.clock = FakeClock(FRIDAY_NOON)
+
+        matcher.update_premium_tiers({**matcher.premium_tiers, "GOLD": {"multiplier": 1.8, "min_rating": 4.5}})
+
+        assert matcher.apply_premium_pricing(10.0, "GOLD", "RIDE")["multiplier"] == 1.8
+
+    @pytest.mark.parametrize("moment", [FRIDAY_NOON, SATURDAY_NOON, FRIDAY_NIGHT])
+    def test_batch_matches_single(self, moment):
+        """Test batch pricing gives the same numbers as pricing one fare at a time."""
+        table = make_table(moment)
+        base_fares = [12.5, 25.0, 40.0, 7.25, 100.0]
+        tiers = ["BRONZE", "SILVER", "GOLD", "PLATINUM", "UNKNOWN"]
+
+        batch = table.price_batch(base_fares, tiers)
+
+        for i, (base_fare, tier) in enumerate(zip(base_fares, tiers)):
+            single = table.price(base_fare, tier)
+            for name, value in single.items():
+                assert batch[name][i] == pytest.approx(value)
+
+        with pytest.raises(ValueError):
+            table.price_batch([10.0], ["GOLD", "GOLD"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
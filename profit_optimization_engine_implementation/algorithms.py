@@ -5,12 +5,16 @@ Implements AI-powered profit optimization algorithms for Tripo04OS platform
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Sequence, Union
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 import math
 
+from multiplier_cache import DemandMultiplierCache, VersionedDict
+from rebalancing import FleetRebalancer, RebalancePlan
+from order_features import OrderFeatures
+
 
 class OptimizationObjective(Enum):
     """Optimization objectives."""
@@ -77,6 +81,212 @@ class OptimizationResult:
     alternative_options: List[Dict[str, Any]]
 
 
+@dataclass
+class MarketConditionArrays:
+    """Market conditions as columns, for batch price optimization."""
+    demand_level: np.ndarray
+    supply_level: np.ndarray
+    time_of_day: np.ndarray
+    day_of_week: np.ndarray
+    is_holiday: np.ndarray
+    weather_impact: np.ndarray
+    event_impact: np.ndarray
+    competitor_pricing: Dict[str, np.ndarray]  # service_type -> price per market, NaN where unknown
+    
+    def __len__(self) -> int:
+        return len(self.demand_level)
+    
+    @classmethod
+    def from_conditions(cls, conditions: Sequence[MarketConditions]) -> "MarketConditionArrays":
+        """
+        Build columns from market conditions.
+        
+        Args:
+            conditions: Market conditions
+        
+        Returns:
+            Market condition columns
+        """
+        count = len(conditions)
+        columns = {
+            name: np.fromiter((getattr(market, name) for market in conditions), dtype=np.float64, count=count)
+            for name in (
+                "demand_level", "supply_level", "time_of_day", "day_of_week",
+                "is_holiday", "weather_impact", "event_impact"
+            )
+        }
+        service_types = {service_type for market in conditions for service_type in market.competitor_pricing}
+        competitor_pricing = {
+            service_type: np.fromiter(
+                (market.competitor_pricing.get(service_type, np.nan) for market in conditions),
+                dtype=np.float64,
+                count=count
+            )
+            for service_type in service_types
+        }
+        return cls(competitor_pricing=competitor_pricing, **columns)
+
+
+@dataclass
+class UserProfileArrays:
+    """User profiles as columns, for batch price optimization."""
+    has_profile: np.ndarray  # bool; rows without a profile price as anonymous users
+    tier_index: np.ndarray  # index into PremiumTier, -1 without a tier
+    order_frequency: np.ndarray
+    churn_risk: np.ndarray
+    monetization_propensity: np.ndarray
+    price_sensitivity: np.ndarray
+    loyalty_score: np.ndarray
+    lifetime_value: np.ndarray
+    
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[Optional[UserProfile]]) -> "UserProfileArrays":
+        """
+        Build columns from user profiles.
+        
+        Args:
+            profiles: One profile (or None) per quote
+            
+        Returns:
+            Profile columns
+        """
+        tiers = {tier: i for i, tier in enumerate(PremiumTier)}
+        count = len(profiles)
+        columns = {
+            name: np.fromiter(
+                (getattr(profile, name) if profile else 0.0 for profile in profiles),
+                dtype=np.float64,
+                count=count
+            )
+            for name in (
+                "order_frequency", "churn_risk", "monetization_propensity",
+                "price_sensitivity", "loyalty_score", "lifetime_value"
+            )
+        }
+        return cls(
+            has_profile=np.fromiter((profile is not None for profile in profiles), dtype=bool, count=count),
+            tier_index=np.fromiter(
+                (tiers.get(profile.user_tier, -1) if profile else -1 for profile in profiles),
+                dtype=np.intp,
+                count=count
+            ),
+            **columns
+        )
+
+
+@dataclass
+class BatchOptimizationResult:
+    """Result of batch price optimization, one array element per quote."""
+    recommended_price: np.ndarray
+    expected_revenue: np.ndarray
+    expected_profit: np.ndarray
+    confidence_score: np.ndarray
+    demand_multiplier: np.ndarray
+    competitive_multiplier: np.ndarray
+    user_multiplier: np.ndarray
+    weighted_multiplier: np.ndarray
+    base_price: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.recommended_price)
+
+
+@dataclass
+class MonetizationInputArrays:
+    """User profiles and order-history summaries as columns, for batch monetization scoring."""
+    tier_index: np.ndarray  # index into PremiumTier, -1 without a tier
+    avg_order_value: np.ndarray
+    order_frequency: np.ndarray
+    churn_risk: np.ndarray
+    monetization_propensity: np.ndarray
+    price_sensitivity: np.ndarray
+    loyalty_score: np.ndarray
+    has_orders: np.ndarray  # bool
+    last_order_at: np.ndarray  # datetime64[us]; NaT counts as ordering at the reference time
+    
+    def __len__(self) -> int:
+        return len(self.tier_index)
+    
+    @classmethod
+    def from_profiles(
+        cls,
+        profiles: Sequence[UserProfile],
+        order_histories: Sequence[List[Dict[str, Any]]]
+    ) -> "MonetizationInputArrays":
+        """
+        Build columns from user profiles and their order histories.
+        
+        Args:
+            profiles: User profiles
+            order_histories: Order history per profile (only the last order's date is used)
+            
+        Returns:
+            Monetization input columns
+        """
+        tiers = {tier: i for i, tier in enumerate(PremiumTier)}
+        count = len(profiles)
+        columns = {
+            name: np.fromiter((getattr(profile, name) for profile in profiles), dtype=np.float64, count=count)
+            for name in (
+                "avg_order_value", "order_frequency", "churn_risk",
+                "monetization_propensity", "price_sensitivity", "loyalty_score"
+            )
+        }
+        return cls(
+            tier_index=np.fromiter((tiers.get(profile.user_tier, -1) for profile in profiles), dtype=np.intp, count=count),
+            has_orders=np.fromiter((bool(history) for history in order_histories), dtype=bool, count=count),
+            last_order_at=np.array(
+                [history[-1].get("date") if history else None for history in order_histories],
+                dtype="datetime64[us]"
+            ),
+            **columns
+        )
+
+
+@dataclass
+class MonetizationBatchResult:
+    """Result of batch monetization scoring, one array element per user."""
+    monetization_propensity: np.ndarray
+    type_index: np.ndarray  # index into UserMonetizationPredictor.monetization_types
+    days_since_last_order: np.ndarray  # float; inf without orders
+    timing_index: np.ndarray  # index into UserMonetizationPredictor.timings
+    price_sensitive: np.ndarray  # bool; the offer carries the extra discount
+    discount_percentage: np.ndarray
+    expected_conversion_rate: np.ndarray
+    confidence_score: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.monetization_propensity)
+
+
+@dataclass
+class FeeSchedule:
+    """Fee rates by zone and hour of day, built once per market tick."""
+    zone_ids: pd.Index  # zones with their own surge state
+    base_rate: float
+    service_rate: float
+    peak_rate: np.ndarray  # per hour of day (0-23)
+    surge_rate: np.ndarray  # per zone in zone_ids order, then one entry for every other zone
+    default_hour: int  # hour of orders given without one
+    tick: Any = None  # identifies the market state the schedule was built from
+
+
+@dataclass
+class FeeBatchResult:
+    """Result of batch fee optimization, one array element per order."""
+    order_value: np.ndarray
+    base_fee: np.ndarray
+    service_fee: np.ndarray
+    peak_fee: np.ndarray
+    surge_fee: np.ndarray
+    total_fees: np.ndarray
+    net_revenue: np.ndarray
+    fee_percentage: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.order_value)
+
+
 class ProfitOptimizationEngine:
     """
     AI-Powered Dynamic Profit Optimization Engine
@@ -104,6 +314,25 @@ class ProfitOptimizationEngine:
             "TRUCK_VAN": 35.0
         }
         
+        # Demand time bands as (start_hour, end_hour, multiplier); the first
+        # matching band applies and a band ending before it starts wraps midnight
+        self.time_bands = (
+            (7, 9, 1.3),  # Morning rush
+            (17, 19, 1.4),  # Evening rush
+            (22, 6, 1.2)  # Night
+        )
+        self.weekend_multiplier = 1.1
+        self.holiday_multiplier = 1.2
+        
+        # Demand inputs are quantized to this step, so quotes in the same zone
+        # and minute share one memoized demand multiplier
+        self.demand_quantum = 0.01
+        self.demand_cache: Optional[DemandMultiplierCache] = DemandMultiplierCache()
+        
+        # Zone-level driver rebalancing; keeps its last solution to warm start the next run
+        self.rebalancer = FleetRebalancer()
+        self.last_rebalance_plan: Optional[RebalancePlan] = None
+        
         # Premium tier multipliers
         self.tier_multipliers = {
             "BRONZE": 1.3,
@@ -140,6 +369,36 @@ class ProfitOptimizationEngine:
             }
         }
     
+    @property
+    def base_prices(self) -> Dict[str, float]:
+        """Base price per service type."""
+        return self._base_prices
+    
+    @base_prices.setter
+    def base_prices(self, prices: Dict[str, float]) -> None:
+        # Track in-place edits too, so caches notice price changes
+        self._base_prices = VersionedDict(prices)
+        self._base_prices_generation = getattr(self, "_base_prices_generation", -1) + 1
+    
+    def pricing_config_key(self) -> Tuple:
+        """
+        Get a key that changes whenever the pricing config changes.
+        
+        Covers base prices and the demand time-band, weekend, holiday and
+        quantization settings.
+        
+        Returns:
+            Comparable config key
+        """
+        return (
+            self._base_prices_generation,
+            self._base_prices.version,
+            self.time_bands,
+            self.weekend_multiplier,
+            self.holiday_multiplier,
+            self.demand_quantum
+        )
+    
     def calculate_demand_multiplier(
         self,
         market_conditions: MarketConditions,
@@ -148,6 +407,10 @@ class ProfitOptimizationEngine:
         """
         Calculate demand-based pricing multiplier.
         
+        Market inputs are quantized to ``demand_quantum`` steps and the result
+        is memoized in ``demand_cache`` (when set) until the pricing config
+        changes.
+        
         Args:
             market_conditions: Current market conditions
             service_type: Service type
@@ -155,37 +418,68 @@ class ProfitOptimizationEngine:
         Returns:
             Demand multiplier (0.5 - 3.0)
         """
+        quantum = self.demand_quantum
+        key = (
+            service_type in ["RIDE", "MOTO"],
+            round(market_conditions.demand_level / quantum),
+            round(market_conditions.supply_level / quantum),
+            market_conditions.time_of_day,
+            market_conditions.day_of_week >= 5,
+            bool(market_conditions.is_holiday),
+            round(market_conditions.weather_impact / quantum),
+            round(market_conditions.event_impact / quantum)
+        )
+        if self.demand_cache is None:
+            return self._compute_demand_multiplier(key)
+        return self.demand_cache.get_or_compute(
+            key,
+            self.pricing_config_key(),
+            lambda: self._compute_demand_multiplier(key)
+        )
+    
+    def _compute_demand_multiplier(self, key: Tuple) -> float:
+        """
+        Calculate the demand multiplier for quantized market inputs.
+        
+        Args:
+            key: Key built by calculate_demand_multiplier
+            
+        Returns:
+            Demand multiplier (0.5 - 3.0)
+        """
+        is_ride, demand_steps, supply_steps, hour, is_weekend, is_holiday, weather_steps, event_steps = key
+        quantum = self.demand_quantum
+        
         # Base multiplier on demand level
-        demand_multiplier = 1.0 + (market_conditions.demand_level - 0.5) * 2.0
+        demand_multiplier = 1.0 + (demand_steps * quantum - 0.5) * 2.0
         
         # Adjust for supply level (lower supply = higher prices)
-        supply_factor = 1.0 + (1.0 - market_conditions.supply_level) * 0.5
+        supply_factor = 1.0 + (1.0 - supply_steps * quantum) * 0.5
         
         # Time-based adjustments
         time_multiplier = 1.0
-        if 7 <= market_conditions.time_of_day < 9:  # Morning rush
-            time_multiplier = 1.3
-        elif 17 <= market_conditions.time_of_day < 19:  # Evening rush
-            time_multiplier = 1.4
-        elif 22 <= market_conditions.time_of_day or market_conditions.time_of_day < 6:  # Night
-            time_multiplier = 1.2
+        for start, end, multiplier in self.time_bands:
+            if (start <= hour < end) if start < end else (hour >= start or hour < end):
+                time_multiplier = multiplier
+                break
         
         # Weekend adjustment
-        if market_conditions.day_of_week >= 5:  # Weekend
-            time_multiplier *= 1.1
+        if is_weekend:
+            time_multiplier *= self.weekend_multiplier
         
         # Holiday adjustment
-        if market_conditions.is_holiday:
-            time_multiplier *= 1.2
+        if is_holiday:
+            time_multiplier *= self.holiday_multiplier
         
         # Weather impact (bad weather = higher demand for rides, lower for food)
-        if service_type in ["RIDE", "MOTO"]:
-            weather_multiplier = 1.0 + abs(market_conditions.weather_impact) * 0.3
+        weather_impact = weather_steps * quantum
+        if is_ride:
+            weather_multiplier = 1.0 + abs(weather_impact) * 0.3
         else:
-            weather_multiplier = 1.0 - market_conditions.weather_impact * 0.2
+            weather_multiplier = 1.0 - weather_impact * 0.2
         
         # Event impact
-        event_multiplier = 1.0 + market_conditions.event_impact * 0.5
+        event_multiplier = 1.0 + event_steps * quantum * 0.5
         
         # Combine all factors
         total_multiplier = (
@@ -473,23 +767,239 @@ class ProfitOptimizationEngine:
         
         return alternatives
     
+    def calculate_optimal_prices(
+        self,
+        service_types: Sequence[str],
+        market_conditions: Union[Sequence[MarketConditions], MarketConditionArrays],
+        market_index: Optional[Sequence[int]] = None,
+        user_profiles: Optional[UserProfileArrays] = None,
+        objective: OptimizationObjective = OptimizationObjective.BALANCED,
+        weights: Optional[Dict[str, float]] = None
+    ) -> BatchOptimizationResult:
+        """
+        Calculate optimal prices for many quotes at once.
+        
+        Applies the same rules as calculate_optimal_price, evaluated as array
+        operations over all quotes instead of one quote at a time. Quotes
+        reference their market conditions by index, so repricing every open
+        quote after a market update does not repeat the conditions per quote.
+        Alternatives are not generated; they follow from the recommended price.
+        
+        Args:
+            service_types: Service type of each quote
+            market_conditions: Distinct market conditions, as objects or columns
+            market_index: Index into market_conditions for each quote
+                (defaults to one market per quote, in order)
+            user_profiles: Optional profile columns, one row per quote
+            objective: Optimization objective
+            weights: Optional weights overriding the objective's weights
+            
+        Returns:
+            Batch optimization result
+        """
+        count = len(service_types)
+        if not isinstance(market_conditions, MarketConditionArrays):
+            market_conditions = MarketConditionArrays.from_conditions(market_conditions)
+        if market_index is None:
+            if len(market_conditions) != count:
+                raise ValueError("market_index is required unless there is one market per quote")
+            market_index = np.arange(count)
+        market_index = np.asarray(market_index, dtype=np.intp)
+        if market_index.shape != (count,):
+            raise ValueError("market_index must have one entry per quote")
+        if count and (market_index.min() < 0 or market_index.max() >= len(market_conditions)):
+            raise ValueError("market_index out of range")
+        
+        # Per-service-type lookups on the distinct service types in the batch
+        codes: Dict[str, int] = {}
+        service_code = np.fromiter(
+            (codes.setdefault(service_type, len(codes)) for service_type in service_types),
+            dtype=np.intp,
+            count=count
+        )
+        names = list(codes)
+        base_prices = np.array([self.base_prices.get(name, 10.0) for name in names], dtype=np.float64)
+        is_ride = np.array([name in ("RIDE", "MOTO") for name in names], dtype=bool)
+        unknown_prices = np.full(len(market_conditions), np.nan)
+        competitor_prices = np.stack(
+            [market_conditions.competitor_pricing.get(name, unknown_prices) for name in names] or [unknown_prices],
+            axis=1
+        )
+        
+        def market_column(name: str) -> np.ndarray:
+            return getattr(market_conditions, name)[market_index]
+        
+        def quantized_column(name: str) -> np.ndarray:
+            # Same quantization as calculate_demand_multiplier
+            return np.round(market_column(name) / self.demand_quantum) * self.demand_quantum
+        
+        demand_level = market_column("demand_level")
+        supply_level = market_column("supply_level")
+        hour = market_column("time_of_day")
+        base_price = base_prices[service_code]
+        
+        # Demand multiplier
+        time_multiplier = np.select(
+            [
+                ((hour >= start) & (hour < end)) if start < end else ((hour >= start) | (hour < end))
+                for start, end, _ in self.time_bands
+            ],
+            [multiplier for _, _, multiplier in self.time_bands],
+            default=1.0
+        )
+        time_multiplier *= np.where(market_column("day_of_week") >= 5, self.weekend_multiplier, 1.0)
+        time_multiplier *= np.where(market_column("is_holiday") > 0, self.holiday_multiplier, 1.0)
+        weather_impact = quantized_column("weather_impact")
+        weather_multiplier = np.where(
+            is_ride[service_code],
+            1.0 + np.abs(weather_impact) * 0.3,
+            1.0 - weather_impact * 0.2
+        )
+        demand_multiplier = np.clip(
+            (1.0 + (quantized_column("demand_level") - 0.5) * 2.0) *
+            (1.0 + (1.0 - quantized_column("supply_level")) * 0.5) *
+            time_multiplier *
+            weather_multiplier *
+            (1.0 + quantized_column("event_impact") * 0.5),
+            0.5,
+            3.0
+        )
+        
+        # Competitive multiplier (1.0 where no competitor price is known)
+        price_ratio = competitor_prices[market_index, service_code] / base_price
+        competitive_multiplier = np.select(
+            [np.isnan(price_ratio), price_ratio < 0.9, price_ratio > 1.1],
+            [1.0, np.clip(price_ratio * 1.05, 0.8, 1.2), np.clip(price_ratio * 0.95, 0.8, 1.2)],
+            default=1.0
+        )
+        
+        # User multiplier and confidence
+        has_competitor_pricing = np.zeros(len(market_conditions), dtype=bool)
+        for prices in market_conditions.competitor_pricing.values():
+            has_competitor_pricing |= ~np.isnan(prices)
+        confidence_score = (
+            0.5 +
+            np.where(demand_level > 0, 0.1, 0.0) +
+            np.where(supply_level > 0, 0.1, 0.0) +
+            np.where(has_competitor_pricing[market_index], 0.1, 0.0)
+        )
+        if user_profiles is None:
+            user_multiplier = np.ones(count)
+        else:
+            if len(user_profiles.has_profile) != count:
+                raise ValueError("user_profiles must have one row per quote")
+            user_multiplier = self._calculate_user_multipliers(user_profiles)
+            confidence_score += np.where(user_profiles.has_profile & (user_profiles.order_frequency > 0), 0.1, 0.0)
+            confidence_score += np.where(user_profiles.has_profile & (user_profiles.lifetime_value > 0), 0.1, 0.0)
+        confidence_score = np.clip(confidence_score, 0.0, 1.0)
+        
+        if weights is None:
+            weights = self.optimization_weights.get(objective, self.optimization_weights[OptimizationObjective.BALANCED])
+        weighted_multiplier = (
+            weights["revenue"] * demand_multiplier +
+            weights["profit_margin"] * competitive_multiplier +
+            weights["user_satisfaction"] * user_multiplier +
+            weights["operational_efficiency"] * 1.0
+        )
+        recommended_price = self._round_prices(base_price * weighted_multiplier)
+        
+        return BatchOptimizationResult(
+            recommended_price=recommended_price,
+            expected_revenue=recommended_price,
+            expected_profit=recommended_price * 0.3,  # 30% profit margin
+            confidence_score=confidence_score,
+            demand_multiplier=demand_multiplier,
+            competitive_multiplier=competitive_multiplier,
+            user_multiplier=user_multiplier,
+            weighted_multiplier=weighted_multiplier,
+            base_price=base_price
+        )
+    
+    @staticmethod
+    def _round_prices(prices: np.ndarray) -> np.ndarray:
+        """
+        Round prices to 2 decimal places exactly as round() does.
+        
+        np.round scales by 100 before rounding, which can land a value on
+        the other side of a half cent; those few values are rounded again
+        one at a time.
+        
+        Args:
+            prices: Unrounded prices
+            
+        Returns:
+            Rounded prices
+        """
+        rounded = np.round(prices, 2)
+        cents = prices * 100.0
+        near_half = np.flatnonzero(np.abs(cents - np.floor(cents) - 0.5) < 1e-6)
+        rounded[near_half] = [round(price, 2) for price in prices[near_half].tolist()]
+        return rounded
+    
+    def _calculate_user_multipliers(self, user_profiles: UserProfileArrays) -> np.ndarray:
+        """
+        Calculate user multipliers for profile columns.
+        
+        Args:
+            user_profiles: Profile columns
+            
+        Returns:
+            User multiplier per row (1.0 for rows without a profile)
+        """
+        # The last entry is picked by tier_index -1 (no tier)
+        tier_table = np.array(
+            [self.tier_multipliers.get(tier.value, 1.0) for tier in PremiumTier] + [1.0],
+            dtype=np.float64
+        )
+        sensitivity = user_profiles.price_sensitivity
+        loyalty = user_profiles.loyalty_score
+        propensity = user_profiles.monetization_propensity
+        frequency = user_profiles.order_frequency
+        
+        multiplier = tier_table[user_profiles.tier_index]
+        multiplier *= np.select([sensitivity > 0.7, sensitivity < 0.3], [0.85, 1.15], default=1.0)
+        multiplier *= np.select([loyalty > 0.8, loyalty < 0.3], [0.9, 1.1], default=1.0)
+        multiplier *= np.where(user_profiles.churn_risk > 0.7, 0.85, 1.0)
+        multiplier *= np.select([propensity > 0.8, propensity < 0.3], [1.1, 0.9], default=1.0)
+        multiplier *= np.select([frequency > 5.0, frequency < 1.0], [0.9, 1.1], default=1.0)
+        multiplier = np.clip(multiplier, 0.7, 1.5)
+        
+        return np.where(user_profiles.has_profile, multiplier, 1.0)
+    
     def optimize_resource_allocation(
         self,
         market_conditions: MarketConditions,
         available_resources: Dict[str, int],
-        demand_forecast: Dict[str, int]
+        demand_forecast: Dict[str, int],
+        available_by_zone: Optional[Dict[str, Dict[str, int]]] = None,
+        demand_by_zone: Optional[Dict[str, Dict[str, int]]] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Optimize resource allocation across service types.
         
+        With per-zone counts, drivers are repositioned across zones and
+        service types by a min-cost flow (see FleetRebalancer) and the
+        recommendations follow from the planned moves. Without them, each
+        service type is judged on its own demand-supply ratio.
+        
         Args:
             market_conditions: Current market conditions
             available_resources: Available resources by service type
             demand_forecast: Demand forecast by service type
+            available_by_zone: Available resources by zone id and service type
+            demand_by_zone: Demand forecast by zone id and service type
             
         Returns:
             Optimized allocation recommendations
         """
+        if available_by_zone is not None and demand_by_zone is not None:
+            return self._allocation_from_rebalancing(
+                available_resources,
+                demand_forecast,
+                available_by_zone,
+                demand_by_zone
+            )
+        
         recommendations = {}
         
         for service_type in self.service_types:
@@ -531,6 +1041,102 @@ class ProfitOptimizationEngine:
         
         return recommendations
     
+    def rebalance_resources(
+        self,
+        available_by_zone: Dict[str, Dict[str, int]],
+        demand_by_zone: Dict[str, Dict[str, int]]
+    ) -> RebalancePlan:
+        """
+        Plan driver moves across zones and service types.
+        
+        Warm starts from the previous plan, so calling this every minute
+        only repairs what changed since.
+        
+        Args:
+            available_by_zone: Available resources by zone id and service type
+            demand_by_zone: Demand forecast by zone id and service type
+            
+        Returns:
+            Rebalance plan
+        """
+        plan = self.rebalancer.solve(available_by_zone, demand_by_zone)
+        self.last_rebalance_plan = plan
+        return plan
+    
+    def _allocation_from_rebalancing(
+        self,
+        available_resources: Dict[str, int],
+        demand_forecast: Dict[str, int],
+        available_by_zone: Dict[str, Dict[str, int]],
+        demand_by_zone: Dict[str, Dict[str, int]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Build per-service recommendations from a rebalance plan.
+        
+        Args:
+            available_resources: Available resources by service type (zone totals if missing)
+            demand_forecast: Demand forecast by service type (zone totals if missing)
+            available_by_zone: Available resources by zone id and service type
+            demand_by_zone: Demand forecast by zone id and service type
+            
+        Returns:
+            Optimized allocation recommendations
+        """
+        plan = self.rebalance_resources(available_by_zone, demand_by_zone)
+        
+        recommendations = {}
+        for service_type in self.service_types:
+            available = available_resources.get(
+                service_type,
+                sum(counts.get(service_type, 0) for counts in available_by_zone.values())
+            )
+            demand = demand_forecast.get(
+                service_type,
+                sum(counts.get(service_type, 0) for counts in demand_by_zone.values())
+            )
+            ratio = demand / available if available > 0 else float('inf')
+            
+            moves = [move for move in plan.moves if move["to_service"] == service_type]
+            switched_in = sum(move["drivers"] for move in moves if move["from_service"] != service_type)
+            switched_out = sum(
+                move["drivers"]
+                for move in plan.moves
+                if move["from_service"] == service_type and move["to_service"] != service_type
+            )
+            unmet = sum(counts.get(service_type, 0) for counts in plan.unmet_by_zone.values())
+            
+            if switched_in > switched_out:
+                action = "increase_allocation"
+            elif switched_in < switched_out:
+                action = "decrease_allocation"
+            elif moves:
+                action = "rebalance_zones"
+            else:
+                action = "maintain_allocation"
+            
+            if unmet > 0:
+                priority = "high"
+            elif moves or switched_out:
+                priority = "medium"
+            else:
+                priority = "low"
+            
+            recommendations[service_type] = {
+                "current_allocation": available,
+                "demand_forecast": demand,
+                "demand_supply_ratio": ratio,
+                "recommended_allocation": int(available + switched_in - switched_out),
+                "action": action,
+                "priority": priority,
+                "expected_impact": self._calculate_resource_impact(action, ratio),
+                "drivers_moving_in": sum(move["drivers"] for move in moves),
+                "drivers_switching_out": switched_out,
+                "unmet_demand": unmet,
+                "moves": moves
+            }
+        
+        return recommendations
+    
     def _calculate_resource_impact(
         self,
         action: str,
@@ -585,12 +1191,67 @@ class UserMonetizationPredictor:
             "promotional_offer",
             "loyalty_program"
         ]
+        
+        # Offer templates and base conversion rates by monetization type
+        self.offer_templates = {
+            "premium_subscription": {
+                "title": "Unlock Premium Benefits",
+                "description": "Get exclusive discounts, priority support, and more",
+                "discount_percentage": 20,
+                "trial_days": 14,
+                "price": 9.99
+            },
+            "cross_sell": {
+                "title": "Try Our Other Services",
+                "description": "Get 15% off your first order on other services",
+                "discount_percentage": 15,
+                "valid_days": 7
+            },
+            "up_sell": {
+                "title": "Upgrade Your Experience",
+                "description": "Get 25% off premium tier upgrade",
+                "discount_percentage": 25,
+                "valid_days": 14
+            },
+            "promotional_offer": {
+                "title": "Special Offer Just For You",
+                "description": "Get 10% off your next order",
+                "discount_percentage": 10,
+                "valid_days": 3
+            },
+            "loyalty_program": {
+                "title": "Join Our Loyalty Program",
+                "description": "Earn points and rewards on every order",
+                "points_per_order": 100,
+                "redemption_value": 0.01
+            }
+        }
+        self.base_conversion_rates = {
+            "premium_subscription": 0.15,
+            "cross_sell": 0.25,
+            "up_sell": 0.20,
+            "promotional_offer": 0.30,
+            "loyalty_program": 0.40
+        }
+        
+        # (timing, urgency) from most to least urgent
+        self.timings = [
+            ("immediate", "high"),
+            ("within_24_hours", "medium"),
+            ("within_3_days", "low")
+        ]
+        self.default_contact_time = "10:00 - 12:00"
+        
+        # Users above this price sensitivity get a deeper discount
+        self.price_sensitivity_threshold = 0.7
     
     def predict_monetization_opportunity(
         self,
         user_profile: UserProfile,
         service_type: str,
-        order_history: List[Dict[str, Any]]
+        order_history: List[Dict[str, Any]],
+        reference_time: Optional[datetime] = None,
+        order_features: Optional[OrderFeatures] = None
     ) -> Dict[str, Any]:
         """
         Predict monetization opportunity for a user.
@@ -599,6 +1260,8 @@ class UserMonetizationPredictor:
             user_profile: User profile
             service_type: Service type
             order_history: User's order history
+            reference_time: Time to measure order recency from (defaults to now)
+            order_features: Pre-aggregated order features, used instead of order_history for timing
             
         Returns:
             Monetization prediction with recommendations
@@ -618,7 +1281,9 @@ class UserMonetizationPredictor:
         # Calculate optimal timing
         optimal_timing = self._calculate_optimal_timing(
             user_profile,
-            order_history
+            order_history,
+            reference_time,
+            order_features
         )
         
         # Generate personalized offer
@@ -646,6 +1311,80 @@ class UserMonetizationPredictor:
             "confidence_score": min(0.9, propensity_score + 0.1)
         }
     
+    def predict_monetization_batch(
+        self,
+        inputs: MonetizationInputArrays,
+        reference_time: datetime
+    ) -> MonetizationBatchResult:
+        """
+        Predict monetization opportunities for many users at once.
+        
+        Applies the rules of predict_monetization_opportunity as array
+        masks, with order recency measured from one reference time.
+        
+        Args:
+            inputs: Profile and order-history columns
+            reference_time: Time to measure order recency from
+            
+        Returns:
+            Scores per user
+        """
+        # Propensity, summed in the same order as _calculate_monetization_propensity
+        frequency = inputs.order_frequency
+        order_value = inputs.avg_order_value
+        propensity = inputs.monetization_propensity * 0.4
+        propensity = propensity + np.where(frequency > 3.0, 0.2, np.where(frequency > 1.0, 0.1, 0.0))
+        propensity = propensity + np.where(order_value > 20.0, 0.15, np.where(order_value > 10.0, 0.1, 0.0))
+        propensity = propensity + inputs.loyalty_score * 0.15
+        propensity = propensity + (1.0 - inputs.churn_risk) * 0.1
+        propensity = np.clip(propensity, 0.0, 1.0)
+        
+        # Monetization type
+        type_codes = {name: i for i, name in enumerate(self.monetization_types)}
+        bronze = list(PremiumTier).index(PremiumTier.BRONZE)
+        type_index = np.where(
+            propensity > 0.8,
+            np.where(
+                inputs.tier_index < 0,
+                type_codes["premium_subscription"],
+                np.where(inputs.tier_index == bronze, type_codes["up_sell"], type_codes["cross_sell"])
+            ),
+            np.where(propensity > 0.5, type_codes["promotional_offer"], type_codes["loyalty_program"])
+        )
+        
+        # Timing; an order without a date counts as placed at the reference time
+        reference = np.datetime64(reference_time, "us")
+        last_order_at = np.where(np.isnat(inputs.last_order_at), reference, inputs.last_order_at)
+        days = ((reference - last_order_at) // np.timedelta64(1, "D")).astype(np.float64)
+        days[~inputs.has_orders] = np.inf
+        timing_index = np.where(days > 7, 0, np.where(days > 3, 1, 2))
+        
+        # Offer discount and conversion, looked up per (type, price sensitive)
+        price_sensitive = inputs.price_sensitivity > self.price_sensitivity_threshold
+        discounts = np.array([
+            [
+                self.personalize_offer(name, sensitive).get("discount_percentage", 0)
+                for sensitive in (False, True)
+            ]
+            for name in self.monetization_types
+        ])
+        discount = discounts[type_index, price_sensitive.astype(np.intp)]
+        base_conversion = np.array([self.base_conversion_rates.get(name, 0.20) for name in self.monetization_types])
+        conversion = base_conversion[type_index] * (0.5 + propensity)
+        conversion = conversion * (1.0 + discount * 0.01)
+        conversion = np.clip(conversion, 0.0, 1.0)
+        
+        return MonetizationBatchResult(
+            monetization_propensity=propensity,
+            type_index=type_index,
+            days_since_last_order=days,
+            timing_index=timing_index,
+            price_sensitive=price_sensitive,
+            discount_percentage=discount,
+            expected_conversion_rate=conversion,
+            confidence_score=np.minimum(0.9, propensity + 0.1)
+        )
+    
     def _calculate_monetization_propensity(
         self,
         user_profile: UserProfile,
@@ -724,7 +1463,9 @@ class UserMonetizationPredictor:
     def _calculate_optimal_timing(
         self,
         user_profile: UserProfile,
-        order_history: List[Dict[str, Any]]
+        order_history: List[Dict[str, Any]],
+        reference_time: Optional[datetime] = None,
+        order_features: Optional[OrderFeatures] = None
     ) -> Dict[str, Any]:
         """
         Calculate optimal timing for monetization offer.
@@ -732,30 +1473,36 @@ class UserMonetizationPredictor:
         Args:
             user_profile: User profile
             order_history: Order history
+            reference_time: Time to measure order recency from (defaults to now)
+            order_features: Pre-aggregated order features, used instead of order_history
             
         Returns:
             Optimal timing information
         """
+        now = reference_time or datetime.now()
+        
         # Calculate time since last order
-        if order_history:
-            last_order_date = order_history[-1].get("date", datetime.now())
-            time_since_last_order = (datetime.now() - last_order_date).days
+        if order_features is not None:
+            if order_features.last_order_at is not None:
+                time_since_last_order = (now - order_features.last_order_at).days
+            else:
+                time_since_last_order = float('inf')
+        elif order_history:
+            last_order_date = order_history[-1].get("date", now)
+            time_since_last_order = (now - last_order_date).days
         else:
             time_since_last_order = float('inf')
         
         # Determine optimal timing
         if time_since_last_order > 7:
             # User hasn't ordered in a week, good time for offer
-            timing = "immediate"
-            urgency = "high"
+            timing, urgency = self.timings[0]
         elif time_since_last_order > 3:
             # User hasn't ordered in 3 days, moderate timing
-            timing = "within_24_hours"
-            urgency = "medium"
+            timing, urgency = self.timings[1]
         else:
             # User ordered recently, wait a bit
-            timing = "within_3_days"
-            urgency = "low"
+            timing, urgency = self.timings[2]
         
         return {
             "timing": timing,
@@ -779,7 +1526,7 @@ class UserMonetizationPredictor:
         """
         # This would be based on user's historical engagement patterns
         # For now, return a reasonable default
-        return "10:00 - 12:00"
+        return self.default_contact_time
     
     def _generate_personalized_offer(
         self,
@@ -800,44 +1547,29 @@ class UserMonetizationPredictor:
         Returns:
             Personalized offer details
         """
-        offers = {
-            "premium_subscription": {
-                "title": "Unlock Premium Benefits",
-                "description": "Get exclusive discounts, priority support, and more",
-                "discount_percentage": 20,
-                "trial_days": 14,
-                "price": 9.99
-            },
-            "cross_sell": {
-                "title": "Try Our Other Services",
-                "description": "Get 15% off your first order on other services",
-                "discount_percentage": 15,
-                "valid_days": 7
-            },
-            "up_sell": {
-                "title": "Upgrade Your Experience",
-                "description": "Get 25% off premium tier upgrade",
-                "discount_percentage": 25,
-                "valid_days": 14
-            },
-            "promotional_offer": {
-                "title": "Special Offer Just For You",
-                "description": "Get 10% off your next order",
-                "discount_percentage": 10,
-                "valid_days": 3
-            },
-            "loyalty_program": {
-                "title": "Join Our Loyalty Program",
-                "description": "Earn points and rewards on every order",
-                "points_per_order": 100,
-                "redemption_value": 0.01
-            }
-        }
-        
-        offer = offers.get(monetization_type, offers["promotional_offer"])
-        
         # Personalize based on user profile
-        if user_profile.price_sensitivity > 0.7:
+        return self.personalize_offer(
+            monetization_type,
+            user_profile.price_sensitivity > self.price_sensitivity_threshold
+        )
+    
+    def personalize_offer(
+        self,
+        monetization_type: str,
+        price_sensitive: bool
+    ) -> Dict[str, Any]:
+        """
+        Get the offer for a monetization type, with the extra discount for price-sensitive users.
+        
+        Args:
+            monetization_type: Monetization type
+            price_sensitive: Whether the user is price sensitive
+            
+        Returns:
+            Offer details (a fresh copy of the template)
+        """
+        offer = dict(self.offer_templates.get(monetization_type, self.offer_templates["promotional_offer"]))
+        if price_sensitive:
             offer["discount_percentage"] = min(offer.get("discount_percentage", 10) + 5, 30)
         
         return offer
@@ -860,13 +1592,7 @@ class UserMonetizationPredictor:
             Expected conversion rate (0-1)
         """
         # Base conversion rate
-        base_conversion = {
-            "premium_subscription": 0.15,
-            "cross_sell": 0.25,
-            "up_sell": 0.20,
-            "promotional_offer": 0.30,
-            "loyalty_program": 0.40
-        }.get(monetization_type, 0.20)
+        base_conversion = self.base_conversion_rates.get(monetization_type, 0.20)
         
         # Adjust by propensity score
         conversion = base_conversion * (0.5 + propensity_score)
@@ -896,6 +1622,16 @@ class RevenueCaptureOptimizer:
             "peak_fee": 0.15,  # 15% peak fee
             "surge_fee": 0.25  # 25% surge fee
         }
+        
+        # Peak hours: 7-9 AM and 5-7 PM
+        self.peak_hours = ((7, 9), (17, 19))
+        
+        # Surge time when demand is high and supply is low
+        self.surge_demand_threshold = 0.7
+        self.surge_supply_threshold = 0.5
+        
+        # Latest schedule built by update_fee_schedule
+        self.fee_schedule: Optional[FeeSchedule] = None
     
     def optimize_fees(
         self,
@@ -947,6 +1683,134 @@ class RevenueCaptureOptimizer:
             "fee_percentage": (total_fees / order_value) * 100
         }
     
+    def update_fee_schedule(
+        self,
+        market_conditions: MarketConditions,
+        zone_levels: Optional[Dict[str, Tuple[float, float]]] = None,
+        tick: Any = None
+    ) -> FeeSchedule:
+        """
+        Build the fee schedule for a market tick and keep it for optimize_fees_batch.
+        
+        Args:
+            market_conditions: Market conditions of the tick; its levels apply to zones
+                without their own, and its hour to orders without one
+            zone_levels: (demand_level, supply_level) by zone id
+            tick: Identifies the market state, so callers can tell when to rebuild
+            
+        Returns:
+            Fee schedule
+        """
+        zone_levels = zone_levels or {}
+        demand_level = np.fromiter(
+            (levels[0] for levels in zone_levels.values()), dtype=np.float64, count=len(zone_levels)
+        )
+        supply_level = np.fromiter(
+            (levels[1] for levels in zone_levels.values()), dtype=np.float64, count=len(zone_levels)
+        )
+        is_surge = np.append(
+            self.surge_mask(demand_level, supply_level),
+            self._is_surge_time(market_conditions)
+        )
+        
+        self.fee_schedule = FeeSchedule(
+            zone_ids=pd.Index(list(zone_levels), dtype=object),
+            base_rate=self.fee_types["base_fee"],
+            service_rate=self.fee_types["service_fee"],
+            peak_rate=np.where(self.peak_hour_mask(np.arange(24)), self.fee_types["peak_fee"], 0.0),
+            surge_rate=np.where(is_surge, self.fee_types["surge_fee"], 0.0),
+            default_hour=market_conditions.time_of_day,
+            tick=tick
+        )
+        return self.fee_schedule
+    
+    def optimize_fees_batch(
+        self,
+        order_values: np.ndarray,
+        zone_ids: Optional[Sequence[str]] = None,
+        hours: Optional[np.ndarray] = None,
+        schedule: Optional[FeeSchedule] = None
+    ) -> FeeBatchResult:
+        """
+        Optimize fees for many orders at once.
+        
+        Fees match optimize_fees for each order under its zone's and
+        hour's market conditions.
+        
+        Args:
+            order_values: Order values
+            zone_ids: Zone per order; zones missing from the schedule use its default rates
+            hours: Hour of day (0-23) per order (defaults to the schedule's hour)
+            schedule: Fee schedule (defaults to the one from update_fee_schedule)
+            
+        Returns:
+            Fee components per order
+        """
+        schedule = schedule or self.fee_schedule
+        if schedule is None:
+            raise ValueError("No fee schedule; call update_fee_schedule first")
+        
+        order_values = np.asarray(order_values, dtype=np.float64)
+        if hours is None:
+            peak_rate = schedule.peak_rate[schedule.default_hour]
+        else:
+            peak_rate = schedule.peak_rate[np.asarray(hours, dtype=np.intp)]
+        if zone_ids is None:
+            surge_rate = schedule.surge_rate[-1]
+        else:
+            # Unknown zones get -1, which selects the trailing default rate
+            surge_rate = schedule.surge_rate[schedule.zone_ids.get_indexer(zone_ids)]
+        
+        # Same operation order as optimize_fees, so results match it exactly
+        base_fee = order_values * schedule.base_rate
+        service_fee = order_values * schedule.service_rate
+        peak_fee = order_values * peak_rate
+        surge_fee = order_values * surge_rate
+        total_fees = base_fee + service_fee + peak_fee + surge_fee
+        
+        return FeeBatchResult(
+            order_value=order_values,
+            base_fee=base_fee,
+            service_fee=service_fee,
+            peak_fee=peak_fee,
+            surge_fee=surge_fee,
+            total_fees=total_fees,
+            net_revenue=order_values - total_fees,
+            fee_percentage=(total_fees / order_values) * 100
+        )
+    
+    def peak_hour_mask(self, hours: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _is_peak_time over hours of day.
+        
+        Args:
+            hours: Hours of day (0-23)
+            
+        Returns:
+            True where the hour is a peak hour
+        """
+        hours = np.asarray(hours)
+        mask = np.zeros(hours.shape, dtype=bool)
+        for start, end in self.peak_hours:
+            mask |= (hours >= start) & (hours < end)
+        return mask
+    
+    def surge_mask(self, demand_level: np.ndarray, supply_level: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _is_surge_time over demand and supply levels.
+        
+        Args:
+            demand_level: Demand levels (0-1)
+            supply_level: Supply levels (0-1)
+            
+        Returns:
+            True where the levels are in surge
+        """
+        return (
+            (np.asarray(demand_level) > self.surge_demand_threshold) &
+            (np.asarray(supply_level) < self.surge_supply_threshold)
+        )
+    
     def _is_peak_time(
         self,
         market_conditions: MarketConditions
@@ -962,8 +1826,7 @@ class RevenueCaptureOptimizer:
         """
         hour = market_conditions.time_of_day
         
-        # Peak hours: 7-9 AM and 5-7 PM
-        return (7 <= hour < 9) or (17 <= hour < 19)
+        return any(start <= hour < end for start, end in self.peak_hours)
     
     def _is_surge_time(
         self,
@@ -978,10 +1841,9 @@ class RevenueCaptureOptimizer:
         Returns:
             True if surge time
         """
-        # Surge time when demand is high and supply is low
         return (
-            market_conditions.demand_level > 0.7 and
-            market_conditions.supply_level < 0.5
+            market_conditions.demand_level > self.surge_demand_threshold and
+            market_conditions.supply_level < self.surge_supply_threshold
         )
 
 
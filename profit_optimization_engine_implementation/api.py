@@ -6,10 +6,11 @@ FastAPI endpoints for profit optimization service
 from fastapi import FastAPI, HTTPException, Depends, status, Query, Path
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, root_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import logging
+import os
 from contextlib import asynccontextmanager
 
 from algorithms import (
@@ -21,8 +22,13 @@ from algorithms import (
     PremiumTier,
     MarketConditions,
     UserProfile,
+    UserProfileArrays,
     OptimizationResult
 )
+from surge_state import SurgeStateEngine, ORDER_CREATED_TOPIC, DRIVER_LOCATION_TOPIC
+from event_stream import EventStreamConsumer, KafkaSource
+from order_features import OrderFeatureStore, ORDER_COMPLETED_TOPIC
+from rebalancing import parse_zone
 
 # Configure logging
 logging.basicConfig(
@@ -36,19 +42,53 @@ logger = logging.getLogger(__name__)
 optimization_engine = ProfitOptimizationEngine()
 monetization_predictor = UserMonetizationPredictor()
 revenue_optimizer = RevenueCaptureOptimizer()
+surge_state = SurgeStateEngine(
+    cell_size_km=float(os.environ.get("SURGE_CELL_SIZE_KM", "1.0")),
+    window_seconds=float(os.environ.get("SURGE_WINDOW_SECONDS", "300"))
+)
+surge_consumer: Optional[EventStreamConsumer] = None
+order_feature_store = OrderFeatureStore(
+    window_days=[int(days) for days in os.environ.get("ORDER_FEATURE_WINDOW_DAYS", "7,30").split(",")]
+)
+order_feature_consumer: Optional[EventStreamConsumer] = None
+
+# Surge event stream; disabled unless brokers are configured
+SURGE_KAFKA_BROKERS = os.environ.get("SURGE_KAFKA_BROKERS")
+SURGE_CONSUMER_GROUP = os.environ.get("SURGE_CONSUMER_GROUP", "profit-optimization-surge")
+SURGE_PUBLISH_INTERVAL = float(os.environ.get("SURGE_PUBLISH_INTERVAL", "5"))
+
+# Order event stream feeding the order feature store; disabled unless brokers are configured
+ORDER_FEATURES_KAFKA_BROKERS = os.environ.get("ORDER_FEATURES_KAFKA_BROKERS")
+ORDER_FEATURES_CONSUMER_GROUP = os.environ.get("ORDER_FEATURES_CONSUMER_GROUP", "profit-optimization-order-features")
+
+# Request objective names
+OBJECTIVE_MAP = {
+    "maximize_profit": OptimizationObjective.MAXIMIZE_PROFIT,
+    "maximize_revenue": OptimizationObjective.MAXIMIZE_REVENUE,
+    "maximize_user_satisfaction": OptimizationObjective.MAXIMIZE_USER_SATISFACTION,
+    "balanced": OptimizationObjective.BALANCED
+}
 
 
 # Pydantic models for API requests/responses
 class MarketConditionsCreate(BaseModel):
     """Request model for market conditions."""
-    demand_level: float = Field(..., ge=0.0, le=1.0, description="Demand level (0-1)")
-    supply_level: float = Field(..., ge=0.0, le=1.0, description="Supply level (0-1)")
+    demand_level: Optional[float] = Field(None, ge=0.0, le=1.0, description="Demand level (0-1); required without zone_id")
+    supply_level: Optional[float] = Field(None, ge=0.0, le=1.0, description="Supply level (0-1); required without zone_id")
     competitor_pricing: Dict[str, float] = Field(default_factory=dict, description="Competitor pricing by service type")
     time_of_day: int = Field(..., ge=0, le=23, description="Time of day (0-23)")
     day_of_week: int = Field(..., ge=0, le=6, description="Day of week (0-6, Monday=0)")
     is_holiday: bool = Field(default=False, description="Whether it's a holiday")
     weather_impact: float = Field(default=0.0, ge=-1.0, le=1.0, description="Weather impact (-1 to 1)")
     event_impact: float = Field(default=0.0, ge=0.0, le=1.0, description="Event impact (0-1)")
+    zone_id: Optional[str] = Field(None, description="Surge zone whose published demand and supply levels are used")
+    
+    @root_validator(skip_on_failure=True)
+    def validate_levels(cls, values):
+        """Require demand and supply levels unless a surge zone provides them."""
+        if values.get('zone_id') is None and (values.get('demand_level') is None or values.get('supply_level') is None):
+            raise ValueError("demand_level and supply_level are required without zone_id")
+        return values
 
 
 class UserProfileCreate(BaseModel):
@@ -110,11 +150,71 @@ class PriceOptimizationResponse(BaseModel):
     timestamp: datetime
 
 
+class BatchQuote(BaseModel):
+    """One quote in a batch price optimization request."""
+    service_type: str = Field(..., description="Service type (RIDE, MOTO, FOOD, GROCERY, GOODS, TRUCK_VAN)")
+    market_index: int = Field(default=0, ge=0, description="Index into the request's market_conditions")
+    user_profile: Optional[UserProfileCreate] = None
+    
+    @validator('service_type')
+    def validate_service_type(cls, v):
+        """Validate service type."""
+        valid_types = ["RIDE", "MOTO", "FOOD", "GROCERY", "GOODS", "TRUCK_VAN"]
+        if v not in valid_types:
+            raise ValueError(f"Service type must be one of {valid_types}")
+        return v
+
+
+class BatchPriceOptimizationRequest(BaseModel):
+    """Request model for batch price optimization."""
+    market_conditions: List[MarketConditionsCreate] = Field(..., description="Distinct market conditions referenced by the quotes")
+    quotes: List[BatchQuote] = Field(..., description="Quotes to price")
+    objective: str = Field(default="balanced", description="Optimization objective (maximize_profit, maximize_revenue, maximize_user_satisfaction, balanced)")
+    
+    @validator('market_conditions')
+    def validate_market_conditions(cls, v):
+        """Validate that at least one market is given."""
+        if not v:
+            raise ValueError("At least one market condition is required")
+        return v
+    
+    @validator('quotes')
+    def validate_market_index(cls, v, values):
+        """Validate that every quote references a given market."""
+        market_count = len(values.get('market_conditions') or [])
+        for quote in v:
+            if quote.market_index >= market_count:
+                raise ValueError(f"market_index must be less than {market_count}")
+        return v
+    
+    @validator('objective')
+    def validate_objective(cls, v):
+        """Validate optimization objective."""
+        valid_objectives = ["maximize_profit", "maximize_revenue", "maximize_user_satisfaction", "balanced"]
+        if v not in valid_objectives:
+            raise ValueError(f"Objective must be one of {valid_objectives}")
+        return v
+
+
+class BatchPriceOptimizationResponse(BaseModel):
+    """Response model for batch price optimization, one list entry per quote."""
+    count: int
+    recommended_prices: List[float]
+    expected_revenues: List[float]
+    expected_profits: List[float]
+    confidence_scores: List[float]
+    optimization_factors: Dict[str, List[float]]
+    timestamp: datetime
+
+
 class MonetizationRequest(BaseModel):
     """Request model for monetization prediction."""
     user_profile: UserProfileCreate
     service_type: str = Field(..., description="Service type")
-    order_history: List[Dict[str, Any]] = Field(default_factory=list, description="Order history")
+    order_history: Optional[List[Dict[str, Any]]] = Field(
+        None,
+        description="Order history (omit to use the stored order features of the user)"
+    )
 
 
 class MonetizationResponse(BaseModel):
@@ -126,6 +226,7 @@ class MonetizationResponse(BaseModel):
     personalized_offer: Dict[str, Any]
     expected_conversion_rate: float
     confidence_score: float
+    order_features: Optional[Dict[str, Any]] = None
     timestamp: datetime
 
 
@@ -149,16 +250,83 @@ class RevenueOptimizationResponse(BaseModel):
     timestamp: datetime
 
 
+class RevenueBatchRequest(BaseModel):
+    """Request model for batch revenue optimization."""
+    market_conditions: MarketConditionsCreate
+    order_values: List[float] = Field(..., description="Order values")
+    zone_ids: Optional[List[str]] = Field(None, description="Surge zone per order; other zones use the market conditions levels")
+    hours: Optional[List[int]] = Field(None, description="Hour of day (0-23) per order; defaults to the market conditions time of day")
+    
+    @validator('order_values')
+    def validate_order_values(cls, v):
+        """Validate that order values are present and positive."""
+        if not v:
+            raise ValueError("order_values must not be empty")
+        if min(v) <= 0:
+            raise ValueError("order_values must be positive")
+        return v
+    
+    @validator('hours')
+    def validate_hours(cls, v):
+        """Validate hours of day if provided."""
+        if v and (min(v) < 0 or max(v) > 23):
+            raise ValueError("hours must be between 0 and 23")
+        return v
+    
+    @root_validator(skip_on_failure=True)
+    def validate_lengths(cls, values):
+        """Validate that per-order lists have one entry per order."""
+        count = len(values['order_values'])
+        for name in ('zone_ids', 'hours'):
+            if values.get(name) is not None and len(values[name]) != count:
+                raise ValueError(f"{name} must have one entry per order value")
+        return values
+
+
+class RevenueBatchResponse(BaseModel):
+    """Response model for batch revenue optimization."""
+    base_fee: List[float]
+    service_fee: List[float]
+    peak_fee: List[float]
+    surge_fee: List[float]
+    total_fees: List[float]
+    net_revenue: List[float]
+    fee_percentage: List[float]
+    totals: Dict[str, float]
+    surge_published_at: Optional[float]
+    timestamp: datetime
+
+
 class ResourceAllocationRequest(BaseModel):
     """Request model for resource allocation optimization."""
     market_conditions: MarketConditionsCreate
     available_resources: Dict[str, int] = Field(..., description="Available resources by service type")
     demand_forecast: Dict[str, int] = Field(..., description="Demand forecast by service type")
+    available_by_zone: Optional[Dict[str, Dict[str, int]]] = Field(None, description="Available resources by zone id and service type")
+    demand_by_zone: Optional[Dict[str, Dict[str, int]]] = Field(None, description="Demand forecast by zone id and service type")
+    
+    @root_validator(skip_on_failure=True)
+    def validate_zone_counts(cls, values):
+        """Validate that zone counts come in pairs, with valid zone ids and non-negative counts."""
+        available_by_zone = values.get('available_by_zone')
+        demand_by_zone = values.get('demand_by_zone')
+        if (available_by_zone is None) != (demand_by_zone is None):
+            raise ValueError("available_by_zone and demand_by_zone must be given together")
+        for counts_by_zone in (available_by_zone or {}, demand_by_zone or {}):
+            for zone, counts in counts_by_zone.items():
+                try:
+                    parse_zone(zone)
+                except ValueError:
+                    raise ValueError(f"Invalid zone id {zone!r}, expected '<row>:<column>'")
+                if any(count < 0 for count in counts.values()):
+                    raise ValueError("Zone counts must be non-negative")
+        return values
 
 
 class ResourceAllocationResponse(BaseModel):
     """Response model for resource allocation optimization."""
     recommendations: Dict[str, Dict[str, Any]]
+    rebalancing: Optional[Dict[str, Any]] = None
     timestamp: datetime
 
 
@@ -174,16 +342,45 @@ class HealthResponse(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
+    global surge_consumer, order_feature_consumer
     # Startup
     logger.info("Starting Profit Optimization Engine API")
     logger.info("Initializing optimization engines...")
     # Load models and data (in production)
+    if SURGE_KAFKA_BROKERS:
+        surge_consumer = EventStreamConsumer(
+            surge_state,
+            {
+                topic: KafkaSource(topic, SURGE_KAFKA_BROKERS, SURGE_CONSUMER_GROUP)
+                for topic in (ORDER_CREATED_TOPIC, DRIVER_LOCATION_TOPIC)
+            },
+            publish_interval_seconds=SURGE_PUBLISH_INTERVAL
+        )
+        await surge_consumer.start()
+        logger.info(f"Consuming surge events from {SURGE_KAFKA_BROKERS}")
+    if ORDER_FEATURES_KAFKA_BROKERS:
+        order_feature_consumer = EventStreamConsumer(
+            order_feature_store,
+            {
+                ORDER_COMPLETED_TOPIC: KafkaSource(
+                    ORDER_COMPLETED_TOPIC, ORDER_FEATURES_KAFKA_BROKERS, ORDER_FEATURES_CONSUMER_GROUP
+                )
+            }
+        )
+        await order_feature_consumer.start()
+        logger.info(f"Consuming order events from {ORDER_FEATURES_KAFKA_BROKERS}")
     logger.info("Optimization engines initialized")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Profit Optimization Engine API")
+    if surge_consumer is not None:
+        await surge_consumer.stop()
+        surge_consumer = None
+    if order_feature_consumer is not None:
+        await order_feature_consumer.stop()
+        order_feature_consumer = None
 
 
 # Create FastAPI app
@@ -207,9 +404,19 @@ app.add_middleware(
 # Helper functions
 def convert_market_conditions(conditions: MarketConditionsCreate) -> MarketConditions:
     """Convert API model to internal model."""
+    demand_level = conditions.demand_level
+    supply_level = conditions.supply_level
+    
+    # Published surge state replaces caller-supplied levels
+    zone = surge_state.zone(conditions.zone_id) if conditions.zone_id else None
+    if zone is not None:
+        demand_level = zone.demand_level
+        supply_level = zone.supply_level
+    
+    # A zone without published state yet counts as balanced
     return MarketConditions(
-        demand_level=conditions.demand_level,
-        supply_level=conditions.supply_level,
+        demand_level=0.5 if demand_level is None else demand_level,
+        supply_level=0.5 if supply_level is None else supply_level,
         competitor_pricing=conditions.competitor_pricing,
         time_of_day=conditions.time_of_day,
         day_of_week=conditions.day_of_week,
@@ -275,13 +482,7 @@ async def optimize_price(request: PriceOptimizationRequest):
             user_profile = convert_user_profile(request.user_profile)
         
         # Convert objective
-        objective_map = {
-            "maximize_profit": OptimizationObjective.MAXIMIZE_PROFIT,
-            "maximize_revenue": OptimizationObjective.MAXIMIZE_REVENUE,
-            "maximize_user_satisfaction": OptimizationObjective.MAXIMIZE_USER_SATISFACTION,
-            "balanced": OptimizationObjective.BALANCED
-        }
-        objective = objective_map.get(request.objective, OptimizationObjective.BALANCED)
+        objective = OBJECTIVE_MAP.get(request.objective, OptimizationObjective.BALANCED)
         
         # Calculate optimal price
         result = optimization_engine.calculate_optimal_price(
@@ -312,6 +513,63 @@ async def optimize_price(request: PriceOptimizationRequest):
         )
 
 
+@app.post("/optimize/price/batch", response_model=BatchPriceOptimizationResponse)
+async def optimize_price_batch(request: BatchPriceOptimizationRequest):
+    """
+    Optimize prices for many quotes in one call.
+    
+    Args:
+        request: Batch price optimization request
+        
+    Returns:
+        Optimized prices, in quote order
+    """
+    try:
+        # Convert models
+        market_conditions = [convert_market_conditions(conditions) for conditions in request.market_conditions]
+        user_profiles = None
+        if any(quote.user_profile for quote in request.quotes):
+            user_profiles = UserProfileArrays.from_profiles([
+                convert_user_profile(quote.user_profile) if quote.user_profile else None
+                for quote in request.quotes
+            ])
+        objective = OBJECTIVE_MAP.get(request.objective, OptimizationObjective.BALANCED)
+        
+        # Calculate optimal prices
+        result = optimization_engine.calculate_optimal_prices(
+            service_types=[quote.service_type for quote in request.quotes],
+            market_conditions=market_conditions,
+            market_index=[quote.market_index for quote in request.quotes],
+            user_profiles=user_profiles,
+            objective=objective
+        )
+        
+        logger.info(f"Optimized {len(result)} prices across {len(market_conditions)} markets")
+        
+        return BatchPriceOptimizationResponse(
+            count=len(result),
+            recommended_prices=result.recommended_price.tolist(),
+            expected_revenues=result.expected_revenue.tolist(),
+            expected_profits=result.expected_profit.tolist(),
+            confidence_scores=result.confidence_score.tolist(),
+            optimization_factors={
+                "demand_multiplier": result.demand_multiplier.tolist(),
+                "competitive_multiplier": result.competitive_multiplier.tolist(),
+                "user_multiplier": result.user_multiplier.tolist(),
+                "weighted_multiplier": result.weighted_multiplier.tolist(),
+                "base_price": result.base_price.tolist()
+            },
+            timestamp=datetime.now()
+        )
+    
+    except Exception as e:
+        logger.error(f"Error optimizing prices: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error optimizing prices: {str(e)}"
+        )
+
+
 @app.post("/optimize/monetization", response_model=MonetizationResponse)
 async def predict_monetization(request: MonetizationRequest):
     """
@@ -327,11 +585,17 @@ async def predict_monetization(request: MonetizationRequest):
         # Convert user profile
         user_profile = convert_user_profile(request.user_profile)
         
+        # Without an explicit history, read the user's stored order features
+        features = None
+        if request.order_history is None:
+            features = order_feature_store.features(user_profile.user_id)
+        
         # Predict monetization opportunity
         result = monetization_predictor.predict_monetization_opportunity(
             user_profile=user_profile,
             service_type=request.service_type,
-            order_history=request.order_history
+            order_history=request.order_history or [],
+            order_features=features
         )
         
         logger.info(f"Predicted monetization for user {user_profile.user_id}: {result['monetization_type']}")
@@ -344,6 +608,7 @@ async def predict_monetization(request: MonetizationRequest):
             personalized_offer=result['personalized_offer'],
             expected_conversion_rate=result['expected_conversion_rate'],
             confidence_score=result['confidence_score'],
+            order_features=features.to_dict() if features is not None else None,
             timestamp=datetime.now()
         )
     
@@ -399,6 +664,77 @@ async def optimize_revenue(request: RevenueOptimizationRequest):
         )
 
 
+@app.post("/optimize/revenue/batch", response_model=RevenueBatchResponse)
+async def optimize_revenue_batch(request: RevenueBatchRequest):
+    """
+    Optimize revenue capture for many orders at once.
+    
+    Orders with a zone id use that zone's published surge state. The fee
+    schedule is rebuilt only when the surge state or market conditions change.
+    
+    Args:
+        request: Batch revenue optimization request
+        
+    Returns:
+        Fee components per order and their totals
+    """
+    try:
+        # Convert market conditions
+        market_conditions = convert_market_conditions(request.market_conditions)
+        
+        # Rebuild the fee schedule once per market tick
+        tick = (
+            surge_state.published_at,
+            market_conditions.time_of_day,
+            market_conditions.demand_level,
+            market_conditions.supply_level
+        )
+        schedule = revenue_optimizer.fee_schedule
+        if schedule is None or schedule.tick != tick:
+            schedule = revenue_optimizer.update_fee_schedule(
+                market_conditions,
+                zone_levels={
+                    zone_id: (zone.demand_level, zone.supply_level)
+                    for zone_id, zone in surge_state.published.items()
+                },
+                tick=tick
+            )
+        
+        # Optimize fees
+        result = revenue_optimizer.optimize_fees_batch(
+            request.order_values,
+            zone_ids=request.zone_ids,
+            hours=request.hours,
+            schedule=schedule
+        )
+        
+        logger.info(f"Optimized revenue for {len(result)} orders: ${result.total_fees.sum():.2f} fees")
+        
+        return RevenueBatchResponse(
+            base_fee=result.base_fee.tolist(),
+            service_fee=result.service_fee.tolist(),
+            peak_fee=result.peak_fee.tolist(),
+            surge_fee=result.surge_fee.tolist(),
+            total_fees=result.total_fees.tolist(),
+            net_revenue=result.net_revenue.tolist(),
+            fee_percentage=result.fee_percentage.tolist(),
+            totals={
+                "order_value": float(result.order_value.sum()),
+                "total_fees": float(result.total_fees.sum()),
+                "net_revenue": float(result.net_revenue.sum())
+            },
+            surge_published_at=surge_state.published_at,
+            timestamp=datetime.now()
+        )
+    
+    except Exception as e:
+        logger.error(f"Error optimizing revenue batch: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error optimizing revenue batch: {str(e)}"
+        )
+
+
 @app.post("/optimize/resources", response_model=ResourceAllocationResponse)
 async def optimize_resources(request: ResourceAllocationRequest):
     """
@@ -418,13 +754,32 @@ async def optimize_resources(request: ResourceAllocationRequest):
         result = optimization_engine.optimize_resource_allocation(
             market_conditions=market_conditions,
             available_resources=request.available_resources,
-            demand_forecast=request.demand_forecast
+            demand_forecast=request.demand_forecast,
+            available_by_zone=request.available_by_zone,
+            demand_by_zone=request.demand_by_zone
         )
         
+        rebalancing = None
+        if request.available_by_zone is not None:
+            plan = optimization_engine.last_rebalance_plan
+            rebalancing = {
+                "drivers_moved": plan.drivers_moved,
+                "unmet_demand": plan.unmet_demand,
+                "idle_drivers": plan.idle_drivers,
+                "reposition_cost": plan.reposition_cost,
+                "warm_started": plan.warm_started,
+                "solve_ms": plan.solve_ms
+            }
+            logger.info(
+                f"Rebalanced {plan.drivers_moved} drivers across {len(request.available_by_zone)} zones "
+                f"in {plan.solve_ms:.0f} ms"
+            )
+        
         logger.info(f"Optimized resource allocation for {len(result)} service types")
         
         return ResourceAllocationResponse(
             recommendations=result,
+            rebalancing=rebalancing,
             timestamp=datetime.now()
         )
     
@@ -463,6 +818,75 @@ async def get_optimization_objectives():
     }
 
 
+@app.get("/surge/zones")
+async def get_surge_zones():
+    """Get the published surge state of every zone."""
+    return {
+        "published_at": surge_state.published_at,
+        "zones": [zone.to_dict() for zone in surge_state.published.values()],
+        "stats": surge_state.stats(),
+        "stream": surge_consumer.metrics if surge_consumer is not None else None
+    }
+
+
+@app.get("/surge/zones/lookup")
+async def lookup_surge_zone(
+    latitude: float = Query(..., ge=-90.0, le=90.0),
+    longitude: float = Query(..., ge=-180.0, le=180.0)
+):
+    """Get the surge zone containing a coordinate and its published state."""
+    zone_id = surge_state.zone_for(latitude, longitude)
+    zone = surge_state.zone(zone_id)
+    return {
+        "zone_id": zone_id,
+        "surge": zone.to_dict() if zone is not None else None
+    }
+
+
+@app.get("/surge/zones/{zone_id}")
+async def get_surge_zone(zone_id: str):
+    """Get the published surge state of one zone."""
+    zone = surge_state.zone(zone_id)
+    if zone is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No surge state published for zone {zone_id}"
+        )
+    return zone.to_dict()
+
+
+@app.get("/users/{user_id}/order-features")
+async def get_user_order_features(user_id: str):
+    """Get the stored order features of one user."""
+    features = order_feature_store.features(user_id)
+    if features is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No orders recorded for user {user_id}"
+        )
+    return features.to_dict()
+
+
+@app.get("/metrics/order-features")
+async def get_order_feature_metrics():
+    """Get order feature store metrics."""
+    return {
+        "stats": order_feature_store.stats(),
+        "stream": order_feature_consumer.metrics if order_feature_consumer is not None else None
+    }
+
+
+@app.get("/metrics/demand-cache")
+async def get_demand_cache_metrics():
+    """Get demand multiplier cache metrics."""
+    cache = optimization_engine.demand_cache
+    return {
+        "enabled": cache is not None,
+        "demand_quantum": optimization_engine.demand_quantum,
+        "metrics": cache.stats() if cache is not None else {}
+    }
+
+
 # Exception handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
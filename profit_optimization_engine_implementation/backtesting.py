@@ -0,0 +1,482 @@
+"""
+Pricing Strategy Backtesting
+Replays order streams through the pricing and fee engines to compare strategies
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from algorithms import (
+    ProfitOptimizationEngine,
+    RevenueCaptureOptimizer,
+    ServiceType,
+    PremiumTier,
+    MarketConditionArrays,
+    UserProfileArrays
+)
+
+MARKET_COLUMNS = (
+    "demand_level", "supply_level", "time_of_day", "day_of_week",
+    "is_holiday", "weather_impact", "event_impact"
+)
+
+
+@dataclass(frozen=True)
+class PricingStrategy:
+    """A named set of optimization weights to backtest."""
+    name: str
+    weights: Dict[str, float]
+
+
+def objective_strategies(engine: Optional[ProfitOptimizationEngine] = None) -> List[PricingStrategy]:
+    """
+    Get one strategy per optimization objective.
+
+    Args:
+        engine: Engine whose optimization_weights to use (defaults to a new engine)
+
+    Returns:
+        Strategies named after the objectives
+    """
+    engine = engine or ProfitOptimizationEngine()
+    return [
+        PricingStrategy(name=objective.value, weights=dict(weights))
+        for objective, weights in engine.optimization_weights.items()
+    ]
+
+
+@dataclass
+class OrderChunk:
+    """A slice of the order stream as columns."""
+    service_types: np.ndarray  # service type per order
+    markets: MarketConditionArrays
+    market_index: np.ndarray  # index into markets per order
+    reference_price: np.ndarray  # price the order was placed at (or expected at)
+    user_profiles: Optional[UserProfileArrays] = None
+
+    def __len__(self) -> int:
+        return len(self.reference_price)
+
+
+@dataclass(frozen=True)
+class SyntheticChunk:
+    """Recipe for a synthetic order chunk, generated inside the worker."""
+    size: int
+    seed: int
+    orders_per_market: int = 500
+    profile_share: float = 0.6
+
+
+class ConstantElasticityModel:
+    """
+    Conversion that falls with price relative to the reference price.
+
+    conversion = base_conversion * (price / reference_price) ** elasticity,
+    capped at 1.
+    """
+
+    def __init__(self, elasticity: float = -1.2, base_conversion: float = 0.75):
+        self.elasticity = elasticity
+        self.base_conversion = base_conversion
+
+    def conversion_probability(self, price: np.ndarray, chunk: OrderChunk) -> np.ndarray:
+        """
+        Get the probability that each order converts at a price.
+
+        Args:
+            price: Offered price per order
+            chunk: Orders being priced
+
+        Returns:
+            Conversion probability per order
+        """
+        ratio = price / np.maximum(chunk.reference_price, 0.01)
+        return np.minimum(self.base_conversion * ratio ** self.elasticity, 1.0)
+
+
+class LogisticElasticityModel:
+    """
+    Logistic conversion curve around the reference price.
+
+    Users with a profile get a steeper curve the more price sensitive they
+    are; anonymous users use the base steepness.
+    """
+
+    def __init__(self, steepness: float = 4.0, midpoint: float = 1.15, max_conversion: float = 0.95):
+        self.steepness = steepness
+        self.midpoint = midpoint
+        self.max_conversion = max_conversion
+
+    def conversion_probability(self, price: np.ndarray, chunk: OrderChunk) -> np.ndarray:
+        """
+        Get the probability that each order converts at a price.
+
+        Args:
+            price: Offered price per order
+            chunk: Orders being priced
+
+        Returns:
+            Conversion probability per order
+        """
+        steepness = np.full(len(chunk), self.steepness)
+        profiles = chunk.user_profiles
+        if profiles is not None:
+            steepness = np.where(
+                profiles.has_profile,
+                self.steepness * (0.5 + profiles.price_sensitivity),
+                steepness
+            )
+        ratio = price / np.maximum(chunk.reference_price, 0.01)
+        return self.max_conversion / (1.0 + np.exp(steepness * (ratio - self.midpoint)))
+
+
+ELASTICITY_MODELS = {
+    "constant": ConstantElasticityModel,
+    "logistic": LogisticElasticityModel
+}
+
+
+class OrderCostModel:
+    """
+    Platform cost of serving a converted order.
+
+    cost = fixed_cost + payment_rate * price, i.e. card processing on the
+    full fare plus a flat per-order operating cost. The platform keeps its
+    fees, so an order's profit is its fees less this cost.
+    """
+
+    def __init__(self, payment_rate: float = 0.029, fixed_cost: float = 0.30):
+        self.payment_rate = payment_rate
+        self.fixed_cost = fixed_cost
+
+    def order_cost(self, price: np.ndarray, chunk: OrderChunk) -> np.ndarray:
+        """
+        Get the cost of each order if it converts.
+
+        Args:
+            price: Offered price per order
+            chunk: Orders being priced
+
+        Returns:
+            Cost per order
+        """
+        return self.fixed_cost + self.payment_rate * price
+
+
+@dataclass
+class StrategyResult:
+    """Expected outcome of a strategy over the replayed orders."""
+    strategy: str
+    orders: int = 0
+    conversions: float = 0.0
+    revenue: float = 0.0  # gross bookings of converted orders
+    fee_revenue: float = 0.0
+    profit: float = 0.0  # fee revenue less order costs
+    price_total: float = 0.0  # sum of offered prices, converted or not
+
+    @property
+    def conversion_rate(self) -> float:
+        return self.conversions / self.orders if self.orders else 0.0
+
+    @property
+    def margin(self) -> float:
+        # Platform profit per unit of gross bookings
+        return self.profit / self.revenue if self.revenue else 0.0
+
+    @property
+    def average_price(self) -> float:
+        return self.price_total / self.orders if self.orders else 0.0
+
+    def merge(self, other: "StrategyResult") -> None:
+        """Add another partial result for the same strategy."""
+        self.orders += other.orders
+        self.conversions += other.conversions
+        self.revenue += other.revenue
+        self.fee_revenue += other.fee_revenue
+        self.profit += other.profit
+        self.price_total += other.price_total
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            **asdict(self),
+            "conversion_rate": self.conversion_rate,
+            "margin": self.margin,
+            "average_price": self.average_price
+        }
+
+
+def synthetic_order_chunk(spec: SyntheticChunk) -> OrderChunk:
+    """
+    Generate a synthetic order chunk.
+
+    Orders share one market state per ``orders_per_market`` orders, as
+    orders in one zone and minute do. Reference prices are the base price
+    of the service scaled by market pressure and noise.
+
+    Args:
+        spec: Chunk recipe
+
+    Returns:
+        Order chunk
+    """
+    rng = np.random.default_rng(spec.seed)
+    size = spec.size
+    market_count = max(1, size // spec.orders_per_market)
+
+    demand = rng.beta(2.0, 2.0, market_count)
+    supply = rng.beta(2.0, 2.0, market_count)
+    service_names = np.array([service_type.value for service_type in ServiceType], dtype=object)
+    base_prices = ProfitOptimizationEngine().base_prices
+    competitor_pricing = {}
+    for name in service_names:
+        prices = base_prices[name] * rng.normal(1.0, 0.12, market_count)
+        prices[rng.random(market_count) < 0.3] = np.nan
+        competitor_pricing[name] = prices
+    markets = MarketConditionArrays(
+        demand_level=np.round(demand, 2),
+        supply_level=np.round(supply, 2),
+        time_of_day=rng.integers(0, 24, market_count).astype(np.float64),
+        day_of_week=rng.integers(0, 7, market_count).astype(np.float64),
+        is_holiday=(rng.random(market_count) < 0.03).astype(np.float64),
+        weather_impact=np.round(np.clip(rng.normal(0.0, 0.3, market_count), -1.0, 1.0), 2),
+        event_impact=np.round(np.where(rng.random(market_count) < 0.1, rng.random(market_count), 0.0), 2),
+        competitor_pricing=competitor_pricing
+    )
+
+    market_index = rng.integers(0, market_count, size)
+    service_code = rng.choice(len(service_names), size, p=[0.35, 0.15, 0.25, 0.12, 0.08, 0.05])
+    base = np.array([base_prices[name] for name in service_names])[service_code]
+    pressure = 1.0 + (demand[market_index] - supply[market_index]) * 0.4
+    reference_price = base * pressure * rng.lognormal(0.0, 0.15, size)
+
+    has_profile = rng.random(size) < spec.profile_share
+    user_profiles = UserProfileArrays(
+        has_profile=has_profile,
+        tier_index=rng.integers(-1, len(PremiumTier), size),
+        order_frequency=rng.gamma(2.0, 1.5, size),
+        churn_risk=rng.random(size),
+        monetization_propensity=rng.random(size),
+        price_sensitivity=rng.random(size),
+        loyalty_score=rng.random(size),
+        lifetime_value=rng.gamma(2.0, 150.0, size)
+    )
+    return OrderChunk(
+        service_types=service_names[service_code],
+        markets=markets,
+        market_index=market_index,
+        reference_price=reference_price,
+        user_profiles=user_profiles
+    )
+
+
+def order_chunks_from_frame(frame: pd.DataFrame, chunk_size: int = 500000) -> Iterator[OrderChunk]:
+    """
+    Split historical orders into chunks.
+
+    The frame needs service_type, order_value (used as the reference price)
+    and the MarketConditions fields as columns; competitor prices may be
+    given as ``competitor_price_<SERVICE_TYPE>`` columns. Every row is its
+    own market.
+
+    Args:
+        frame: Historical orders
+        chunk_size: Orders per chunk
+
+    Yields:
+        Order chunks
+    """
+    competitor_columns = [column for column in frame.columns if column.startswith("competitor_price_")]
+    for start in range(0, len(frame), chunk_size):
+        part = frame.iloc[start:start + chunk_size]
+        markets = MarketConditionArrays(
+            competitor_pricing={
+                column[len("competitor_price_"):]: part[column].to_numpy(dtype=np.float64)
+                for column in competitor_columns
+            },
+            **{name: part[name].to_numpy(dtype=np.float64) for name in MARKET_COLUMNS}
+        )
+        yield OrderChunk(
+            service_types=part["service_type"].to_numpy(dtype=object),
+            markets=markets,
+            market_index=np.arange(len(part)),
+            reference_price=part["order_value"].to_numpy(dtype=np.float64)
+        )
+
+
+def read_order_chunks(path: str, chunk_size: int = 500000) -> Iterator[OrderChunk]:
+    """
+    Stream historical orders from a CSV file in chunks.
+
+    Args:
+        path: CSV file with the columns order_chunks_from_frame expects
+        chunk_size: Orders per chunk
+
+    Yields:
+        Order chunks
+    """
+    for frame in pd.read_csv(path, chunksize=chunk_size):
+        yield from order_chunks_from_frame(frame, chunk_size)
+
+
+def fee_totals(optimizer: RevenueCaptureOptimizer, prices: np.ndarray, chunk: OrderChunk) -> np.ndarray:
+    """
+    Get the total fees of every order, as RevenueCaptureOptimizer.optimize_fees computes them.
+
+    Args:
+        optimizer: Fee optimizer
+        prices: Order values
+        chunk: Orders (for their market conditions)
+
+    Returns:
+        Total fees per order
+    """
+    markets = chunk.markets
+    is_peak = optimizer.peak_hour_mask(markets.time_of_day)
+    is_surge = optimizer.surge_mask(markets.demand_level, markets.supply_level)
+    fees = optimizer.fee_types
+    rate = (
+        fees["base_fee"] + fees["service_fee"] +
+        np.where(is_peak, fees["peak_fee"], 0.0) +
+        np.where(is_surge, fees["surge_fee"], 0.0)
+    )
+    return prices * rate[chunk.market_index]
+
+
+def evaluate_chunk(
+    chunk: Union[OrderChunk, SyntheticChunk],
+    strategies: Sequence[PricingStrategy],
+    elasticity_model,
+    cost_model=None
+) -> Dict[str, StrategyResult]:
+    """
+    Price one chunk under every strategy and total the expected outcome.
+
+    Args:
+        chunk: Orders, or a recipe for synthetic orders
+        strategies: Strategies to compare
+        elasticity_model: Object with conversion_probability(price, chunk)
+        cost_model: Object with order_cost(price, chunk) (defaults to OrderCostModel)
+
+    Returns:
+        Partial result per strategy name
+    """
+    cost_model = cost_model or OrderCostModel()
+    if isinstance(chunk, SyntheticChunk):
+        chunk = synthetic_order_chunk(chunk)
+    engine = ProfitOptimizationEngine()
+    optimizer = RevenueCaptureOptimizer()
+
+    results = {}
+    for strategy in strategies:
+        priced = engine.calculate_optimal_prices(
+            chunk.service_types,
+            chunk.markets,
+            chunk.market_index,
+            chunk.user_profiles,
+            weights=strategy.weights
+        )
+        price = priced.recommended_price
+        conversion = elasticity_model.conversion_probability(price, chunk)
+        fees = fee_totals(optimizer, price, chunk)
+        results[strategy.name] = StrategyResult(
+            strategy=strategy.name,
+            orders=len(chunk),
+            conversions=float(conversion.sum()),
+            revenue=float(np.dot(conversion, price)),
+            fee_revenue=float(np.dot(conversion, fees)),
+            profit=float(np.dot(conversion, fees - cost_model.order_cost(price, chunk))),
+            price_total=float(price.sum())
+        )
+    return results
+
+
+def run_backtest(
+    chunks: Iterable[Union[OrderChunk, SyntheticChunk]],
+    strategies: Sequence[PricingStrategy],
+    elasticity_model=None,
+    workers: Optional[int] = None,
+    cost_model=None
+) -> Dict[str, StrategyResult]:
+    """
+    Replay an order stream under several strategies.
+
+    Chunks are evaluated in a process pool with at most two chunks per
+    worker in flight, so a long historical stream is read as it is
+    consumed rather than loaded up front.
+
+    Args:
+        chunks: Order chunks or synthetic chunk recipes
+        strategies: Strategies to compare
+        elasticity_model: Conversion model (defaults to ConstantElasticityModel)
+        workers: Worker processes (defaults to the CPU count; 1 runs in-process)
+        cost_model: Order cost model (defaults to OrderCostModel)
+
+    Returns:
+        Result per strategy name
+    """
+    elasticity_model = elasticity_model or ConstantElasticityModel()
+    cost_model = cost_model or OrderCostModel()
+    workers = workers or os.cpu_count() or 1
+    totals = {strategy.name: StrategyResult(strategy=strategy.name) for strategy in strategies}
+
+    def merge(partial: Dict[str, StrategyResult]) -> None:
+        for name, result in partial.items():
+            totals[name].merge(result)
+
+    if workers == 1:
+        for chunk in chunks:
+            merge(evaluate_chunk(chunk, strategies, elasticity_model, cost_model))
+        return totals
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                merge(pending.popleft().result())
+            pending.append(pool.submit(evaluate_chunk, chunk, strategies, elasticity_model, cost_model))
+        while pending:
+            merge(pending.popleft().result())
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest pricing strategies on a synthetic or historical order stream")
+    parser.add_argument("--orders", type=int, default=10_000_000, help="Synthetic orders to replay")
+    parser.add_argument("--input", help="CSV of historical orders (replaces the synthetic stream)")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--elasticity", choices=sorted(ELASTICITY_MODELS), default="constant")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.input:
+        chunks = read_order_chunks(args.input, args.chunk_size)
+    else:
+        chunks = (
+            SyntheticChunk(size=min(args.chunk_size, args.orders - start), seed=args.seed + i)
+            for i, start in enumerate(range(0, args.orders, args.chunk_size))
+        )
+
+    started = time.perf_counter()
+    results = run_backtest(chunks, objective_strategies(), ELASTICITY_MODELS[args.elasticity](), args.workers)
+    elapsed = time.perf_counter() - started
+
+    orders = next(iter(results.values())).orders
+    print(f"{orders:,} orders x {len(results)} strategies in {elapsed:.1f}s ({orders / elapsed:,.0f} orders/s)")
+    print(f"{'strategy':<28} {'avg price':>10} {'conversion':>11} {'revenue':>15} {'fees':>13} {'profit':>13} {'margin':>7}")
+    for result in sorted(results.values(), key=lambda result: -result.revenue):
+        print(
+            f"{result.strategy:<28} {result.average_price:>10.2f} {result.conversion_rate:>11.2%} "
+            f"{result.revenue:>15,.0f} {result.fee_revenue:>13,.0f} {result.profit:>13,.0f} {result.margin:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,28 @@ Dashboard API for Profit Optimization Engine
 Provides real-time metrics, charts, alerts, and optimization recommendations
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
 import logging
+import numpy as np
+
+from metric_rollups import MetricRollupStore, RollupSeries
 
 logger = logging.getLogger(__name__)
 
+# Order aggregates behind the charts
+rollups = MetricRollupStore()
+
+# Chart label format per rollup resolution (UTC)
+LABEL_FORMATS = {
+    "minute": "%H:%M",
+    "hour": "%b %d %H:00",
+    "day": "%b %d"
+}
+
 
 # Pydantic models
 class MetricCard(BaseModel):
@@ -76,64 +89,69 @@ class DashboardResponse(BaseModel):
     optimizations: List[Optimization]
 
 
-# Mock data generators
-def generate_revenue_data() -> ChartData:
-    """Generate mock revenue chart data."""
-    labels = []
-    values = []
-    base_value = 100000
-    
-    for i in range(30):
-        date = datetime.now() - timedelta(days=29-i)
-        labels.append(date.strftime("%b %d"))
-        # Add some randomness and trend
-        value = base_value + (i * 1000) + random.uniform(-10000, 15000)
-        values.append(round(value, 2))
-    
-    return ChartData(labels=labels, values=values)
+class PricedOrderEvent(BaseModel):
+    """A priced order."""
+    service_type: str
+    price: float = Field(..., gt=0)
+    base_price: float = Field(..., gt=0)
+    timestamp: Optional[datetime] = Field(None, description="Pricing time (defaults to now)")
 
 
-def generate_margin_data() -> ChartData:
-    """Generate mock profit margin chart data."""
-    labels = []
-    values = []
-    
-    for i in range(30):
-        date = datetime.now() - timedelta(days=29-i)
-        labels.append(date.strftime("%b %d"))
-        # Margin between 25-35%
-        value = 25 + (i * 0.3) + random.uniform(-2, 2)
-        values.append(round(value, 2))
-    
-    return ChartData(labels=labels, values=values)
+class SettledOrderEvent(BaseModel):
+    """A settled order."""
+    service_type: str
+    order_value: float = Field(..., gt=0)
+    fees: float = Field(..., ge=0, description="Total fees")
+    dynamic_fees: float = Field(default=0.0, ge=0, description="Peak and surge fees")
+    timestamp: Optional[datetime] = Field(None, description="Settlement time (defaults to now)")
 
 
-def generate_optimization_data() -> ChartData:
-    """Generate mock optimization impact chart data."""
-    labels = ["Price Optimization", "Revenue Capture", "Resource Allocation", "User Monetization"]
-    values = [
-        random.uniform(25000, 35000),
-        random.uniform(15000, 25000),
-        random.uniform(10000, 20000),
-        random.uniform(5000, 15000)
-    ]
-    
-    return ChartData(labels=labels, values=values)
-
-
-def generate_service_data() -> ChartData:
-    """Generate mock service type revenue chart data."""
-    labels = ["RIDE", "MOTO", "FOOD", "GROCERY", "GOODS", "TRUCK_VAN"]
-    values = [
-        random.uniform(40000, 60000),
-        random.uniform(15000, 25000),
-        random.uniform(30000, 45000),
-        random.uniform(20000, 30000),
-        random.uniform(25000, 35000),
-        random.uniform(10000, 20000)
-    ]
-    
-    return ChartData(labels=labels, values=values)
+# Chart builders over rollup series
+def get_series(resolution: str = "day", periods: int = 30, max_points: Optional[int] = None) -> RollupSeries:
+    """Get rollup buckets, turning bad ranges into 400 responses."""
+    try:
+        return rollups.series(resolution, periods, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def series_labels(series: RollupSeries) -> List[str]:
+    """Format the start of each point for chart labels."""
+    label_format = LABEL_FORMATS[series.resolution]
+    return [datetime.fromtimestamp(start, tz=timezone.utc).strftime(label_format) for start in series.starts.tolist()]
+
+
+def build_revenue_data(series: RollupSeries) -> ChartData:
+    """Build revenue chart data."""
+    values = series.total("revenue")
+    return ChartData(labels=series_labels(series), values=np.round(values, 2).tolist())
+
+
+def build_margin_data(series: RollupSeries) -> ChartData:
+    """Build profit margin chart data (fees as a percentage of revenue)."""
+    revenue = series.total("revenue")
+    fees = series.total("fees")
+    margin = np.divide(fees * 100, revenue, out=np.zeros_like(revenue), where=revenue > 0)
+    return ChartData(labels=series_labels(series), values=np.round(margin, 2).tolist())
+
+
+def build_optimization_data(series: RollupSeries) -> ChartData:
+    """Build optimization impact chart data."""
+    return ChartData(
+        labels=["Price Optimization", "Revenue Capture"],
+        values=[
+            round(float(series.values["price_uplift"].sum()), 2),
+            round(float(series.values["dynamic_fees"].sum()), 2)
+        ]
+    )
+
+
+def build_service_data(series: RollupSeries) -> ChartData:
+    """Build service type revenue chart data."""
+    return ChartData(
+        labels=series.service_types,
+        values=np.round(series.values["revenue"].sum(axis=0), 2).tolist()
+    )
 
 
 def generate_alerts() -> List[Alert]:
@@ -264,11 +282,12 @@ async def get_dashboard_metrics():
     """
     try:
         metrics = generate_metrics()
+        series = get_series()
         charts = DashboardCharts(
-            revenue=generate_revenue_data(),
-            margin=generate_margin_data(),
-            optimization=generate_optimization_data(),
-            services=generate_service_data()
+            revenue=build_revenue_data(series),
+            margin=build_margin_data(series),
+            optimization=build_optimization_data(series),
+            services=build_service_data(series)
         )
         alerts = generate_alerts()
         optimizations = generate_optimizations()
@@ -404,28 +423,91 @@ async def get_optimization_details(optimization_id: str):
     }
 
 
+@app.post("/dashboard/events/priced")
+async def record_priced_orders(events: List[PricedOrderEvent]):
+    """
+    Record priced orders in the rollups.
+    
+    Args:
+        events: Priced orders
+        
+    Returns:
+        Number of orders recorded (orders of unknown service types are dropped)
+    """
+    now = datetime.now()
+    recorded = rollups.record_priced(
+        [event.service_type for event in events],
+        [(event.timestamp or now).timestamp() for event in events],
+        [event.price for event in events],
+        [event.base_price for event in events]
+    ) if events else 0
+    return {"recorded": recorded, "dropped": len(events) - recorded}
+
+
+@app.post("/dashboard/events/settled")
+async def record_settled_orders(events: List[SettledOrderEvent]):
+    """
+    Record settled orders in the rollups.
+    
+    Args:
+        events: Settled orders
+        
+    Returns:
+        Number of orders recorded (orders of unknown service types are dropped)
+    """
+    now = datetime.now()
+    recorded = rollups.record_settled(
+        [event.service_type for event in events],
+        [(event.timestamp or now).timestamp() for event in events],
+        [event.order_value for event in events],
+        [event.fees for event in events],
+        [event.dynamic_fees for event in events]
+    ) if events else 0
+    return {"recorded": recorded, "dropped": len(events) - recorded}
+
+
 @app.get("/dashboard/charts/revenue")
-async def get_revenue_chart():
+async def get_revenue_chart(
+    resolution: str = Query("day", description="minute, hour or day"),
+    periods: int = Query(30, ge=1, description="Number of buckets"),
+    max_points: Optional[int] = Query(None, ge=1, description="Merge adjacent buckets down to this many points")
+):
     """Get revenue chart data."""
-    return generate_revenue_data()
+    return build_revenue_data(get_series(resolution, periods, max_points))
 
 
 @app.get("/dashboard/charts/margin")
-async def get_margin_chart():
+async def get_margin_chart(
+    resolution: str = Query("day", description="minute, hour or day"),
+    periods: int = Query(30, ge=1, description="Number of buckets"),
+    max_points: Optional[int] = Query(None, ge=1, description="Merge adjacent buckets down to this many points")
+):
     """Get profit margin chart data."""
-    return generate_margin_data()
+    return build_margin_data(get_series(resolution, periods, max_points))
 
 
 @app.get("/dashboard/charts/optimization")
-async def get_optimization_chart():
+async def get_optimization_chart(
+    resolution: str = Query("day", description="minute, hour or day"),
+    periods: int = Query(30, ge=1, description="Number of buckets")
+):
     """Get optimization impact chart data."""
-    return generate_optimization_data()
+    return build_optimization_data(get_series(resolution, periods))
 
 
 @app.get("/dashboard/charts/services")
-async def get_services_chart():
+async def get_services_chart(
+    resolution: str = Query("day", description="minute, hour or day"),
+    periods: int = Query(30, ge=1, description="Number of buckets")
+):
     """Get service type revenue chart data."""
-    return generate_service_data()
+    return build_service_data(get_series(resolution, periods))
+
+
+@app.get("/dashboard/rollups/stats")
+async def get_rollup_stats():
+    """Get rollup store counters."""
+    return rollups.stats()
 
 
 @app.get("/health")
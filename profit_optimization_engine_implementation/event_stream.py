@@ -0,0 +1,170 @@
+"""
+Event Stream Consumer
+Feeds in-memory state stores from message topics
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class EventSink(Protocol):
+    """State updated from decoded event records, such as SurgeStateEngine or OrderFeatureStore."""
+
+    def ingest(self, topic: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Apply records from a topic and return how many were applied."""
+
+
+class KafkaSource:
+    """
+    Message source backed by kafka-python.
+
+    kafka-python is blocking and its consumer is not thread-safe, so every
+    call runs on one dedicated worker thread.
+    """
+
+    def __init__(self, topic: str, bootstrap_servers: str, group_id: str):
+        from kafka import KafkaConsumer
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"kafka-{topic}")
+        self._consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers.split(","),
+            group_id=group_id,
+            enable_auto_commit=False,
+            auto_offset_reset="latest"
+        )
+
+    async def getmany(self, max_records: int, timeout_seconds: float) -> List[bytes]:
+        records = await self._run(
+            self._consumer.poll,
+            timeout_ms=int(timeout_seconds * 1000),
+            max_records=max_records
+        )
+        return [record.value for partition in records.values() for record in partition]
+
+    async def commit(self) -> None:
+        await self._run(self._consumer.commit)
+
+    async def close(self) -> None:
+        await self._run(self._consumer.close)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+
+class EventStreamConsumer:
+    """
+    Feeds an EventSink from message sources, optionally publishing on an interval.
+
+    Each source is polled by its own loop and only needs ``getmany``,
+    ``commit`` and ``close`` coroutines. Payloads are decoded with
+    ``decode`` (JSON by default); undecodable or malformed payloads are
+    counted and dropped. All sink updates happen on the event loop thread.
+
+    With ``publish_interval_seconds`` set, the sink's ``publish`` method is
+    also called on that interval.
+    """
+
+    def __init__(
+        self,
+        sink: EventSink,
+        sources: Dict[str, Any],
+        decode: Callable[[bytes], Dict[str, Any]] = json.loads,
+        publish_interval_seconds: Optional[float] = None,
+        max_batch_size: int = 1000,
+        poll_timeout_seconds: float = 0.5
+    ):
+        """
+        Initialize the consumer.
+
+        Args:
+            sink: State to feed
+            sources: Message source per topic
+            decode: Decodes one payload into a record
+            publish_interval_seconds: Seconds between publishes (None disables publishing)
+            max_batch_size: Maximum messages per poll
+            poll_timeout_seconds: Poll wait when no messages are available
+        """
+        if publish_interval_seconds is not None and not callable(getattr(sink, "publish", None)):
+            raise ValueError(f"{type(sink).__name__} has no publish method")
+        self.sink = sink
+        self.sources = sources
+        self.decode = decode
+        self.publish_interval_seconds = publish_interval_seconds
+        self.max_batch_size = max_batch_size
+        self.poll_timeout_seconds = poll_timeout_seconds
+        self.metrics = {"messages_received": 0, "records_applied": 0, "dropped": 0, "publishes": 0}
+        self._tasks: List[asyncio.Task] = []
+
+    def process_batch(self, topic: str, payloads: List[bytes]) -> int:
+        """
+        Decode and apply one batch of raw messages from a topic.
+
+        Args:
+            topic: Topic the payloads came from
+            payloads: Raw messages
+
+        Returns:
+            Number of records applied
+        """
+        records = []
+        for payload in payloads:
+            try:
+                records.append(self.decode(payload))
+            except (ValueError, TypeError):
+                pass
+        applied = self.sink.ingest(topic, records)
+        self.metrics["messages_received"] += len(payloads)
+        self.metrics["records_applied"] += applied
+        self.metrics["dropped"] += len(payloads) - applied
+        return applied
+
+    async def start(self) -> None:
+        """Start the poll and publish loops in the background."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._poll_loop(topic, source))
+                for topic, source in self.sources.items()
+            ]
+            if self.publish_interval_seconds is not None:
+                self._tasks.append(asyncio.create_task(self._publish_loop()))
+
+    async def stop(self) -> None:
+        """Stop every loop and close the sources."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for source in self.sources.values():
+            await source.close()
+
+    async def _poll_loop(self, topic: str, source) -> None:
+        while True:
+            try:
+                payloads = await source.getmany(self.max_batch_size, self.poll_timeout_seconds)
+                if payloads:
+                    self.process_batch(topic, payloads)
+                    await source.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Polling {topic} for {type(self.sink).__name__} failed: {e}")
+                await asyncio.sleep(self.poll_timeout_seconds)
+
+    async def _publish_loop(self) -> None:
+        while True:
+            try:
+                self.sink.publish()
+                self.metrics["publishes"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Publishing {type(self.sink).__name__} failed: {e}")
+            await asyncio.sleep(self.publish_interval_seconds)
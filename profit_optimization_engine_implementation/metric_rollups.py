@@ -0,0 +1,314 @@
+"""
+Metric Rollups
+Per-minute, per-hour and per-day order aggregates in fixed-size ring buffers
+"""
+
+import math
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+# Aggregated per bucket and service type
+PRICED_METRICS = ("priced_orders", "price_uplift")
+SETTLED_METRICS = ("settled_orders", "revenue", "fees", "dynamic_fees")
+ROLLUP_METRICS = PRICED_METRICS + SETTLED_METRICS
+
+DEFAULT_SERVICE_TYPES = ("RIDE", "MOTO", "FOOD", "GROCERY", "GOODS", "TRUCK_VAN")
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """Bucket width and retention of one rollup level."""
+    name: str
+    bucket_seconds: int
+    capacity: int  # buckets kept
+
+
+DEFAULT_RESOLUTIONS = (
+    Resolution("minute", 60, 24 * 60),  # one day
+    Resolution("hour", 3600, 90 * 24),  # 90 days
+    Resolution("day", 86400, 2 * 365)  # two years
+)
+
+
+@dataclass
+class RollupSeries:
+    """Aggregates of consecutive buckets, oldest first."""
+    resolution: str
+    bucket_seconds: int  # width of one point after downsampling
+    starts: np.ndarray  # bucket start per point, seconds since the epoch
+    service_types: List[str]
+    values: Dict[str, np.ndarray]  # metric -> (points, service types)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def total(self, metric: str) -> np.ndarray:
+        """Sum a metric over service types, per point."""
+        return self.values[metric].sum(axis=1)
+
+
+class RollupRing:
+    """
+    Fixed-size ring of buckets for one resolution.
+
+    Slot ``bucket % capacity`` holds ``bucket``; each slot remembers which
+    bucket it holds, so stale slots are cleared when they are reused and
+    reads skip them without any periodic roll-forward.
+    """
+
+    def __init__(self, resolution: Resolution, service_count: int, metric_count: int):
+        self.resolution = resolution
+        self.values = np.zeros((resolution.capacity, service_count, metric_count), dtype=np.float64)
+        self.bucket_ids = np.full(resolution.capacity, -1, dtype=np.int64)
+        self.latest = -1
+        self.late_events = 0
+
+    def add(
+        self,
+        timestamps: np.ndarray,
+        service_index: np.ndarray,
+        metric_slice: slice,
+        amounts: np.ndarray
+    ) -> np.ndarray:
+        """
+        Add event amounts to their buckets.
+
+        Events older than the ring's retention are counted and dropped.
+
+        Args:
+            timestamps: Event times in seconds since the epoch, none in the future
+            service_index: Service type row per event
+            metric_slice: Metric columns the amounts belong to
+            amounts: (events, metrics) amounts
+
+        Returns:
+            Mask of the events that were added
+        """
+        capacity = self.resolution.capacity
+        buckets = (timestamps // self.resolution.bucket_seconds).astype(np.int64)
+        self.latest = max(self.latest, int(buckets.max()))
+
+        keep = buckets > self.latest - capacity
+        self.late_events += int(len(buckets) - keep.sum())
+        buckets = buckets[keep]
+        slots = buckets % capacity
+
+        # Claim each slot for the newest bucket mapped to it, clearing what it held
+        bucket_ids = self.bucket_ids.copy()
+        np.maximum.at(bucket_ids, slots, buckets)
+        reused = bucket_ids != self.bucket_ids
+        self.values[reused] = 0.0
+        self.bucket_ids = bucket_ids
+
+        np.add.at(self.values[:, :, metric_slice], (slots, service_index[keep]), amounts[keep])
+        return keep
+
+    def window(self, end_bucket: int, periods: int) -> np.ndarray:
+        """
+        Get the buckets ending at end_bucket.
+
+        Args:
+            end_bucket: Last bucket of the window
+            periods: Number of buckets, at most the ring's capacity
+
+        Returns:
+            (periods, service types, metrics) aggregates, zero for empty buckets
+        """
+        buckets = np.arange(end_bucket - periods + 1, end_bucket + 1, dtype=np.int64)
+        slots = buckets % self.resolution.capacity
+        present = self.bucket_ids[slots] == buckets
+        return np.where(present[:, None, None], self.values[slots], 0.0)
+
+
+class MetricRollupStore:
+    """
+    Order aggregates by service type at several resolutions.
+
+    Priced orders add to priced_orders and price_uplift (price above the
+    base price). Settled orders add to settled_orders, revenue, fees and
+    dynamic_fees (peak and surge fees). Every resolution keeps a fixed
+    number of buckets, so memory and query cost do not grow with history.
+
+    Event times after the clock are counted as now, so a bad timestamp
+    cannot move the rings past real time.
+    """
+
+    def __init__(
+        self,
+        service_types: Sequence[str] = DEFAULT_SERVICE_TYPES,
+        resolutions: Sequence[Resolution] = DEFAULT_RESOLUTIONS,
+        clock=time.time
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            service_types: Service types aggregated separately
+            resolutions: Rollup levels
+            clock: Returns the current time in seconds since the epoch
+        """
+        self.service_types = list(service_types)
+        self._service_index = pd.Index(self.service_types)
+        self.clock = clock
+        self.rings = {
+            resolution.name: RollupRing(resolution, len(self.service_types), len(ROLLUP_METRICS))
+            for resolution in resolutions
+        }
+        self.events = 0
+        self.unknown_service_events = 0
+        self.late_events = 0
+
+    def record_priced(
+        self,
+        service_types: Sequence[str],
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        base_prices: np.ndarray
+    ) -> int:
+        """
+        Add priced orders.
+
+        Args:
+            service_types: Service type per order
+            timestamps: Pricing time per order, seconds since the epoch
+            prices: Quoted price per order
+            base_prices: Base price per order
+
+        Returns:
+            Number of orders recorded at one resolution or more
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        amounts = np.column_stack((np.ones_like(prices), prices - np.asarray(base_prices, dtype=np.float64)))
+        return self._record(service_types, timestamps, PRICED_METRICS, amounts)
+
+    def record_settled(
+        self,
+        service_types: Sequence[str],
+        timestamps: np.ndarray,
+        order_values: np.ndarray,
+        fees: np.ndarray,
+        dynamic_fees: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Add settled orders.
+
+        Args:
+            service_types: Service type per order
+            timestamps: Settlement time per order, seconds since the epoch
+            order_values: Order value per order
+            fees: Total fees per order
+            dynamic_fees: Peak and surge fees per order (defaults to none)
+
+        Returns:
+            Number of orders recorded at one resolution or more
+        """
+        order_values = np.asarray(order_values, dtype=np.float64)
+        if dynamic_fees is None:
+            dynamic_fees = np.zeros_like(order_values)
+        amounts = np.column_stack((
+            np.ones_like(order_values),
+            order_values,
+            np.asarray(fees, dtype=np.float64),
+            np.asarray(dynamic_fees, dtype=np.float64)
+        ))
+        return self._record(service_types, timestamps, SETTLED_METRICS, amounts)
+
+    def series(
+        self,
+        resolution: str = "day",
+        periods: int = 30,
+        max_points: Optional[int] = None,
+        end: Optional[float] = None
+    ) -> RollupSeries:
+        """
+        Get the latest buckets of a resolution, optionally downsampled.
+
+        Args:
+            resolution: Rollup level name
+            periods: Number of buckets, at most the level's capacity
+            max_points: Merge adjacent buckets so at most this many points remain
+            end: Time inside the last bucket (defaults to now)
+
+        Returns:
+            Aggregates per point and service type
+        """
+        ring = self.rings.get(resolution)
+        if ring is None:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if not 1 <= periods <= ring.resolution.capacity:
+            raise ValueError(f"periods must be between 1 and {ring.resolution.capacity} for {resolution}")
+
+        bucket_seconds = ring.resolution.bucket_seconds
+        end_bucket = int((self.clock() if end is None else end) // bucket_seconds)
+        values = ring.window(end_bucket, periods)
+
+        factor = 1
+        if max_points is not None and periods > max_points:
+            # Sum groups of adjacent buckets; the oldest group may be partial
+            factor = math.ceil(periods / max_points)
+            points = math.ceil(periods / factor)
+            padding = points * factor - periods
+            values = np.concatenate((np.zeros((padding,) + values.shape[1:]), values))
+            values = values.reshape((points, factor) + values.shape[1:]).sum(axis=1)
+
+        starts = (end_bucket + 1 - factor * np.arange(len(values), 0, -1)) * bucket_seconds
+        starts[0] = max(starts[0], (end_bucket - periods + 1) * bucket_seconds)
+        return RollupSeries(
+            resolution=resolution,
+            bucket_seconds=bucket_seconds * factor,
+            starts=starts,
+            service_types=self.service_types,
+            values={metric: values[:, :, i] for i, metric in enumerate(ROLLUP_METRICS)}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store counters.
+
+        Returns:
+            Event counters and per-resolution retention
+        """
+        return {
+            "events": self.events,
+            "unknown_service_events": self.unknown_service_events,
+            "late_events": self.late_events,
+            "resolutions": {
+                name: {
+                    "bucket_seconds": ring.resolution.bucket_seconds,
+                    "capacity": ring.resolution.capacity,
+                    "latest_bucket_start": ring.latest * ring.resolution.bucket_seconds if ring.latest >= 0 else None,
+                    "late_events": ring.late_events
+                }
+                for name, ring in self.rings.items()
+            }
+        }
+
+    def _record(
+        self,
+        service_types: Sequence[str],
+        timestamps: np.ndarray,
+        metrics: Sequence[str],
+        amounts: np.ndarray
+    ) -> int:
+        service_index = self._service_index.get_indexer(pd.Index(service_types, dtype=object))
+        known = service_index >= 0
+        self.unknown_service_events += int(len(service_index) - known.sum())
+        if not known.any():
+            return 0
+
+        timestamps = np.minimum(np.asarray(timestamps, dtype=np.float64)[known], self.clock())
+        service_index = service_index[known]
+        amounts = amounts[known]
+        first = ROLLUP_METRICS.index(metrics[0])
+        metric_slice = slice(first, first + len(metrics))
+        added = np.zeros(len(timestamps), dtype=bool)
+        for ring in self.rings.values():
+            added |= ring.add(timestamps, service_index, metric_slice, amounts)
+
+        recorded = int(added.sum())
+        self.events += recorded
+        self.late_events += len(added) - recorded
+        return recorded
@@ -0,0 +1,157 @@
+"""
+Demand Multiplier Cache
+Bounded LRU/TTL memoization of demand multipliers keyed on quantized market conditions
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class VersionedDict(dict):
+    """
+    Dict that counts its mutations.
+
+    Lets a cache derived from the dict tell cheaply whether it changed,
+    including in-place edits such as ``base_prices["RIDE"] = 16.0``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self.version += 1
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.version += 1
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self.version += 1
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+
+class DemandMultiplierCache:
+    """
+    Bounded LRU cache with a time-to-live for demand multipliers.
+
+    Entries are keyed on quantized market inputs plus service type, so
+    every quote priced in the same zone and minute shares one entry.
+    Each lookup carries the current pricing config key; when it differs
+    from the key the entries were computed under, the whole cache is
+    dropped before the lookup.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries before the least recently used is evicted
+            ttl_seconds: Seconds an entry stays valid after it was computed
+            clock: Returns the current time in seconds
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._config_key: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, config_key: Any, compute: Callable[[], float]) -> float:
+        """
+        Get a cached multiplier, computing and storing it on a miss.
+
+        Args:
+            key: Quantized market inputs and service type
+            config_key: Current pricing config key (compared with ==)
+            compute: Computes the multiplier for ``key``
+
+        Returns:
+            Demand multiplier
+        """
+        if config_key != self._config_key:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._config_key = config_key
+
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if now < expires:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = (value, now + self.ttl_seconds)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+
+        Returns:
+            Size, limits and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,254 @@
+"""
+Order Feature Store
+Per-user order-history features maintained incrementally from order events
+"""
+
+import logging
+import time
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+ORDER_COMPLETED_TOPIC = "order.completed"
+
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class OrderFeatures:
+    """Order-history summary of one user."""
+    user_id: str
+    order_count: int
+    orders_by_window: Dict[int, int]  # window length in days -> orders in the window
+    avg_order_value: Optional[float]
+    last_order_at: Optional[datetime]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "order_count": self.order_count,
+            "orders_by_window": {f"{days}d": count for days, count in self.orders_by_window.items()},
+            "avg_order_value": self.avg_order_value,
+            "last_order_at": self.last_order_at.isoformat() if self.last_order_at else None
+        }
+
+
+class OrderFeatureStore:
+    """
+    Per-user order features, updated one order event at a time.
+
+    Each user owns a row of fixed-size columns: lifetime order count,
+    order value total, last order time, and a ring of daily order counts
+    covering the longest window. The ring is only rolled forward when an
+    order lands on a newer day, so reading a user's features touches at
+    most one ring's worth of slots however long their history is.
+
+    Windows are whole UTC days including the current one. Orders older
+    than the ring still count towards the lifetime totals.
+
+    Order events are delivered at least once, so recently seen order ids
+    are remembered and repeats are ignored. Order times after the clock
+    are counted as now, so a bad timestamp cannot roll a user's ring past
+    real time and wipe their recent days.
+    """
+
+    def __init__(
+        self,
+        window_days: Sequence[int] = (7, 30),
+        dedupe_size: int = 100000,
+        clock=time.time
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            window_days: Rolling window lengths in days
+            dedupe_size: Number of recent order ids remembered to drop redelivered events
+            clock: Returns the current time in seconds since the epoch
+        """
+        if not window_days or min(window_days) < 1:
+            raise ValueError("window_days must be positive")
+        self.window_days = tuple(sorted(set(int(days) for days in window_days)))
+        self.day_count = self.window_days[-1]
+        self.dedupe_size = dedupe_size
+        self.clock = clock
+
+        self._user_rows: Dict[str, int] = {}
+        capacity = 1024
+        self._daily = np.zeros((capacity, self.day_count), dtype=np.int32)
+        self._head_day = np.full(capacity, np.iinfo(np.int64).min // 2, dtype=np.int64)
+        self._order_count = np.zeros(capacity, dtype=np.int64)
+        self._value_total = np.zeros(capacity, dtype=np.float64)
+        self._valued_orders = np.zeros(capacity, dtype=np.int64)
+        self._last_order_at = np.full(capacity, np.nan, dtype=np.float64)
+
+        self._recent_orders: "OrderedDict[str, None]" = OrderedDict()
+        self.duplicates = 0
+        self.late_orders = 0
+
+    def __len__(self) -> int:
+        return len(self._user_rows)
+
+    def record_order(
+        self,
+        user_id: str,
+        event_time: float,
+        order_value: Optional[float] = None,
+        order_id: Optional[str] = None
+    ) -> bool:
+        """
+        Add one order to a user's features.
+
+        Args:
+            user_id: User identifier
+            event_time: Order time in seconds since the epoch
+            order_value: Order value, if known
+            order_id: Order identifier, used to drop redelivered events
+
+        Returns:
+            False if the order was already recorded
+        """
+        if order_id is not None:
+            if order_id in self._recent_orders:
+                self.duplicates += 1
+                return False
+            self._recent_orders[order_id] = None
+            if len(self._recent_orders) > self.dedupe_size:
+                self._recent_orders.popitem(last=False)
+
+        event_time = min(event_time, self.clock())
+        row = self._row(user_id)
+        self._order_count[row] += 1
+        if order_value is not None:
+            self._value_total[row] += order_value
+            self._valued_orders[row] += 1
+        if not event_time <= self._last_order_at[row]:
+            self._last_order_at[row] = event_time
+
+        day = int(event_time // SECONDS_PER_DAY)
+        head = int(self._head_day[row])
+        days = self.day_count
+        if day > head:
+            # Clear the slots of the days skipped since the last order
+            if day - head >= days:
+                self._daily[row] = 0
+            else:
+                self._daily[row, np.arange(head + 1, day + 1) % days] = 0
+            self._head_day[row] = head = day
+        if day > head - days:
+            self._daily[row, day % days] += 1
+        else:
+            self.late_orders += 1
+        return True
+
+    def features(self, user_id: str, now: Optional[float] = None) -> Optional[OrderFeatures]:
+        """
+        Get a user's order features.
+
+        Args:
+            user_id: User identifier
+            now: Current time in seconds since the epoch (defaults to the clock)
+
+        Returns:
+            Order features, or None for a user without recorded orders
+        """
+        row = self._user_rows.get(user_id)
+        if row is None:
+            return None
+        today = int((self.clock() if now is None else now) // SECONDS_PER_DAY)
+        head = int(self._head_day[row])
+        days = self.day_count
+
+        orders_by_window = {}
+        for window in self.window_days:
+            first = max(today - window + 1, head - days + 1)
+            last = min(today, head)
+            orders_by_window[window] = (
+                int(self._daily[row, np.arange(first, last + 1) % days].sum()) if last >= first else 0
+            )
+
+        valued = int(self._valued_orders[row])
+        return OrderFeatures(
+            user_id=user_id,
+            order_count=int(self._order_count[row]),
+            orders_by_window=orders_by_window,
+            avg_order_value=float(self._value_total[row] / valued) if valued else None,
+            last_order_at=datetime.fromtimestamp(float(self._last_order_at[row]))
+        )
+
+    def ingest(self, topic: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply decoded order events.
+
+        Records missing a required field, and redelivered orders, are skipped.
+
+        Args:
+            topic: ORDER_COMPLETED_TOPIC
+            records: order.completed records (user_id, completed_at or event_timestamp in ms, final_fare, order_id)
+
+        Returns:
+            Number of records applied
+        """
+        if topic != ORDER_COMPLETED_TOPIC:
+            raise ValueError(f"Unsupported topic: {topic}")
+        applied = 0
+        for record in records:
+            try:
+                event_time = record.get("completed_at") or record["event_timestamp"]
+                fare = record.get("final_fare")
+                recorded = self.record_order(
+                    str(record["user_id"]),
+                    event_time / 1000.0,
+                    float(fare) if fare is not None else None,
+                    record.get("order_id")
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping malformed {topic} record: {e!r}")
+                continue
+            applied += recorded
+        return applied
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store counters.
+
+        Returns:
+            User, dedupe and window counters
+        """
+        return {
+            "users": len(self._user_rows),
+            "window_days": list(self.window_days),
+            "remembered_order_ids": len(self._recent_orders),
+            "duplicates": self.duplicates,
+            "late_orders": self.late_orders
+        }
+
+    def _row(self, user_id: str) -> int:
+        row = self._user_rows.get(user_id)
+        if row is None:
+            row = len(self._user_rows)
+            if row == len(self._order_count):
+                self._grow()
+            self._user_rows[user_id] = row
+        return row
+
+    def _grow(self) -> None:
+        capacity = len(self._order_count) * 2
+        daily = np.zeros((capacity, self.day_count), dtype=self._daily.dtype)
+        daily[:len(self._daily)] = self._daily
+        self._daily = daily
+        for name, fill in (
+            ("_head_day", np.iinfo(np.int64).min // 2),
+            ("_order_count", 0),
+            ("_value_total", 0.0),
+            ("_valued_orders", 0),
+            ("_last_order_at", np.nan)
+        ):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
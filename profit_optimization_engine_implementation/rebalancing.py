@@ -0,0 +1,454 @@
+"""
+Fleet Rebalancing
+Min-cost flow repositioning of drivers across zones and service types
+"""
+
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra, maximum_flow
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+Zone = Union[str, Tuple[int, int]]
+
+# Drivers may switch between these service types in addition to repositioning;
+# the value is the extra cost of switching, in ring units
+DEFAULT_SWITCH_COSTS = {
+    ("FOOD", "GROCERY"): 1,
+    ("GROCERY", "FOOD"): 1,
+    ("FOOD", "GOODS"): 1,
+    ("GOODS", "FOOD"): 1,
+    ("GROCERY", "GOODS"): 1,
+    ("GOODS", "GROCERY"): 1,
+    ("RIDE", "MOTO"): 2,
+    ("MOTO", "RIDE"): 2
+}
+
+# Offsets that pack (row, column, service) into one int64 key
+_COORDINATE_BITS = 24
+_COORDINATE_OFFSET = 1 << (_COORDINATE_BITS - 1)
+_SERVICE_BITS = 6
+
+# Node keys add the node kind above the packed (row, column, service)
+_KIND_SHIFT = 2 * _COORDINATE_BITS + _SERVICE_BITS
+_SURPLUS, _DEFICIT, _IDLE, _UNMET = range(4)
+
+
+def parse_zone(zone: Zone) -> Tuple[int, int]:
+    """
+    Get the grid cell of a zone.
+
+    Args:
+        zone: "<row>:<column>" zone id (as published by SurgeStateEngine) or a (row, column) pair
+
+    Returns:
+        (row, column)
+    """
+    if isinstance(zone, str):
+        row, column = zone.split(":")
+        return int(row), int(column)
+    return int(zone[0]), int(zone[1])
+
+
+def _pack(rows: np.ndarray, columns: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    return (
+        ((rows + _COORDINATE_OFFSET) << (_COORDINATE_BITS + _SERVICE_BITS)) |
+        ((columns + _COORDINATE_OFFSET) << _SERVICE_BITS) |
+        codes
+    )
+
+
+@dataclass
+class RebalancePlan:
+    """Driver moves that serve forecast demand at the least reposition cost."""
+    moves: List[Dict[str, Any]]
+    drivers_moved: int
+    unmet_demand: int
+    idle_drivers: int
+    reposition_cost: int
+    phases: int
+    warm_started: bool
+    solve_ms: float
+    unmet_by_zone: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "moves": self.moves,
+            "drivers_moved": self.drivers_moved,
+            "unmet_demand": self.unmet_demand,
+            "idle_drivers": self.idle_drivers,
+            "reposition_cost": self.reposition_cost,
+            "phases": self.phases,
+            "warm_started": self.warm_started,
+            "solve_ms": self.solve_ms,
+            "unmet_by_zone": self.unmet_by_zone
+        }
+
+
+class FleetRebalancer:
+    """
+    Moves idle drivers towards forecast demand by solving a min-cost flow.
+
+    Supply and demand are first netted inside each (zone, service type):
+    local drivers serve local demand at no cost. What remains are surplus
+    nodes and deficit nodes, joined by an arc wherever a driver could move
+    (within ``max_rings`` grid rings, optionally switching service type)
+    at ``ring_cost`` per ring plus the switch cost. Two dummy nodes make the
+    problem balanced: surplus drivers may stay idle at no cost and deficit
+    demand may go unmet at ``unmet_penalty``, so a move is only made when
+    it costs less than leaving the demand unserved.
+
+    The flow is solved with the primal-dual method over a pseudoflow with
+    node potentials, starting from every surplus driver idle; the shortest
+    path and maximum flow steps run in scipy.sparse.csgraph, so only array
+    work is left in Python. The flows and potentials of the last solution
+    are kept, so the next solve (a minute later, with slightly different
+    counts) starts from them and only repairs the imbalances that changed.
+    """
+
+    def __init__(
+        self,
+        max_rings: int = 2,
+        ring_cost: int = 1,
+        unmet_penalty: int = 4,
+        switch_costs: Optional[Mapping[Tuple[str, str], int]] = None
+    ):
+        """
+        Initialize the rebalancer.
+
+        Args:
+            max_rings: Largest move, in grid rings (Chebyshev distance)
+            ring_cost: Cost of moving a driver one ring
+            unmet_penalty: Cost of leaving one unit of demand unserved
+            switch_costs: Extra cost per (from_service, to_service) switch allowed
+        """
+        if max_rings < 0 or ring_cost <= 0 or unmet_penalty <= 0:
+            raise ValueError("max_rings must be non-negative and costs positive")
+        self.max_rings = max_rings
+        self.ring_cost = ring_cost
+        self.unmet_penalty = unmet_penalty
+        self.switch_costs = dict(DEFAULT_SWITCH_COSTS if switch_costs is None else switch_costs)
+        self._solved_config: Any = None
+        self.reset()
+
+    def config_key(self) -> Tuple:
+        """Key that changes whenever a setting that affects arc costs changes."""
+        return (self.max_rings, self.ring_cost, self.unmet_penalty, tuple(sorted(self.switch_costs.items())))
+
+    def reset(self) -> None:
+        """Forget the previous solution, so the next solve starts cold."""
+        empty = np.zeros(0, dtype=np.int64)
+        # Sorted node keys with their potentials, and the arcs with flow as
+        # (tail rank << 32 | head rank) over those sorted keys
+        self._node_keys = empty
+        self._potentials = empty
+        self._arc_keys = empty
+        self._flows = empty
+
+    def solve(
+        self,
+        available: Mapping[Zone, Mapping[str, int]],
+        demand: Mapping[Zone, Mapping[str, int]],
+        warm_start: bool = True
+    ) -> RebalancePlan:
+        """
+        Plan driver moves for the current supply and demand forecast.
+
+        Args:
+            available: Idle drivers per zone and service type
+            demand: Forecast demand per zone and service type
+            warm_start: Start from the previous solution
+
+        Returns:
+            Rebalance plan
+        """
+        started = time.perf_counter()
+        services = sorted(
+            {service for counts in available.values() for service in counts} |
+            {service for counts in demand.values() for service in counts} |
+            {service for pair in self.switch_costs for service in pair}
+        )
+        if len(services) >= 1 << _SERVICE_BITS:
+            raise ValueError("Too many service types")
+        service_code = {service: code for code, service in enumerate(services)}
+
+        # Net supply against demand inside each (zone, service type)
+        net: Dict[Tuple[int, int, int], int] = {}
+        zone_ids: Dict[Tuple[int, int], str] = {}
+        for sign, counts_by_zone in ((1, available), (-1, demand)):
+            for zone, counts in counts_by_zone.items():
+                cell = parse_zone(zone)
+                zone_ids.setdefault(cell, zone if isinstance(zone, str) else f"{cell[0]}:{cell[1]}")
+                for service, count in counts.items():
+                    if count < 0:
+                        raise ValueError("Counts must be non-negative")
+                    key = (cell[0], cell[1], service_code[service])
+                    net[key] = net.get(key, 0) + sign * int(count)
+
+        keys = np.array(list(net), dtype=np.int64).reshape(-1, 3)
+        amounts = np.array(list(net.values()), dtype=np.int64)
+        surplus = keys[amounts > 0]
+        deficit = keys[amounts < 0]
+        tails, heads, costs = self._arcs(surplus, deficit, services)
+
+        n_surplus = len(surplus)
+        n_deficit = len(deficit)
+        idle_node = n_surplus + n_deficit
+        unmet_node = idle_node + 1
+        node_count = unmet_node + 1
+        node_keys = np.concatenate([
+            _pack(surplus[:, 0], surplus[:, 1], surplus[:, 2]) | (_SURPLUS << _KIND_SHIFT),
+            _pack(deficit[:, 0], deficit[:, 1], deficit[:, 2]) | (_DEFICIT << _KIND_SHIFT),
+            np.array([_IDLE << _KIND_SHIFT, _UNMET << _KIND_SHIFT], dtype=np.int64)
+        ])
+
+        # Real moves, then every surplus -> idle, unmet -> every deficit, unmet -> idle
+        surplus_nodes = np.arange(n_surplus, dtype=np.int64)
+        deficit_nodes = np.arange(n_surplus, idle_node, dtype=np.int64)
+        tail = np.concatenate([tails, surplus_nodes, np.full(n_deficit + 1, unmet_node, dtype=np.int64)])
+        head = np.concatenate([
+            heads + n_surplus, np.full(n_surplus, idle_node, dtype=np.int64), deficit_nodes, [idle_node]
+        ])
+        cost = np.concatenate([
+            costs, np.zeros(n_surplus, dtype=np.int64),
+            np.full(n_deficit, self.unmet_penalty, dtype=np.int64), [0]
+        ])
+        move_arcs = len(tails)
+
+        excess = np.concatenate([amounts[amounts > 0], amounts[amounts < 0], [0, 0]])
+        excess[idle_node] = -excess[:n_surplus].sum()
+        excess[unmet_node] = -excess[n_surplus:idle_node].sum()
+        flow = np.zeros(len(tail), dtype=np.int64)
+        potential = np.zeros(node_count, dtype=np.int64)
+
+        # A previous solution is only optimal for the arc costs it was solved with
+        config_key = self.config_key()
+        warm_started = warm_start and bool(len(self._node_keys)) and config_key == self._solved_config
+        if warm_started:
+            self._warm_start(node_keys, tail, head, cost, flow, excess, potential, n_surplus, n_deficit)
+        else:
+            # Start with every surplus driver idle: zero-cost arcs, so all potentials can start at zero
+            flow[move_arcs:move_arcs + n_surplus] = excess[:n_surplus]
+            excess[:n_surplus] = 0
+            excess[idle_node] = 0
+
+        phases = self._primal_dual(node_count, tail, head, cost, flow, excess, potential)
+
+        # Keep the solution for the next warm start
+        order = np.argsort(node_keys)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(node_count)
+        carrying = np.flatnonzero(flow)
+        arc_keys = (rank[tail[carrying]] << 32) | rank[head[carrying]]
+        arc_order = np.argsort(arc_keys)
+        self._solved_config = config_key
+        self._node_keys = node_keys[order]
+        self._potentials = potential[order]
+        self._arc_keys = arc_keys[arc_order]
+        self._flows = flow[carrying[arc_order]]
+
+        moves = []
+        used = np.flatnonzero(flow[:move_arcs])
+        for (row, column, code), (to_row, to_column, to_code), drivers, arc_cost in zip(
+            surplus[tail[used]].tolist(),
+            deficit[head[used] - n_surplus].tolist(),
+            flow[used].tolist(),
+            cost[used].tolist()
+        ):
+            moves.append({
+                "from_zone": zone_ids[(row, column)],
+                "to_zone": zone_ids[(to_row, to_column)],
+                "from_service": services[code],
+                "to_service": services[to_code],
+                "drivers": drivers,
+                "cost": arc_cost
+            })
+
+        unmet_by_zone: Dict[str, Dict[str, int]] = {}
+        unmet_flows = flow[move_arcs + n_surplus:move_arcs + n_surplus + n_deficit]
+        unmet = np.flatnonzero(unmet_flows)
+        for (row, column, code), drivers in zip(deficit[unmet].tolist(), unmet_flows[unmet].tolist()):
+            unmet_by_zone.setdefault(zone_ids[(row, column)], {})[services[code]] = drivers
+
+        return RebalancePlan(
+            moves=moves,
+            drivers_moved=int(flow[used].sum()),
+            unmet_demand=int(unmet_flows.sum()),
+            idle_drivers=int(flow[move_arcs:move_arcs + n_surplus].sum()),
+            reposition_cost=int(flow[used] @ cost[used]),
+            phases=phases,
+            warm_started=warm_started,
+            solve_ms=(time.perf_counter() - started) * 1000,
+            unmet_by_zone=unmet_by_zone
+        )
+
+    def _arcs(self, surplus: np.ndarray, deficit: np.ndarray, services: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find every allowed move from a surplus node to a deficit node.
+
+        Deficit nodes are packed into sorted int64 keys; for each ring
+        offset and service pair, the keys the surplus nodes could reach are
+        looked up with one searchsorted.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(surplus) or not len(deficit):
+            return empty, empty, empty
+
+        deficit_keys = _pack(deficit[:, 0], deficit[:, 1], deficit[:, 2])
+        order = np.argsort(deficit_keys)
+        sorted_keys = deficit_keys[order]
+
+        service_code = {service: code for code, service in enumerate(services)}
+        transitions = [(code, code, 0) for code in range(len(services))] + [
+            (service_code[source], service_code[target], extra)
+            for (source, target), extra in self.switch_costs.items()
+        ]
+
+        tails, heads, costs = [], [], []
+        for source_code, target_code, extra in transitions:
+            movable = np.flatnonzero(surplus[:, 2] == source_code)
+            if not len(movable):
+                continue
+            rows = surplus[movable, 0]
+            columns = surplus[movable, 1]
+            for d_row in range(-self.max_rings, self.max_rings + 1):
+                for d_column in range(-self.max_rings, self.max_rings + 1):
+                    wanted = _pack(rows + d_row, columns + d_column, target_code)
+                    positions = np.minimum(np.searchsorted(sorted_keys, wanted), len(sorted_keys) - 1)
+                    found = sorted_keys[positions] == wanted
+                    if found.any():
+                        rings = max(abs(d_row), abs(d_column))
+                        tails.append(movable[found])
+                        heads.append(order[positions[found]])
+                        costs.append(np.full(int(found.sum()), rings * self.ring_cost + extra, dtype=np.int64))
+        if not tails:
+            return empty, empty, empty
+        return np.concatenate(tails), np.concatenate(heads), np.concatenate(costs)
+
+    def _warm_start(self, node_keys, tail, head, cost, flow, excess, potential, n_surplus, n_deficit) -> None:
+        """
+        Restore the previous flows and potentials on the nodes and arcs that still exist.
+
+        Reduced costs stay non-negative on every residual arc: restored
+        arcs kept their costs, new nodes get potentials just inside the
+        bounds their arcs impose, and flows are only ever lowered. Flows
+        are lowered until no node sends more than it has or receives more
+        than it needs, which leaves a small cold start: unrouted drivers
+        and unserved demand.
+        """
+        node_count = len(node_keys)
+        idle_node = n_surplus + n_deficit
+        move_arcs = len(tail) - n_surplus - n_deficit - 1
+
+        previous = np.minimum(np.searchsorted(self._node_keys, node_keys), len(self._node_keys) - 1)
+        known = self._node_keys[previous] == node_keys
+        potential[known] = self._potentials[previous[known]]
+
+        # Only arcs between two known nodes can have carried flow
+        if len(self._arc_keys):
+            restorable = np.flatnonzero(known[tail] & known[head])
+            arc_keys = (previous[tail[restorable]] << 32) | previous[head[restorable]]
+            positions = np.minimum(np.searchsorted(self._arc_keys, arc_keys), len(self._arc_keys) - 1)
+            found = self._arc_keys[positions] == arc_keys
+            restored = restorable[found]
+            flow[restored] = self._flows[positions[found]]
+            excess -= np.bincount(tail[restored], flow[restored], node_count).astype(np.int64)
+            excess += np.bincount(head[restored], flow[restored], node_count).astype(np.int64)
+
+        # New surplus nodes first (bounded by known deficits and the idle node), then new deficits
+        new_surplus = np.flatnonzero(~known[:n_surplus])
+        if len(new_surplus):
+            bounded = np.flatnonzero(~known[tail] & known[head] & (tail < n_surplus))
+            bound = np.full(node_count, np.iinfo(np.int64).min)
+            np.maximum.at(bound, tail[bounded], potential[head[bounded]] - cost[bounded])
+            potential[new_surplus] = bound[new_surplus]
+            # Idling is already a cheapest use of these drivers
+            idling = new_surplus[potential[new_surplus] == potential[idle_node]]
+            flow[move_arcs + idling] += excess[idling]
+            excess[idle_node] += excess[idling].sum()
+            excess[idling] = 0
+        new_deficit = n_surplus + np.flatnonzero(~known[n_surplus:idle_node])
+        if len(new_deficit):
+            bounded = np.flatnonzero(~known[head])
+            bound = np.full(node_count, np.iinfo(np.int64).max)
+            np.minimum.at(bound, head[bounded], cost[bounded] + potential[tail[bounded]])
+            potential[new_deficit] = bound[new_deficit]
+
+        # Surplus nodes and the unmet node only send; deficit nodes and the idle node only receive.
+        # Arcs are lowered from the last, so dummy arcs are lowered before moves.
+        for ends, sign in ((tail, -1), (head, 1)):
+            arcs = np.flatnonzero((flow > 0) & (sign * excess[ends] > 0))
+            if not len(arcs):
+                continue
+            arcs = arcs[np.lexsort((-arcs, ends[arcs]))]
+            owner = ends[arcs]
+            carried = flow[arcs]
+            # Flow on the owner's arcs lowered before this one
+            before = np.cumsum(carried) - carried
+            first = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+            before -= np.repeat(before[first], np.diff(np.r_[first, len(arcs)]))
+            lowered = np.clip(sign * excess[owner] - before, 0, carried)
+            flow[arcs] -= lowered
+            excess += np.bincount(tail[arcs], lowered, node_count).astype(np.int64)
+            excess -= np.bincount(head[arcs], lowered, node_count).astype(np.int64)
+
+    @staticmethod
+    def _primal_dual(node_count, tail, head, cost, flow, excess, potential) -> int:
+        """
+        Route every excess to a deficit along cheapest paths.
+
+        Each phase runs one multi-source Dijkstra over reduced costs, raises
+        the potentials so every cheapest path has zero reduced cost, and
+        then pushes a maximum flow (Dinic) from a super source to a super
+        sink through the zero reduced cost arcs. The number of phases is
+        the number of distinct path costs, not the number of paths.
+
+        Returns:
+            Number of phases
+        """
+        source_node = node_count
+        sink_node = node_count + 1
+        phases = 0
+        while True:
+            sources = np.flatnonzero(excess > 0)
+            if not len(sources):
+                return phases
+            phases += 1
+
+            # Forward arcs are uncapacitated; backward use needs flow on the arc, whose
+            # reduced cost is then zero both ways
+            reduced = cost + potential[tail] - potential[head]
+            used = np.flatnonzero(flow)
+            residual = csr_matrix(
+                (np.r_[reduced, -reduced[used]].astype(float), (np.r_[tail, head[used]], np.r_[head, tail[used]])),
+                shape=(node_count, node_count)
+            )
+            dist = dijkstra(residual, indices=sources, min_only=True)
+            deficits = np.flatnonzero(excess < 0)
+            reach = dist[deficits].min()
+            if reach == np.inf:
+                raise RuntimeError("Excess left with no path to a deficit")
+            potential += np.minimum(dist, reach).astype(np.int64)
+
+            tight = np.flatnonzero(cost + potential[tail] == potential[head])
+            backward = tight[flow[tight] > 0]
+            total = int(excess[sources].sum())
+            capacity = csr_matrix(
+                (
+                    np.r_[
+                        np.full(len(tight), total), flow[backward], excess[sources], -excess[deficits]
+                    ].astype(np.int32),
+                    (
+                        np.r_[tail[tight], head[backward], np.full(len(sources), source_node), deficits],
+                        np.r_[head[tight], tail[backward], sources, np.full(len(deficits), sink_node)]
+                    )
+                ),
+                shape=(node_count + 2, node_count + 2)
+            )
+            pushed = maximum_flow(capacity, source_node, sink_node, method="dinic").flow
+            # Net flow along each tight arc, forward minus backward
+            moved = np.asarray(pushed[tail[tight], head[tight]]).ravel().astype(np.int64)
+            flow[tight] += moved
+            excess -= np.bincount(tail[tight], moved, node_count).astype(np.int64)
+            excess += np.bincount(head[tight], moved, node_count).astype(np.int64)
@@ -0,0 +1,369 @@
+"""
+Surge State Engine
+Per-zone demand/supply state computed from order and driver location events
+"""
+
+import logging
+import math
+import time
+import numpy as np
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED_TOPIC = "order.created"
+DRIVER_LOCATION_TOPIC = "identity.driver.location.updated"
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+@dataclass
+class ZoneSurge:
+    """Published surge state of one zone."""
+    zone_id: str
+    demand_level: float  # 0-1 scale, 0.5 when demand matches supply
+    supply_level: float  # 0-1 scale, 0.5 when demand matches supply
+    demand_supply_ratio: float  # smoothed orders per available driver, 1.0 = balanced
+    surge_multiplier: float
+    orders: int  # orders created in the window
+    available_drivers: float  # average available drivers over the window
+    updated_at: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SurgeStateEngine:
+    """
+    Rolling demand and supply per geo cell, published as smoothed surge state.
+
+    Time is cut into buckets of ``bucket_seconds``; each zone owns one slot
+    per bucket of the window in two ring buffers, stored as rows of a
+    (zones x buckets) array. Order events add to the demand slot of their
+    bucket. Supply is the number of available drivers whose latest position
+    is in the zone, sampled into the supply slot as buckets roll over.
+
+    ``publish`` computes every zone's demand/supply ratio over the window
+    in a few array operations, smooths it with an exponential moving
+    average across publishes and swaps in a new dict of ZoneSurge values.
+    Readers only ever see a complete published dict, so the pricing path
+    can look a zone up per request without recomputing anything.
+
+    Order counts are scaled up to a full window while the engine has run
+    for less than one, so nothing is published until ``min_window_fraction``
+    of the window has elapsed; extrapolating a few seconds of orders would
+    put every zone at the surge cap after each restart.
+    """
+
+    def __init__(
+        self,
+        cell_size_km: float = 1.0,
+        window_seconds: float = 300.0,
+        bucket_seconds: float = 10.0,
+        orders_per_driver: float = 1.0,
+        smoothing: float = 0.3,
+        surge_sensitivity: float = 0.5,
+        max_surge_multiplier: float = 3.0,
+        driver_ttl_seconds: float = 60.0,
+        min_window_fraction: float = 0.5,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            cell_size_km: Approximate zone edge length
+            window_seconds: Rolling window length
+            bucket_seconds: Ring buffer slot length
+            orders_per_driver: Orders per available driver per window that count as balanced
+            smoothing: EWMA weight of the newest ratio (1.0 disables smoothing)
+            surge_sensitivity: Surge multiplier increase per unit of ratio above 1.0
+            max_surge_multiplier: Upper bound of the surge multiplier
+            driver_ttl_seconds: Drivers without a location update for this long stop counting as supply
+            min_window_fraction: Share of the window that must have elapsed since startup before publishing
+            clock: Returns the current time in seconds since the epoch
+        """
+        if cell_size_km <= 0:
+            raise ValueError("cell_size_km must be positive")
+        if bucket_seconds <= 0 or window_seconds < bucket_seconds:
+            raise ValueError("window_seconds must be at least one positive bucket_seconds")
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1]")
+        if not 0 < min_window_fraction <= 1:
+            raise ValueError("min_window_fraction must be in (0, 1]")
+
+        self.cell_size_km = cell_size_km
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = int(math.ceil(window_seconds / bucket_seconds))
+        self.window_seconds = self.bucket_count * bucket_seconds
+        self.min_buckets = int(math.ceil(self.bucket_count * min_window_fraction))
+        self.orders_per_driver = orders_per_driver
+        self.smoothing = smoothing
+        self.surge_sensitivity = surge_sensitivity
+        self.max_surge_multiplier = max_surge_multiplier
+        self.driver_ttl_seconds = driver_ttl_seconds
+        self.clock = clock
+        self._cell_deg = cell_size_km / KM_PER_DEGREE_LAT
+
+        self._zone_rows: Dict[str, int] = {}
+        self._zone_ids: List[str] = []
+        capacity = 64
+        self._demand = np.zeros((capacity, self.bucket_count), dtype=np.int32)
+        self._supply = np.zeros((capacity, self.bucket_count), dtype=np.float32)
+        self._supply_now = np.zeros(capacity, dtype=np.int32)
+        self._smoothed = np.zeros(capacity, dtype=np.float64)
+        self._seen = np.zeros(capacity, dtype=bool)
+
+        # Zone row of each available driver, and the latest update time of every driver
+        self._drivers: Dict[str, int] = {}
+        self._driver_times: Dict[str, float] = {}
+        self._bucket: Optional[int] = None
+        self._buckets_elapsed = 0
+        self.published: Dict[str, ZoneSurge] = {}
+        self.published_at: Optional[float] = None
+
+    def zone_for(self, latitude: float, longitude: float) -> str:
+        """
+        Get the zone containing a coordinate.
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+
+        Returns:
+            Zone id ("<row>:<column>" of the grid cell)
+        """
+        return f"{math.floor(latitude / self._cell_deg)}:{math.floor(longitude / self._cell_deg)}"
+
+    def zone(self, zone_id: str) -> Optional[ZoneSurge]:
+        """
+        Get the published state of a zone.
+
+        Args:
+            zone_id: Zone id
+
+        Returns:
+            Published state, or None if the zone has not been published
+        """
+        return self.published.get(zone_id)
+
+    def record_order(self, latitude: float, longitude: float, event_time: float) -> None:
+        """
+        Count an order created at a pickup location.
+
+        Args:
+            latitude: Pickup latitude
+            longitude: Pickup longitude
+            event_time: Order creation time in seconds since the epoch
+        """
+        current = self.advance()
+        bucket = min(int(event_time // self.bucket_seconds), current)
+        if bucket <= current - self.bucket_count:
+            return  # Older than the window
+        row = self._row(self.zone_for(latitude, longitude))
+        self._demand[row, bucket % self.bucket_count] += 1
+
+    def record_driver(
+        self,
+        driver_id: str,
+        latitude: float,
+        longitude: float,
+        is_available: bool,
+        event_time: float
+    ) -> None:
+        """
+        Apply a driver location update to zone supply.
+
+        Args:
+            driver_id: Driver identifier
+            latitude: Driver latitude
+            longitude: Driver longitude
+            is_available: Whether the driver can take orders
+            event_time: Update time in seconds since the epoch
+        """
+        if event_time < self._driver_times.get(driver_id, -math.inf):
+            return  # Superseded by a newer update
+        self._driver_times[driver_id] = event_time
+
+        previous = self._drivers.pop(driver_id, None)
+        if previous is not None:
+            self._supply_now[previous] -= 1
+        if is_available:
+            row = self._row(self.zone_for(latitude, longitude))
+            self._supply_now[row] += 1
+            self._drivers[driver_id] = row
+
+    def ingest(self, topic: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply decoded event records from a topic.
+
+        Records missing a required field are skipped.
+
+        Args:
+            topic: ORDER_CREATED_TOPIC or DRIVER_LOCATION_TOPIC
+            records: Records following the topic's schema
+
+        Returns:
+            Number of records applied
+        """
+        if topic not in (ORDER_CREATED_TOPIC, DRIVER_LOCATION_TOPIC):
+            raise ValueError(f"Unsupported topic: {topic}")
+        applied = 0
+        for record in records:
+            try:
+                if topic == ORDER_CREATED_TOPIC:
+                    pickup = record["pickup_location"]
+                    event_time = record.get("created_at") or record["event_timestamp"]
+                    self.record_order(pickup["latitude"], pickup["longitude"], event_time / 1000.0)
+                else:
+                    self.record_driver(
+                        record["driver_id"],
+                        record["latitude"],
+                        record["longitude"],
+                        bool(record.get("is_online", True) and record["is_available"]),
+                        record["event_timestamp"] / 1000.0
+                    )
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Skipping malformed {topic} record: {e!r}")
+                continue
+            applied += 1
+        return applied
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """
+        Roll the ring buffers forward to the current bucket.
+
+        Args:
+            now: Current time (defaults to the clock)
+
+        Returns:
+            Current bucket number
+        """
+        now = self.clock() if now is None else now
+        target = int(now // self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = target
+            self._buckets_elapsed = 1
+            return target
+        if target <= self._bucket:
+            return self._bucket
+
+        zones = len(self._zone_ids)
+        # Close the current bucket with the latest supply, then clear the new ones
+        self._supply[:zones, self._bucket % self.bucket_count] = self._supply_now[:zones]
+        self._expire_drivers(now)
+        for bucket in range(max(self._bucket + 1, target - self.bucket_count + 1), target + 1):
+            column = bucket % self.bucket_count
+            self._demand[:, column] = 0
+            self._supply[:zones, column] = self._supply_now[:zones]
+        self._buckets_elapsed = min(self.bucket_count, self._buckets_elapsed + target - self._bucket)
+        self._bucket = target
+        return target
+
+    def publish(self, now: Optional[float] = None) -> Dict[str, ZoneSurge]:
+        """
+        Recompute and publish the surge state of every zone.
+
+        Args:
+            now: Current time (defaults to the clock)
+
+        Returns:
+            Published state per zone id (empty until the engine has warmed up)
+        """
+        now = self.clock() if now is None else now
+        current = self.advance(now)
+        if self._buckets_elapsed < self.min_buckets:
+            return self.published
+        zones = len(self._zone_ids)
+        self._supply[:zones, current % self.bucket_count] = self._supply_now[:zones]
+
+        # Buckets that existed before the engine started hold no data
+        elapsed = self._buckets_elapsed
+        orders = self._demand[:zones].sum(axis=1)
+        available = self._supply[:zones].sum(axis=1, dtype=np.float64) / elapsed
+        orders_per_window = orders * (self.bucket_count / elapsed)
+        ratio = orders_per_window / (np.maximum(available, 1.0) * self.orders_per_driver)
+
+        smoothed = self._smoothed[:zones]
+        seen = self._seen[:zones]
+        smoothed[:] = np.where(seen, self.smoothing * ratio + (1.0 - self.smoothing) * smoothed, ratio)
+        seen[:] = True
+
+        surge = np.clip(1.0 + (smoothed - 1.0) * self.surge_sensitivity, 1.0, self.max_surge_multiplier)
+        demand_level = smoothed / (1.0 + smoothed)
+
+        published = {
+            zone_id: ZoneSurge(
+                zone_id=zone_id,
+                demand_level=level,
+                supply_level=1.0 - level,
+                demand_supply_ratio=zone_ratio,
+                surge_multiplier=multiplier,
+                orders=zone_orders,
+                available_drivers=drivers,
+                updated_at=now
+            )
+            for zone_id, level, zone_ratio, multiplier, zone_orders, drivers in zip(
+                self._zone_ids,
+                demand_level.tolist(),
+                smoothed.tolist(),
+                surge.tolist(),
+                orders.tolist(),
+                available.tolist()
+            )
+        }
+        self.published = published
+        self.published_at = now
+        return published
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get engine counters.
+
+        Returns:
+            Zone, driver and window counters
+        """
+        return {
+            "zones": len(self._zone_ids),
+            "available_drivers": len(self._drivers),
+            "tracked_drivers": len(self._driver_times),
+            "window_seconds": self.window_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "warming_up": self._buckets_elapsed < self.min_buckets,
+            "published_zones": len(self.published),
+            "published_at": self.published_at
+        }
+
+    def _row(self, zone_id: str) -> int:
+        row = self._zone_rows.get(zone_id)
+        if row is None:
+            row = len(self._zone_ids)
+            if row == len(self._supply_now):
+                self._grow()
+            self._zone_rows[zone_id] = row
+            self._zone_ids.append(zone_id)
+            # Supply before the zone was first seen was zero
+            self._supply[row] = 0.0
+        return row
+
+    def _grow(self) -> None:
+        capacity = len(self._supply_now) * 2
+        self._demand = np.resize(self._demand, (capacity, self.bucket_count))
+        self._supply = np.resize(self._supply, (capacity, self.bucket_count))
+        self._demand[capacity // 2:] = 0
+        self._supply[capacity // 2:] = 0.0
+        for name in ("_supply_now", "_smoothed", "_seen"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _expire_drivers(self, now: float) -> None:
+        cutoff = now - self.driver_ttl_seconds
+        expired = [driver_id for driver_id, seen_at in self._driver_times.items() if seen_at < cutoff]
+        for driver_id in expired:
+            del self._driver_times[driver_id]
+            row = self._drivers.pop(driver_id, None)
+            if row is not None:
+                self._supply_now[row] -= 1
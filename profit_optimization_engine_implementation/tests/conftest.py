@@ -0,0 +1,9 @@
+"""
+Shared setup for Profit Optimization Engine tests
+"""
+
+import os
+import sys
+
+# The engine modules live at the project root and are imported as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,248 @@
+"""
+Tests for the batch paths of the profit optimization algorithms
+"""
+
+import json
+import dataclasses
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from algorithms import (
+    MarketConditions,
+    MonetizationInputArrays,
+    OptimizationObjective,
+    PremiumTier,
+    ProfitOptimizationEngine,
+    RevenueCaptureOptimizer,
+    ServiceType,
+    UserMonetizationPredictor,
+    UserProfile,
+    UserProfileArrays
+)
+from monetization_scoring import encode_ndjson
+
+SERVICE_TYPES = [service_type.value for service_type in ServiceType]
+
+
+def random_markets(rng, count):
+    """Create market conditions covering every hour, weekends, holidays and missing competitor prices."""
+    return [
+        MarketConditions(
+            demand_level=float(rng.uniform(0.0, 1.0)),
+            supply_level=float(rng.uniform(0.0, 1.0)),
+            competitor_pricing={
+                service_type: float(rng.uniform(5.0, 45.0))
+                for service_type in SERVICE_TYPES
+                if rng.uniform() < 0.5
+            },
+            time_of_day=int(rng.integers(0, 24)),
+            day_of_week=int(rng.integers(0, 7)),
+            is_holiday=bool(rng.uniform() < 0.1),
+            weather_impact=float(rng.uniform(-1.0, 1.0)),
+            event_impact=float(rng.uniform(0.0, 1.0))
+        )
+        for _ in range(count)
+    ]
+
+
+def random_profiles(rng, count):
+    """Create user profiles, with every tier and some anonymous users (None)."""
+    tiers = [None] + list(PremiumTier)
+    return [
+        UserProfile(
+            user_id=f"user_{i}",
+            user_tier=tiers[int(rng.integers(0, len(tiers)))],
+            avg_order_value=float(rng.uniform(5.0, 40.0)),
+            order_frequency=float(rng.uniform(0.0, 6.0)),
+            churn_risk=float(rng.uniform(0.0, 1.0)),
+            monetization_propensity=float(rng.uniform(0.0, 1.0)),
+            price_sensitivity=float(rng.uniform(0.0, 1.0)),
+            loyalty_score=float(rng.uniform(0.0, 1.0)),
+            behavior_segment="regular",
+            lifetime_value=float(rng.choice([0.0, rng.uniform(10.0, 2000.0)]))
+        ) if rng.uniform() < 0.7 else None
+        for i in range(count)
+    ]
+
+
+class TestBatchPricing:
+    """Test suite for ProfitOptimizationEngine.calculate_optimal_prices."""
+
+    @pytest.mark.parametrize("objective", list(OptimizationObjective))
+    def test_matches_scalar_pricing(self, objective):
+        """Test every quote gets the price and factors calculate_optimal_price gives it."""
+        rng = np.random.default_rng(17)
+        engine = ProfitOptimizationEngine()
+        markets = random_markets(rng, 50)
+        quotes = 400
+        service_types = [SERVICE_TYPES[i] for i in rng.integers(0, len(SERVICE_TYPES), quotes)]
+        market_index = rng.integers(0, len(markets), quotes)
+        profiles = random_profiles(rng, quotes)
+
+        batch = engine.calculate_optimal_prices(
+            service_types,
+            markets,
+            market_index,
+            UserProfileArrays.from_profiles(profiles),
+            objective=objective
+        )
+
+        for i in range(quotes):
+            scalar = engine.calculate_optimal_price(
+                service_types[i], markets[market_index[i]], profiles[i], objective
+            )
+            factors = scalar.optimization_factors
+            assert batch.recommended_price[i] == scalar.recommended_price
+            assert batch.expected_profit[i] == pytest.approx(scalar.expected_profit)
+            assert batch.confidence_score[i] == pytest.approx(scalar.confidence_score)
+            assert batch.demand_multiplier[i] == pytest.approx(factors["demand_multiplier"])
+            assert batch.competitive_multiplier[i] == pytest.approx(factors["competitive_multiplier"])
+            assert batch.user_multiplier[i] == pytest.approx(factors["user_multiplier"])
+            assert batch.base_price[i] == factors["base_price"]
+
+    def test_one_market_per_quote_by_default(self):
+        """Test market_index may be omitted when markets and quotes line up."""
+        rng = np.random.default_rng(3)
+        engine = ProfitOptimizationEngine()
+        markets = random_markets(rng, 5)
+
+        batch = engine.calculate_optimal_prices(["RIDE"] * 5, markets)
+
+        assert batch.recommended_price.tolist() == [
+            engine.calculate_optimal_price("RIDE", market).recommended_price for market in markets
+        ]
+        with pytest.raises(ValueError):
+            engine.calculate_optimal_prices(["RIDE"] * 4, markets)
+        with pytest.raises(ValueError):
+            engine.calculate_optimal_prices(["RIDE"], markets, market_index=[5])
+
+
+class TestBatchMonetization:
+    """Test suite for UserMonetizationPredictor.predict_monetization_batch."""
+
+    def make_users(self, rng, count, reference_time):
+        """Create profiles (no anonymous users) with order histories of varying recency."""
+        profiles = [profile for profile in random_profiles(rng, count * 2) if profile is not None][:count]
+        histories = []
+        for _ in profiles:
+            kind = rng.integers(0, 3)
+            if kind == 0:
+                histories.append([])
+            elif kind == 1:
+                histories.append([{"order_id": "o1"}])  # no date: counts as just ordered
+            else:
+                age = timedelta(hours=float(rng.uniform(0.0, 24 * 14)))
+                histories.append([{"order_id": "o0"}, {"order_id": "o1", "date": reference_time - age}])
+        return profiles, histories
+
+    def test_matches_scalar_prediction(self):
+        """Test every user gets the scores predict_monetization_opportunity gives them."""
+        rng = np.random.default_rng(22)
+        reference_time = datetime(2024, 3, 1, 12, 0)
+        predictor = UserMonetizationPredictor()
+        profiles, histories = self.make_users(rng, 300, reference_time)
+
+        batch = predictor.predict_monetization_batch(
+            MonetizationInputArrays.from_profiles(profiles, histories), reference_time
+        )
+
+        for i, (profile, history) in enumerate(zip(profiles, histories)):
+            scalar = predictor.predict_monetization_opportunity(profile, "RIDE", history, reference_time)
+            timing, urgency = predictor.timings[batch.timing_index[i]]
+            assert batch.monetization_propensity[i] == scalar["monetization_propensity"]
+            assert predictor.monetization_types[batch.type_index[i]] == scalar["monetization_type"]
+            assert (timing, urgency) == (scalar["optimal_timing"]["timing"], scalar["optimal_timing"]["urgency"])
+            assert batch.days_since_last_order[i] == scalar["optimal_timing"]["days_since_last_order"]
+            assert batch.discount_percentage[i] == scalar["personalized_offer"].get("discount_percentage", 0)
+            assert batch.expected_conversion_rate[i] == scalar["expected_conversion_rate"]
+            assert batch.confidence_score[i] == scalar["confidence_score"]
+
+    def test_ndjson_records_match_scalar_prediction(self):
+        """Test each encoded line decodes to the scalar prediction (null days without orders)."""
+        rng = np.random.default_rng(23)
+        reference_time = datetime(2024, 3, 1, 12, 0)
+        predictor = UserMonetizationPredictor()
+        profiles, histories = self.make_users(rng, 50, reference_time)
+        batch = predictor.predict_monetization_batch(
+            MonetizationInputArrays.from_profiles(profiles, histories), reference_time
+        )
+
+        lines = encode_ndjson(
+            predictor, np.array([profile.user_id for profile in profiles], dtype=object), batch
+        ).splitlines()
+
+        assert len(lines) == len(profiles)
+        for line, profile, history in zip(lines, profiles, histories):
+            expected = predictor.predict_monetization_opportunity(profile, "RIDE", history, reference_time)
+            if expected["optimal_timing"]["days_since_last_order"] == float("inf"):
+                expected["optimal_timing"]["days_since_last_order"] = None
+            assert json.loads(line) == expected
+
+
+class TestBatchFees:
+    """Test suite for RevenueCaptureOptimizer.optimize_fees_batch."""
+
+    FIELDS = ("order_value", "base_fee", "service_fee", "peak_fee", "surge_fee", "total_fees", "net_revenue", "fee_percentage")
+
+    def assert_matches_scalar(self, optimizer, batch, index, market, order_value):
+        """Assert one batch order equals optimize_fees under the given market conditions."""
+        scalar = optimizer.optimize_fees(market, "RIDE", float(order_value))
+        for field in self.FIELDS:
+            assert getattr(batch, field)[index] == scalar[field], field
+
+    def test_matches_scalar_per_zone_and_hour(self):
+        """Test every order gets the fees optimize_fees gives its zone's levels and its hour."""
+        rng = np.random.default_rng(24)
+        optimizer = RevenueCaptureOptimizer()
+        market = random_markets(rng, 1)[0]
+        # Include zones in surge and zones at the thresholds
+        zone_levels = {f"zone_{i}": (float(rng.uniform(0.5, 1.0)), float(rng.uniform(0.2, 0.8))) for i in range(20)}
+        zone_levels["edge"] = (optimizer.surge_demand_threshold, optimizer.surge_supply_threshold)
+        optimizer.update_fee_schedule(market, zone_levels, tick=1)
+
+        zones = list(zone_levels) + ["unknown"]
+        zone_ids = [zones[i] for i in rng.integers(0, len(zones), 500)]
+        hours = rng.integers(0, 24, 500)
+        order_values = rng.uniform(1.0, 80.0, 500)
+
+        batch = optimizer.optimize_fees_batch(order_values, zone_ids, hours)
+
+        assert len(batch) == 500
+        for i, (zone_id, hour, order_value) in enumerate(zip(zone_ids, hours, order_values)):
+            demand_level, supply_level = zone_levels.get(zone_id, (market.demand_level, market.supply_level))
+            zone_market = dataclasses.replace(
+                market, demand_level=demand_level, supply_level=supply_level, time_of_day=int(hour)
+            )
+            self.assert_matches_scalar(optimizer, batch, i, zone_market, order_value)
+
+    def test_defaults_to_schedule_market(self):
+        """Test orders without zones or hours use the schedule's market conditions."""
+        rng = np.random.default_rng(25)
+        optimizer = RevenueCaptureOptimizer()
+        for market in random_markets(rng, 30):
+            optimizer.update_fee_schedule(market)
+            order_values = rng.uniform(1.0, 80.0, 5)
+
+            batch = optimizer.optimize_fees_batch(order_values)
+
+            for i, order_value in enumerate(order_values):
+                self.assert_matches_scalar(optimizer, batch, i, market, order_value)
+
+    def test_explicit_schedule_overrides_latest(self):
+        """Test a schedule passed in is used instead of the latest one."""
+        optimizer = RevenueCaptureOptimizer()
+        market = random_markets(np.random.default_rng(26), 1)[0]
+        surge = optimizer.update_fee_schedule(dataclasses.replace(market, demand_level=1.0, supply_level=0.0))
+        optimizer.update_fee_schedule(dataclasses.replace(market, demand_level=0.0, supply_level=1.0))
+
+        assert optimizer.optimize_fees_batch(np.array([10.0]), schedule=surge).surge_fee[0] > 0.0
+        assert optimizer.optimize_fees_batch(np.array([10.0])).surge_fee[0] == 0.0
+
+    def test_requires_schedule(self):
+        """Test batch fees without a schedule raise ValueError."""
+        with pytest.raises(ValueError):
+            RevenueCaptureOptimizer().optimize_fees_batch(np.array([10.0]))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
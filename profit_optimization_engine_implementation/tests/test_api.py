@@ -0,0 +1,65 @@
+"""
+Tests for the Profit Optimization Engine API
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from api import app
+
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    return TestClient(app)
+
+
+@pytest.fixture
+def resource_request():
+    """Resource allocation request with zone-level counts."""
+    return {
+        "market_conditions": {
+            "demand_level": 0.7,
+            "supply_level": 0.4,
+            "time_of_day": 18,
+            "day_of_week": 2
+        },
+        "available_resources": {"RIDE": 5},
+        "demand_forecast": {"RIDE": 6},
+        "available_by_zone": {"0:0": {"RIDE": 5}},
+        "demand_by_zone": {"0:0": {"RIDE": 2}, "0:1": {"RIDE": 4}}
+    }
+
+
+class TestResourceAllocationEndpoint:
+    """Test suite for /optimize/resources."""
+
+    def test_rebalances_zones(self, client, resource_request):
+        """Test zone counts produce a rebalancing summary."""
+        response = client.post("/optimize/resources", json=resource_request)
+
+        assert response.status_code == 200
+        rebalancing = response.json()["rebalancing"]
+        assert rebalancing["drivers_moved"] == 3
+        assert rebalancing["unmet_demand"] == 1
+
+    @pytest.mark.parametrize("zone_id", ["downtown", "1:2:3", "a:b"])
+    def test_invalid_zone_id(self, client, resource_request, zone_id):
+        """Test a malformed zone id is a validation error, not a server error."""
+        resource_request["demand_by_zone"][zone_id] = {"RIDE": 1}
+
+        response = client.post("/optimize/resources", json=resource_request)
+
+        assert response.status_code == 422
+        assert "Invalid zone id" in response.text
+
+    def test_zone_counts_come_in_pairs(self, client, resource_request):
+        """Test available_by_zone without demand_by_zone is rejected."""
+        del resource_request["demand_by_zone"]
+
+        response = client.post("/optimize/resources", json=resource_request)
+
+        assert response.status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
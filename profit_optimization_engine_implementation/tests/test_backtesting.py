@@ -0,0 +1,99 @@
+"""
+Tests for the pricing strategy backtesting harness
+"""
+
+import numpy as np
+import pytest
+from algorithms import MarketConditions, RevenueCaptureOptimizer
+from backtesting import (
+    ConstantElasticityModel,
+    OrderCostModel,
+    SyntheticChunk,
+    evaluate_chunk,
+    fee_totals,
+    objective_strategies,
+    run_backtest,
+    synthetic_order_chunk
+)
+
+
+class TestBacktesting:
+    """Test suite for the backtesting harness."""
+
+    def test_fee_totals_match_optimize_fees(self):
+        """Test per-order fees equal RevenueCaptureOptimizer.optimize_fees."""
+        chunk = synthetic_order_chunk(SyntheticChunk(size=300, seed=1, orders_per_market=10))
+        optimizer = RevenueCaptureOptimizer()
+        prices = chunk.reference_price
+
+        fees = fee_totals(optimizer, prices, chunk)
+
+        markets = chunk.markets
+        for i in range(0, len(chunk), 7):
+            market = chunk.market_index[i]
+            conditions = MarketConditions(
+                demand_level=markets.demand_level[market],
+                supply_level=markets.supply_level[market],
+                competitor_pricing={},
+                time_of_day=int(markets.time_of_day[market]),
+                day_of_week=int(markets.day_of_week[market]),
+                is_holiday=bool(markets.is_holiday[market]),
+                weather_impact=markets.weather_impact[market],
+                event_impact=markets.event_impact[market]
+            )
+            expected = optimizer.optimize_fees(conditions, chunk.service_types[i], prices[i])["total_fees"]
+            assert fees[i] == pytest.approx(expected)
+
+    def test_profit_is_fees_less_order_costs(self):
+        """Test profit is fee revenue less the cost model's cost of converted orders."""
+        chunk = SyntheticChunk(size=2000, seed=2)
+        strategies = objective_strategies()[:1]
+        name = strategies[0].name
+
+        free = evaluate_chunk(chunk, strategies, ConstantElasticityModel(), OrderCostModel(0.0, 0.0))[name]
+        costly = evaluate_chunk(chunk, strategies, ConstantElasticityModel(), OrderCostModel(0.03, 0.5))[name]
+
+        assert free.profit == pytest.approx(free.fee_revenue)
+        assert costly.profit == pytest.approx(
+            costly.fee_revenue - 0.5 * costly.conversions - 0.03 * costly.revenue
+        )
+        assert costly.margin == pytest.approx(costly.profit / costly.revenue)
+
+    def test_margin_differs_between_strategies(self):
+        """Test strategies are not all reported at one fixed margin."""
+        results = run_backtest([SyntheticChunk(size=5000, seed=3)], objective_strategies(), workers=1)
+
+        margins = [result.margin for result in results.values()]
+        assert max(margins) - min(margins) > 1e-4
+
+    def test_chunks_merge(self):
+        """Test a backtest over several chunks sums the per-chunk results."""
+        chunks = [SyntheticChunk(size=1000, seed=seed) for seed in range(3)]
+        strategies = objective_strategies()
+        model = ConstantElasticityModel()
+
+        results = run_backtest(chunks, strategies, model, workers=1)
+
+        partials = [evaluate_chunk(chunk, strategies, model) for chunk in chunks]
+        for strategy in strategies:
+            result = results[strategy.name]
+            assert result.orders == 3000
+            for field in ("conversions", "revenue", "fee_revenue", "profit", "price_total"):
+                assert getattr(result, field) == pytest.approx(
+                    sum(getattr(partial[strategy.name], field) for partial in partials)
+                )
+
+    def test_conversion_falls_with_price(self):
+        """Test the constant elasticity model converts less at higher prices."""
+        chunk = synthetic_order_chunk(SyntheticChunk(size=100, seed=4))
+        model = ConstantElasticityModel()
+
+        low = model.conversion_probability(chunk.reference_price * 0.9, chunk)
+        high = model.conversion_probability(chunk.reference_price * 1.1, chunk)
+
+        assert np.all(high < low)
+        assert np.all((0.0 <= high) & (low <= 1.0))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
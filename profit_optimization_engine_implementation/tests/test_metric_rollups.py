@@ -0,0 +1,169 @@
+"""
+Tests for the ring-buffer metric rollups
+"""
+
+import numpy as np
+import pytest
+from metric_rollups import MetricRollupStore, Resolution, RollupRing
+
+# Start of an hour, so minute and hour buckets line up
+NOW = 3600.0 * 1000
+MINUTE = NOW // 60
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(NOW)
+
+
+@pytest.fixture
+def store(clock):
+    """Store keeping 10 minute buckets and 3 hour buckets for RIDE and FOOD."""
+    return MetricRollupStore(
+        service_types=("RIDE", "FOOD"),
+        resolutions=(Resolution("minute", 60, 10), Resolution("hour", 3600, 3)),
+        clock=clock
+    )
+
+
+def priced(store, service_types, timestamps, uplift=1.0):
+    """Record priced orders with the given uplift over a base price of 10."""
+    count = len(timestamps)
+    return store.record_priced(
+        service_types, np.asarray(timestamps, dtype=np.float64), np.full(count, 10.0 + uplift), np.full(count, 10.0)
+    )
+
+
+class TestRollupRing:
+    """Test suite for RollupRing."""
+
+    def make_ring(self):
+        """Ring of 5 one-minute buckets with one service type and one metric."""
+        return RollupRing(Resolution("minute", 60, 5), service_count=1, metric_count=1)
+
+    def add(self, ring, timestamps):
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        return ring.add(timestamps, np.zeros(len(timestamps), dtype=np.intp), slice(0, 1), np.ones((len(timestamps), 1)))
+
+    def test_reused_slot_is_cleared(self):
+        """Test a bucket sharing a slot with an older one replaces its aggregates."""
+        ring = self.make_ring()
+        self.add(ring, [NOW, NOW, NOW])
+        self.add(ring, [NOW + 5 * 60])
+
+        assert ring.window(MINUTE + 5, 5)[:, 0, 0].tolist() == [0.0, 0.0, 0.0, 0.0, 1.0]
+        assert ring.window(MINUTE, 1)[0, 0, 0] == 0.0
+
+    def test_stale_slots_read_as_zero(self):
+        """Test buckets never written since their slot was last used read as zero."""
+        ring = self.make_ring()
+        self.add(ring, [NOW + 60 * i for i in range(5)])
+
+        assert ring.window(MINUTE + 4, 5)[:, 0, 0].tolist() == [1.0] * 5
+        assert ring.window(MINUTE + 7, 5)[:, 0, 0].tolist() == [1.0, 1.0, 0.0, 0.0, 0.0]
+        assert ring.window(MINUTE + 20, 5).sum() == 0.0
+
+    def test_newest_bucket_wins_slot_within_batch(self):
+        """Test one batch mapping two buckets to a slot keeps only the newer one."""
+        ring = self.make_ring()
+        keep = self.add(ring, [NOW + 5 * 60, NOW, NOW + 5 * 60])
+
+        assert keep.tolist() == [True, False, True]
+        assert ring.window(MINUTE + 5, 1)[0, 0, 0] == 2.0
+        assert ring.late_events == 1
+
+
+class TestMetricRollupStore:
+    """Test suite for MetricRollupStore."""
+
+    def test_aggregates_by_service_type(self, store):
+        """Test priced and settled orders add to their own metrics per service type."""
+        priced(store, ["RIDE", "RIDE", "FOOD"], [NOW, NOW - 60, NOW], uplift=2.0)
+        store.record_settled(["FOOD"], np.array([NOW]), np.array([20.0]), np.array([3.0]), np.array([1.0]))
+
+        series = store.series("minute", periods=2)
+
+        assert series.starts.tolist() == [NOW - 60, NOW]
+        assert series.values["priced_orders"].tolist() == [[1.0, 0.0], [1.0, 1.0]]
+        assert series.values["price_uplift"].tolist() == [[2.0, 0.0], [2.0, 2.0]]
+        assert series.values["revenue"][-1].tolist() == [0.0, 20.0]
+        assert series.total("fees").tolist() == [0.0, 3.0]
+        assert series.total("dynamic_fees").tolist() == [0.0, 1.0]
+        assert store.series("hour", periods=1).total("priced_orders").tolist() == [2.0]
+
+    def test_downsampling_merges_adjacent_buckets(self, store):
+        """Test max_points sums groups of buckets, with a partial oldest group."""
+        timestamps = [NOW - 60 * age for age in range(7) for _ in range(age + 1)]
+        priced(store, ["RIDE"] * len(timestamps), timestamps)
+
+        series = store.series("minute", periods=7, max_points=3)
+
+        # Buckets hold 7..1 orders oldest first; groups are [7], [6, 5, 4], [3, 2, 1]
+        assert series.total("priced_orders").tolist() == [7.0, 15.0, 6.0]
+        assert series.bucket_seconds == 180
+        assert series.starts.tolist() == [NOW - 6 * 60, NOW - 5 * 60, NOW - 2 * 60]
+
+    def test_no_downsampling_within_max_points(self, store):
+        """Test series are returned per bucket when they already fit in max_points."""
+        series = store.series("minute", periods=4, max_points=4)
+
+        assert len(series) == 4
+        assert series.bucket_seconds == 60
+
+    def test_late_events_are_counted_not_recorded(self, store):
+        """Test events older than every resolution's retention are dropped and counted."""
+        priced(store, ["RIDE"], [NOW])
+
+        assert priced(store, ["RIDE", "RIDE"], [NOW - 2 * 3600, NOW - 4 * 3600]) == 1
+        stats = store.stats()
+        assert stats["events"] == 2
+        assert stats["late_events"] == 1
+        assert stats["resolutions"]["minute"]["late_events"] == 2
+        assert stats["resolutions"]["hour"]["late_events"] == 1
+        assert store.series("hour", periods=3).total("priced_orders").tolist() == [1.0, 0.0, 1.0]
+
+    def test_future_events_are_clamped_to_clock(self, store, clock):
+        """Test an event time after the clock is recorded now and keeps earlier buckets."""
+        priced(store, ["RIDE"], [NOW - 60])
+        priced(store, ["RIDE"], [NOW + 86400])
+
+        assert store.series("minute", periods=2).total("priced_orders").tolist() == [1.0, 1.0]
+        assert store.stats()["resolutions"]["minute"]["latest_bucket_start"] == NOW
+
+    def test_unknown_service_types_are_counted(self, store):
+        """Test orders of service types outside the store are skipped and counted."""
+        assert priced(store, ["TRUCK_VAN", "RIDE"], [NOW, NOW]) == 1
+        assert priced(store, ["TRUCK_VAN"], [NOW]) == 0
+        assert store.stats()["unknown_service_events"] == 2
+        assert store.series("minute", periods=1).total("priced_orders").tolist() == [1.0]
+
+    def test_series_reads_old_windows(self, store, clock):
+        """Test end selects an earlier window and buckets past retention read as zero."""
+        priced(store, ["RIDE"], [NOW])
+        clock.now = NOW + 3600
+
+        assert store.series("minute", periods=10).total("priced_orders").sum() == 0.0
+        assert store.series("minute", periods=1, end=NOW).total("priced_orders").tolist() == [1.0]
+
+    def test_series_rejects_bad_arguments(self, store):
+        """Test unknown resolutions and out of range periods raise ValueError."""
+        with pytest.raises(ValueError):
+            store.series("week")
+        with pytest.raises(ValueError):
+            store.series("hour", periods=4)
+        with pytest.raises(ValueError):
+            store.series("minute", periods=0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
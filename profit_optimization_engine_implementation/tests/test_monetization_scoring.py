@@ -0,0 +1,91 @@
+"""
+Tests for the streaming monetization scorer
+"""
+
+import json
+import time
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta, timezone
+from monetization_scoring import run_scoring, user_chunks_from_frame, utc_naive
+
+REFERENCE = datetime(2024, 3, 1, 12, 0)
+
+
+def user_frame(last_order_at):
+    """Create a frame with one user per last order time."""
+    count = len(last_order_at)
+    return pd.DataFrame({
+        "user_id": [f"user_{i}" for i in range(count)],
+        "user_tier": [None] * count,
+        "avg_order_value": [20.0] * count,
+        "order_frequency": [2.0] * count,
+        "churn_risk": [0.2] * count,
+        "monetization_propensity": [0.5] * count,
+        "price_sensitivity": [0.3] * count,
+        "loyalty_score": [0.6] * count,
+        "last_order_at": last_order_at
+    })
+
+
+@pytest.fixture
+def non_utc_host(monkeypatch):
+    """Run with a local time zone well away from UTC."""
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def scored_days(tmp_path, frame, reference_time=None):
+    """Score a frame and return each user's days_since_last_order."""
+    output = str(tmp_path / "scores.ndjson")
+    run_scoring(user_chunks_from_frame(frame), output, reference_time, workers=1)
+    with open(output) as lines:
+        return [json.loads(line)["optimal_timing"]["days_since_last_order"] for line in lines]
+
+
+class TestUtcTimes:
+    """Test suite for the UTC handling of order and reference times."""
+
+    def test_utc_naive(self):
+        """Test aware times are converted to UTC and naive ones are kept."""
+        aware = datetime(2024, 3, 1, 17, 30, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+
+        assert utc_naive(aware) == REFERENCE
+        assert utc_naive(REFERENCE) == REFERENCE
+
+    def test_offsets_are_converted_to_utc(self, tmp_path):
+        """Test last order times with and without offsets are compared as UTC."""
+        frame = user_frame([
+            "2024-02-27T12:30:00",  # 2.98 days before the reference
+            "2024-02-27T18:30:00+05:00",  # 13:30 UTC, 2.94 days
+            "2024-02-26T23:30:00-01:00",  # 00:30 UTC, 3.48 days
+            None
+        ])
+
+        days = scored_days(tmp_path, frame, REFERENCE)
+
+        assert days == [2, 2, 3, None]
+
+    def test_aware_reference_time_is_converted(self, tmp_path):
+        """Test a reference time with an offset means the same instant as naive UTC."""
+        frame = user_frame(["2024-02-22T12:30:00Z"])
+        aware = datetime(2024, 3, 1, 7, 0, tzinfo=timezone(timedelta(hours=-5)))
+
+        assert scored_days(tmp_path, frame, aware) == scored_days(tmp_path, frame, REFERENCE) == [7]
+
+    def test_default_reference_time_is_utc(self, tmp_path, non_utc_host):
+        """Test the default reference time is UTC however the host's time zone is set."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        frame = user_frame([(now - timedelta(days=3, minutes=-30)).isoformat()])
+
+        summary = run_scoring(user_chunks_from_frame(frame), str(tmp_path / "scores.ndjson"), workers=1)
+
+        assert abs(datetime.fromisoformat(summary["reference_time"]) - now) < timedelta(minutes=1)
+        assert scored_days(tmp_path, frame) == [2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,147 @@
+"""
+Tests for the demand multiplier cache
+"""
+
+import pytest
+from algorithms import MarketConditions, ProfitOptimizationEngine
+from multiplier_cache import DemandMultiplierCache, VersionedDict
+
+
+def evening_rush(**overrides):
+    """Create evening-rush market conditions."""
+    values = dict(
+        demand_level=0.8,
+        supply_level=0.4,
+        competitor_pricing={},
+        time_of_day=18,
+        day_of_week=2,
+        is_holiday=False,
+        weather_impact=0.0,
+        event_impact=0.0
+    )
+    values.update(overrides)
+    return MarketConditions(**values)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestVersionedDict:
+    """Test suite for VersionedDict."""
+
+    def test_mutations_bump_version(self):
+        """Test every mutating method changes the version."""
+        prices = VersionedDict({"RIDE": 15.0})
+        versions = [prices.version]
+        prices["RIDE"] = 16.0
+        versions.append(prices.version)
+        prices.update(MOTO=8.0)
+        versions.append(prices.version)
+        prices.pop("MOTO")
+        versions.append(prices.version)
+        del prices["RIDE"]
+        versions.append(prices.version)
+
+        assert len(set(versions)) == len(versions)
+
+
+class TestDemandMultiplierCache:
+    """Test suite for DemandMultiplierCache."""
+
+    def test_hits_until_ttl(self):
+        """Test an entry is reused until it expires."""
+        clock = FakeClock()
+        cache = DemandMultiplierCache(ttl_seconds=60.0, clock=clock)
+        values = iter([1.5, 2.0])
+
+        assert cache.get_or_compute("key", 0, lambda: next(values)) == 1.5
+        clock.now = 59.0
+        assert cache.get_or_compute("key", 0, lambda: next(values)) == 1.5
+        clock.now = 60.0
+        assert cache.get_or_compute("key", 0, lambda: next(values)) == 2.0
+        assert (cache.hits, cache.misses, cache.expirations) == (1, 2, 1)
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted past max_size."""
+        cache = DemandMultiplierCache(max_size=2)
+        cache.get_or_compute("a", 0, lambda: 1.0)
+        cache.get_or_compute("b", 0, lambda: 2.0)
+        cache.get_or_compute("a", 0, lambda: 1.0)
+        cache.get_or_compute("c", 0, lambda: 3.0)
+
+        assert len(cache) == 2
+        assert cache.get_or_compute("a", 0, lambda: -1.0) == 1.0
+        assert cache.get_or_compute("b", 0, lambda: -2.0) == -2.0
+        assert cache.evictions == 2
+
+    def test_config_change_drops_entries(self):
+        """Test a new config key empties the cache before the lookup."""
+        cache = DemandMultiplierCache()
+        cache.get_or_compute("key", "v1", lambda: 1.0)
+
+        assert cache.get_or_compute("key", "v2", lambda: 2.0) == 2.0
+        assert cache.invalidations == 1
+
+
+class TestEngineCacheInvalidation:
+    """Test suite for demand multiplier caching in ProfitOptimizationEngine."""
+
+    def test_time_band_change_recomputes(self):
+        """Test changing the time bands is not served from stale entries."""
+        engine = ProfitOptimizationEngine()
+        market = evening_rush(demand_level=0.5, supply_level=0.8)
+        before = engine.calculate_demand_multiplier(market, "RIDE")
+
+        engine.time_bands = ((17, 19, 2.0),)
+        after = engine.calculate_demand_multiplier(market, "RIDE")
+
+        assert after == pytest.approx(before * 2.0 / 1.4)
+        assert engine.demand_cache.invalidations == 1
+
+    def test_base_price_changes_invalidate(self):
+        """Test in-place edits and reassignment of base_prices both invalidate."""
+        engine = ProfitOptimizationEngine()
+        market = evening_rush()
+        engine.calculate_demand_multiplier(market, "RIDE")
+
+        engine.base_prices["RIDE"] = 16.0
+        engine.calculate_demand_multiplier(market, "RIDE")
+        engine.base_prices = {**engine.base_prices, "RIDE": 17.0}
+        engine.calculate_demand_multiplier(market, "RIDE")
+        engine.calculate_demand_multiplier(market, "RIDE")
+
+        assert engine.demand_cache.invalidations == 2
+        assert engine.demand_cache.hits == 1
+        assert engine.calculate_optimal_price("RIDE", market).optimization_factors["base_price"] == 17.0
+
+    def test_quotes_in_one_bucket_share_an_entry(self):
+        """Test market inputs within one quantum share a cached multiplier."""
+        engine = ProfitOptimizationEngine()
+        engine.calculate_demand_multiplier(evening_rush(demand_level=0.801), "RIDE")
+        engine.calculate_demand_multiplier(evening_rush(demand_level=0.802), "MOTO")
+
+        assert (engine.demand_cache.hits, engine.demand_cache.misses) == (1, 1)
+
+    def test_cached_and_uncached_agree(self):
+        """Test disabling the cache does not change multipliers."""
+        cached = ProfitOptimizationEngine()
+        uncached = ProfitOptimizationEngine()
+        uncached.demand_cache = None
+        market = evening_rush(weather_impact=-0.4, event_impact=0.3, is_holiday=True)
+
+        for service_type in ("RIDE", "FOOD"):
+            for _ in range(2):
+                assert cached.calculate_demand_multiplier(market, service_type) == (
+                    uncached.calculate_demand_multiplier(market, service_type)
+                )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
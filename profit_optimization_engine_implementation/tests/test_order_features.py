@@ -0,0 +1,182 @@
+"""
+Tests for the per-user order feature store and the event stream consumer
+"""
+
+import json
+import pytest
+from event_stream import EventStreamConsumer
+from order_features import ORDER_COMPLETED_TOPIC, SECONDS_PER_DAY, OrderFeatureStore
+
+# Noon on day 100 since the epoch
+NOON = 100 * SECONDS_PER_DAY + 12 * 3600.0
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(NOON)
+
+
+@pytest.fixture
+def store(clock):
+    """Store with 7 and 30 day windows and room for 3 remembered order ids."""
+    return OrderFeatureStore(window_days=(30, 7), dedupe_size=3, clock=clock)
+
+
+def days_ago(days):
+    return NOON - days * SECONDS_PER_DAY
+
+
+class TestOrderFeatureStore:
+    """Test suite for OrderFeatureStore."""
+
+    def test_counts_orders_per_window(self, store):
+        """Test whole-day windows include today and exclude orders older than the window."""
+        for days in (0, 0, 6, 7, 29, 30):
+            store.record_order("u1", days_ago(days), order_value=10.0 * (days + 1))
+
+        features = store.features("u1")
+
+        assert features.order_count == 6
+        assert features.orders_by_window == {7: 3, 30: 5}
+        assert features.avg_order_value == pytest.approx(10.0 * (1 + 1 + 7 + 8 + 30 + 31) / 6)
+        assert features.last_order_at.timestamp() == NOON
+
+    def test_windows_roll_forward_with_time(self, store, clock):
+        """Test reading later drops days that have left the window without new orders."""
+        store.record_order("u1", days_ago(0))
+        store.record_order("u1", days_ago(5))
+
+        clock.now = NOON + 2 * SECONDS_PER_DAY
+        assert store.features("u1").orders_by_window == {7: 1, 30: 2}
+        clock.now = NOON + 40 * SECONDS_PER_DAY
+        assert store.features("u1").orders_by_window == {7: 0, 30: 0}
+        assert store.features("u1").order_count == 2
+
+    def test_ring_slots_are_cleared_when_reused(self, store, clock):
+        """Test a newer order clears the slots of the days it skipped over."""
+        store.record_order("u1", days_ago(0))
+        clock.now = NOON + 30 * SECONDS_PER_DAY
+        store.record_order("u1", clock.now)  # lands on the same ring slot as the first order
+
+        assert store.features("u1").orders_by_window == {7: 1, 30: 1}
+        assert store.features("u1").order_count == 2
+
+    def test_orders_older_than_ring_count_only_towards_lifetime(self, store):
+        """Test an order behind the ring is counted as late and kept out of the windows."""
+        store.record_order("u1", days_ago(0))
+        store.record_order("u1", days_ago(45), order_value=5.0)
+
+        features = store.features("u1")
+
+        assert features.order_count == 2
+        assert features.orders_by_window == {7: 1, 30: 1}
+        assert features.avg_order_value == 5.0
+        assert features.last_order_at.timestamp() == NOON
+        assert store.stats()["late_orders"] == 1
+
+    def test_future_orders_are_clamped_to_clock(self, store, clock):
+        """Test an order time after the clock counts as now and does not wipe recent days."""
+        store.record_order("u1", days_ago(3))
+        store.record_order("u1", NOON + 60 * SECONDS_PER_DAY)
+
+        features = store.features("u1")
+
+        assert features.orders_by_window == {7: 2, 30: 2}
+        assert features.last_order_at.timestamp() == NOON
+
+    def test_redelivered_orders_are_ignored(self, store):
+        """Test a repeated order id is recorded once."""
+        assert store.record_order("u1", NOON, order_id="o1") is True
+        assert store.record_order("u1", NOON, order_id="o1") is False
+
+        assert store.features("u1").order_count == 1
+        assert store.stats()["duplicates"] == 1
+
+    def test_dedupe_forgets_oldest_order_ids(self, store):
+        """Test only the last dedupe_size order ids are remembered."""
+        for order_id in ("o1", "o2", "o3", "o4"):
+            store.record_order("u1", NOON, order_id=order_id)
+
+        assert store.stats()["remembered_order_ids"] == 3
+        assert store.record_order("u1", NOON, order_id="o4") is False
+        assert store.record_order("u1", NOON, order_id="o1") is True
+        assert store.features("u1").order_count == 5
+
+    def test_unknown_user_has_no_features(self, store):
+        """Test a user without orders gets None."""
+        assert store.features("nobody") is None
+
+    def test_grows_past_initial_capacity(self, store):
+        """Test users beyond the initial row capacity keep their own features."""
+        for i in range(1500):
+            store.record_order(f"u{i}", days_ago(i % 10), order_value=float(i))
+
+        assert len(store) == 1500
+        assert store.features("u0").avg_order_value == 0.0
+        assert store.features("u1499").avg_order_value == 1499.0
+        assert store.features("u1499").orders_by_window == {7: 0, 30: 1}
+
+    def test_ingest_skips_malformed_records(self, store):
+        """Test ingest applies valid records and skips malformed and redelivered ones."""
+        records = [
+            {"user_id": "u1", "completed_at": NOON * 1000, "final_fare": "12.5", "order_id": "o1"},
+            {"user_id": "u1", "event_timestamp": days_ago(1) * 1000, "order_id": "o2"},
+            {"user_id": "u1", "completed_at": NOON * 1000, "order_id": "o1"},
+            {"completed_at": NOON * 1000, "order_id": "o3"},
+            {"user_id": "u2", "completed_at": NOON * 1000, "final_fare": "free"},
+            {"user_id": "u2"}
+        ]
+
+        assert store.ingest(ORDER_COMPLETED_TOPIC, records) == 2
+        features = store.features("u1")
+        assert features.order_count == 2
+        assert features.avg_order_value == 12.5
+        assert store.features("u2") is None
+
+    def test_ingest_rejects_unknown_topic(self, store):
+        """Test ingest only accepts order.completed records."""
+        with pytest.raises(ValueError):
+            store.ingest("driver.location", [])
+
+    def test_rejects_empty_windows(self):
+        """Test window lengths must be positive."""
+        with pytest.raises(ValueError):
+            OrderFeatureStore(window_days=())
+        with pytest.raises(ValueError):
+            OrderFeatureStore(window_days=(0, 7))
+
+
+class TestEventStreamConsumer:
+    """Test suite for EventStreamConsumer."""
+
+    def test_process_batch_counts_dropped_payloads(self, store):
+        """Test undecodable, malformed and redelivered payloads are counted as dropped."""
+        consumer = EventStreamConsumer(store, {})
+        payloads = [
+            json.dumps({"user_id": "u1", "completed_at": NOON * 1000, "order_id": "o1"}).encode(),
+            json.dumps({"user_id": "u1", "completed_at": NOON * 1000, "order_id": "o1"}).encode(),
+            b"not json",
+            json.dumps({"order_id": "o2"}).encode()
+        ]
+
+        assert consumer.process_batch(ORDER_COMPLETED_TOPIC, payloads) == 1
+        assert consumer.metrics == {"messages_received": 4, "records_applied": 1, "dropped": 3, "publishes": 0}
+
+    def test_publishing_requires_publish_method(self, store):
+        """Test a publish interval is rejected for sinks that cannot publish."""
+        with pytest.raises(ValueError):
+            EventStreamConsumer(store, {}, publish_interval_seconds=1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
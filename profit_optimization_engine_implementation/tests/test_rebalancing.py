@@ -0,0 +1,204 @@
+"""
+Tests for min-cost flow fleet rebalancing
+"""
+
+import numpy as np
+import pytest
+from rebalancing import FleetRebalancer, parse_zone
+
+SERVICES = ("RIDE", "MOTO", "FOOD", "GROCERY")
+
+
+def random_counts(rng, zones, mean):
+    """Draw counts per zone and service type on a small grid."""
+    return {
+        f"{row}:{column}": {service: int(rng.poisson(mean)) for service in SERVICES}
+        for row, column in zones
+    }
+
+
+def plan_cost(rebalancer, plan):
+    """Total cost of a plan: moves plus the penalty for unmet demand."""
+    return plan.reposition_cost + rebalancer.unmet_penalty * plan.unmet_demand
+
+
+def reference_cost(rebalancer, available, demand):
+    """
+    Solve the same rebalancing problem as a linear program.
+
+    Variables are the drivers moved along every allowed (surplus, deficit)
+    pair plus the unmet demand of every deficit; surplus drivers that do
+    not move stay idle for free. The constraint matrix is a transportation
+    problem, so the LP optimum is integral and equals the min-cost flow.
+    """
+    optimize = pytest.importorskip("scipy.optimize")
+    net = {}
+    for sign, counts_by_zone in ((1, available), (-1, demand)):
+        for zone, counts in counts_by_zone.items():
+            for service, count in counts.items():
+                key = (parse_zone(zone), service)
+                net[key] = net.get(key, 0) + sign * count
+    surplus = [(key, amount) for key, amount in net.items() if amount > 0]
+    deficit = [(key, -amount) for key, amount in net.items() if amount < 0]
+
+    arcs = []
+    for i, ((source, source_service), _) in enumerate(surplus):
+        for j, ((target, target_service), _) in enumerate(deficit):
+            rings = max(abs(source[0] - target[0]), abs(source[1] - target[1]))
+            if source_service == target_service:
+                extra = 0
+            elif (source_service, target_service) in rebalancer.switch_costs:
+                extra = rebalancer.switch_costs[(source_service, target_service)]
+            else:
+                continue
+            if rings <= rebalancer.max_rings:
+                arcs.append((i, j, rings * rebalancer.ring_cost + extra))
+
+    variables = len(arcs) + len(deficit)
+    cost = [arc_cost for _, _, arc_cost in arcs] + [rebalancer.unmet_penalty] * len(deficit)
+    supply_rows = np.zeros((len(surplus), variables))
+    demand_rows = np.zeros((len(deficit), variables))
+    for a, (i, j, _) in enumerate(arcs):
+        supply_rows[i, a] = 1.0
+        demand_rows[j, a] = 1.0
+    for j in range(len(deficit)):
+        demand_rows[j, len(arcs) + j] = 1.0
+    result = optimize.linprog(
+        cost,
+        A_ub=supply_rows if len(surplus) else None,
+        b_ub=[amount for _, amount in surplus] if len(surplus) else None,
+        A_eq=demand_rows,
+        b_eq=[amount for _, amount in deficit],
+        bounds=(0, None),
+        method="highs"
+    )
+    assert result.success
+    return round(result.fun)
+
+
+def assert_feasible(plan, available, demand):
+    """Check a plan moves no more drivers than a cell has spare and serves no more than it lacks."""
+    sent = {}
+    received = {}
+    for move in plan.moves:
+        source = (parse_zone(move["from_zone"]), move["from_service"])
+        target = (parse_zone(move["to_zone"]), move["to_service"])
+        sent[source] = sent.get(source, 0) + move["drivers"]
+        received[target] = received.get(target, 0) + move["drivers"]
+
+    def count(counts_by_zone, key):
+        zone, service = key
+        return counts_by_zone.get(f"{zone[0]}:{zone[1]}", {}).get(service, 0)
+
+    for key, drivers in sent.items():
+        assert drivers <= count(available, key) - count(demand, key)
+    for key, drivers in received.items():
+        assert drivers <= count(demand, key) - count(available, key)
+
+
+class TestFleetRebalancer:
+    """Test suite for FleetRebalancer."""
+
+    def test_single_move(self):
+        """Test a surplus driver moves to an adjacent deficit instead of leaving it unmet."""
+        plan = FleetRebalancer().solve({"0:0": {"RIDE": 2}}, {"0:1": {"RIDE": 1}, "0:0": {"RIDE": 1}})
+
+        assert plan.moves == [{
+            "from_zone": "0:0", "to_zone": "0:1", "from_service": "RIDE", "to_service": "RIDE",
+            "drivers": 1, "cost": 1
+        }]
+        assert (plan.unmet_demand, plan.idle_drivers) == (0, 0)
+
+    def test_moves_cheaper_than_the_penalty_only(self):
+        """Test demand farther than the penalty allows stays unmet."""
+        rebalancer = FleetRebalancer(max_rings=5, unmet_penalty=4)
+
+        plan = rebalancer.solve({"0:0": {"RIDE": 1}}, {"0:5": {"RIDE": 1}})
+
+        assert plan.moves == []
+        assert plan.unmet_by_zone == {"0:5": {"RIDE": 1}}
+        assert plan.idle_drivers == 1
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_cold_solve_matches_linear_program(self, seed):
+        """Test a cold solve reaches the LP optimum with a feasible plan."""
+        rng = np.random.default_rng(seed)
+        zones = [(row, column) for row in range(6) for column in range(6)]
+        available = random_counts(rng, zones, 1.2)
+        demand = random_counts(rng, zones, 2.0)
+        rebalancer = FleetRebalancer()
+
+        plan = rebalancer.solve(available, demand, warm_start=False)
+
+        assert not plan.warm_started
+        assert plan_cost(rebalancer, plan) == reference_cost(rebalancer, available, demand)
+        assert_feasible(plan, available, demand)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_warm_solve_matches_linear_program(self, seed):
+        """Test re-solving after small count changes stays optimal when warm started."""
+        rng = np.random.default_rng(100 + seed)
+        zones = [(row, column) for row in range(6) for column in range(6)]
+        available = random_counts(rng, zones, 1.2)
+        demand = random_counts(rng, zones, 2.0)
+        rebalancer = FleetRebalancer()
+        rebalancer.solve(available, demand)
+
+        for step in range(3):
+            for counts_by_zone in (available, demand):
+                for index in rng.choice(len(zones), 5, replace=False):
+                    counts = counts_by_zone[f"{zones[index][0]}:{zones[index][1]}"]
+                    service = SERVICES[rng.integers(len(SERVICES))]
+                    counts[service] = max(0, counts[service] + int(rng.integers(-2, 3)))
+            # A zone appearing for the first time
+            demand[f"{7 + step}:0"] = {"RIDE": 2}
+
+            plan = rebalancer.solve(available, demand)
+
+            assert plan.warm_started
+            assert plan_cost(rebalancer, plan) == reference_cost(rebalancer, available, demand)
+            assert_feasible(plan, available, demand)
+
+    def test_city_scale_solve_time(self):
+        """Test cold and warm solves over about 2k cells and six services stay under a second."""
+        rng = np.random.default_rng(7)
+        services = SERVICES + ("GOODS", "TRUCK_VAN")
+        zones = [f"{row}:{column}" for row in range(45) for column in range(45)]
+        available = {zone: {service: int(rng.poisson(3)) for service in services} for zone in zones}
+        demand = {zone: {service: int(rng.poisson(3)) for service in services} for zone in zones}
+        rebalancer = FleetRebalancer()
+
+        cold = rebalancer.solve(available, demand)
+        for counts_by_zone in (available, demand):
+            for index in rng.choice(len(zones), 100, replace=False):
+                counts = counts_by_zone[zones[index]]
+                service = services[rng.integers(len(services))]
+                counts[service] = max(0, counts[service] + int(rng.integers(-1, 2)))
+        warm = rebalancer.solve(available, demand)
+
+        assert warm.warm_started
+        assert cold.solve_ms < 1000
+        assert warm.solve_ms < 1000
+        assert plan_cost(rebalancer, warm) == plan_cost(
+            rebalancer, FleetRebalancer().solve(available, demand, warm_start=False)
+        )
+
+    def test_config_change_forces_cold_start(self):
+        """Test changing arc costs does not reuse a solution solved for other costs."""
+        rebalancer = FleetRebalancer()
+        rebalancer.solve({"0:0": {"RIDE": 2}}, {"0:1": {"RIDE": 2}})
+
+        rebalancer.ring_cost = 2
+        plan = rebalancer.solve({"0:0": {"RIDE": 2}}, {"0:1": {"RIDE": 2}})
+
+        assert not plan.warm_started
+        assert plan.reposition_cost == 4
+
+    def test_rejects_bad_zone_ids(self):
+        """Test zone ids that are not '<row>:<column>' are rejected."""
+        with pytest.raises(ValueError):
+            FleetRebalancer().solve({"downtown": {"RIDE": 1}}, {"0:0": {"RIDE": 1}})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+"""
+Tests for the per-zone surge state engine
+"""
+
+import pytest
+from surge_state import DRIVER_LOCATION_TOPIC, ORDER_CREATED_TOPIC, SurgeStateEngine
+
+LATITUDE, LONGITUDE = 40.7128, -74.0060
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(1000.0)
+
+
+@pytest.fixture
+def engine(clock):
+    """Engine with a 60 s window of 10 s buckets, no smoothing and a 30 s driver TTL."""
+    engine = SurgeStateEngine(
+        window_seconds=60.0,
+        bucket_seconds=10.0,
+        smoothing=1.0,
+        driver_ttl_seconds=30.0,
+        clock=clock
+    )
+    # Start the window at the fixture time
+    engine.advance()
+    return engine
+
+
+class TestSurgeStateEngine:
+    """Test suite for SurgeStateEngine."""
+
+    def test_waits_for_half_a_window_before_publishing(self, engine, clock):
+        """Test nothing is published until min_window_fraction of the window has elapsed."""
+        engine.record_order(LATITUDE, LONGITUDE, clock.now)
+
+        assert engine.publish() == {}
+        assert engine.stats()["warming_up"] is True
+        clock.now = 1025.0
+        engine.publish()
+        assert engine.zone(engine.zone_for(LATITUDE, LONGITUDE)) is not None
+        assert engine.stats()["warming_up"] is False
+
+    def test_partial_window_is_scaled_to_a_full_window(self, engine, clock):
+        """Test orders and supply are averaged over the buckets seen so far."""
+        zone_id = engine.zone_for(LATITUDE, LONGITUDE)
+        engine.record_driver("driver_1", LATITUDE, LONGITUDE, True, clock.now)
+        engine.record_order(LATITUDE, LONGITUDE, clock.now)
+        engine.record_order(LATITUDE, LONGITUDE, clock.now)
+
+        clock.now = 1025.0
+        state = engine.publish()[zone_id]
+
+        assert state.orders == 2
+        assert state.available_drivers == pytest.approx(1.0)
+        # 2 orders in 3 of 6 buckets count as 4 per window, against 1 driver
+        assert state.demand_supply_ratio == pytest.approx(4.0)
+        assert state.surge_multiplier == pytest.approx(2.5)
+        assert state.demand_level == pytest.approx(0.8)
+
+    def test_orders_leave_the_window(self, engine, clock):
+        """Test orders stop counting once their bucket is older than the window."""
+        zone_id = engine.zone_for(LATITUDE, LONGITUDE)
+        engine.record_order(LATITUDE, LONGITUDE, clock.now)
+
+        clock.now = 1055.0
+        assert engine.publish()[zone_id].orders == 1
+        clock.now = 1060.0
+        assert engine.publish()[zone_id].orders == 0
+
+    def test_late_and_future_orders(self, engine, clock):
+        """Test orders older than the window are dropped and future ones count as now."""
+        zone_id = engine.zone_for(LATITUDE, LONGITUDE)
+        clock.now = 1070.0
+        engine.record_order(LATITUDE, LONGITUDE, 1000.0)
+        engine.record_order(LATITUDE, LONGITUDE, 5000.0)
+
+        clock.now = 1095.0
+        assert engine.publish()[zone_id].orders == 1
+        clock.now = 1130.0
+        assert engine.publish()[zone_id].orders == 0
+
+    def test_silent_drivers_expire(self, engine, clock):
+        """Test drivers without an update for driver_ttl_seconds stop counting as supply."""
+        engine.record_driver("driver_1", LATITUDE, LONGITUDE, True, clock.now)
+        engine.record_driver("driver_2", LATITUDE, LONGITUDE, True, clock.now)
+
+        clock.now = 1025.0
+        engine.record_driver("driver_2", LATITUDE, LONGITUDE, True, clock.now)
+        engine.advance()
+        assert engine.stats()["available_drivers"] == 2
+        clock.now = 1045.0
+        engine.advance()
+
+        assert engine.stats()["available_drivers"] == 1
+        assert engine.stats()["tracked_drivers"] == 1
+
+    def test_drivers_move_between_zones(self, engine, clock):
+        """Test a driver counts in its latest zone only, and older updates are ignored."""
+        far_latitude = LATITUDE + 0.1
+        engine.record_driver("driver_1", LATITUDE, LONGITUDE, True, 1000.0)
+        engine.record_driver("driver_1", far_latitude, LONGITUDE, True, 1001.0)
+        engine.record_driver("driver_1", LATITUDE, LONGITUDE, True, 999.0)
+
+        clock.now = 1030.0
+        published = engine.publish()
+
+        assert published[engine.zone_for(LATITUDE, LONGITUDE)].available_drivers == 0.0
+        assert published[engine.zone_for(far_latitude, LONGITUDE)].available_drivers == pytest.approx(1.0)
+
+    def test_ingest_skips_malformed_records(self, engine, clock):
+        """Test records missing a field are skipped and the rest applied."""
+        millis = int(clock.now * 1000)
+        orders = [
+            {"pickup_location": {"latitude": LATITUDE, "longitude": LONGITUDE}, "created_at": millis},
+            {"created_at": millis}
+        ]
+        drivers = [
+            {"driver_id": "driver_1", "latitude": LATITUDE, "longitude": LONGITUDE,
+             "is_available": True, "event_timestamp": millis},
+            {"driver_id": "driver_2", "latitude": LATITUDE, "is_available": True, "event_timestamp": millis}
+        ]
+
+        assert engine.ingest(ORDER_CREATED_TOPIC, orders) == 1
+        assert engine.ingest(DRIVER_LOCATION_TOPIC, drivers) == 1
+        assert engine.stats()["available_drivers"] == 1
+        with pytest.raises(ValueError):
+            engine.ingest("order.completed", [])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])